@@ -0,0 +1,86 @@
+"""
+Add student daily stats rollup table
+
+Revision ID: 20260208_1000
+Revises: 20260207_1000
+Create Date: 2026-02-08 10:00:00
+
+This migration adds:
+1. student_daily_stats table holding per-student, per-day practice and
+   mistake aggregates maintained incrementally by the services
+
+Existing history is loaded by the backfill task
+(app.tasks.report_tasks.backfill_student_daily_stats).
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '20260208_1000'
+down_revision = '20260207_1000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_daily_stats',
+        sa.Column(
+            'id',
+            sa.UUID(),
+            server_default=sa.text('gen_random_uuid()'),
+            nullable=False
+        ),
+        sa.Column('student_id', sa.UUID(), nullable=False),
+        sa.Column('stat_date', sa.Date(), nullable=False),
+        sa.Column('practice_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('completed_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('correct_rate_sum', sa.Float(), server_default='0', nullable=False),
+        sa.Column('correct_rate_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('score_sum', sa.Float(), server_default='0', nullable=False),
+        sa.Column('score_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('time_spent_seconds', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('mistake_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column(
+            'mistakes_by_type',
+            postgresql.JSONB(astext_type=sa.Text()),
+            server_default=sa.text("'{}'::jsonb"),
+            nullable=True
+        ),
+        sa.Column(
+            'mistakes_by_status',
+            postgresql.JSONB(astext_type=sa.Text()),
+            server_default=sa.text("'{}'::jsonb"),
+            nullable=True
+        ),
+        sa.Column(
+            'updated_at',
+            sa.DateTime(),
+            server_default=sa.text('NOW()'),
+            nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ['student_id'],
+            ['students.id'],
+            name='fk_student_daily_stats_student',
+            ondelete='CASCADE'
+        ),
+        sa.UniqueConstraint(
+            'student_id',
+            'stat_date',
+            name='uq_student_daily_stats_student_date'
+        ),
+        sa.PrimaryKeyConstraint('id', name='pk_student_daily_stats')
+    )
+
+    op.create_index(
+        'ix_student_daily_stats_student_id',
+        'student_daily_stats',
+        ['student_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_student_daily_stats_student_id', table_name='student_daily_stats')
+    op.drop_table('student_daily_stats')
@@ -0,0 +1,77 @@
+"""
+Add question hash to mistakes for merge-on-repeat collection
+
+Revision ID: 20260209_1000
+Revises: 20260208_1000
+Create Date: 2026-02-09 10:00:00
+
+This migration adds:
+1. mistakes.question_hash (sha256 of the normalized question and correct answer)
+2. Partial unique index uq_mistakes_student_question_hash on
+   (student_id, question_hash) WHERE question_hash IS NOT NULL, used as the
+   ON CONFLICT target when collecting mistakes in bulk
+
+Existing rows are hashed with the same normalization as
+app.services.mistake_service.compute_question_hash. Only the most recent row
+of each (student_id, question_hash) group receives the hash; older duplicates
+keep NULL so the unique index can be built without deleting history.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20260209_1000'
+down_revision = '20260208_1000'
+branch_labels = None
+depends_on = None
+
+
+# 与 compute_question_hash 一致：折叠空白、转小写，题干与答案以 \x1f 分隔
+_HASH_EXPRESSION = """
+encode(
+    sha256(convert_to(
+        lower(btrim(regexp_replace(coalesce(question, ''), '\\s+', ' ', 'g')))
+        || chr(31)
+        || lower(btrim(regexp_replace(coalesce(correct_answer, ''), '\\s+', ' ', 'g'))),
+        'UTF8'
+    )),
+    'hex'
+)
+"""
+
+
+def upgrade() -> None:
+    op.add_column(
+        'mistakes',
+        sa.Column('question_hash', sa.String(length=64), nullable=True)
+    )
+
+    op.execute(f"""
+        WITH hashed AS (
+            SELECT
+                id,
+                {_HASH_EXPRESSION} AS question_hash,
+                row_number() OVER (
+                    PARTITION BY student_id, {_HASH_EXPRESSION}
+                    ORDER BY last_mistaken_at DESC, id
+                ) AS rn
+            FROM mistakes
+        )
+        UPDATE mistakes m
+        SET question_hash = hashed.question_hash
+        FROM hashed
+        WHERE m.id = hashed.id AND hashed.rn = 1
+    """)
+
+    op.create_index(
+        'uq_mistakes_student_question_hash',
+        'mistakes',
+        ['student_id', 'question_hash'],
+        unique=True,
+        postgresql_where=sa.text('question_hash IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_mistakes_student_question_hash', table_name='mistakes')
+    op.drop_column('mistakes', 'question_hash')
@@ -0,0 +1,49 @@
+"""
+Add persisted next review time to mistakes
+
+Revision ID: 20260210_1000
+Revises: 20260209_1000
+Create Date: 2026-02-10 10:00:00
+
+This migration adds:
+1. mistakes.next_review_at, the Ebbinghaus schedule maintained by the
+   mistake service on create / review / retry
+2. Composite index ix_mistakes_review_queue on
+   (student_id, status, next_review_at) for the review queue range queries
+
+Existing rows are backfilled with the same schedule as
+app.services.mistake_review_service.compute_next_review_at.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20260210_1000'
+down_revision = '20260209_1000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'mistakes',
+        sa.Column('next_review_at', sa.DateTime(), nullable=True)
+    )
+
+    # 间隔：第1~5次复习分别为 1/3/7/14/30 天，之后保持30天
+    op.execute("""
+        UPDATE mistakes
+        SET next_review_at = COALESCE(last_reviewed_at, first_mistaken_at)
+            + make_interval(days => (ARRAY[1, 3, 7, 14, 30])[LEAST(COALESCE(review_count, 0), 4) + 1])
+    """)
+
+    op.create_index(
+        'ix_mistakes_review_queue',
+        'mistakes',
+        ['student_id', 'status', 'next_review_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_mistakes_review_queue', table_name='mistakes')
+    op.drop_column('mistakes', 'next_review_at')
@@ -0,0 +1,145 @@
+"""
+Add cross-student mistake fingerprints
+
+Revision ID: 20260211_1000
+Revises: 20260210_1000
+Create Date: 2026-02-11 10:00:00
+
+This migration adds:
+1. mistake_fingerprints table: one row per (normalized question + correct
+   answer, normalized wrong answer), shared by all students, holding the
+   occurrence count and the shared AI analysis
+2. mistakes.fingerprint_id referencing the fingerprint of the latest wrong
+   answer, indexed for the class "most common mistakes" aggregation
+
+Existing rows are fingerprinted with the same normalization as
+app.services.mistake_service.compute_mistake_fingerprint. The question hash is
+recomputed inline because older duplicates keep question_hash NULL.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20260211_1000'
+down_revision = '20260210_1000'
+branch_labels = None
+depends_on = None
+
+
+def _normalized(column: str) -> str:
+    """折叠空白、转小写（与 normalize_answer_text 一致）"""
+    return f"lower(btrim(regexp_replace(coalesce({column}, ''), '\\s+', ' ', 'g')))"
+
+
+def _question_hash_expression(alias: str = "") -> str:
+    """与 compute_question_hash 一致"""
+    return f"""
+    encode(
+        sha256(convert_to(
+            {_normalized(alias + 'question')} || chr(31) || {_normalized(alias + 'correct_answer')},
+            'UTF8'
+        )),
+        'hex'
+    )
+    """
+
+
+def _fingerprint_expression(alias: str = "") -> str:
+    """与 compute_mistake_fingerprint 一致：题目哈希与错误答案以 \\x1f 分隔"""
+    return f"""
+    encode(
+        sha256(convert_to(
+            {_question_hash_expression(alias)} || chr(31) || {_normalized(alias + 'wrong_answer')},
+            'UTF8'
+        )),
+        'hex'
+    )
+    """
+
+
+def upgrade() -> None:
+    op.create_table(
+        'mistake_fingerprints',
+        sa.Column(
+            'id',
+            sa.UUID(),
+            server_default=sa.text('gen_random_uuid()'),
+            nullable=False
+        ),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('question_hash', sa.String(length=64), nullable=False),
+        sa.Column('question', sa.Text(), nullable=False),
+        sa.Column('wrong_answer', sa.Text(), nullable=False),
+        sa.Column('correct_answer', sa.Text(), nullable=False),
+        sa.Column('mistake_type', sa.String(length=50), nullable=False),
+        sa.Column('occurrence_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('ai_analysis', sa.JSON(), nullable=True),
+        sa.Column('analyzed_at', sa.DateTime(), nullable=True),
+        sa.Column('first_seen_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_seen_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('fingerprint')
+    )
+    op.create_index(
+        op.f('ix_mistake_fingerprints_question_hash'),
+        'mistake_fingerprints',
+        ['question_hash']
+    )
+
+    op.add_column(
+        'mistakes',
+        sa.Column('fingerprint_id', sa.UUID(), nullable=True)
+    )
+    op.create_foreign_key(
+        'fk_mistakes_fingerprint_id',
+        'mistakes',
+        'mistake_fingerprints',
+        ['fingerprint_id'],
+        ['id'],
+        ondelete='SET NULL'
+    )
+
+    # 回填指纹：展示字段取最早出现的错题，出现次数为所有学生错误次数之和
+    op.execute(f"""
+        WITH fingerprinted AS (
+            SELECT
+                {_fingerprint_expression()} AS fingerprint,
+                {_question_hash_expression()} AS question_hash,
+                question, wrong_answer, correct_answer, mistake_type,
+                mistake_count, first_mistaken_at, last_mistaken_at
+            FROM mistakes
+        )
+        INSERT INTO mistake_fingerprints (
+            fingerprint, question_hash, question, wrong_answer, correct_answer,
+            mistake_type, occurrence_count, first_seen_at, last_seen_at
+        )
+        SELECT DISTINCT ON (fingerprint)
+            fingerprint, question_hash, question, wrong_answer, correct_answer,
+            mistake_type,
+            sum(mistake_count) OVER (PARTITION BY fingerprint),
+            min(first_mistaken_at) OVER (PARTITION BY fingerprint),
+            max(last_mistaken_at) OVER (PARTITION BY fingerprint)
+        FROM fingerprinted
+        ORDER BY fingerprint, first_mistaken_at
+    """)
+
+    op.execute(f"""
+        UPDATE mistakes m
+        SET fingerprint_id = f.id
+        FROM mistake_fingerprints f
+        WHERE f.fingerprint = {_fingerprint_expression('m.')}
+    """)
+
+    op.create_index(
+        op.f('ix_mistakes_fingerprint_id'),
+        'mistakes',
+        ['fingerprint_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_mistakes_fingerprint_id'), table_name='mistakes')
+    op.drop_constraint('fk_mistakes_fingerprint_id', 'mistakes', type_='foreignkey')
+    op.drop_column('mistakes', 'fingerprint_id')
+    op.drop_index(op.f('ix_mistake_fingerprints_question_hash'), table_name='mistake_fingerprints')
+    op.drop_table('mistake_fingerprints')
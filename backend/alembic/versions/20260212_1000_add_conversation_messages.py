@@ -0,0 +1,119 @@
+"""
+Store conversation messages as append-only rows
+
+Revision ID: 20260212_1000
+Revises: 20260211_1000
+Create Date: 2026-02-12 10:00:00
+
+This migration adds:
+1. conversation_messages table: one row per message, unique on
+   (conversation_id, seq) so recent-context reads scan only the last N rows
+2. conversations.message_count: allocates the next seq and replaces
+   len(messages) in list responses
+
+Existing conversations.messages JSON blobs are expanded into rows (array
+order becomes seq), then the messages column is dropped. Downgrade rebuilds
+the blobs from the rows.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20260212_1000'
+down_revision = '20260211_1000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'conversation_messages',
+        sa.Column(
+            'id',
+            sa.UUID(),
+            server_default=sa.text('gen_random_uuid()'),
+            nullable=False
+        ),
+        sa.Column('conversation_id', sa.UUID(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('conversation_id', 'seq', name='uq_conversation_messages_conversation_seq')
+    )
+
+    op.add_column(
+        'conversations',
+        sa.Column('message_count', sa.Integer(), server_default='0', nullable=False)
+    )
+
+    # 展开历史消息：空值按空数组处理，被二次编码为 JSON 字符串的数组先解码一次
+    op.execute("""
+        WITH parsed AS (
+            SELECT id, started_at, coalesce(nullif(messages::text, ''), '[]')::jsonb AS doc
+            FROM conversations
+        ),
+        normalized AS (
+            SELECT
+                id,
+                started_at,
+                CASE WHEN jsonb_typeof(doc) = 'string' THEN (doc #>> '{}')::jsonb ELSE doc END AS doc
+            FROM parsed
+        )
+        INSERT INTO conversation_messages (conversation_id, seq, role, content, created_at)
+        SELECT
+            n.id,
+            m.ordinality,
+            coalesce(m.value ->> 'role', 'user'),
+            coalesce(m.value ->> 'content', ''),
+            coalesce((m.value ->> 'timestamp')::timestamp, n.started_at)
+        FROM normalized n
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(n.doc) = 'array' THEN n.doc ELSE '[]'::jsonb END
+        ) WITH ORDINALITY AS m(value, ordinality)
+    """)
+
+    op.execute("""
+        UPDATE conversations c
+        SET message_count = counts.total
+        FROM (
+            SELECT conversation_id, max(seq) AS total
+            FROM conversation_messages
+            GROUP BY conversation_id
+        ) counts
+        WHERE counts.conversation_id = c.id
+    """)
+
+    op.drop_column('conversations', 'messages')
+
+
+def downgrade() -> None:
+    op.add_column(
+        'conversations',
+        sa.Column('messages', sa.Text(), server_default='[]', nullable=False)
+    )
+
+    op.execute("""
+        UPDATE conversations c
+        SET messages = rebuilt.doc
+        FROM (
+            SELECT
+                conversation_id,
+                json_agg(
+                    json_build_object(
+                        'role', role,
+                        'content', content,
+                        'timestamp', to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US')
+                    )
+                    ORDER BY seq
+                )::text AS doc
+            FROM conversation_messages
+            GROUP BY conversation_id
+        ) rebuilt
+        WHERE rebuilt.conversation_id = c.id
+    """)
+
+    op.drop_column('conversations', 'message_count')
+    op.drop_table('conversation_messages')
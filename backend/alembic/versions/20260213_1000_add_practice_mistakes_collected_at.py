@@ -0,0 +1,43 @@
+"""
+Track mistake collection on practices
+
+Revision ID: 20260213_1000
+Revises: 20260212_1000
+Create Date: 2026-02-13 10:00:00
+
+This migration adds:
+1. practices.mistakes_collected_at, set when the mistake service collects a
+   practice. Repeated mistakes are merged into one row per (student_id,
+   question_hash) that keeps the practice_id of the first occurrence, so
+   mistakes.practice_id can no longer tell whether a later practice was
+   collected.
+
+Existing practices referenced by a mistake are backfilled as collected.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20260213_1000'
+down_revision = '20260212_1000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'practices',
+        sa.Column('mistakes_collected_at', sa.DateTime(), nullable=True)
+    )
+
+    op.execute("""
+        UPDATE practices
+        SET mistakes_collected_at = now()
+        WHERE id IN (
+            SELECT DISTINCT practice_id FROM mistakes WHERE practice_id IS NOT NULL
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('practices', 'mistakes_collected_at')
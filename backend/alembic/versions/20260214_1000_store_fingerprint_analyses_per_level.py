@@ -0,0 +1,46 @@
+"""
+Store shared mistake analyses per student level
+
+Revision ID: 20260214_1000
+Revises: 20260213_1000
+Create Date: 2026-02-14 10:00:00
+
+mistake_fingerprints.ai_analysis changes from a single analysis to a mapping
+{student_level: analysis}, matching the analysis cache key, which already
+includes the student level. Existing analyses were generated for an unknown
+level and are kept under the "legacy" key, which is only used for display and
+never reused for new students. Placeholder analyses written when the AI call
+failed are cleared.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20260214_1000'
+down_revision = '20260213_1000'
+branch_labels = None
+depends_on = None
+
+# 与 MistakeAnalysisService._create_fallback_analysis 的分类一致
+_FALLBACK_CATEGORY = '需要进一步分析'
+
+
+def upgrade() -> None:
+    op.execute(f"""
+        UPDATE mistake_fingerprints
+        SET ai_analysis = NULL, analyzed_at = NULL
+        WHERE ai_analysis->>'mistake_category' = '{_FALLBACK_CATEGORY}'
+    """)
+    op.execute("""
+        UPDATE mistake_fingerprints
+        SET ai_analysis = json_build_object('legacy', ai_analysis)
+        WHERE ai_analysis IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    # 每个指纹保留任意一个水平的分析
+    op.execute("""
+        UPDATE mistake_fingerprints
+        SET ai_analysis = (SELECT value FROM json_each(ai_analysis) LIMIT 1)
+        WHERE ai_analysis IS NOT NULL
+    """)
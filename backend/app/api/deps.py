@@ -5,15 +5,18 @@ API依赖注入模块
 import uuid
 from typing import AsyncGenerator, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import verify_token, get_token_jti, get_token_version, decode_token
-from app.core.token_blacklist import get_token_blacklist
+from app.core.exceptions import RateLimitError
+from app.core.rate_limiter import get_rate_limiter
+from app.core.request_admission import get_request_admission
+from app.core.security import verify_token, get_token_version, decode_token
 from app.models import User, UserRole
+from app.services.auth_principal_cache import AuthPrincipal, get_auth_principal_cache
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 
 # HTTP Bearer 安全方案
 security = HTTPBearer(auto_error=False)
@@ -33,25 +36,15 @@ async def check_token_not_revoked(
     Returns:
         tuple: (是否有效, 错误信息)
     """
-    try:
-        blacklist = get_token_blacklist()
-
-        # 检查 JTI 是否在黑名单中
-        jti = get_token_jti(token)
-        if jti and await blacklist.is_revoked(jti):
-            return False, "Token 已被撤销"
-
-        # 检查 Token 版本（用于密码修改后的撤销）
-        token_version = get_token_version(token)
-        if token_version:
-            is_valid = await blacklist.check_token_version(user_id, token_version)
-            if not is_valid:
-                return False, "Token 版本已过期，请重新登录"
+    payload = decode_token(token) or {}
 
-        return True, ""
-    except Exception:
-        # 如果 Redis 不可用，降级处理（允许请求通过）
-        return True, ""
+    # 黑名单和版本检查合并为一次 Redis 往返，确定未撤销的 Token 不访问 Redis
+    result = await get_request_admission().admit(
+        jti=payload.get("jti"),
+        user_id=user_id,
+        token_version=payload.get("version"),
+    )
+    return result.allowed, result.detail
 
 
 async def validate_token(
@@ -71,29 +64,38 @@ async def validate_token(
     Raises:
         HTTPException: Token 无效
     """
-    if credentials is None:
+    user_id = _verify_credentials(credentials, token_type)
+
+    # 检查 Token 是否被撤销
+    is_valid, error_msg = await check_token_not_revoked(credentials.credentials, user_id)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="未提供认证凭据",
+            detail=error_msg,
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    token = credentials.credentials
-    user_id = verify_token(token, token_type=token_type)
+    return user_id
 
-    if user_id is None:
+
+def _verify_credentials(
+    credentials: Optional[HTTPAuthorizationCredentials],
+    token_type: str = "access"
+) -> str:
+    """校验 Token 签名、过期时间和类型（不检查撤销），返回用户 ID"""
+    if credentials is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证凭据",
+            detail="未提供认证凭据",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 检查 Token 是否被撤销
-    is_valid, error_msg = await check_token_not_revoked(token, user_id)
-    if not is_valid:
+    user_id = verify_token(credentials.credentials, token_type=token_type)
+
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=error_msg,
+            detail="无效的认证凭据",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
@@ -119,6 +121,100 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def resolve_principal(
+    token: str,
+    user_id: str,
+    db: AsyncSession,
+) -> Optional[AuthPrincipal]:
+    """
+    解析已验证 Token 对应的认证主体
+
+    优先读取认证主体缓存（进程内LRU + Redis），未命中时用一条查询加载。
+
+    Args:
+        token: 已验证的 JWT token 字符串
+        user_id: Token 中的用户 ID
+        db: 数据库会话
+
+    Returns:
+        AuthPrincipal，如果用户ID无效或用户不存在则返回None
+    """
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        return None
+
+    cache = get_auth_principal_cache()
+    return await cache.get_or_load(db, user_uuid, get_token_version(token))
+
+
+def _user_load_options(role: str) -> list:
+    """根据角色构建用户查询的预加载选项（一对一关系使用 JOIN，一次查询完成）"""
+    if role == UserRole.STUDENT.value:
+        return [joinedload(User.organization), joinedload(User.student_profile)]
+    if role == UserRole.TEACHER.value:
+        return [joinedload(User.organization), joinedload(User.teacher_profile)]
+    return [joinedload(User.organization)]
+
+
+async def _load_user(db: AsyncSession, principal: AuthPrincipal) -> Optional[User]:
+    """按认证主体的角色加载用户及其关联数据"""
+    result = await db.execute(
+        select(User)
+        .options(*_user_load_options(principal.role))
+        .where(User.id == principal.user_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+) -> AuthPrincipal:
+    """
+    获取当前认证主体
+
+    只需要用户ID、角色、组织或档案ID的端点应使用此依赖，
+    稳态下（缓存命中）不访问数据库。
+
+    Args:
+        credentials: HTTP Bearer credentials（必需）
+        db: 数据库会话（仅在缓存未命中时使用）
+
+    Returns:
+        AuthPrincipal对象
+
+    Raises:
+        HTTPException: 如果未提供token、token无效或账户已被禁用
+    """
+    user_id = await validate_token(credentials)
+
+    return await _resolve_active_principal(credentials.credentials, user_id, db)
+
+
+async def _resolve_active_principal(
+    token: str,
+    user_id: str,
+    db: AsyncSession,
+) -> AuthPrincipal:
+    """解析认证主体并校验用户存在且已激活"""
+    principal = await resolve_principal(token, user_id, db)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户不存在",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="账户已被禁用",
+        )
+
+    return principal
+
+
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: AsyncSession = Depends(get_db),
@@ -148,40 +244,11 @@ async def get_current_user_optional(
     except HTTPException:
         return None
 
-    try:
-        user_uuid = uuid.UUID(user_id)
-    except ValueError:
+    principal = await resolve_principal(credentials.credentials, user_id, db)
+    if principal is None:
         return None
 
-    # 查询用户 - 根据角色预加载不同的关联数据
-    # 首先获取用户基本信息以确定角色
-    temp_result = await db.execute(
-        select(User).where(User.id == user_uuid)
-    )
-    temp_user = temp_result.scalar_one_or_none()
-
-    if temp_user is None:
-        return None
-
-    # 根据角色构建查询选项
-    from sqlalchemy.orm import selectinload
-
-    if temp_user.role == UserRole.STUDENT.value:
-        options = [selectinload(User.organization), selectinload(User.student_profile)]
-    elif temp_user.role == UserRole.TEACHER.value:
-        options = [selectinload(User.organization), selectinload(User.teacher_profile)]
-    else:
-        options = [selectinload(User.organization)]
-
-    # 重新查询用户并预加载关联数据
-    result = await db.execute(
-        select(User)
-        .options(*options)
-        .where(User.id == user_uuid)
-    )
-    user = result.scalar_one_or_none()
-
-    return user
+    return await _load_user(db, principal)
 
 
 async def get_current_user(
@@ -206,51 +273,18 @@ async def get_current_user(
         async def protected_endpoint(user: User = Depends(get_current_user)):
             return {"message": f"Hello {user.username}"}
     """
-    user_id = await validate_token(credentials)
+    # 认证主体来自缓存，已校验用户存在和激活状态，并确定需要预加载的档案
+    principal = await get_current_principal(credentials, db)
 
-    try:
-        user_uuid = uuid.UUID(user_id)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的用户ID",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    # 查询用户 - 根据角色预加载不同的关联数据
-    # 首先获取用户基本信息以确定角色
-    temp_result = await db.execute(
-        select(User).where(User.id == user_uuid)
-    )
-    temp_user = temp_result.scalar_one_or_none()
+    user = await _load_user(db, principal)
 
-    if temp_user is None:
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户不存在",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 根据角色构建查询选项
-    from sqlalchemy.orm import selectinload
-
-    if temp_user.role == UserRole.STUDENT.value:
-        # 学生需要预加载 student_profile
-        options = [selectinload(User.organization), selectinload(User.student_profile)]
-    elif temp_user.role == UserRole.TEACHER.value:
-        # 教师需要预加载 teacher_profile
-        options = [selectinload(User.organization), selectinload(User.teacher_profile)]
-    else:
-        options = [selectinload(User.organization)]
-
-    # 重新查询用户并预加载关联数据
-    result = await db.execute(
-        select(User)
-        .options(*options)
-        .where(User.id == user_uuid)
-    )
-    user = result.scalar_one_or_none()
-
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -350,27 +384,17 @@ async def get_current_student(
     Raises:
         HTTPException: 如果用户不是学生
     """
-    user_id = await validate_token(credentials)
+    principal = await get_current_principal(credentials, db)
 
-    try:
-        user_uuid = uuid.UUID(user_id)
-    except ValueError:
+    # 非学生用户直接拒绝，无需查询数据库
+    if principal.role != UserRole.STUDENT:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的用户ID",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要学生权限"
         )
 
     # 查询用户并预加载学生档案
-    result = await db.execute(
-        select(User)
-        .options(
-            selectinload(User.organization),
-            selectinload(User.student_profile),
-        )
-        .where(User.id == user_uuid)
-    )
-    user = result.scalar_one_or_none()
+    user = await _load_user(db, principal)
 
     if user is None:
         raise HTTPException(
@@ -385,12 +409,6 @@ async def get_current_student(
             detail="账户已被禁用",
         )
 
-    if user.role != UserRole.STUDENT:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="需要学生权限"
-        )
-
     return user
 
 
@@ -468,7 +486,7 @@ async def get_current_user_ws(
             detail="无效的用户ID"
         )
 
-    # 查询用户
+    # 查询用户（每个连接只认证一次，不经过认证主体缓存）
     result = await db.execute(
         select(User).where(User.id == user_uuid)
     )
@@ -487,3 +505,72 @@ async def get_current_user_ws(
         )
 
     return user
+
+
+def require_ai_quota(endpoint: str):
+    """
+    创建 AI 端点配额检查依赖
+
+    按用户滑动窗口和组织令牌桶扣减端点的成本权重，超出配额时返回 429。
+    Token 撤销/版本检查与配额扣减由请求准入脚本在同一次 Redis 往返中完成，
+    已撤销的 Token 返回 401 且不扣减配额。
+
+    Args:
+        endpoint: 端点名称（见 app.core.rate_limiter.AI_ENDPOINT_COSTS）
+
+    Returns:
+        FastAPI 依赖函数
+
+    Example:
+        @router.post("/", dependencies=[Depends(require_ai_quota("lesson_plan_generate"))])
+        async def create_lesson_plan(...):
+            ...
+    """
+
+    async def check_ai_quota(
+        response: Response,
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: AsyncSession = Depends(get_db),
+    ) -> None:
+        user_id = _verify_credentials(credentials)
+        token = credentials.credentials
+        principal = await _resolve_active_principal(token, user_id, db)
+        quota = get_rate_limiter().prepare_ai_quota(
+            endpoint=endpoint,
+            user_id=str(principal.user_id),
+            organization_id=str(principal.organization_id) if principal.organization_id else None,
+        )
+
+        payload = decode_token(token) or {}
+        admission = await get_request_admission().admit(
+            jti=payload.get("jti"),
+            user_id=user_id,
+            token_version=payload.get("version"),
+            quota=quota,
+        )
+        result = admission.quota
+        if result is None:
+            if not admission.allowed:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail=admission.detail,
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+            return  # 未启用 AI 限流
+
+        headers = {
+            "X-RateLimit-Limit": str(result.limit),
+            "X-RateLimit-Remaining": str(result.remaining),
+            "X-RateLimit-Reset": str(result.reset_seconds),
+        }
+        if not result.allowed:
+            detail = (
+                "组织的 AI 使用配额已用尽，请稍后再试"
+                if result.scope == "org"
+                else f"AI 请求过于频繁，请 {result.retry_after} 秒后重试"
+            )
+            raise RateLimitError(detail=detail, retry_after=result.retry_after, headers=headers)
+
+        response.headers.update(headers)
+
+    return check_ai_quota
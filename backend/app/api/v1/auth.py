@@ -8,7 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_principal, get_current_user, get_db
 from app.models import User
 from app.schemas.auth import (
     AuthResponse,
@@ -19,6 +19,7 @@ from app.schemas.auth import (
     TokenResponse,
     UserResponse,
 )
+from app.services.auth_principal_cache import AuthPrincipal
 from app.services.auth_service import AuthService
 
 router = APIRouter()
@@ -237,7 +238,7 @@ async def change_password(
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    current_user: User = Depends(get_current_user),
+    principal: AuthPrincipal = Depends(get_current_principal),
 ) -> None:
     """
     用户登出
@@ -247,7 +248,7 @@ async def logout(
 
     Args:
         credentials: HTTP Bearer credentials
-        current_user: 当前认证用户
+        principal: 当前认证主体
 
     Returns:
         None
@@ -265,7 +266,7 @@ async def logout(
         blacklist = get_token_blacklist()
         await blacklist.add_to_blacklist(
             jti=jti,
-            user_id=str(current_user.id),
+            user_id=str(principal.user_id),
             reason="logout"
         )
 
@@ -9,7 +9,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_db, require_ai_quota
 from app.models import User, Student, Content
 from app.schemas.recommendation import (
     DailyContentResponse,
@@ -28,12 +28,17 @@ from app.schemas.recommendation import (
     ContentSearchResponse,
     ContentSearchResult,
 )
+from app.services.recommendation_cache_service import get_recommendation_cache
 from app.services.recommendation_service import RecommendationService
 
 router = APIRouter()
 
 
-@router.get("/recommend", response_model=DailyContentResponse)
+@router.get(
+    "/recommend",
+    response_model=DailyContentResponse,
+    dependencies=[Depends(require_ai_quota("content_recommend"))],
+)
 async def get_daily_recommendations(
     *,
     db: AsyncSession = Depends(get_db),
@@ -513,6 +518,10 @@ async def mark_content_complete(
     db.add(history)
     await db.commit()
 
+    # 完成内容后刷新当日推荐
+    cache = await get_recommendation_cache()
+    await cache.invalidate_daily(student.id)
+
     return ContentCompletionResponse(
         success=True,
         message="内容完成记录成功",
@@ -809,6 +818,10 @@ async def update_recommendation_preferences(
     preference.updated_at = datetime.utcnow()
     await db.commit()
 
+    # 偏好变化后刷新当日推荐
+    cache = await get_recommendation_cache()
+    await cache.invalidate_daily(student.id)
+
     return RecommendationPreferenceResponse(
         user_id=preference.user_id,
         preferred_topics=preference.preferred_topics or [],
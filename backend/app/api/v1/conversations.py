@@ -4,8 +4,9 @@
 """
 import uuid
 import json
+import logging
 from datetime import datetime
-from typing import List, Optional, AsyncGenerator
+from typing import Dict, List, Optional, AsyncGenerator
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
@@ -13,7 +14,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.api.deps import get_db, get_current_user, get_current_student
+from app.api.deps import get_db, get_current_user, get_current_student, require_ai_quota
+from app.db.session_manager import get_session_maker
 from app.models import User, Student, Conversation, ConversationScenario
 from app.schemas.conversation import (
     CreateConversationRequest,
@@ -29,54 +31,66 @@ from app.schemas.conversation import (
 )
 from app.services.conversation_service import get_conversation_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
-async def _stream_ai_response(
-    response_text: str
+def _sse_event(data: dict) -> str:
+    """格式化 SSE 数据帧"""
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_ai_reply(
+    conversation_id: str,
+    api_messages: List[Dict[str, str]]
 ) -> AsyncGenerator[str, None]:
     """
-    流式生成 AI 响应
+    转发 AI 回复的增量文本，结束后保存完整回复
+
+    响应开始发送后请求的数据库会话可能已关闭，保存回复使用独立的会话。
 
     Args:
-        response_text: 完整的 AI 响应文本
+        conversation_id: 对话 ID (UUID)
+        api_messages: 发送给 AI 的消息列表
 
     Yields:
         SSE 格式的数据流
     """
-    # 模拟逐字流式输出
-    words = response_text.split()
-    accumulated = ""
-
-    for i, word in enumerate(words):
-        accumulated += word + " "
-
-        # 发送 token 事件
-        chunk = {
-            "type": "token",
-            "content": word + " ",
-            "index": i
-        }
-        yield f"data: {json.dumps(chunk)}\n\n"
-
-        # 模拟网络延迟
-        await asyncio.sleep(0.03)
+    service = get_conversation_service()
+    deltas: List[str] = []
+    try:
+        async for delta in service.stream_reply(api_messages):
+            # 发送 token 事件
+            yield _sse_event({
+                "type": "token",
+                "content": delta,
+                "index": len(deltas)
+            })
+            deltas.append(delta)
+
+        # 完整回复只保存一次（产出的文本已过滤思考过程，与推送内容一致）
+        async with get_session_maker()() as db:
+            full_message = await service.save_reply(
+                db, conversation_id, "".join(deltas), extracted=True
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"流式生成对话 {conversation_id} 的回复失败: {e}")
+        yield _sse_event({"type": "error", "error": "AI 回复生成失败，请重试"})
+        return
 
     # 发送完成事件
-    complete_chunk = {
+    yield _sse_event({
         "type": "complete",
-        "full_message": accumulated.strip(),
-        "total_tokens": len(words)
-    }
-    yield f"data: {json.dumps(complete_chunk)}\n\n"
+        "full_message": full_message,
+        "total_tokens": len(deltas)
+    })
 
     # 发送结束标记
     yield "data: [DONE]\n\n"
 
 
-import asyncio
-
-
 @router.post(
     "",
     response_model=ConversationResponse,
@@ -141,7 +155,7 @@ async def create_conversation(
         scenario=conversation.scenario.value,
         level=conversation.level,
         status=conversation.status.value,
-        message_count=len(conversation.get_messages()),
+        message_count=conversation.message_count,
         started_at=conversation.started_at,
         completed_at=conversation.completed_at
     )
@@ -151,7 +165,8 @@ async def create_conversation(
     "/{conversation_id}/message",
     response_model=SendMessageResponse,
     summary="发送消息",
-    description="在对话中发送用户消息并获取 AI 回复"
+    description="在对话中发送用户消息并获取 AI 回复",
+    dependencies=[Depends(require_ai_quota("conversation_message"))],
 )
 async def send_message(
     conversation_id: str,
@@ -227,7 +242,8 @@ async def send_message(
 @router.get(
     "/{conversation_id}/message/stream",
     summary="发送消息（流式）",
-    description="发送用户消息并以流式方式获取 AI 回复（SSE）"
+    description="发送用户消息并以流式方式获取 AI 回复（SSE）",
+    dependencies=[Depends(require_ai_quota("conversation_message"))],
 )
 async def send_message_stream(
     conversation_id: str,
@@ -277,10 +293,10 @@ async def send_message_stream(
             detail="对话不存在"
         )
 
-    # 发送消息获取完整响应
+    # 保存用户消息并构建上下文（在响应开始前完成校验）
     service = get_conversation_service()
     try:
-        ai_response = await service.send_message(
+        api_messages = await service.prepare_reply(
             db=db,
             conversation_id=conversation_id,
             user_message=message
@@ -292,9 +308,9 @@ async def send_message_stream(
             detail=str(e)
         )
 
-    # 返回流式响应
+    # 返回流式响应：模型产出的 token 立即转发
     return StreamingResponse(
-        _stream_ai_response(ai_response),
+        _stream_ai_reply(conversation_id, api_messages),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -376,7 +392,7 @@ async def complete_conversation(
         status=conversation.status.value,
         completed_at=conversation.completed_at,
         scores=ConversationScores(**scores),
-        message_count=len(conversation.get_messages()),
+        message_count=conversation.message_count,
         duration_seconds=conversation.calculate_duration_seconds()
     )
 
@@ -434,7 +450,8 @@ async def get_conversation(
         )
 
     # 获取消息
-    messages_data = conversation.get_messages()
+    service = get_conversation_service()
+    messages_data = await service.get_messages(db, conversation.id)
     messages = [
         MessageSchema(
             role=msg["role"],
@@ -517,7 +534,7 @@ async def list_conversations(
             scenario=c.scenario.value,
             level=c.level,
             status=c.status.value,
-            message_count=len(c.get_messages()),
+            message_count=c.message_count,
             started_at=c.started_at,
             completed_at=c.completed_at
         )
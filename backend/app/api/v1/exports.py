@@ -15,6 +15,7 @@ from app.models import User, UserRole
 from app.models.export_task import ExportFormat
 from app.models.lesson_plan import LessonPlan
 from app.services.content_renderer_service import ContentRendererService
+from app.services.progress_notifier import progress_notifier
 from app.services.streaming_document_service import get_streaming_document_service
 
 logger = logging.getLogger(__name__)
@@ -29,6 +30,7 @@ async def stream_export_lesson_plan(
     template_id: Optional[uuid.UUID] = Query(None, description="可选的模板ID"),
     include_sections: Optional[List[str]] = Query(None, description="要包含的章节列表"),
     chunk_size: int = Query(8192, ge=1024, le=1048576, description="数据块大小（字节）"),
+    task_id: Optional[str] = Query(None, description="进度任务ID（可选，通过导出 WebSocket 接收生成进度）"),
     current_user: User = Depends(get_current_teacher),
     db: AsyncSession = Depends(get_db),
 ) -> StreamingResponse:
@@ -43,6 +45,7 @@ async def stream_export_lesson_plan(
         template_id: 可选的模板ID
         include_sections: 要包含的章节列表
         chunk_size: 数据块大小（字节），范围 1024-1048576
+        task_id: 进度任务ID，提供时生成进度经合并后推送到 /ws/lesson-export/{task_id}
         current_user: 当前教师用户
         db: 数据库会话
 
@@ -130,6 +133,13 @@ async def stream_export_lesson_plan(
 
     # 7. 流式生成文档
     streaming_service = get_streaming_document_service()
+    progress_callback = (
+        progress_notifier.progress_callback(
+            task_id, f"正在生成{export_format.value.upper()}文档..."
+        )
+        if task_id
+        else None
+    )
 
     # 定义异步生成器函数
     async def generate_document() -> AsyncIterator[bytes]:
@@ -140,6 +150,7 @@ async def stream_export_lesson_plan(
                     content=content_data,
                     template_vars=template_vars,
                     chunk_size=chunk_size,
+                    progress_callback=progress_callback,
                 ):
                     yield chunk
 
@@ -148,6 +159,7 @@ async def stream_export_lesson_plan(
                     lesson_plan=lesson_plan,
                     chunk_size=chunk_size,
                     include_sections=include_sections,
+                    progress_callback=progress_callback,
                 ):
                     yield chunk
 
@@ -156,11 +168,18 @@ async def stream_export_lesson_plan(
                     content=content_data,
                     template_vars=template_vars,
                     chunk_size=chunk_size,
+                    progress_callback=progress_callback,
                 ):
                     yield chunk
 
+            if task_id:
+                # 补发最终进度并释放合并器
+                await progress_notifier.notify_complete(task_id)
+
         except Exception as e:
             logger.error(f"流式生成文档失败: {str(e)}")
+            if task_id:
+                await progress_notifier.notify_error(task_id, f"文档生成失败: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"文档生成失败: {str(e)}"
@@ -768,3 +768,78 @@ async def get_class_summary(
     )
 
     return summary
+
+
+@router.get("/teacher/class-summaries", response_model=dict)
+async def get_class_summaries(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    class_ids: Optional[str] = Query(None, description="班级ID列表（逗号分隔，默认全部在读班级）"),
+    period_start: Optional[str] = Query(None, description="统计开始时间（ISO 8601格式）"),
+    period_end: Optional[str] = Query(None, description="统计结束时间（ISO 8601格式）"),
+) -> Any:
+    """
+    批量获取教师多个班级的学习状况汇总
+
+    Args:
+        db: 数据库会话
+        current_user: 当前认证用户（必须是教师）
+        class_ids: 班级ID列表（逗号分隔，可选）
+        period_start: 统计开始时间（可选，默认30天前）
+        period_end: 统计结束时间（可选，默认当前时间）
+
+    Returns:
+        dict: 班级学习状况汇总列表
+
+    Raises:
+        HTTPException 403: 权限不足
+    """
+    # 权限检查
+    if current_user.role not in [UserRole.TEACHER, UserRole.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有教师可以查看班级学习状况"
+        )
+
+    class_uuids = None
+    if class_ids:
+        try:
+            class_uuids = [uuid.UUID(cid.strip()) for cid in class_ids.split(",") if cid.strip()]
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的班级ID格式"
+            )
+
+    # 检查教师档案
+    if not current_user.teacher_profile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="教师档案不存在"
+        )
+
+    # 处理时间参数
+    from datetime import datetime
+
+    try:
+        start_time = datetime.fromisoformat(period_start) if period_start else None
+        end_time = datetime.fromisoformat(period_end) if period_end else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="时间格式错误，应为 ISO 8601 格式"
+        )
+
+    service = get_learning_report_service(db)
+    summaries = await service.generate_class_summaries(
+        teacher_id=current_user.teacher_profile.id,
+        class_ids=class_uuids,
+        period_start=start_time,
+        period_end=end_time,
+    )
+
+    return {
+        "total": len(summaries),
+        "classes": summaries,
+    }
@@ -9,7 +9,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_db, require_ai_quota
+from app.core.config import settings
 from app.models import User, UserRole
 from app.schemas.lesson_plan import (
     ExportLessonPlanRequest,
@@ -33,7 +34,12 @@ from app.services.lesson_plan_service import get_lesson_plan_service, LessonPlan
 router = APIRouter()
 
 
-@router.post("/", response_model=LessonPlanResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=LessonPlanResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_ai_quota("lesson_plan_generate"))],
+)
 async def create_lesson_plan(
     request: GenerateLessonPlanRequest,
     db: AsyncSession = Depends(get_db),
@@ -52,6 +58,10 @@ async def create_lesson_plan(
     - 练习题
     - PPT大纲
 
+    启用流水线生成时，接口在教案骨架生成后立即返回（状态为 generating），
+    其余章节完成后通过 WebSocket 推送 lesson_plan_generation 消息。
+    全部章节完成后状态为 generated，部分章节失败为 partial，全部失败为 failed。
+
     Args:
         request: 生成教案请求
         db: 数据库会话
@@ -73,7 +83,12 @@ async def create_lesson_plan(
 
     try:
         # 生成教案
-        lesson_plan = await lesson_plan_service.generate_lesson_plan(
+        generate = (
+            lesson_plan_service.generate_lesson_plan_pipelined
+            if settings.LESSON_PLAN_PIPELINE_ENABLED
+            else lesson_plan_service.generate_lesson_plan
+        )
+        lesson_plan = await generate(
             db=db,
             teacher_id=current_user.id,
             request=request,
@@ -714,7 +729,11 @@ async def preview_lesson_plan_ppt(
         )
 
 
-@router.post("/{lesson_plan_id}/regenerate", response_model=LessonPlanResponse)
+@router.post(
+    "/{lesson_plan_id}/regenerate",
+    response_model=LessonPlanResponse,
+    dependencies=[Depends(require_ai_quota("lesson_plan_generate"))],
+)
 async def regenerate_lesson_plan(
     lesson_plan_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
@@ -762,10 +781,17 @@ async def regenerate_lesson_plan(
         request = GenerateLessonPlanRequest(**original_params)
 
         # 重新生成
-        new_lesson_plan = await lesson_plan_service.generate_lesson_plan(
+        generate = (
+            lesson_plan_service.generate_lesson_plan_pipelined
+            if settings.LESSON_PLAN_PIPELINE_ENABLED
+            else lesson_plan_service.generate_lesson_plan
+        )
+        # 重新生成需要新的内容，不复用缓存结果
+        new_lesson_plan = await generate(
             db=db,
             teacher_id=current_user.id,
             request=request,
+            use_cache=False,
         )
 
         return _convert_to_response(new_lesson_plan)
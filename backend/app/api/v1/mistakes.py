@@ -9,12 +9,13 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_db, require_ai_quota
 from app.models import User, UserRole
 from app.models.mistake import MistakeStatus, MistakeType
 from app.services.mistake_service import get_mistake_service
 from app.services.mistake_analysis_service import get_mistake_analysis_service
 from app.services.mistake_export_service import get_mistake_export_service
+from app.services.mistake_fingerprint_service import get_mistake_fingerprint_service
 from app.services.mistake_review_service import get_mistake_review_service
 
 router = APIRouter()
@@ -59,6 +60,9 @@ async def create_mistake(
     创建错题记录
 
     学生或教师可以手动添加错题到错题本。
+    同一学生已有同一道题（规范化题干 + 正确答案相同）的错题时不会新建记录，
+    而是合并到已有错题：错误次数加一、更新最新错误答案并重新置为待复习，
+    返回的 merged 为 true。
 
     Args:
         db: 数据库会话
@@ -76,7 +80,7 @@ async def create_mistake(
             - topic: 主题分类（可选）
 
     Returns:
-        dict: 创建的错题记录
+        dict: 创建或合并后的错题记录
 
     Raises:
         HTTPException 400: 数据格式错误
@@ -153,8 +157,157 @@ async def create_mistake(
         "mistake_type": mistake.mistake_type,
         "status": mistake.status,
         "question": mistake.question,
+        "mistake_count": mistake.mistake_count,
+        "merged": mistake.mistake_count > 1,
         "created_at": mistake.created_at.isoformat(),
-        "message": "错题记录创建成功"
+        "message": "已合并到已有错题" if mistake.mistake_count > 1 else "错题记录创建成功"
+    }
+
+
+@router.post("/collect/batch", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def collect_mistakes_batch(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    request_data: dict,
+) -> Any:
+    """
+    批量收集多份练习的错题（异步）
+
+    考试结束后教师一次提交整班的练习，由后台任务分批合并写入错题本。
+    教师只能提交自己所带班级学生的练习；未完成或已收集过的练习会被跳过。
+
+    Args:
+        db: 数据库会话
+        current_user: 当前认证用户（必须是教师或管理员）
+        request_data: 请求数据，包含 practice_ids（练习ID列表）
+
+    Returns:
+        dict: 已提交的练习数量
+
+    Raises:
+        HTTPException 400: 练习ID列表为空或格式无效，或教师档案不存在
+        HTTPException 403: 权限不足，或包含不属于所带班级学生的练习
+    """
+    if current_user.role not in [UserRole.TEACHER, UserRole.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有教师可以批量收集错题"
+        )
+
+    practice_ids = request_data.get("practice_ids") or []
+    if not practice_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="练习ID列表不能为空"
+        )
+    try:
+        practice_uuids = list(dict.fromkeys(uuid.UUID(str(practice_id)) for practice_id in practice_ids))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的练习ID格式"
+        )
+
+    # 教师只能收集所带班级学生的练习（后台任务不再校验归属）
+    if current_user.role == UserRole.TEACHER:
+        if not current_user.teacher_profile:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="教师档案不存在，请先完善个人信息"
+            )
+        service = get_mistake_service(db)
+        allowed = await service.filter_teacher_practices(
+            practice_uuids, current_user.teacher_profile.id
+        )
+        if len(allowed) != len(practice_uuids):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="包含不属于所带班级学生的练习"
+            )
+
+    practice_ids = [str(practice_id) for practice_id in practice_uuids]
+
+    from app.core.celery import celery_app
+
+    celery_app.send_task(
+        "app.tasks.mistake_tasks.collect_mistakes_for_practices",
+        args=[practice_ids],
+        queue="default",
+    )
+
+    return {
+        "submitted_count": len(practice_ids),
+        "message": f"已提交 {len(practice_ids)} 份练习的错题收集任务",
+    }
+
+
+@router.get("/class/{class_id}/common-mistakes", response_model=dict)
+async def get_class_common_mistakes(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    class_id: str,
+    limit: int = Query(10, ge=1, le=50, description="返回数量限制"),
+) -> Any:
+    """
+    获取班级最常见的错误
+
+    按错题指纹（同一道题的同一种错误答案）统计班级学生的错题，
+    按出错学生数和出错次数降序排列。
+
+    Args:
+        db: 数据库会话
+        current_user: 当前认证用户（必须是教师或管理员）
+        class_id: 班级ID
+        limit: 返回数量限制
+
+    Returns:
+        dict: 班级最常见错误列表
+
+    Raises:
+        HTTPException 400: 班级ID格式无效或教师档案不存在
+        HTTPException 403: 权限不足
+        HTTPException 404: 班级不存在或不属于当前教师
+    """
+    if current_user.role not in [UserRole.TEACHER, UserRole.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有教师可以查看班级常见错误"
+        )
+
+    teacher_id = None
+    if current_user.role == UserRole.TEACHER:
+        if not current_user.teacher_profile:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="教师档案不存在，请先完善个人信息"
+            )
+        teacher_id = current_user.teacher_profile.id
+
+    try:
+        class_uuid = uuid.UUID(class_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的班级ID格式"
+        )
+
+    service = get_mistake_fingerprint_service(db)
+    common_mistakes = await service.get_class_common_mistakes(
+        class_id=class_uuid,
+        teacher_id=teacher_id,
+        limit=limit,
+    )
+    if common_mistakes is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="班级不存在"
+        )
+
+    return {
+        "class_id": class_id,
+        "common_mistakes": common_mistakes,
     }
 
 
@@ -679,7 +832,8 @@ async def delete_mistake(
                 detail="无权删除此错题"
             )
 
-    # 删除错题
+    # 删除错题（同一事务内扣减每日统计）
+    await service.daily_stats_service.record_mistake_deleted(mistake)
     await db.delete(mistake)
     await db.commit()
 
@@ -763,6 +917,7 @@ async def analyze_mistake(
             difficulty_level=mistake.difficulty_level,
             mistake_count=mistake.mistake_count,
             student_level=current_user.student_profile.current_cefr_level,
+            fingerprint_id=mistake.fingerprint_id,
         )
 
         # 更新错题的AI分析结果
@@ -830,7 +985,11 @@ async def analyze_mistake(
         )
 
 
-@router.post("/batch-analyze", response_model=dict)
+@router.post(
+    "/batch-analyze",
+    response_model=dict,
+    dependencies=[Depends(require_ai_quota("mistake_batch_analyze"))],
+)
 async def batch_analyze_mistakes(
     *,
     db: AsyncSession = Depends(get_db),
@@ -903,6 +1062,7 @@ async def batch_analyze_mistakes(
             "topic": m.topic,
             "difficulty_level": m.difficulty_level,
             "mistake_count": m.mistake_count,
+            "fingerprint_id": m.fingerprint_id,
         }
         for m in mistakes
     ]
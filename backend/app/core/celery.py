@@ -3,6 +3,7 @@ Celery 配置
 异步任务队列配置，用于处理耗时的后台任务（PDF导出、批量操作等）
 """
 from celery import Celery
+from celery.schedules import crontab
 from kombu import Queue
 
 from app.core.config import settings
@@ -69,6 +70,17 @@ celery_app.conf.update(
             "schedule": 3600.0,  # 每小时执行一次
             "options": {"queue": "default"},
         },
+        "precompute-daily-recommendations": {
+            "task": "app.tasks.recommendation_tasks.precompute_daily_recommendations",
+            "schedule": crontab(hour=4, minute=0),  # 每天凌晨4点（低峰期）
+            "options": {"queue": "default"},
+        },
+        "reconcile-student-daily-stats": {
+            "task": "app.tasks.report_tasks.backfill_student_daily_stats",
+            "schedule": crontab(hour=3, minute=30),  # 每天凌晨3点半重建最近两天
+            "kwargs": {"days": 2},
+            "options": {"queue": "default"},
+        },
     },
 )
 
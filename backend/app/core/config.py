@@ -86,6 +86,10 @@ class Settings(BaseSettings):
     ZHIPUAI_TOP_K: int = 1
     # 教案生成专用超时配置（秒）
     ZHIPUAI_LESSON_PLAN_TIMEOUT: int = 600
+    # 教案流水线生成：先返回教案骨架，分层材料/练习题/PPT大纲在后台并发生成并通过WebSocket逐节推送
+    # 默认关闭：客户端需要处理 generating/partial/failed 状态和逐节推送后再开启
+    LESSON_PLAN_PIPELINE_ENABLED: bool = False
+    LESSON_PLAN_SHUTDOWN_TIMEOUT: int = 10  # 应用关闭时等待后台章节生成的最长时间（秒），超时的教案标记为失败
 
     # OpenAI (备用)
     OPENAI_API_KEY: str = ""
@@ -109,11 +113,51 @@ class Settings(BaseSettings):
     # AI提供商选择
     AI_PROVIDER: str = "zhipuai"  # zhipuai, openai, anthropic
 
+    # 向量嵌入缓存配置（进程内LRU + Redis两级缓存）
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_TTL: int = 30 * 24 * 3600  # 30天，相同模型的嵌入结果稳定
+    EMBEDDING_CACHE_LOCAL_TTL: int = 3600  # 进程内缓存1小时
+    EMBEDDING_CACHE_LOCAL_MAX_BYTES: int = 64 * 1024 * 1024  # 进程内缓存上限64MB
+
+    # 大模型响应缓存配置（按规范化提示词哈希缓存，各调用点TTL见 app.services.llm_response_cache.LLM_CACHE_TTLS）
+    LLM_RESPONSE_CACHE_ENABLED: bool = True
+    LLM_RESPONSE_CACHE_SEMANTIC_ENABLED: bool = False  # 精确未命中时是否按向量相似度复用近似请求的响应
+    LLM_RESPONSE_CACHE_SEMANTIC_THRESHOLD: float = 0.97  # 余弦相似度阈值
+    LLM_RESPONSE_CACHE_SEMANTIC_MAX_ENTRIES: int = 200  # 每个语义分区保留的向量数
+
+    # 推荐精排配置
+    RECOMMENDATION_RERANKER: str = "linear"  # 请求路径上使用的本地精排器
+    RECOMMENDATION_LLM_RERANK_ENABLED: bool = False  # 是否在返回后异步使用LLM精排增强结果
+
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_MAX_CONNECTIONS: int = 50
     CACHE_TTL: int = 3600
 
+    # 认证主体缓存配置（进程内LRU + Redis，按用户ID和Token版本缓存角色/档案ID）
+    AUTH_PRINCIPAL_CACHE_TTL: int = 300  # Redis缓存5分钟
+    AUTH_PRINCIPAL_CACHE_LOCAL_TTL: int = 30  # 进程内缓存30秒（限制其他进程失效前的延迟）
+    AUTH_PRINCIPAL_CACHE_LOCAL_MAX_BYTES: int = 4 * 1024 * 1024  # 进程内缓存上限4MB
+
+    # 对话上下文缓存配置（进行中对话的系统提示和最近消息，消息在后台写入数据库）
+    CONVERSATION_CONTEXT_CACHE_ENABLED: bool = True
+    CONVERSATION_CONTEXT_CACHE_TTL: int = 1800  # 30分钟无新消息后过期
+    CONVERSATION_WRITE_BEHIND_RETRIES: int = 3  # 后台写入消息失败后的重试次数
+    CONVERSATION_WRITE_BEHIND_RETRY_DELAY: float = 0.5  # 首次重试延迟（秒），之后每次翻倍
+
+    # AI 端点配额配置（端点成本权重见 app.core.rate_limiter.AI_ENDPOINT_COSTS）
+    AI_RATE_LIMIT_ENABLED: bool = True
+    AI_RATE_LIMIT_USER_BUDGET: int = 60  # 每个用户每个窗口可消耗的成本单位
+    AI_RATE_LIMIT_USER_WINDOW: int = 60  # 用户滑动窗口长度（秒）
+    AI_RATE_LIMIT_ORG_CAPACITY: int = 600  # 组织令牌桶容量（允许的突发量）
+    AI_RATE_LIMIT_ORG_REFILL_RATE: float = 5.0  # 组织令牌桶每秒恢复的成本单位
+    AI_RATE_LIMIT_ORG_OVERRIDES: dict[str, int] = {}  # 按组织ID覆盖令牌桶容量
+
+    # WebSocket 配置（多进程部署时通过 Redis pub/sub 转发消息）
+    WEBSOCKET_BACKPLANE_ENABLED: bool = True
+    WEBSOCKET_SEND_TIMEOUT: float = 5.0  # 单次发送超时（秒），超时按慢消费者驱逐
+    WEBSOCKET_MAX_PENDING_SENDS: int = 16  # 每个连接同时进行中的最大发送数
+
     # 分页配置
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
@@ -123,6 +167,9 @@ class Settings(BaseSettings):
     EXPORT_MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
     EXPORT_FILE_RETENTION_DAYS: int = 30
     EXPORT_TASK_RETENTION_DAYS: int = 7
+    EXPORT_PROGRESS_MIN_INTERVAL: float = 0.5  # 进度推送最小间隔（秒）
+    EXPORT_PROGRESS_MIN_DELTA: int = 5  # 进度变化达到该百分点时不受间隔限制立即推送
+    EXPORT_PROGRESS_IDLE_TIMEOUT: int = 600  # 进度合并器空闲超过该秒数后释放（秒）
     MAX_CONCURRENT_EXPORTS: int = 5
     EXPORT_TASK_TIMEOUT: int = 300  # 5 minutes
 
@@ -1,13 +1,113 @@
 """
 速率限制模块
-使用 Redis 实现分布式登录速率限制，防止暴力破解
+使用 Redis 实现分布式速率限制：
+- 登录限流：固定窗口计数器，防止暴力破解
+- AI 配额：按用户的滑动窗口 + 按组织的令牌桶，端点按成本权重扣减。
+  配额检查不单独访问 Redis，由请求准入脚本（app.core.request_admission）
+  与 Token 撤销检查在同一次往返中完成
 """
+import logging
+import math
+import time
+from dataclasses import dataclass
 from typing import Optional
 from datetime import timedelta
 
 import redis.asyncio as redis
 
 from app.core.config import get_settings
+from app.metrics.rate_limit_metrics import record_rate_limit_decision
+
+logger = logging.getLogger(__name__)
+
+
+# AI 端点的成本权重（一次请求消耗的配额单位）
+AI_ENDPOINT_COSTS: dict[str, int] = {
+    "conversation_message": 1,
+    "content_recommend": 2,
+    "mistake_batch_analyze": 5,
+    "lesson_plan_generate": 10,
+}
+
+
+# 用户滑动窗口（相邻两个固定窗口按时间加权近似）与组织令牌桶的原子检查，
+# 定义为 Lua 函数，嵌入请求准入脚本执行
+# 参数：用户当前窗口计数 key、用户上一窗口计数 key、组织令牌桶 key（为空字符串时跳过）、
+#       本次请求成本、用户窗口内预算、窗口长度（毫秒）、当前窗口已经过的时间（毫秒）、
+#       组织令牌桶容量、组织令牌桶每秒恢复量、当前时间（毫秒）
+# 返回 {是否允许, 拒绝范围(0无/1用户/2组织), 用户剩余, 用户重置毫秒, 组织剩余, 组织重试毫秒}
+AI_QUOTA_LUA_FUNCTION = """
+local function check_ai_quota(user_key, previous_key, org_key, cost, budget, window, elapsed, capacity, rate, now)
+    local current = tonumber(redis.call('GET', user_key) or '0')
+    local previous = tonumber(redis.call('GET', previous_key) or '0')
+    local used = previous * (window - elapsed) / window + current
+    local user_ok = used + cost <= budget
+
+    local org_ok = true
+    local tokens = -1
+    if org_key ~= '' then
+        local bucket = redis.call('HMGET', org_key, 'tokens', 'ts')
+        tokens = tonumber(bucket[1]) or capacity
+        local ts = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+        org_ok = tokens >= cost
+    end
+
+    local scope = 0
+    if not user_ok then
+        scope = 1
+    elseif not org_ok then
+        scope = 2
+    else
+        redis.call('INCRBY', user_key, cost)
+        redis.call('PEXPIRE', user_key, window * 2)
+        used = used + cost
+        if org_key ~= '' then
+            tokens = tokens - cost
+            redis.call('HSET', org_key, 'tokens', tostring(tokens), 'ts', now)
+            redis.call('PEXPIRE', org_key, math.ceil(capacity / rate * 1000) + 1000)
+        end
+    end
+
+    local org_retry = 0
+    if tokens >= 0 and tokens < cost then
+        org_retry = math.ceil((cost - tokens) / rate * 1000)
+    end
+
+    return {scope == 0 and 1 or 0, scope, math.floor(math.max(0, budget - used)), window - elapsed, math.floor(tokens), org_retry}
+end
+"""
+
+
+@dataclass(frozen=True)
+class AIQuotaCheck:
+    """一次 AI 配额检查的参数（由请求准入脚本执行）"""
+
+    endpoint: str
+    cost: int
+    budget: int
+    # 组织令牌桶容量（已应用组织覆盖配置）
+    capacity: int
+    organization_id: Optional[str]
+    # (用户当前窗口 key, 用户上一窗口 key, 组织令牌桶 key 或空字符串)
+    keys: tuple
+    # (成本, 预算, 窗口毫秒, 已过毫秒, 桶容量, 每秒恢复量, 当前毫秒)
+    args: tuple
+
+
+@dataclass(frozen=True)
+class QuotaResult:
+    """AI 配额检查结果"""
+
+    allowed: bool
+    # 拒绝的范围：user（用户滑动窗口）/ org（组织令牌桶），允许时为 None
+    scope: Optional[str] = None
+    limit: int = 0
+    remaining: int = 0
+    reset_seconds: int = 0
+    # 组织令牌桶剩余（未关联组织时为 None）
+    org_remaining: Optional[int] = None
+    retry_after: int = 0
 
 
 class RateLimiter:
@@ -75,18 +175,15 @@ class RateLimiter:
             # 使用 Redis MULTI/PIPELINE 实现原子操作
             pipe = redis_client.pipeline()
 
-            # 增加计数器并设置过期时间
+            # 增加计数器、设置过期时间并读取 TTL（一次往返）
             pipe.incr(key)
             pipe.expire(key, int(window.total_seconds()))
+            pipe.ttl(key)
 
-            results = await pipe.execute()
-            current_count = results[0]
+            current_count, _, ttl = await pipe.execute()
 
             # 计算剩余请求数和重置时间
             remaining = max(0, limit - current_count)
-
-            # 获取 TTL 作为重置时间
-            ttl = await redis_client.ttl(key)
             reset_seconds = max(0, ttl)
 
             # 检查是否超过限制
@@ -97,6 +194,108 @@ class RateLimiter:
             # Redis 不可用时，降级处理（允许请求通过）
             return True, limit, int(window.total_seconds())
 
+    def get_endpoint_cost(self, endpoint: str) -> int:
+        """获取 AI 端点的成本权重，未配置的端点按 1 计"""
+        return AI_ENDPOINT_COSTS.get(endpoint, 1)
+
+    def prepare_ai_quota(
+        self,
+        endpoint: str,
+        user_id: str,
+        organization_id: Optional[str] = None,
+    ) -> Optional[AIQuotaCheck]:
+        """
+        构造 AI 端点配额检查
+
+        用户配额使用滑动窗口（上一窗口计数按剩余时间比例加权），
+        组织配额使用令牌桶；两者都满足时才扣减。检查本身由请求准入脚本
+        与 Token 撤销检查在同一次 Redis 往返中执行。
+
+        Args:
+            endpoint: 端点名称（见 AI_ENDPOINT_COSTS）
+            user_id: 用户 ID
+            organization_id: 组织 ID（为空时只检查用户配额）
+
+        Returns:
+            AIQuotaCheck: 配额检查参数，未启用 AI 限流时返回 None
+        """
+        settings = get_settings()
+        if not settings.AI_RATE_LIMIT_ENABLED:
+            return None
+
+        cost = self.get_endpoint_cost(endpoint)
+        budget = settings.AI_RATE_LIMIT_USER_BUDGET
+        window_ms = settings.AI_RATE_LIMIT_USER_WINDOW * 1000
+        capacity = settings.AI_RATE_LIMIT_ORG_CAPACITY
+        if organization_id:
+            capacity = settings.AI_RATE_LIMIT_ORG_OVERRIDES.get(organization_id, capacity)
+
+        now_ms = int(time.time() * 1000)
+        window_index, elapsed_ms = divmod(now_ms, window_ms)
+        user_key = self._get_key(user_id, "ai:user")
+
+        return AIQuotaCheck(
+            endpoint=endpoint,
+            cost=cost,
+            budget=budget,
+            capacity=capacity,
+            organization_id=organization_id,
+            keys=(
+                f"{user_key}:{window_index}",
+                f"{user_key}:{window_index - 1}",
+                self._get_key(organization_id, "ai:org") if organization_id else "",
+            ),
+            args=(
+                cost,
+                budget,
+                window_ms,
+                elapsed_ms,
+                capacity,
+                settings.AI_RATE_LIMIT_ORG_REFILL_RATE,
+                now_ms,
+            ),
+        )
+
+    def build_quota_result(self, check: AIQuotaCheck, raw: list) -> QuotaResult:
+        """
+        解析配额检查脚本的返回值并记录监控指标
+
+        Args:
+            check: 配额检查参数
+            raw: check_ai_quota Lua 函数的返回值
+
+        Returns:
+            QuotaResult: 配额检查结果
+        """
+        allowed, scope, remaining, reset_ms, org_tokens, org_retry_ms = raw
+        reset_seconds = math.ceil(int(reset_ms) / 1000)
+        result = QuotaResult(
+            allowed=bool(allowed),
+            scope={1: "user", 2: "org"}.get(int(scope)),
+            limit=check.budget,
+            remaining=int(remaining),
+            reset_seconds=reset_seconds,
+            org_remaining=max(0, int(org_tokens)) if check.organization_id else None,
+            retry_after=math.ceil(int(org_retry_ms) / 1000) if int(scope) == 2 else reset_seconds,
+        )
+        record_rate_limit_decision(
+            endpoint=check.endpoint,
+            cost=check.cost,
+            allowed=result.allowed,
+            scope=result.scope,
+            user_remaining_ratio=result.remaining / check.budget if check.budget else 0.0,
+            org_remaining_ratio=(
+                result.org_remaining / check.capacity
+                if result.org_remaining is not None and check.capacity else None
+            ),
+        )
+        return result
+
+    @staticmethod
+    def unchecked_quota_result(check: AIQuotaCheck) -> QuotaResult:
+        """Redis 不可用时的降级结果（允许请求通过）"""
+        return QuotaResult(allowed=True, limit=check.budget, remaining=check.budget)
+
     async def get_attempts(
         self,
         identifier: str,
@@ -0,0 +1,194 @@
+"""
+请求准入检查
+将 Token 黑名单、Token 版本和 AI 端点配额检查合并为一次 Redis 往返
+
+- 进程内布隆过滤器判定"一定未撤销"且无需配额检查的请求不访问 Redis
+- 其余请求通过一个 Lua 脚本完成全部检查（单次往返，原子执行）；
+  Token 已撤销时不扣减配额
+- Redis 不可用时降级放行，与原有黑名单检查行为一致
+"""
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.rate_limiter import (
+    AI_QUOTA_LUA_FUNCTION,
+    AIQuotaCheck,
+    QuotaResult,
+    get_rate_limiter,
+)
+from app.core.token_blacklist import TokenBlacklist, get_token_blacklist
+
+logger = logging.getLogger(__name__)
+
+
+# KEYS[1]: 黑名单 key（为空字符串时跳过）
+# KEYS[2]: 用户 Token 版本 key
+# KEYS[3..5]: AI 配额的用户当前窗口 / 用户上一窗口 / 组织令牌桶 key（KEYS[3] 为空字符串时跳过配额）
+# ARGV[1]: Token 版本号（为空字符串时跳过）
+# ARGV[2..8]: AI 配额参数（见 AIQuotaCheck.args）
+# 返回 {是否已撤销, 版本是否有效, 配额检查结果...}
+_ADMISSION_SCRIPT = AI_QUOTA_LUA_FUNCTION + """
+local revoked = 0
+if KEYS[1] ~= '' then
+    revoked = redis.call('EXISTS', KEYS[1])
+end
+
+local version_ok = 1
+if ARGV[1] ~= '' then
+    local current = redis.call('GET', KEYS[2])
+    if current and current ~= ARGV[1] then
+        version_ok = 0
+    end
+end
+
+local result = {revoked, version_ok}
+if KEYS[3] ~= '' and revoked == 0 and version_ok == 1 then
+    local quota = check_ai_quota(
+        KEYS[3], KEYS[4], KEYS[5],
+        tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5]),
+        tonumber(ARGV[6]), tonumber(ARGV[7]), tonumber(ARGV[8])
+    )
+    for _, value in ipairs(quota) do
+        table.insert(result, value)
+    end
+end
+return result
+"""
+
+# 未检查配额时占位的 KEYS[3..5] 和 ARGV[2..8]
+_NO_QUOTA_KEYS = ("", "", "")
+_NO_QUOTA_ARGS = (0, 0, 0, 0, 0, 0, 0)
+
+
+@dataclass(frozen=True)
+class AdmissionResult:
+    """准入检查结果"""
+
+    allowed: bool
+    detail: str = ""
+    # AI 配额检查结果（未请求配额检查或 Token 已撤销时为 None）
+    quota: Optional[QuotaResult] = None
+    # 是否访问了 Redis（用于观察布隆过滤器的效果）
+    checked_redis: bool = False
+
+
+class RequestAdmission:
+    """
+    请求准入检查器
+
+    使用示例：
+        ```python
+        admission = get_request_admission()
+        result = await admission.admit(jti, user_id, token_version)
+        if not result.allowed:
+            raise HTTPException(status_code=401, detail=result.detail)
+
+        # AI 端点：撤销检查与配额扣减一次往返
+        quota = get_rate_limiter().prepare_ai_quota(endpoint, user_id, organization_id)
+        result = await admission.admit(jti, user_id, token_version, quota=quota)
+        ```
+    """
+
+    def __init__(self, blacklist: Optional[TokenBlacklist] = None):
+        """
+        初始化准入检查器
+
+        Args:
+            blacklist: Token 黑名单管理器，默认使用全局单例（共享 Redis 连接池）
+        """
+        self._blacklist = blacklist
+        self._script = None
+        self._script_client = None
+
+    @property
+    def blacklist(self) -> TokenBlacklist:
+        """Token 黑名单管理器（未指定时每次取全局单例，跟随应用启动/关闭时的重建）"""
+        return self._blacklist or get_token_blacklist()
+
+    async def _get_script(self):
+        """注册 Lua 脚本（EVALSHA，脚本未缓存时自动回退 EVAL）"""
+        redis_client = await self.blacklist._get_redis()
+        if self._script is None or self._script_client is not redis_client:
+            self._script = redis_client.register_script(_ADMISSION_SCRIPT)
+            self._script_client = redis_client
+        return self._script
+
+    async def admit(
+        self,
+        jti: Optional[str],
+        user_id: str,
+        token_version: Optional[str] = None,
+        quota: Optional[AIQuotaCheck] = None,
+    ) -> AdmissionResult:
+        """
+        检查请求是否准入
+
+        Args:
+            jti: Token 的 JWT ID
+            user_id: 用户 ID
+            token_version: Token 中的版本号
+            quota: AI 端点配额检查（可选，见 RateLimiter.prepare_ai_quota）
+
+        Returns:
+            AdmissionResult: 准入检查结果；配额不足时 allowed 为 False 且 quota 不为空
+        """
+        blacklist = self.blacklist
+        check_revocation = await blacklist.might_be_revoked(
+            jti, user_id, has_version=bool(token_version)
+        )
+        if not check_revocation and quota is None:
+            return AdmissionResult(allowed=True)
+
+        try:
+            script = await self._get_script()
+            raw = await script(
+                keys=[
+                    blacklist._get_blacklist_key(jti) if check_revocation and jti else "",
+                    blacklist._get_user_version_key(user_id),
+                    *(quota.keys if quota else _NO_QUOTA_KEYS),
+                ],
+                args=[
+                    token_version if check_revocation and token_version else "",
+                    *(quota.args if quota else _NO_QUOTA_ARGS),
+                ],
+            )
+        except Exception as e:
+            # 如果 Redis 不可用，降级处理（允许请求通过）
+            logger.warning(f"请求准入检查失败: {e}")
+            return AdmissionResult(
+                allowed=True,
+                quota=get_rate_limiter().unchecked_quota_result(quota) if quota else None,
+            )
+
+        revoked, version_ok = raw[0], raw[1]
+        if revoked:
+            return AdmissionResult(allowed=False, detail="Token 已被撤销", checked_redis=True)
+        if not version_ok:
+            return AdmissionResult(allowed=False, detail="Token 版本已过期，请重新登录", checked_redis=True)
+        if quota is None:
+            return AdmissionResult(allowed=True, checked_redis=True)
+
+        quota_result = get_rate_limiter().build_quota_result(quota, raw[2:])
+        return AdmissionResult(
+            allowed=quota_result.allowed,
+            quota=quota_result,
+            checked_redis=True,
+        )
+
+
+# 创建全局单例
+_request_admission: Optional[RequestAdmission] = None
+
+
+def get_request_admission() -> RequestAdmission:
+    """
+    获取请求准入检查器单例
+
+    Returns:
+        RequestAdmission: 请求准入检查器实例
+    """
+    global _request_admission
+    if _request_admission is None:
+        _request_admission = RequestAdmission()
+    return _request_admission
@@ -1,15 +1,70 @@
 """
 Token 黑名单管理
 使用 Redis 存储已撤销的 JWT Token，支持单 Token 撤销和用户级 Token 撤销
+
+进程内维护已撤销 JTI（以及修改过 Token 版本的用户）的布隆过滤器：
+- 撤销时同时写入 Redis 索引（有序集合，分数为过期时间）并递增代数计数器
+- 各进程定期比较代数，有变化时从索引重建过滤器
+- 过滤器判定"一定未撤销"的 Token 无需访问 Redis
+- 索引引入前已存在的黑名单和用户版本 key 由首次同步回填（完成后写入标记）
+- 索引未回填、为空或同步失败时过滤器视为不可用，所有 Token 都回到 Redis 检查
 """
+import hashlib
+import logging
+import math
+import time
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Iterable, Optional
 
 import redis.asyncio as redis
 
 from app.core.config import get_settings
 
+logger = logging.getLogger(__name__)
+
+
+class RevokedTokenFilter:
+    """
+    已撤销 Token 的布隆过滤器
+
+    - 不存在假阴性：加入过的条目一定判定为可能存在
+    - 假阳性的 Token 仍会回到 Redis 精确检查
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        """
+        初始化布隆过滤器
+
+        Args:
+            capacity: 预期条目数
+            error_rate: 预期假阳性率
+        """
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        """双重哈希计算比特位置"""
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
 
 class TokenBlacklist:
     """
@@ -26,10 +81,21 @@ class TokenBlacklist:
     _TOKEN_BLACKLIST_PREFIX = "token:blacklist:"
     _USER_TOKEN_VERSION_PREFIX = "token:version:user:"
     _TOKEN_REFRESH_VERSION_PREFIX = "token:version:refresh:"
+    # 撤销索引（有序集合，成员为 jti:{jti} / user:{user_id}，分数为过期时间戳）
+    _REVOCATION_INDEX_KEY = "token:blacklist:index"
+    # 撤销代数（每次撤销递增，用于判断进程内过滤器是否需要重建）
+    _REVOCATION_GENERATION_KEY = "token:blacklist:generation"
+    # 索引回填完成标记与回填锁
+    _REVOCATION_BACKFILL_KEY = "token:blacklist:index:backfilled"
+    _REVOCATION_BACKFILL_LOCK_KEY = "token:blacklist:index:backfilling"
+    _REVOCATION_BACKFILL_LOCK_TTL = 60
 
     # Token 黑名单默认过期时间（7天）
     _DEFAULT_TTL = 7 * 24 * 60 * 60  # 7 days in seconds
 
+    # 进程内过滤器与 Redis 同步的最小间隔（秒），即跨进程撤销的最大生效延迟
+    _FILTER_SYNC_INTERVAL = 1.0
+
     def __init__(self, redis_client: Optional[redis.Redis] = None):
         """
         初始化 Token 黑名单管理器
@@ -39,6 +105,10 @@ class TokenBlacklist:
         """
         self._redis = redis_client
         self._settings = None  # 懒加载配置
+        self._filter = RevokedTokenFilter()
+        self._filter_generation: Optional[str] = None
+        self._filter_synced_at = 0.0
+        self._filter_ready = False
 
     async def _get_redis(self) -> redis.Redis:
         """获取 Redis 客户端（懒加载）"""
@@ -99,11 +169,151 @@ class TokenBlacklist:
             "jti": jti
         }
 
-        await redis_client.hset(key, mapping=data)
-        await redis_client.expire(key, ttl)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=data)
+            pipe.expire(key, ttl)
+            self._queue_index_update(pipe, f"jti:{jti}", ttl)
+            await pipe.execute()
 
+        self._filter.add(f"jti:{jti}")
         return True
 
+    def _queue_index_update(self, pipe, member: str, ttl: int) -> None:
+        """在 pipeline 中写入撤销索引、清理过期成员并递增代数"""
+        now = time.time()
+        pipe.zadd(self._REVOCATION_INDEX_KEY, {member: now + ttl})
+        pipe.zremrangebyscore(self._REVOCATION_INDEX_KEY, "-inf", now)
+        pipe.incr(self._REVOCATION_GENERATION_KEY)
+
+    async def backfill_index(self) -> Optional[int]:
+        """
+        回填撤销索引
+
+        扫描索引引入前写入的 token:blacklist:{jti} 和 token:version:user:{user_id}，
+        按剩余 TTL 加入索引（无过期时间的 key 分数为 +inf），完成后写入回填标记。
+        多个进程同时触发时只有获得锁的进程执行。
+
+        Returns:
+            Optional[int]: 回填的成员数，未获得锁时返回 None
+        """
+        redis_client = await self._get_redis()
+        acquired = await redis_client.set(
+            self._REVOCATION_BACKFILL_LOCK_KEY, "1",
+            nx=True, ex=self._REVOCATION_BACKFILL_LOCK_TTL,
+        )
+        if not acquired:
+            return None
+
+        internal_keys = {
+            self._REVOCATION_INDEX_KEY,
+            self._REVOCATION_GENERATION_KEY,
+            self._REVOCATION_BACKFILL_KEY,
+            self._REVOCATION_BACKFILL_LOCK_KEY,
+        }
+        now = time.time()
+        members: dict[str, float] = {}
+        for prefix, kind in (
+            (self._TOKEN_BLACKLIST_PREFIX, "jti"),
+            (self._USER_TOKEN_VERSION_PREFIX, "user"),
+        ):
+            keys = [
+                key async for key in redis_client.scan_iter(match=f"{prefix}*", count=1000)
+                if key not in internal_keys
+            ]
+            if not keys:
+                continue
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.ttl(key)
+                ttls = await pipe.execute()
+            for key, ttl in zip(keys, ttls):
+                if ttl == -2:
+                    continue  # 扫描后已过期
+                members[f"{kind}:{key[len(prefix):]}"] = now + ttl if ttl >= 0 else math.inf
+
+        async with redis_client.pipeline(transaction=False) as pipe:
+            if members:
+                pipe.zadd(self._REVOCATION_INDEX_KEY, members)
+            pipe.incr(self._REVOCATION_GENERATION_KEY)
+            pipe.set(self._REVOCATION_BACKFILL_KEY, int(now))
+            pipe.delete(self._REVOCATION_BACKFILL_LOCK_KEY)
+            await pipe.execute()
+
+        logger.info(f"Token 撤销索引回填完成: {len(members)} 条")
+        return len(members)
+
+    async def sync_filter(self, force: bool = False) -> bool:
+        """
+        与 Redis 撤销索引同步进程内布隆过滤器
+
+        代数未变化时只需一次 MGET；变化时读取索引中未过期的成员并重建过滤器。
+        索引尚未回填时先回填；未回填、索引为空或同步失败时过滤器不可用。
+
+        Args:
+            force: 忽略同步间隔立即同步
+
+        Returns:
+            bool: 过滤器是否可用（不可用时调用方必须访问 Redis 精确检查）
+        """
+        now = time.monotonic()
+        if not force and now - self._filter_synced_at < self._FILTER_SYNC_INTERVAL:
+            return self._filter_ready
+        # 先更新时间戳，避免并发请求同时触发同步
+        self._filter_synced_at = now
+
+        try:
+            redis_client = await self._get_redis()
+            generation, backfilled = await redis_client.mget(
+                self._REVOCATION_GENERATION_KEY, self._REVOCATION_BACKFILL_KEY
+            )
+            if not backfilled:
+                # 旧 key 未进入索引前过滤器会漏判，回填完成前全部走 Redis
+                self._filter_ready = False
+                await self.backfill_index()
+                return False
+            if self._filter_ready and generation == self._filter_generation:
+                return True
+
+            members = await redis_client.zrangebyscore(
+                self._REVOCATION_INDEX_KEY, time.time(), "+inf"
+            )
+        except Exception as e:
+            logger.warning(f"同步 Token 撤销过滤器失败: {e}")
+            self._filter_ready = False
+            return False
+
+        rebuilt = RevokedTokenFilter(capacity=max(100_000, 2 * len(members)))
+        for member in members:
+            rebuilt.add(member)
+        self._filter = rebuilt
+        self._filter_generation = generation
+        # 索引为空可能是索引 key 被淘汰，不能据此判定"一定未撤销"
+        self._filter_ready = bool(members)
+        return self._filter_ready
+
+    async def might_be_revoked(
+        self,
+        jti: Optional[str],
+        user_id: str,
+        has_version: bool = False,
+    ) -> bool:
+        """
+        判断 Token 是否可能已被撤销（需要 Redis 精确检查）
+
+        Args:
+            jti: Token 的 JWT ID
+            user_id: 用户 ID
+            has_version: Token 是否带有版本号
+
+        Returns:
+            bool: False 表示一定未被撤销，可跳过 Redis
+        """
+        if not await self.sync_filter():
+            return True
+        if jti and f"jti:{jti}" in self._filter:
+            return True
+        return has_version and f"user:{user_id}" in self._filter
+
     async def is_revoked(self, jti: str) -> bool:
         """
         检查 Token 是否已被撤销
@@ -148,6 +358,7 @@ class TokenBlacklist:
         实现方式：
         1. 增加用户的 token_version
         2. 之后的所有 Token 验证时检查 version
+        3. 使该用户的认证主体缓存失效
 
         Args:
             user_id: 用户 ID
@@ -164,12 +375,21 @@ class TokenBlacklist:
         new_version = str(uuid.uuid4())
 
         # 存储新版本
-        await redis_client.set(version_key, new_version, ex=self._DEFAULT_TTL)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(version_key, new_version, ex=self._DEFAULT_TTL)
+            self._queue_index_update(pipe, f"user:{user_id}", self._DEFAULT_TTL)
+            await pipe.execute()
+        self._filter.add(f"user:{user_id}")
 
         # 如果提供了当前 JTI，也加入黑名单
         if current_jti:
             await self.add_to_blacklist(current_jti, user_id, reason)
 
+        # 延迟导入，避免 core 与 services 循环依赖
+        from app.services.auth_principal_cache import get_auth_principal_cache
+
+        await get_auth_principal_cache().invalidate(user_id)
+
         return 1
 
     async def get_user_token_version(self, user_id: str) -> Optional[str]:
@@ -13,6 +13,9 @@ from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.api.v1 import api_router
 from app.core.config import settings
 from app.metrics import export_tasks_total  # 确保指标模块初始化
+from app.services.conversation_service import get_conversation_service
+from app.services.lesson_plan_service import get_lesson_plan_service
+from app.websocket.backplane import get_websocket_backplane
 
 
 @asynccontextmanager
@@ -27,10 +30,19 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     print(f"📊 环境: {settings.ENVIRONMENT}")
     print(f"🔧 调试模式: {settings.DEBUG}")
 
+    # 启动 WebSocket 跨进程消息总线
+    backplane = get_websocket_backplane()
+    await backplane.start()
+
     yield
 
     # 关闭时执行
     print(f"👋 {settings.APP_NAME} 关闭中...")
+    # 等待教案流水线的后台章节生成，超时的教案标记为失败（在关闭消息总线前推送事件）
+    await get_lesson_plan_service().drain_section_tasks(settings.LESSON_PLAN_SHUTDOWN_TIMEOUT)
+    await backplane.stop()
+    # 等待对话消息的后台写入完成
+    await get_conversation_service().flush_pending_writes()
 
 
 # 创建FastAPI应用实例
@@ -1,8 +1,18 @@
 """
 Prometheus 监控指标模块
 
-提供导出功能的 Prometheus 指标收集。
+提供导出功能、业务缓存、大模型响应缓存、速率限制的 Prometheus 指标收集。
 """
+from app.metrics.cache_metrics import (
+    cache_evictions_total,
+    cache_local_bytes,
+    cache_local_entries,
+    cache_requests_total,
+    record_cache_eviction,
+    record_cache_hit,
+    record_cache_miss,
+    update_local_cache_size,
+)
 from app.metrics.export_metrics import (
     decrement_active_tasks,
     export_errors_total,
@@ -18,6 +28,19 @@ from app.metrics.export_metrics import (
     set_queued_tasks,
     update_storage_metrics,
 )
+from app.metrics.llm_cache_metrics import (
+    llm_cache_requests_total,
+    llm_cache_saved_seconds_total,
+    llm_cache_saved_tokens_total,
+    record_llm_cache_request,
+    record_llm_cache_savings,
+)
+from app.metrics.rate_limit_metrics import (
+    rate_limit_cost_units_total,
+    rate_limit_decisions_total,
+    rate_limit_remaining_ratio,
+    record_rate_limit_decision,
+)
 
 __all__ = [
     "export_tasks_total",
@@ -33,4 +56,21 @@ __all__ = [
     "decrement_active_tasks",
     "set_queued_tasks",
     "update_storage_metrics",
+    "cache_requests_total",
+    "cache_evictions_total",
+    "cache_local_entries",
+    "cache_local_bytes",
+    "record_cache_hit",
+    "record_cache_miss",
+    "record_cache_eviction",
+    "update_local_cache_size",
+    "llm_cache_requests_total",
+    "llm_cache_saved_tokens_total",
+    "llm_cache_saved_seconds_total",
+    "record_llm_cache_request",
+    "record_llm_cache_savings",
+    "rate_limit_decisions_total",
+    "rate_limit_cost_units_total",
+    "rate_limit_remaining_ratio",
+    "record_rate_limit_decision",
 ]
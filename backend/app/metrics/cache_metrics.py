@@ -0,0 +1,96 @@
+"""
+缓存 Prometheus 监控指标
+
+为各类业务缓存（向量嵌入等）提供统一的命中率指标。
+
+指标类型:
+- Counter: 按缓存名称、层级、结果统计的请求数
+- Gauge: 本地缓存条目数和占用字节数
+"""
+import logging
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# ==================== 指标定义 ====================
+
+# 缓存请求数（按缓存名称、层级和结果分类）
+cache_requests_total = Counter(
+    "cache_requests_total",
+    "缓存请求总数",
+    ["cache", "tier", "result"]  # tier: local/redis, result: hit/miss
+)
+
+# 缓存淘汰数（按缓存名称和原因分类）
+cache_evictions_total = Counter(
+    "cache_evictions_total",
+    "本地缓存淘汰总数",
+    ["cache", "reason"]  # reason: size/expired
+)
+
+# 本地缓存条目数
+cache_local_entries = Gauge(
+    "cache_local_entries",
+    "本地缓存条目数",
+    ["cache"]
+)
+
+# 本地缓存占用字节数
+cache_local_bytes = Gauge(
+    "cache_local_bytes",
+    "本地缓存占用字节数",
+    ["cache"]
+)
+
+
+# ==================== 辅助函数 ====================
+
+def record_cache_hit(cache: str, tier: str, count: int = 1) -> None:
+    """
+    记录缓存命中。
+
+    Args:
+        cache: 缓存名称（如 embedding）
+        tier: 缓存层级 (local/redis)
+        count: 命中次数
+    """
+    if count:
+        cache_requests_total.labels(cache=cache, tier=tier, result="hit").inc(count)
+
+
+def record_cache_miss(cache: str, tier: str, count: int = 1) -> None:
+    """
+    记录缓存未命中。
+
+    Args:
+        cache: 缓存名称（如 embedding）
+        tier: 缓存层级 (local/redis)
+        count: 未命中次数
+    """
+    if count:
+        cache_requests_total.labels(cache=cache, tier=tier, result="miss").inc(count)
+
+
+def record_cache_eviction(cache: str, reason: str) -> None:
+    """
+    记录本地缓存淘汰。
+
+    Args:
+        cache: 缓存名称
+        reason: 淘汰原因 (size/expired)
+    """
+    cache_evictions_total.labels(cache=cache, reason=reason).inc()
+
+
+def update_local_cache_size(cache: str, entries: int, size_bytes: int) -> None:
+    """
+    更新本地缓存容量指标。
+
+    Args:
+        cache: 缓存名称
+        entries: 条目数
+        size_bytes: 占用字节数
+    """
+    cache_local_entries.labels(cache=cache).set(entries)
+    cache_local_bytes.labels(cache=cache).set(size_bytes)
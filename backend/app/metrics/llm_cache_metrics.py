@@ -0,0 +1,65 @@
+"""
+大模型响应缓存 Prometheus 监控指标
+
+为大模型响应缓存提供按调用点的命中率和节省成本指标。
+
+指标类型:
+- Counter: 按调用点、结果统计的缓存查询数
+- Counter: 命中缓存节省的 token 数和生成耗时
+"""
+import logging
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# ==================== 指标定义 ====================
+
+# 缓存查询数（按调用点和结果分类）
+llm_cache_requests_total = Counter(
+    "llm_cache_requests_total",
+    "大模型响应缓存查询总数",
+    ["call_site", "result"]  # result: hit/semantic_hit/miss/refresh/bypass
+)
+
+# 命中缓存节省的 token 数（按调用点分类）
+llm_cache_saved_tokens_total = Counter(
+    "llm_cache_saved_tokens_total",
+    "命中大模型响应缓存节省的 token 数",
+    ["call_site"]
+)
+
+# 命中缓存节省的生成耗时（按调用点分类）
+llm_cache_saved_seconds_total = Counter(
+    "llm_cache_saved_seconds_total",
+    "命中大模型响应缓存节省的生成耗时（秒）",
+    ["call_site"]
+)
+
+
+# ==================== 辅助函数 ====================
+
+def record_llm_cache_request(call_site: str, result: str) -> None:
+    """
+    记录一次缓存查询。
+
+    Args:
+        call_site: 调用点名称（如 lesson_plan）
+        result: 查询结果 (hit/semantic_hit/miss/refresh/bypass)
+    """
+    llm_cache_requests_total.labels(call_site=call_site, result=result).inc()
+
+
+def record_llm_cache_savings(call_site: str, tokens: int, seconds: float) -> None:
+    """
+    记录命中缓存节省的成本。
+
+    Args:
+        call_site: 调用点名称
+        tokens: 原始调用消耗的 token 数
+        seconds: 原始调用的生成耗时（秒）
+    """
+    if tokens:
+        llm_cache_saved_tokens_total.labels(call_site=call_site).inc(tokens)
+    if seconds:
+        llm_cache_saved_seconds_total.labels(call_site=call_site).inc(seconds)
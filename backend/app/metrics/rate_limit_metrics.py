@@ -0,0 +1,76 @@
+"""
+速率限制 Prometheus 监控指标
+
+为 AI 端点配额（用户滑动窗口 + 组织令牌桶）提供拒绝数和剩余预算指标。
+
+指标类型:
+- Counter: 按端点、结果、拒绝范围统计的配额检查数，以及消耗的成本单位
+- Histogram: 检查后剩余预算占比的分布
+"""
+import logging
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# ==================== 指标定义 ====================
+
+# 配额检查数（按端点、结果和拒绝范围分类）
+rate_limit_decisions_total = Counter(
+    "rate_limit_decisions_total",
+    "AI 端点配额检查总数",
+    ["endpoint", "result", "scope"]  # result: allowed/rejected, scope: user/org/none
+)
+
+# 已消耗的配额成本单位（按端点分类）
+rate_limit_cost_units_total = Counter(
+    "rate_limit_cost_units_total",
+    "AI 端点已消耗的配额成本单位",
+    ["endpoint"]
+)
+
+# 检查后剩余预算占比（按端点和配额范围分类）
+rate_limit_remaining_ratio = Histogram(
+    "rate_limit_remaining_ratio",
+    "AI 端点配额检查后剩余预算占比",
+    ["endpoint", "scope"],  # scope: user/org
+    buckets=(0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+)
+
+
+# ==================== 辅助函数 ====================
+
+def record_rate_limit_decision(
+    endpoint: str,
+    cost: int,
+    allowed: bool,
+    scope: Optional[str],
+    user_remaining_ratio: float,
+    org_remaining_ratio: Optional[float] = None,
+) -> None:
+    """
+    记录一次配额检查结果。
+
+    Args:
+        endpoint: 端点名称
+        cost: 本次请求成本
+        allowed: 是否允许
+        scope: 拒绝范围 (user/org)，允许时为 None
+        user_remaining_ratio: 用户剩余预算占比
+        org_remaining_ratio: 组织剩余预算占比（未关联组织时为 None）
+    """
+    result = "allowed" if allowed else "rejected"
+    rate_limit_decisions_total.labels(
+        endpoint=endpoint, result=result, scope=scope or "none"
+    ).inc()
+    if allowed:
+        rate_limit_cost_units_total.labels(endpoint=endpoint).inc(cost)
+
+    rate_limit_remaining_ratio.labels(endpoint=endpoint, scope="user").observe(
+        max(0.0, min(1.0, user_remaining_ratio))
+    )
+    if org_remaining_ratio is not None:
+        rate_limit_remaining_ratio.labels(endpoint=endpoint, scope="org").observe(
+            max(0.0, min(1.0, org_remaining_ratio))
+        )
@@ -25,6 +25,7 @@ from app.models.conversation import (
     ConversationScenario,
     ConversationStatus,
 )
+from app.models.conversation_message import ConversationMessage
 from app.models.practice import (
     Practice,
     PracticeStatus,
@@ -35,6 +36,7 @@ from app.models.mistake import (
     MistakeStatus,
     MistakeType,
 )
+from app.models.mistake_fingerprint import MistakeFingerprint
 from app.models.class_model import ClassInfo, ClassStudent
 from app.models.learning_report import LearningReport
 from app.models.question import (
@@ -68,6 +70,7 @@ from app.models.async_task import (
     AsyncTaskStatus,
     AsyncTaskType,
 )
+from app.models.student_daily_stats import StudentDailyStats
 
 __all__ = [
     "User",
@@ -90,12 +93,14 @@ __all__ = [
     "Conversation",
     "ConversationScenario",
     "ConversationStatus",
+    "ConversationMessage",
     "Practice",
     "PracticeStatus",
     "PracticeType",
     "Mistake",
     "MistakeStatus",
     "MistakeType",
+    "MistakeFingerprint",
     "ClassInfo",
     "ClassStudent",
     "LearningReport",
@@ -118,4 +123,5 @@ __all__ = [
     "AsyncTask",
     "AsyncTaskStatus",
     "AsyncTaskType",
+    "StudentDailyStats",
 ]
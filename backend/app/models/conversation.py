@@ -2,13 +2,13 @@
 import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING, List, Optional
-from sqlalchemy import String, Text, Float, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, Text, Float, DateTime, ForeignKey, Integer, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.orm.attributes import flag_modified
 import enum
 
 from app.db.base import Base
+from app.models.conversation_message import ConversationMessage
 
 if TYPE_CHECKING:
     from app.models.student import Student
@@ -48,7 +48,7 @@ class Conversation(Base):
         scenario: Conversation scenario type
         level: English proficiency level (A1-C2)
         status: Current status of the conversation
-        messages: JSON array of conversation messages
+        message_count: Number of messages (also the last allocated message seq)
         started_at: Conversation start timestamp
         completed_at: Conversation completion timestamp
         fluency_score: Final fluency score (0-100)
@@ -57,6 +57,8 @@ class Conversation(Base):
         overall_score: Final overall score (0-100)
         feedback: AI feedback on the conversation
         student: Relationship to Student model
+        message_records: Messages ordered by seq (async code should query
+            conversation_messages directly instead of loading all rows)
     """
 
     __tablename__ = "conversations"
@@ -90,7 +92,8 @@ class Conversation(Base):
         nullable=False
     )
 
-    messages: Mapped[str] = mapped_column(Text, nullable=False, default="[]")  # JSON string
+    # 消息数（消息本身存储在 conversation_messages 表，按序号追加）
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     started_at: Mapped[datetime] = mapped_column(
         DateTime,
@@ -123,6 +126,13 @@ class Conversation(Base):
         back_populates="conversations"
     )
 
+    message_records: Mapped[List[ConversationMessage]] = relationship(
+        ConversationMessage,
+        order_by=ConversationMessage.seq,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
     def __repr__(self) -> str:
         return (
             f"<Conversation(id={self.id}, student_id={self.student_id}, "
@@ -137,7 +147,7 @@ class Conversation(Base):
             "scenario": self.scenario.value if isinstance(self.scenario, ConversationScenario) else self.scenario,
             "level": self.level,
             "status": self.status.value if isinstance(self.status, ConversationStatus) else self.status,
-            "messages": self.messages if isinstance(self.messages, list) else [],
+            "message_count": self.message_count,
             "started_at": self.started_at.isoformat() if self.started_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
             "fluency_score": self.fluency_score,
@@ -147,32 +157,23 @@ class Conversation(Base):
             "feedback": self.feedback
         }
 
-    def add_message(self, role: str, content: str, metadata: Optional[dict] = None) -> None:
+    def add_message(self, role: str, content: str) -> None:
         """
         Add a message to the conversation.
 
         Args:
             role: Message role ('user' or 'assistant')
             content: Message content
-            metadata: Optional metadata (timestamp, corrections, etc.)
         """
-        import json
-
-        messages = self.messages if isinstance(self.messages, list) else []
-        messages.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.utcnow().isoformat(),
-            **(metadata or {})
-        })
-        self.messages = json.dumps(messages)
-        # 通知 SQLAlchemy 这个字段已修改（用于 JSON 字段）
-        flag_modified(self, "messages")
+        seq = (self.message_count or 0) + 1
+        self.message_records.append(
+            ConversationMessage(seq=seq, role=role, content=content)
+        )
+        self.message_count = seq
 
     def get_messages(self) -> List[dict]:
         """Get conversation messages as a list."""
-        import json
-        return self.messages if isinstance(self.messages, list) else json.loads(self.messages or "[]")
+        return [message.to_dict() for message in self.message_records]
 
     def get_recent_messages(self, limit: int = 10) -> List[dict]:
         """
@@ -184,8 +185,7 @@ class Conversation(Base):
         Returns:
             List of recent messages
         """
-        messages = self.get_messages()
-        return messages[-limit:] if messages else []
+        return [message.to_dict() for message in self.message_records[-limit:]]
 
     def calculate_duration_seconds(self) -> Optional[int]:
         """
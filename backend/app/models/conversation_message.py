@@ -0,0 +1,70 @@
+"""
+对话消息模型 - AI英语教学系统
+对话中的每条消息单独一行，按序号追加写入
+"""
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ConversationMessage(Base):
+    """
+    对话消息模型
+
+    序号（seq）由 conversations.message_count 分配，从 1 开始连续递增。
+    (conversation_id, seq) 唯一约束同时作为读取最近 N 条消息的索引。
+    """
+
+    __tablename__ = "conversation_messages"
+    __table_args__ = (
+        UniqueConstraint("conversation_id", "seq", name="uq_conversation_messages_conversation_seq"),
+    )
+
+    # 主键
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4
+    )
+
+    # 所属对话
+    conversation_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("conversations.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    # 消息序号（对话内从 1 开始）
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # 角色：user / assistant
+    role: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    # 消息内容
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # 创建时间
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<ConversationMessage(conversation_id={self.conversation_id}, "
+            f"seq={self.seq}, role={self.role})>"
+        )
+
+    def to_dict(self) -> dict:
+        """转换为消息字典（与原 messages JSON 中的条目格式一致）"""
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": self.created_at.isoformat() if self.created_at else None,
+        }
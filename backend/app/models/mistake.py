@@ -7,7 +7,7 @@ from datetime import datetime
 from enum import Enum as PyEnum
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, Integer, JSON, String, Text, func
+from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, Index, Integer, JSON, String, Text, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -52,6 +52,18 @@ class Mistake(Base):
     """
 
     __tablename__ = "mistakes"
+    __table_args__ = (
+        # 同一学生同一道题只保留一条错题，重复出错时合并计数（见 MistakeService.merge_mistakes）
+        Index(
+            "uq_mistakes_student_question_hash",
+            "student_id",
+            "question_hash",
+            unique=True,
+            postgresql_where=text("question_hash IS NOT NULL"),
+        ),
+        # 复习队列：按学生、状态取到期错题（范围查询 + LIMIT）
+        Index("ix_mistakes_review_queue", "student_id", "status", "next_review_at"),
+    )
 
     # 主键
     id: Mapped[uuid.UUID] = mapped_column(
@@ -117,6 +129,20 @@ class Mistake(Base):
         nullable=False
     )
 
+    # 题目哈希（规范化题干 + 正确答案），用于识别同一学生的重复错题
+    question_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True
+    )
+
+    # 错题指纹ID（跨学生共享的错误模式，随最新错误答案更新）
+    fingerprint_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("mistake_fingerprints.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True
+    )
+
     # 错题解析（AI生成或教师添加）
     explanation: Mapped[Optional[str]] = mapped_column(Text)
 
@@ -157,6 +183,12 @@ class Mistake(Base):
         nullable=True
     )
 
+    # 下次复习时间（艾宾浩斯间隔，创建和每次复习时更新）
+    next_review_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True
+    )
+
     # AI生成的学习建议
     ai_suggestion: Mapped[Optional[str]] = mapped_column(Text)
 
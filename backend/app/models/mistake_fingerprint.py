@@ -0,0 +1,95 @@
+"""
+错题指纹模型 - AI英语教学系统
+跨学生共享的错误模式：同一道题的同一种错误答案只记录一次
+"""
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, JSON, String, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class MistakeFingerprint(Base):
+    """
+    错题指纹模型
+
+    指纹 = 题目哈希（规范化题干 + 正确答案）+ 规范化错误答案。
+    每条学生错题通过 fingerprint_id 引用对应指纹：
+    1. AI分析按指纹和学生水平只做一次，结果保存在指纹上供同水平的学生复用
+    2. 班级/全局"最常见错误"统计按指纹分组
+    """
+
+    __tablename__ = "mistake_fingerprints"
+
+    # 主键
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4
+    )
+
+    # 指纹（SHA-256 十六进制）
+    fingerprint: Mapped[str] = mapped_column(
+        String(64),
+        unique=True,
+        nullable=False
+    )
+
+    # 题目哈希（与 mistakes.question_hash 一致）
+    question_hash: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        index=True
+    )
+
+    # 首次出现时的题目、错误答案、正确答案（用于展示）
+    question: Mapped[str] = mapped_column(Text, nullable=False)
+    wrong_answer: Mapped[str] = mapped_column(Text, nullable=False)
+    correct_answer: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # 错题类型
+    mistake_type: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False
+    )
+
+    # 累计出现次数（所有学生的错误次数之和）
+    occurrence_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False
+    )
+
+    # 共享的AI分析结果，按学生水平存放：{水平: MistakeAnalysisResponse 的 JSON}
+    ai_analysis: Mapped[Optional[dict]] = mapped_column(
+        JSON,
+        nullable=True
+    )
+
+    # AI分析时间
+    analyzed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True
+    )
+
+    # 时间戳
+    first_seen_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        nullable=False
+    )
+    last_seen_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<MistakeFingerprint(id={self.id}, type={self.mistake_type}, "
+            f"occurrences={self.occurrence_count})>"
+        )
@@ -164,6 +164,12 @@ class Practice(Base):
         default=False
     )
 
+    # 错题收集时间（为空表示尚未收集；错题合并后 practice_id 只指向首次出错的练习）
+    mistakes_collected_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True
+    )
+
     # 扩展元数据（JSON格式）
     extra_metadata: Mapped[Optional[dict]] = mapped_column(
         JSON,
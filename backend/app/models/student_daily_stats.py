@@ -0,0 +1,94 @@
+"""
+学生每日统计汇总模型 - AI英语教学系统
+按学生和日期增量维护的练习/错题统计，供趋势图、周报和学习报告读取
+"""
+import uuid
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, Float, ForeignKey, Integer, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StudentDailyStats(Base):
+    """
+    学生每日统计汇总模型
+
+    每个学生每天一行，由练习/错题服务在写入事件时原子累加：
+    1. 练习按创建日期归档（与原趋势图 DATE(created_at) 分组一致）
+    2. 完成相关指标（正确率、得分、耗时）在练习完成时计入其创建日期
+    3. 错题按首次出错日期归档，状态分布随错题状态变更调整
+
+    读取方只需扫描 O(天数) 行，而不是 O(练习/错题数) 行。
+    """
+
+    __tablename__ = "student_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("student_id", "stat_date", name="uq_student_daily_stats_student_date"),
+    )
+
+    # 主键
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4
+    )
+
+    # 关联的学生ID
+    student_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    # 统计日期
+    stat_date: Mapped[date] = mapped_column(
+        Date,
+        nullable=False
+    )
+
+    # 练习统计
+    practice_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    completed_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # 正确率累加值（0-1）及计入的练习数，平均值 = sum / count
+    correct_rate_sum: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    correct_rate_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # 得分累加值（0-100）及计入的练习数
+    score_sum: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    score_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # 完成练习的总耗时（秒）
+    time_spent_seconds: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # 错题统计
+    mistake_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # 错题按类型/状态计数，如 {"grammar": 3}
+    mistakes_by_type: Mapped[Optional[dict]] = mapped_column(
+        JSONB,
+        default=dict
+    )
+    mistakes_by_status: Mapped[Optional[dict]] = mapped_column(
+        JSONB,
+        default=dict
+    )
+
+    # 时间戳
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<StudentDailyStats(student_id={self.student_id}, "
+            f"date={self.stat_date}, practices={self.practice_count})>"
+        )
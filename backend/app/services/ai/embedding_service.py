@@ -3,7 +3,7 @@
 
 提供文本向量嵌入生成功能，支持智谱AI和OpenAI。
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from openai import AsyncOpenAI
 from tenacity import (
@@ -14,6 +14,7 @@ from tenacity import (
 )
 
 from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache, get_embedding_cache
 from app.services.zhipu_service import get_zhipuai_service
 
 
@@ -25,16 +26,22 @@ class EmbeddingService:
     支持智谱AI（主要）和OpenAI（备用）。
     """
 
-    def __init__(self, provider: Optional[str] = None):
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None
+    ):
         """
         初始化向量嵌入服务
 
         Args:
             provider: AI服务提供商 ("zhipuai", "openai", None=使用默认)
+            cache: 嵌入缓存（默认使用全局两级缓存）
         """
         self.provider = provider or settings.AI_PROVIDER
         self._openai_client: Optional[AsyncOpenAI] = None
         self._zhipuai_service = None
+        self._cache = cache
 
         # 从配置获取模型参数
         if self.provider == "zhipuai":
@@ -56,6 +63,22 @@ class EmbeddingService:
             self._zhipuai_service = get_zhipuai_service()
         return self._zhipuai_service
 
+    def _get_cache(self) -> EmbeddingCache:
+        """获取嵌入缓存"""
+        if self._cache is None:
+            self._cache = get_embedding_cache()
+        return self._cache
+
+    async def _cached_embeddings(
+        self,
+        provider: str,
+        model: str,
+        texts: List[str],
+        generate: Callable[[List[str]], Awaitable[List[List[float]]]]
+    ) -> List[List[float]]:
+        """经过缓存生成向量，只对未命中的文本调用 generate"""
+        return await self._get_cache().get_or_generate(provider, model, texts, generate)
+
     @retry(
         retry=retry_if_exception_type((ConnectionError, TimeoutError)),
         stop=stop_after_attempt(3),
@@ -90,14 +113,34 @@ class EmbeddingService:
         # 尝试智谱AI
         if ai_provider == "zhipuai":
             try:
-                return await self._get_zhipuai_service().generate_embedding(text)
+                zhipuai_service = self._get_zhipuai_service()
+                vectors = await self._cached_embeddings(
+                    "zhipuai", zhipuai_service.embedding_model, [text],
+                    lambda texts: self._single_as_batch(zhipuai_service.generate_embedding, texts)
+                )
+                return vectors[0]
             except Exception as e:
                 if provider == "zhipuai":  # 明确指定使用智谱AI
                     raise
                 print(f"智谱AI调用失败，降级到OpenAI: {e}")
 
         # 尝试OpenAI
-        return await self._generate_openai_embedding(text, model)
+        embedding_model = model or settings.OPENAI_EMBEDDING_MODEL
+        vectors = await self._cached_embeddings(
+            "openai", embedding_model, [text],
+            lambda texts: self._single_as_batch(
+                lambda t: self._generate_openai_embedding(t, embedding_model), texts
+            )
+        )
+        return vectors[0]
+
+    @staticmethod
+    async def _single_as_batch(
+        generate: Callable[[str], Awaitable[List[float]]],
+        texts: List[str]
+    ) -> List[List[float]]:
+        """将单条生成函数适配为缓存所需的批量接口"""
+        return [await generate(texts[0])]
 
     async def _generate_openai_embedding(
         self,
@@ -145,17 +188,25 @@ class EmbeddingService:
 
         ai_provider = provider or self.provider
 
-        # 尝试智谱AI
+        # 尝试智谱AI（只请求缓存未命中的文本）
         if ai_provider == "zhipuai":
             try:
-                return await self._get_zhipuai_service().batch_generate_embeddings(texts)
+                zhipuai_service = self._get_zhipuai_service()
+                return await self._cached_embeddings(
+                    "zhipuai", zhipuai_service.embedding_model, texts,
+                    zhipuai_service.batch_generate_embeddings
+                )
             except Exception as e:
                 if provider == "zhipuai":
                     raise
                 print(f"智谱AI批量调用失败，降级到OpenAI: {e}")
 
         # 使用OpenAI批量生成
-        return await self._batch_generate_openai_embeddings(texts, model)
+        embedding_model = model or settings.OPENAI_EMBEDDING_MODEL
+        return await self._cached_embeddings(
+            "openai", embedding_model, texts,
+            lambda miss_texts: self._batch_generate_openai_embeddings(miss_texts, embedding_model)
+        )
 
     async def _batch_generate_openai_embeddings(
         self,
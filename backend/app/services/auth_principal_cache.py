@@ -0,0 +1,298 @@
+"""
+认证主体缓存 - AI英语教学系统
+缓存每个请求认证所需的用户信息（角色、激活状态、组织和档案ID），稳态下认证不访问数据库
+
+缓存策略：
+- 两级缓存：进程内LRU（短TTL）+ Redis，Key 为用户ID，值中记录 Token 版本
+- Token 版本与缓存中的不一致时视为未命中（撤销全部 Token 后自动重新加载）
+- TokenBlacklist.revoke_user_tokens 和用户信息更新时调用 invalidate 主动失效
+- 其他进程的进程内缓存最多在 AUTH_PRINCIPAL_CACHE_LOCAL_TTL 秒后过期
+"""
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import redis.asyncio as redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.metrics.cache_metrics import record_cache_hit, record_cache_miss
+from app.models import Student, Teacher, User
+from app.services.embedding_cache import LocalLRUCache
+
+logger = logging.getLogger(__name__)
+
+_AUTH_PRINCIPAL_CACHE = "auth_principal"
+
+
+@dataclass(frozen=True)
+class AuthPrincipal:
+    """
+    已认证的用户主体
+
+    只包含权限判断需要的字段，不是 ORM 对象。
+    """
+
+    user_id: uuid.UUID
+    role: str
+    is_active: bool
+    is_superuser: bool
+    organization_id: Optional[uuid.UUID] = None
+    student_id: Optional[uuid.UUID] = None
+    teacher_id: Optional[uuid.UUID] = None
+
+    def to_dict(self) -> dict:
+        """转换为可 JSON 序列化的字典"""
+        return {
+            "user_id": str(self.user_id),
+            "role": self.role,
+            "is_active": self.is_active,
+            "is_superuser": self.is_superuser,
+            "organization_id": str(self.organization_id) if self.organization_id else None,
+            "student_id": str(self.student_id) if self.student_id else None,
+            "teacher_id": str(self.teacher_id) if self.teacher_id else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AuthPrincipal":
+        """从 to_dict 的结果恢复"""
+
+        def _uuid(value: Optional[str]) -> Optional[uuid.UUID]:
+            return uuid.UUID(value) if value else None
+
+        return cls(
+            user_id=uuid.UUID(data["user_id"]),
+            role=data["role"],
+            is_active=data["is_active"],
+            is_superuser=data["is_superuser"],
+            organization_id=_uuid(data.get("organization_id")),
+            student_id=_uuid(data.get("student_id")),
+            teacher_id=_uuid(data.get("teacher_id")),
+        )
+
+
+class AuthPrincipalCache:
+    """
+    认证主体两级缓存
+
+    使用示例：
+        ```python
+        cache = get_auth_principal_cache()
+        principal = await cache.get_or_load(db, user_uuid, token_version)
+        ...
+        await cache.invalidate(user_id)
+        ```
+    """
+
+    # 缓存 Key 前缀
+    _PREFIX = "cache:auth_principal:"
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        ttl: Optional[int] = None,
+        local_ttl: Optional[int] = None,
+        local_max_bytes: Optional[int] = None,
+    ):
+        """
+        初始化认证主体缓存
+
+        Args:
+            redis_client: Redis 客户端实例，如果未提供则从配置创建
+            ttl: Redis 缓存时间（秒）
+            local_ttl: 进程内缓存时间（秒）
+            local_max_bytes: 进程内缓存容量上限（字节）
+        """
+        settings = get_settings()
+        self.ttl = ttl or settings.AUTH_PRINCIPAL_CACHE_TTL
+        self.local = LocalLRUCache(
+            max_bytes=local_max_bytes or settings.AUTH_PRINCIPAL_CACHE_LOCAL_MAX_BYTES,
+            ttl=local_ttl or settings.AUTH_PRINCIPAL_CACHE_LOCAL_TTL,
+            name=_AUTH_PRINCIPAL_CACHE,
+        )
+        self._redis = redis_client
+
+    async def _get_redis(self) -> redis.Redis:
+        """获取 Redis 客户端（懒加载）"""
+        if self._redis is None:
+            settings = get_settings()
+            self._redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                max_connections=settings.REDIS_MAX_CONNECTIONS
+            )
+        return self._redis
+
+    def _get_key(self, user_id: str) -> str:
+        """获取认证主体缓存 Key"""
+        return f"{self._PREFIX}{user_id}"
+
+    @staticmethod
+    def _decode(value, token_version: Optional[str]) -> Optional[AuthPrincipal]:
+        """解析缓存值，Token 版本不一致时返回None"""
+        try:
+            data = json.loads(value)
+            if data.get("token_version") != token_version:
+                return None
+            return AuthPrincipal.from_dict(data["principal"])
+        except Exception as e:
+            logger.warning(f"认证主体缓存数据无效: {e}")
+            return None
+
+    async def get(self, user_id: uuid.UUID, token_version: Optional[str] = None) -> Optional[AuthPrincipal]:
+        """
+        获取认证主体缓存
+
+        Args:
+            user_id: 用户ID
+            token_version: Token 中的版本号
+
+        Returns:
+            Optional[AuthPrincipal]: 命中且版本一致时返回认证主体
+        """
+        key = self._get_key(str(user_id))
+
+        local_value = self.local.get(key)
+        if local_value is not None:
+            principal = self._decode(local_value, token_version)
+            if principal is not None:
+                record_cache_hit(_AUTH_PRINCIPAL_CACHE, "local")
+                return principal
+        record_cache_miss(_AUTH_PRINCIPAL_CACHE, "local")
+
+        try:
+            redis_client = await self._get_redis()
+            value = await redis_client.get(key)
+        except Exception as e:
+            logger.warning(f"读取认证主体缓存失败: {e}")
+            return None
+
+        principal = self._decode(value, token_version) if value else None
+        if principal is None:
+            record_cache_miss(_AUTH_PRINCIPAL_CACHE, "redis")
+            return None
+
+        record_cache_hit(_AUTH_PRINCIPAL_CACHE, "redis")
+        self.local.set(key, value.encode("utf-8"))
+        return principal
+
+    async def set(self, principal: AuthPrincipal, token_version: Optional[str] = None) -> bool:
+        """
+        写入认证主体缓存
+
+        Args:
+            principal: 认证主体
+            token_version: 加载时使用的 Token 版本号
+
+        Returns:
+            是否写入 Redis 成功
+        """
+        key = self._get_key(str(principal.user_id))
+        value = json.dumps({"token_version": token_version, "principal": principal.to_dict()})
+        self.local.set(key, value.encode("utf-8"))
+
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.setex(key, self.ttl, value)
+            return True
+        except Exception as e:
+            logger.warning(f"写入认证主体缓存失败: {e}")
+            return False
+
+    async def get_or_load(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        token_version: Optional[str] = None,
+    ) -> Optional[AuthPrincipal]:
+        """
+        获取认证主体，未命中时用一条查询从数据库加载
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            token_version: Token 中的版本号
+
+        Returns:
+            Optional[AuthPrincipal]: 用户不存在时返回None
+        """
+        principal = await self.get(user_id, token_version)
+        if principal is not None:
+            return principal
+
+        result = await db.execute(
+            select(
+                User.id,
+                User.role,
+                User.is_active,
+                User.is_superuser,
+                User.organization_id,
+                Student.id,
+                Teacher.id,
+            )
+            .outerjoin(Student, Student.user_id == User.id)
+            .outerjoin(Teacher, Teacher.user_id == User.id)
+            .where(User.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        principal = AuthPrincipal(
+            user_id=row[0],
+            role=row[1],
+            is_active=row[2],
+            is_superuser=row[3],
+            organization_id=row[4],
+            student_id=row[5],
+            teacher_id=row[6],
+        )
+        await self.set(principal, token_version)
+        return principal
+
+    async def invalidate(self, user_id) -> bool:
+        """
+        使用户的认证主体缓存失效（用户信息更新、撤销 Token 时调用）
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            是否删除 Redis 缓存成功
+        """
+        key = self._get_key(str(user_id))
+        self.local.delete(key)
+
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.delete(key)
+            return True
+        except Exception as e:
+            logger.warning(f"删除认证主体缓存失败: {e}")
+            return False
+
+    async def close(self):
+        """关闭 Redis 连接"""
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+# 全局缓存服务实例
+_auth_principal_cache: Optional[AuthPrincipalCache] = None
+
+
+def get_auth_principal_cache() -> AuthPrincipalCache:
+    """
+    获取认证主体缓存实例（单例模式）
+
+    Returns:
+        AuthPrincipalCache: 缓存服务实例
+    """
+    global _auth_principal_cache
+    if _auth_principal_cache is None:
+        _auth_principal_cache = AuthPrincipalCache()
+    return _auth_principal_cache
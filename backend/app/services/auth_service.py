@@ -18,6 +18,7 @@ from app.core.security import (
     verify_password,
 )
 from app.models import User, UserRole
+from app.services.auth_principal_cache import get_auth_principal_cache
 from app.schemas.auth import AuthResponse, LoginRequest, RegisterRequest, UserResponse
 
 
@@ -312,3 +313,6 @@ class AuthService:
         # 更新密码
         user.password_hash = get_password_hash(new_password)
         await db.commit()
+
+        # 用户信息更新后使认证主体缓存失效
+        await get_auth_principal_cache().invalidate(user.id)
@@ -3,14 +3,15 @@
 负责聚合学习趋势、能力雷达图、知识点热力图等可视化数据
 """
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from typing import Any, Dict, List, Optional
 
 from sqlalchemy import select, func, and_, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models import Student, Practice, Mistake, LearningReport
+from app.models import Student, Practice, Mistake, LearningReport, StudentDailyStats
+from app.services.daily_stats_service import get_daily_stats_service
 from app.services.knowledge_graph_service import get_knowledge_graph_service
 
 
@@ -20,6 +21,7 @@ class ChartDataService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.kg_service = get_knowledge_graph_service()
+        self.daily_stats_service = get_daily_stats_service(db)
 
     async def get_learning_trend_data(
         self,
@@ -51,128 +53,50 @@ class ChartDataService:
             "metrics": {}
         }
 
+        # 一次读取日期范围内的每日统计汇总行，各指标均由其派生
+        daily_rows = await self.daily_stats_service.get_daily_stats(
+            student_id, start_date.date(), end_date.date()
+        )
+
         if "practices" in metrics:
-            result["metrics"]["practices"] = await self._get_practice_trend(
-                student_id, start_date, end_date
-            )
+            result["metrics"]["practices"] = self._get_practice_trend(daily_rows)
 
         if "correctRate" in metrics:
-            result["metrics"]["correctRate"] = await self._get_correct_rate_trend(
-                student_id, start_date, end_date
-            )
+            result["metrics"]["correctRate"] = self._get_correct_rate_trend(daily_rows)
 
         if "duration" in metrics:
-            result["metrics"]["duration"] = await self._get_duration_trend(
-                student_id, start_date, end_date
-            )
+            result["metrics"]["duration"] = self._get_duration_trend(daily_rows)
 
         return result
 
-    async def _get_practice_trend(
-        self,
-        student_id: uuid.UUID,
-        start_date: datetime,
-        end_date: datetime,
-    ) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _get_practice_trend(daily_rows: List[StudentDailyStats]) -> List[Dict[str, Any]]:
         """获取每日练习数量趋势"""
-        query = text("""
-            SELECT
-                DATE(created_at) as date,
-                COUNT(*) as count
-            FROM practices
-            WHERE
-                student_id = :student_id
-                AND created_at >= :start_date
-                AND created_at < :end_date
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        """)
-
-        result = await self.db.execute(
-            query,
-            {
-                "student_id": student_id,
-                "start_date": start_date,
-                "end_date": end_date + timedelta(days=1)
-            }
-        )
-
-        rows = result.all()
         return [
-            {"date": row[0].isoformat(), "count": row[1]}
-            for row in rows
+            {"date": row.stat_date.isoformat(), "count": row.practice_count}
+            for row in daily_rows
+            if row.practice_count
         ]
 
-    async def _get_correct_rate_trend(
-        self,
-        student_id: uuid.UUID,
-        start_date: datetime,
-        end_date: datetime,
-    ) -> List[Dict[str, Any]]:
-        """获取每日正确率趋势"""
-        query = text("""
-            SELECT
-                DATE(created_at) as date,
-                AVG(correct_rate) as rate
-            FROM practices
-            WHERE
-                student_id = :student_id
-                AND created_at >= :start_date
-                AND created_at < :end_date
-                AND correct_rate IS NOT NULL
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        """)
-
-        result = await self.db.execute(
-            query,
-            {
-                "student_id": student_id,
-                "start_date": start_date,
-                "end_date": end_date + timedelta(days=1)
-            }
-        )
-
-        rows = result.all()
+    @staticmethod
+    def _get_correct_rate_trend(daily_rows: List[StudentDailyStats]) -> List[Dict[str, Any]]:
+        """获取每日正确率趋势（已完成练习的平均正确率）"""
         return [
-            {"date": row[0].isoformat(), "rate": round(float(row[1] or 0) * 100, 2)}
-            for row in rows
-        ]
-
-    async def _get_duration_trend(
-        self,
-        student_id: uuid.UUID,
-        start_date: datetime,
-        end_date: datetime,
-    ) -> List[Dict[str, Any]]:
-        """获取每日学习时长趋势"""
-        query = text("""
-            SELECT
-                DATE(created_at) as date,
-                SUM(duration) as minutes
-            FROM practices
-            WHERE
-                student_id = :student_id
-                AND created_at >= :start_date
-                AND created_at < :end_date
-                AND duration IS NOT NULL
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        """)
-
-        result = await self.db.execute(
-            query,
             {
-                "student_id": student_id,
-                "start_date": start_date,
-                "end_date": end_date + timedelta(days=1)
+                "date": row.stat_date.isoformat(),
+                "rate": round(row.correct_rate_sum / row.correct_rate_count * 100, 2),
             }
-        )
+            for row in daily_rows
+            if row.correct_rate_count
+        ]
 
-        rows = result.all()
+    @staticmethod
+    def _get_duration_trend(daily_rows: List[StudentDailyStats]) -> List[Dict[str, Any]]:
+        """获取每日学习时长趋势（分钟）"""
         return [
-            {"date": row[0].isoformat(), "minutes": row[1] or 0}
-            for row in rows
+            {"date": row.stat_date.isoformat(), "minutes": row.time_spent_seconds // 60}
+            for row in daily_rows
+            if row.time_spent_seconds
         ]
 
     async def get_ability_radar_data(
@@ -462,38 +386,26 @@ class ChartDataService:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(weeks=weeks)
 
-        # 获取练习统计
-        query = text("""
-            SELECT
-                DATE_TRUNC('week', created_at) as week_start,
-                COUNT(*) as total_practices,
-                AVG(correct_rate) as avg_correct_rate,
-                SUM(duration) as total_duration
-            FROM practices
-            WHERE
-                student_id = :student_id
-                AND created_at >= :start_date
-                AND created_at < :end_date
-            GROUP BY DATE_TRUNC('week', created_at)
-            ORDER BY week_start
-        """)
-
-        result = await self.db.execute(
-            query,
-            {
-                "student_id": student_id,
-                "start_date": start_date,
-                "end_date": end_date
-            }
+        # 读取每日统计汇总行，按周（周一开始）合并
+        daily_rows = await self.daily_stats_service.get_daily_stats(
+            student_id, start_date.date(), end_date.date()
         )
 
+        weeks_rows: Dict[date, List[StudentDailyStats]] = {}
+        for row in daily_rows:
+            if not row.practice_count:
+                continue
+            week_start = row.stat_date - timedelta(days=row.stat_date.weekday())
+            weeks_rows.setdefault(week_start, []).append(row)
+
         weeks_data = []
-        for row in result.all():
+        for week_start, rows in sorted(weeks_rows.items()):
+            summary = self.daily_stats_service.summarize_rows(rows)
             weeks_data.append({
-                "week_start": row[0].isoformat(),
-                "total_practices": row[1],
-                "avg_correct_rate": round(float(row[2] or 0) * 100, 2),
-                "total_duration": row[3] or 0,
+                "week_start": datetime.combine(week_start, time.min).isoformat(),
+                "total_practices": summary["practice_count"],
+                "avg_correct_rate": round(summary["avg_correct_rate"] * 100, 2),
+                "total_duration": summary["time_spent_seconds"] // 60,
             })
 
         return {
@@ -0,0 +1,195 @@
+"""
+班级汇总缓存服务 - AI英语教学系统
+按班级缓存教师看板的班级学习状况汇总
+
+缓存策略：
+- Hash `cache:class_summary:{class_id}`，字段为统计周期（按天），
+  班级学生完成练习或生成新报告时整体删除，1小时后自然过期
+- 多个班级通过 pipeline 一次读写
+"""
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+from app.metrics.cache_metrics import record_cache_hit, record_cache_miss
+
+logger = logging.getLogger(__name__)
+
+_CLASS_SUMMARY_CACHE = "class_summary"
+
+
+class ClassSummaryCacheService:
+    """
+    班级汇总缓存服务
+
+    使用示例：
+        ```python
+        cache = await get_class_summary_cache()
+        cached = await cache.get_many(class_ids, period_start, period_end)
+        missing = [cid for cid in class_ids if cid not in cached]
+        ...
+        await cache.set_many(computed, period_start, period_end)
+        ```
+    """
+
+    # 缓存 Key 前缀
+    _PREFIX = "cache:class_summary:"
+
+    # TTL配置（秒）
+    _TTL = 3600  # 1小时（有主动失效，TTL只是兜底）
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        """
+        初始化缓存服务
+
+        Args:
+            redis_client: Redis 客户端实例，如果未提供则从配置创建
+        """
+        self._redis = redis_client
+        self._settings = None  # 懒加载配置
+
+    async def _get_redis(self) -> redis.Redis:
+        """获取 Redis 客户端（懒加载）"""
+        if self._redis is None:
+            if self._settings is None:
+                self._settings = get_settings()
+            self._redis = redis.from_url(
+                self._settings.REDIS_URL,
+                decode_responses=True,
+                max_connections=self._settings.REDIS_MAX_CONNECTIONS
+            )
+        return self._redis
+
+    def _get_key(self, class_id: uuid.UUID) -> str:
+        """获取班级汇总缓存 Key"""
+        return f"{self._PREFIX}{class_id}"
+
+    @staticmethod
+    def _get_period_field(period_start: datetime, period_end: datetime) -> str:
+        """获取统计周期对应的 Hash 字段（按天粒度）"""
+        return f"{period_start.date().isoformat()}:{period_end.date().isoformat()}"
+
+    async def get_many(
+        self,
+        class_ids: Iterable[uuid.UUID],
+        period_start: datetime,
+        period_end: datetime,
+    ) -> Dict[uuid.UUID, Dict[str, Any]]:
+        """
+        批量获取班级汇总缓存
+
+        Args:
+            class_ids: 班级ID列表
+            period_start: 统计开始时间
+            period_end: 统计结束时间
+
+        Returns:
+            Dict[uuid.UUID, Dict[str, Any]]: 命中的班级汇总（未命中的班级不在结果中）
+        """
+        class_ids = list(class_ids)
+        if not class_ids:
+            return {}
+
+        field = self._get_period_field(period_start, period_end)
+        try:
+            redis_client = await self._get_redis()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for class_id in class_ids:
+                    pipe.hget(self._get_key(class_id), field)
+                values = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"读取班级汇总缓存失败: {e}")
+            return {}
+
+        cached = {}
+        for class_id, value in zip(class_ids, values):
+            if value:
+                record_cache_hit(_CLASS_SUMMARY_CACHE, "redis")
+                cached[class_id] = json.loads(value)
+            else:
+                record_cache_miss(_CLASS_SUMMARY_CACHE, "redis")
+        return cached
+
+    async def set_many(
+        self,
+        summaries: Dict[uuid.UUID, Dict[str, Any]],
+        period_start: datetime,
+        period_end: datetime,
+    ) -> bool:
+        """
+        批量写入班级汇总缓存
+
+        Args:
+            summaries: 班级ID到汇总数据的映射
+            period_start: 统计开始时间
+            period_end: 统计结束时间
+
+        Returns:
+            是否设置成功
+        """
+        if not summaries:
+            return True
+
+        field = self._get_period_field(period_start, period_end)
+        try:
+            redis_client = await self._get_redis()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for class_id, summary in summaries.items():
+                    key = self._get_key(class_id)
+                    pipe.hset(key, field, json.dumps(summary, ensure_ascii=False))
+                    pipe.expire(key, self._TTL)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"写入班级汇总缓存失败: {e}")
+            return False
+
+    async def invalidate(self, class_ids: Iterable[uuid.UUID]) -> bool:
+        """
+        使班级汇总缓存失效（所有统计周期）
+
+        Args:
+            class_ids: 班级ID列表
+
+        Returns:
+            是否删除成功
+        """
+        keys = [self._get_key(class_id) for class_id in class_ids]
+        if not keys:
+            return True
+
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.delete(*keys)
+            return True
+        except Exception as e:
+            logger.warning(f"删除班级汇总缓存失败: {e}")
+            return False
+
+    async def close(self):
+        """关闭 Redis 连接"""
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+# 全局缓存服务实例
+_class_summary_cache: Optional[ClassSummaryCacheService] = None
+
+
+async def get_class_summary_cache() -> ClassSummaryCacheService:
+    """
+    获取班级汇总缓存服务实例（单例模式）
+
+    Returns:
+        ClassSummaryCacheService: 缓存服务实例
+    """
+    global _class_summary_cache
+    if _class_summary_cache is None:
+        _class_summary_cache = ClassSummaryCacheService()
+    return _class_summary_cache
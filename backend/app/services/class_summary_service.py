@@ -0,0 +1,386 @@
+"""
+班级汇总服务 - AI英语教学系统
+为教师看板批量计算班级学习状况汇总
+
+所有班级的指标由固定的几条集合查询得到（与班级数、学生数无关）：
+1. 班级列表（归属校验）
+2. 总体指标：花名册 / 期间报告 / 每日练习统计 三个分组子查询外连接
+3. 能力分布：每个班级最近50份报告（窗口函数取前N）
+4. 薄弱知识点：报告中的知识点计数按班级求和并取前10（窗口函数）
+
+结果按班级缓存，班级学生完成练习或生成新报告时失效。
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Float, and_, cast, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ClassInfo, ClassStudent, LearningReport, StudentDailyStats
+from app.services.class_summary_cache_service import get_class_summary_cache
+
+logger = logging.getLogger(__name__)
+
+# 能力名称关键字 -> 能力维度
+_ABILITY_KEYWORDS = (
+    ("listening", ("听力", "listening")),
+    ("reading", ("阅读", "reading")),
+    ("speaking", ("口语", "speaking")),
+    ("writing", ("写作", "writing")),
+    ("grammar", ("语法", "grammar")),
+    ("vocabulary", ("词汇", "vocabulary")),
+)
+
+
+def _aggregate_abilities(ability_data: Sequence[Optional[dict]]) -> Dict[str, float]:
+    """将多份报告的能力雷达数据平均为班级能力分布"""
+    distribution = {name: 0.0 for name, _ in _ABILITY_KEYWORDS}
+
+    for ability in ability_data:
+        if ability and "ability_radar" in ability:
+            for item in ability["ability_radar"]:
+                name = item.get("name", "").lower()
+                value = item.get("value", 0)
+                for dimension, keywords in _ABILITY_KEYWORDS:
+                    if any(keyword in name for keyword in keywords):
+                        distribution[dimension] += value
+                        break
+
+    count = len([d for d in ability_data if d])
+    if count > 0:
+        for key in distribution:
+            distribution[key] = round(distribution[key] / count, 2)
+
+    return distribution
+
+
+class ClassSummaryService:
+    """
+    班级汇总服务类
+
+    核心功能：
+    1. 一次调用汇总教师的多个班级
+    2. 集合查询计算班级指标（查询数不随班级/学生数增长）
+    3. 按班级缓存汇总结果
+    """
+
+    # 能力分布取每个班级最近的报告数
+    ABILITY_REPORT_LIMIT = 50
+    # 薄弱知识点取前N个
+    TOP_WEAK_POINTS = 10
+
+    def __init__(self, db: AsyncSession):
+        """
+        初始化班级汇总服务
+
+        Args:
+            db: 数据库会话
+        """
+        self.db = db
+
+    async def summarize_classes(
+        self,
+        teacher_id: uuid.UUID,
+        class_ids: Optional[Sequence[uuid.UUID]] = None,
+        period_start: Optional[datetime] = None,
+        period_end: Optional[datetime] = None,
+        use_cache: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        汇总教师负责的班级学习状况
+
+        Args:
+            teacher_id: 教师ID
+            class_ids: 班级ID列表（为空则为该教师的全部在读班级）
+            period_start: 统计开始时间（默认30天前）
+            period_end: 统计结束时间（默认当前时间）
+            use_cache: 是否读写缓存
+
+        Returns:
+            List[Dict[str, Any]]: 班级汇总列表（按班级名称排序），
+            不属于该教师或已停用的班级不会出现在结果中
+        """
+        if not period_end:
+            period_end = datetime.utcnow()
+        if not period_start:
+            period_start = period_end - timedelta(days=30)
+
+        query = (
+            select(ClassInfo.id, ClassInfo.name)
+            .where(
+                and_(
+                    ClassInfo.head_teacher_id == teacher_id,
+                    ClassInfo.status == "active",
+                )
+            )
+            .order_by(ClassInfo.name)
+        )
+        if class_ids is not None:
+            if not class_ids:
+                return []
+            query = query.where(ClassInfo.id.in_(class_ids))
+        classes = (await self.db.execute(query)).all()
+        if not classes:
+            return []
+
+        class_names = {row.id: row.name for row in classes}
+
+        cache = await get_class_summary_cache() if use_cache else None
+        summaries = (
+            await cache.get_many(list(class_names), period_start, period_end) if cache else {}
+        )
+
+        missing = [class_id for class_id in class_names if class_id not in summaries]
+        if missing:
+            computed = await self._compute_summaries(missing, period_start, period_end)
+            summaries.update(computed)
+            if cache:
+                await cache.set_many(computed, period_start, period_end)
+
+        return [
+            {
+                "class_id": str(class_id),
+                "class_name": name,
+                **summaries[class_id],
+                "period_start": period_start.isoformat(),
+                "period_end": period_end.isoformat(),
+            }
+            for class_id, name in class_names.items()
+        ]
+
+    async def invalidate_for_student(self, student_id: uuid.UUID) -> None:
+        """
+        使学生所在班级的汇总缓存失效
+
+        Args:
+            student_id: 学生ID
+        """
+        result = await self.db.execute(
+            select(ClassStudent.class_id).where(
+                and_(
+                    ClassStudent.student_id == student_id,
+                    ClassStudent.enrollment_status == "active",
+                )
+            )
+        )
+        class_ids = list(result.scalars().all())
+        if class_ids:
+            cache = await get_class_summary_cache()
+            await cache.invalidate(class_ids)
+
+    async def _compute_summaries(
+        self,
+        class_ids: List[uuid.UUID],
+        period_start: datetime,
+        period_end: datetime,
+    ) -> Dict[uuid.UUID, Dict[str, Any]]:
+        """用集合查询计算一组班级的汇总（不含班级名称和统计周期）"""
+        roster = (
+            select(ClassStudent.class_id, ClassStudent.student_id)
+            .where(
+                and_(
+                    ClassStudent.class_id.in_(class_ids),
+                    ClassStudent.enrollment_status == "active",
+                )
+            )
+            .cte("roster")
+        )
+        reports = (
+            select(
+                roster.c.class_id,
+                LearningReport.student_id,
+                LearningReport.created_at,
+                LearningReport.statistics,
+                LearningReport.ability_analysis,
+                LearningReport.weak_points,
+            )
+            .join(roster, roster.c.student_id == LearningReport.student_id)
+            .where(
+                and_(
+                    LearningReport.created_at >= period_start,
+                    LearningReport.created_at <= period_end,
+                )
+            )
+            .cte("class_reports")
+        )
+
+        overall = await self._query_overall(roster, reports, period_start, period_end)
+        abilities = await self._query_abilities(reports)
+        weak_points = await self._query_weak_points(reports)
+
+        summaries = {}
+        for class_id in class_ids:
+            row = overall.get(class_id)
+            summaries[class_id] = {
+                "total_students": row.total_students if row else 0,
+                "active_students": row.active_students if row else 0,
+                "overall_stats": {
+                    "avg_completion_rate": round(float(row.avg_completion_rate or 0), 2) if row else 0.0,
+                    "avg_correct_rate": round(float(row.avg_correct_rate or 0), 2) if row else 0.0,
+                    "total_study_hours": round(float(row.total_minutes or 0) / 60.0, 2) if row else 0.0,
+                },
+                "practice_stats": self._build_practice_stats(row),
+                "ability_distribution": _aggregate_abilities(abilities.get(class_id, [])),
+                "top_weak_points": weak_points.get(class_id, []),
+            }
+        return summaries
+
+    async def _query_overall(self, roster, reports, period_start: datetime, period_end: datetime) -> Dict[uuid.UUID, Any]:
+        """花名册人数、期间报告指标、期间练习统计（一条查询）"""
+        roster_counts = (
+            select(
+                roster.c.class_id,
+                func.count(roster.c.student_id).label("total_students"),
+            )
+            .group_by(roster.c.class_id)
+            .subquery()
+        )
+        report_stats = (
+            select(
+                reports.c.class_id,
+                func.count(func.distinct(reports.c.student_id)).label("active_students"),
+                func.avg(reports.c.statistics["completion_rate"].as_float()).label("avg_completion_rate"),
+                func.avg(reports.c.statistics["avg_correct_rate"].as_float()).label("avg_correct_rate"),
+                func.sum(reports.c.statistics["total_duration_minutes"].as_float()).label("total_minutes"),
+            )
+            .group_by(reports.c.class_id)
+            .subquery()
+        )
+        practice_stats = (
+            select(
+                roster.c.class_id,
+                func.count(func.distinct(StudentDailyStats.student_id)).filter(
+                    StudentDailyStats.practice_count > 0
+                ).label("practicing_students"),
+                func.sum(StudentDailyStats.practice_count).label("practice_count"),
+                func.sum(StudentDailyStats.completed_count).label("completed_count"),
+                func.sum(StudentDailyStats.correct_rate_sum).label("correct_rate_sum"),
+                func.sum(StudentDailyStats.correct_rate_count).label("correct_rate_count"),
+                func.sum(StudentDailyStats.time_spent_seconds).label("time_spent_seconds"),
+                func.sum(StudentDailyStats.mistake_count).label("mistake_count"),
+            )
+            .join(StudentDailyStats, StudentDailyStats.student_id == roster.c.student_id)
+            .where(
+                and_(
+                    StudentDailyStats.stat_date >= period_start.date(),
+                    StudentDailyStats.stat_date <= period_end.date(),
+                )
+            )
+            .group_by(roster.c.class_id)
+            .subquery()
+        )
+
+        result = await self.db.execute(
+            select(
+                roster_counts.c.class_id,
+                roster_counts.c.total_students,
+                func.coalesce(report_stats.c.active_students, 0).label("active_students"),
+                report_stats.c.avg_completion_rate,
+                report_stats.c.avg_correct_rate,
+                report_stats.c.total_minutes,
+                practice_stats.c.practicing_students,
+                practice_stats.c.practice_count,
+                practice_stats.c.completed_count,
+                practice_stats.c.correct_rate_sum,
+                practice_stats.c.correct_rate_count,
+                practice_stats.c.time_spent_seconds,
+                practice_stats.c.mistake_count,
+            )
+            .outerjoin(report_stats, report_stats.c.class_id == roster_counts.c.class_id)
+            .outerjoin(practice_stats, practice_stats.c.class_id == roster_counts.c.class_id)
+        )
+        return {row.class_id: row for row in result.all()}
+
+    async def _query_abilities(self, reports) -> Dict[uuid.UUID, List[Optional[dict]]]:
+        """每个班级最近N份报告的能力分析（一条查询）"""
+        ranked = (
+            select(
+                reports.c.class_id,
+                reports.c.ability_analysis,
+                func.row_number().over(
+                    partition_by=reports.c.class_id,
+                    order_by=reports.c.created_at.desc(),
+                ).label("rn"),
+            )
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(ranked.c.class_id, ranked.c.ability_analysis)
+            .where(ranked.c.rn <= self.ABILITY_REPORT_LIMIT)
+        )
+
+        abilities: Dict[uuid.UUID, List[Optional[dict]]] = {}
+        for class_id, ability in result.all():
+            abilities.setdefault(class_id, []).append(ability)
+        return abilities
+
+    async def _query_weak_points(self, reports) -> Dict[uuid.UUID, List[Dict[str, Any]]]:
+        """报告中的知识点计数按班级求和取前N（一条查询）"""
+        knowledge_points = reports.c.weak_points["knowledge_points"]
+        report_points = (
+            select(reports.c.class_id, knowledge_points.label("points"))
+            .where(func.json_typeof(knowledge_points) == "object")
+            .subquery()
+        )
+        kp = func.json_each_text(report_points.c.points).table_valued("key", "value").lateral("kp")
+        totals = (
+            select(
+                report_points.c.class_id,
+                kp.c.key.label("knowledge_point"),
+                func.sum(cast(kp.c.value, Float)).label("total"),
+            )
+            .select_from(report_points)
+            .join(kp, true())
+            .group_by(report_points.c.class_id, kp.c.key)
+            .subquery()
+        )
+        ranked = (
+            select(
+                totals,
+                func.row_number().over(
+                    partition_by=totals.c.class_id,
+                    order_by=(totals.c.total.desc(), totals.c.knowledge_point),
+                ).label("rn"),
+            )
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(ranked.c.class_id, ranked.c.knowledge_point, ranked.c.total)
+            .where(ranked.c.rn <= self.TOP_WEAK_POINTS)
+            .order_by(ranked.c.class_id, ranked.c.rn)
+        )
+
+        weak_points: Dict[uuid.UUID, List[Dict[str, Any]]] = {}
+        for class_id, knowledge_point, total in result.all():
+            weak_points.setdefault(class_id, []).append({
+                "knowledge_point": knowledge_point,
+                "affected_students": int(total),
+            })
+        return weak_points
+
+    @staticmethod
+    def _build_practice_stats(row: Any) -> Dict[str, Any]:
+        """由每日统计汇总构建班级练习指标"""
+        practice_count = int(row.practice_count or 0) if row else 0
+        completed_count = int(row.completed_count or 0) if row else 0
+        correct_rate_count = int(row.correct_rate_count or 0) if row else 0
+
+        return {
+            "practicing_students": int(row.practicing_students or 0) if row else 0,
+            "total_practices": practice_count,
+            "completed_practices": completed_count,
+            "completion_rate": round(completed_count / practice_count * 100, 2) if practice_count else 0,
+            "avg_correct_rate": (
+                round(float(row.correct_rate_sum) / correct_rate_count * 100, 2)
+                if correct_rate_count else 0
+            ),
+            "study_hours": round(int(row.time_spent_seconds or 0) / 3600, 2) if row else 0.0,
+            "total_mistakes": int(row.mistake_count or 0) if row else 0,
+        }
+
+
+def get_class_summary_service(db: AsyncSession) -> ClassSummaryService:
+    """获取班级汇总服务实例"""
+    return ClassSummaryService(db)
@@ -8,10 +8,28 @@ from typing import List, Set, Tuple, Optional
 
 from app.services.vector_service import VectorService
 from app.services.embedding_service import EmbeddingService
+from app.services.similarity_engine import MODE_EXACT, SimilarityEngine
 
 logger = logging.getLogger(__name__)
 
 
+def _threadsafe_callback(progress_callback: Optional[callable]) -> Optional[callable]:
+    """将进度回调包装为可在工作线程中调用的版本
+
+    相似度计算在线程池中执行，回调通过 call_soon_threadsafe
+    投递回事件循环线程执行，保持原有回调的调用线程语义。
+    """
+    if progress_callback is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+
+    def _callback(phase: str, current: int, total: int, message: str) -> None:
+        loop.call_soon_threadsafe(progress_callback, phase, current, total, message)
+
+    return _callback
+
+
 class ContentDeduplicationService:
     """内容语义去重服务
 
@@ -21,16 +39,19 @@ class ContentDeduplicationService:
     def __init__(
         self,
         embedding_service: Optional[EmbeddingService] = None,
-        similarity_threshold: float = 0.85
+        similarity_threshold: float = 0.85,
+        mode: str = MODE_EXACT
     ):
         """初始化去重服务
 
         Args:
             embedding_service: 嵌入服务实例
             similarity_threshold: 相似度阈值（0-1），超过此值认为重复
+            mode: 相似度计算模式（exact/lsh/auto），大规模导入可使用近似模式
         """
         self.embedding_service = embedding_service or EmbeddingService()
         self.similarity_threshold = similarity_threshold
+        self.engine = SimilarityEngine(threshold=similarity_threshold, mode=mode)
 
     async def find_duplicates(
         self,
@@ -50,8 +71,6 @@ class ContentDeduplicationService:
             return []
 
         total = len(texts)
-        duplicates: List[Set[int]] = []
-        processed = set()
 
         # 生成所有文本的向量
         if progress_callback:
@@ -62,36 +81,32 @@ class ContentDeduplicationService:
         if progress_callback:
             progress_callback("comparing", 0, total, "Comparing texts...")
 
-        # 逐一比较向量
-        for i, vec_i in enumerate(vectors):
-            if i in processed:
-                continue
-
-            current_group = {i}
-            for j in range(i + 1, len(vectors)):
-                if j in processed:
-                    continue
-
-                similarity = self._cosine_similarity(vec_i, vectors[j])
-                if similarity >= self.similarity_threshold:
-                    current_group.add(j)
-                    processed.add(j)
-
-                # 更新进度
-                if progress_callback:
-                    current = i * total + j
-                    total_comparisons = total * (total - 1) // 2
-                    progress_callback("comparing", current, total_comparisons, f"Comparing {i} vs {j}")
-
-            if len(current_group) > 1:
-                duplicates.append(current_group)
-            processed.add(i)
+        duplicates = await self.find_vector_duplicates(vectors, progress_callback)
 
         if progress_callback:
             progress_callback("complete", total, total, f"Found {len(duplicates)} duplicate groups")
 
         return duplicates
 
+    async def find_vector_duplicates(
+        self,
+        vectors: List[List[float]],
+        progress_callback: Optional[callable] = None
+    ) -> List[Set[int]]:
+        """在已生成的向量中查找重复组
+
+        Args:
+            vectors: 向量列表
+            progress_callback: 进度回调函数
+
+        Returns:
+            重复向量索引集合列表
+        """
+        # 分块矩阵相似度计算（CPU密集，放到线程池执行），进度按分块上报
+        return await asyncio.to_thread(
+            self.engine.find_groups, vectors, _threadsafe_callback(progress_callback)
+        )
+
     async def filter_duplicates(
         self,
         contents: List[dict],
@@ -119,7 +134,7 @@ class ContentDeduplicationService:
         duplicate_indices = set()
         for group in duplicates:
             # 只保留第一条
-            duplicate_indices.update(list(group)[1:])
+            duplicate_indices.update(sorted(group)[1:])
 
         # 过滤结果
         result = [c for i, c in enumerate(contents) if i not in duplicate_indices]
@@ -208,16 +223,50 @@ class ContentDeduplicationService:
         existing_vectors = await self.embedding_service.batch_generate_embeddings(existing_texts)
 
         # 比较
-        results = []
-        for new_vec in new_vectors:
-            is_duplicate = False
-            for existing_vec in existing_vectors:
-                if self._cosine_similarity(new_vec, existing_vec) >= self.similarity_threshold:
-                    is_duplicate = True
-                    break
-            results.append(is_duplicate)
+        max_similarities = await asyncio.to_thread(
+            self.engine.max_similarity,
+            new_vectors,
+            existing_vectors,
+            _threadsafe_callback(progress_callback),
+        )
+
+        return [bool(score >= self.similarity_threshold) for score in max_similarities]
+
+    async def check_duplicate_with_index(
+        self,
+        vectors: List[List[float]],
+        vector_service: VectorService,
+        collection_name: Optional[str] = None
+    ) -> List[bool]:
+        """检查向量是否与Qdrant集合中已索引的内容重复
+
+        直接复用集合中已存储的向量，无需重新生成已有内容的向量，
+        去重成本与内容库规模无关。
+
+        Args:
+            vectors: 新内容的向量列表
+            vector_service: 向量服务实例
+            collection_name: 集合名称（默认内容集合）
+
+        Returns:
+            布尔列表，True表示与已索引内容重复
+        """
+        if not vectors:
+            return []
 
-        return results
+        try:
+            results = await vector_service.batch_search_similar(
+                vectors,
+                limit=1,
+                score_threshold=self.similarity_threshold,
+                collection_name=collection_name,
+            )
+        except Exception as e:
+            # 集合不存在或Qdrant不可用时不阻塞导入
+            logger.warning(f"Index duplicate check skipped: {e}")
+            return [False] * len(vectors)
+
+        return [bool(hits) for hits in results]
 
 
 class VocabularyDeduplicationService:
@@ -226,16 +275,19 @@ class VocabularyDeduplicationService:
     def __init__(
         self,
         embedding_service: Optional[EmbeddingService] = None,
-        similarity_threshold: float = 0.90
+        similarity_threshold: float = 0.90,
+        mode: str = MODE_EXACT
     ):
         """初始化去重服务
 
         Args:
             embedding_service: 嵌入服务实例
             similarity_threshold: 相似度阈值
+            mode: 相似度计算模式（exact/lsh/auto）
         """
         self.embedding_service = embedding_service or EmbeddingService()
         self.similarity_threshold = similarity_threshold
+        self.engine = SimilarityEngine(threshold=similarity_threshold, mode=mode)
 
     async def find_duplicates(self, vocabularies: List[dict]) -> List[Set[int]]:
         """查找语义重复的词汇
@@ -256,28 +308,7 @@ class VocabularyDeduplicationService:
         vectors = await self.embedding_service.batch_generate_embeddings(texts)
 
         # 比较
-        duplicates: List[Set[int]] = []
-        processed = set()
-
-        for i, vec_i in enumerate(vectors):
-            if i in processed:
-                continue
-
-            current_group = {i}
-            for j in range(i + 1, len(vectors)):
-                if j in processed:
-                    continue
-
-                similarity = self._cosine_similarity(vec_i, vectors[j])
-                if similarity >= self.similarity_threshold:
-                    current_group.add(j)
-                    processed.add(j)
-
-            if len(current_group) > 1:
-                duplicates.append(current_group)
-            processed.add(i)
-
-        return duplicates
+        return await asyncio.to_thread(self.engine.find_groups, vectors)
 
     def _extract_text(self, vocabulary: dict) -> str:
         """提取用于向量化的文本"""
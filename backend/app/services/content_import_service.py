@@ -28,11 +28,15 @@ class ContentImportService:
     从JSON文件批量导入内容到数据库
     """
 
+    # 每条内容必须包含的字段（构建嵌入文本和创建记录时直接使用）
+    REQUIRED_FIELDS = ("title", "content_type", "difficulty_level")
+
     def __init__(
         self,
         db: AsyncSession,
         vector_service: Optional[VectorService] = None,
-        skip_duplicates: bool = True
+        skip_duplicates: bool = True,
+        index_vectors: bool = False
     ):
         """初始化导入服务
 
@@ -40,6 +44,8 @@ class ContentImportService:
             db: 数据库会话
             vector_service: 向量服务实例
             skip_duplicates: 是否跳过重复内容
+            index_vectors: 导入后是否直接将去重时生成的向量写入Qdrant（默认不写入，
+                由调用方显式开启）
         """
         self.db = db
         self.vector_service = vector_service or VectorService()
@@ -48,6 +54,7 @@ class ContentImportService:
             embedding_service=self.vector_service.embedding_service
         )
         self.skip_duplicates = skip_duplicates
+        self.index_vectors = index_vectors
 
     async def import_from_file(
         self,
@@ -111,21 +118,116 @@ class ContentImportService:
 
         success, failed = 0, 0
 
-        # 语义去重
+        # 缺少必填字段的条目单独记为失败，不影响同批次其他内容
+        valid_contents = []
+        for index, item in enumerate(contents):
+            error = self._validate_item(item)
+            if error:
+                logger.error(f"Failed to import item #{index}: {error}")
+                failed += 1
+            else:
+                valid_contents.append(item)
+        contents = valid_contents
+        if not contents:
+            return success, failed
+
+        # 每条内容只生成一次向量，去重与索引共用
+        embedding_texts = [self._build_embedding_text(item) for item in contents]
+        vectors: List[Optional[List[float]]] = [None] * len(contents)
+        if skip or self.index_vectors:
+            vectors = await self.vector_service.embedding_service.batch_generate_embeddings(
+                embedding_texts
+            )
+            if len(vectors) != len(contents):
+                raise ValueError(
+                    f"Embedding count mismatch: {len(vectors)} vectors for {len(contents)} contents"
+                )
+
+        # 语义去重：批次内部 + 已索引的内容库
         if skip:
-            contents = await self.deduplication_service.filter_duplicates(contents)
+            keep = await self._deduplicate(vectors)
+            contents = [contents[i] for i in keep]
+            embedding_texts = [embedding_texts[i] for i in keep]
+            vectors = [vectors[i] for i in keep]
 
-        for item in contents:
+        imported: List[Tuple[Content, List[float]]] = []
+        for item, text, vector in zip(contents, embedding_texts, vectors):
             try:
                 content = await self._import_single(item)
+                content.embedding_text = text
+                imported.append((content, vector))
                 success += 1
             except Exception as e:
                 logger.error(f"Failed to import: {item.get('title', 'unknown')} - {e}")
                 failed += 1
 
         await self.db.commit()
+
+        if self.index_vectors and imported:
+            await self._index_imported(imported)
+
         return success, failed
 
+    def _validate_item(self, data: dict) -> Optional[str]:
+        """检查单条内容的必填字段，返回错误信息，有效时返回None"""
+        if not isinstance(data, dict):
+            return "item is not an object"
+        missing = [field for field in self.REQUIRED_FIELDS if not data.get(field)]
+        if missing:
+            return f"{data.get('title', 'unknown')}: missing required fields {', '.join(missing)}"
+        return None
+
+    def _build_embedding_text(self, data: dict) -> str:
+        """构建与向量索引一致的嵌入文本"""
+        return self.vector_service.embedding_service.build_content_text(
+            title=data['title'],
+            content_text=data.get('content_text'),
+            description=data.get('description'),
+            topic=data.get('topic'),
+            difficulty_level=data.get('difficulty_level'),
+            exam_type=data.get('exam_type'),
+        )
+
+    async def _deduplicate(self, vectors: List[List[float]]) -> List[int]:
+        """返回去重后保留的内容索引
+
+        先在批次内部去重（保留每组第一条），再对剩余向量批量查询
+        Qdrant内容集合，跳过与已索引内容重复的条目。
+        """
+        duplicate_indices = set()
+        for group in await self.deduplication_service.find_vector_duplicates(vectors):
+            duplicate_indices.update(sorted(group)[1:])
+
+        candidates = [i for i in range(len(vectors)) if i not in duplicate_indices]
+        in_index = await self.deduplication_service.check_duplicate_with_index(
+            [vectors[i] for i in candidates], self.vector_service
+        )
+        keep = [i for i, duplicated in zip(candidates, in_index) if not duplicated]
+
+        skipped = len(vectors) - len(keep)
+        if skipped:
+            logger.info(
+                f"Filtered {skipped} duplicate contents "
+                f"({len(duplicate_indices)} in batch, {skipped - len(duplicate_indices)} already indexed)"
+            )
+        return keep
+
+    async def _index_imported(self, imported: List[Tuple[Content, List[float]]]) -> None:
+        """复用导入时生成的向量写入Qdrant并回填vector_id
+
+        索引失败不影响已导入的内容，未回填vector_id的内容会在
+        VectorService.batch_index_contents 中被重新索引。
+        """
+        try:
+            await self.vector_service.upsert_contents_batch(
+                [content for content, _ in imported],
+                [vector for _, vector in imported],
+            )
+            await self.db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to index imported contents, will retry on reindex: {e}")
+            await self.db.rollback()
+
     async def _import_single(self, data: dict) -> Content:
         """导入单条内容
 
@@ -282,7 +384,7 @@ class VocabularyImportService:
             duplicates = await self.deduplication_service.find_duplicates(vocabularies)
             duplicate_indices = set()
             for group in duplicates:
-                duplicate_indices.update(list(group)[1:])
+                duplicate_indices.update(sorted(group)[1:])
             vocabularies = [v for i, v in enumerate(vocabularies) if i not in duplicate_indices]
 
         for item in vocabularies:
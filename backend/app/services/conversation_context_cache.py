@@ -0,0 +1,332 @@
+"""
+对话上下文缓存 - AI英语教学系统
+把进行中对话的上下文物化到Redis，多轮对话每轮只需一次缓存读写
+
+缓存内容（String `cache:conversation:ctx:{conversation_id}`，JSON）：
+- 场景、级别和已生成的系统提示
+- 对话状态（非进行中的对话拒绝追加消息）
+- 消息数（同时是下一条消息的序号来源）
+- 最近 N 条消息的环形缓冲
+
+追加消息使用 Lua 脚本在一次往返内完成"读取 + 分配序号 + 追加 + 截断 + 续期"，
+未命中时返回空，由调用方从数据库加载并回填。
+只缓存进行中的对话，对话完成时删除缓存。
+"""
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+from app.metrics.cache_metrics import record_cache_hit, record_cache_miss
+
+logger = logging.getLogger(__name__)
+
+_CONTEXT_CACHE = "conversation_context"
+
+# KEYS[1]: 上下文 Key
+# ARGV[1]: 消息 JSON，ARGV[2]: 保留的最近消息数，ARGV[3]: TTL（秒）
+# 返回更新后的上下文 JSON，未命中返回 false；对话已不在进行中时原样返回、不追加
+_APPEND_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    return false
+end
+
+local context = cjson.decode(raw)
+if context['status'] and context['status'] ~= 'active' then
+    return raw
+end
+local messages = context['messages']
+if type(messages) ~= 'table' then
+    messages = {}
+end
+
+local seq = tonumber(context['message_count']) + 1
+local message = cjson.decode(ARGV[1])
+message['seq'] = seq
+table.insert(messages, message)
+
+local limit = tonumber(ARGV[2])
+while #messages > limit do
+    table.remove(messages, 1)
+end
+
+context['messages'] = messages
+context['message_count'] = seq
+local encoded = cjson.encode(context)
+redis.call('SET', KEYS[1], encoded, 'EX', tonumber(ARGV[3]))
+return encoded
+"""
+
+# KEYS[1]: 上下文 Key
+# ARGV[1]: 对话状态
+# 返回 1 表示已更新，未命中返回 0
+_MARK_STATUS_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    return 0
+end
+
+local context = cjson.decode(raw)
+context['status'] = ARGV[1]
+redis.call('SET', KEYS[1], cjson.encode(context), 'KEEPTTL')
+return 1
+"""
+
+
+@dataclass
+class ConversationContext:
+    """进行中对话的上下文"""
+
+    conversation_id: str
+    scenario: str
+    level: str
+    system_prompt: str
+    message_count: int
+    # 最近的消息（role/content/timestamp/seq），按时间正序
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    # 对话状态，不是 active 时追加脚本拒绝追加消息
+    status: str = "active"
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "ConversationContext":
+        data = json.loads(raw)
+        messages = data.get("messages")
+        # cjson 把空数组编码为 {}
+        data["messages"] = messages if isinstance(messages, list) else []
+        return cls(**data)
+
+
+class ConversationContextCache:
+    """
+    对话上下文缓存
+
+    使用示例：
+        ```python
+        cache = get_conversation_context_cache()
+        context = await cache.append(conversation_id, "user", message, datetime.utcnow())
+        if context is None:
+            context = await load_from_db(...)
+            await cache.put(context)
+        ```
+    """
+
+    # 缓存 Key 前缀
+    _PREFIX = "cache:conversation:ctx:"
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        max_messages: int = 10,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            redis_client: Redis 客户端实例，如果未提供则从配置创建
+            max_messages: 保留的最近消息数
+        """
+        self._redis = redis_client
+        self._append_script = None
+        self._mark_status_script = None
+        self.max_messages = max_messages
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用上下文缓存"""
+        return get_settings().CONVERSATION_CONTEXT_CACHE_ENABLED
+
+    @property
+    def ttl(self) -> int:
+        """缓存过期时间（秒），每次追加消息时续期"""
+        return get_settings().CONVERSATION_CONTEXT_CACHE_TTL
+
+    async def _get_redis(self) -> redis.Redis:
+        """获取 Redis 客户端（懒加载）"""
+        if self._redis is None:
+            settings = get_settings()
+            self._redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                max_connections=settings.REDIS_MAX_CONNECTIONS
+            )
+        return self._redis
+
+    def _get_key(self, conversation_id: Any) -> str:
+        return f"{self._PREFIX}{conversation_id}"
+
+    async def get(self, conversation_id: Any) -> Optional[ConversationContext]:
+        """
+        读取对话上下文
+
+        Args:
+            conversation_id: 对话ID
+
+        Returns:
+            缓存的上下文，如果未命中返回None
+        """
+        if not self.enabled:
+            return None
+        try:
+            redis_client = await self._get_redis()
+            cached = await redis_client.get(self._get_key(conversation_id))
+        except Exception as e:
+            logger.warning(f"读取对话上下文缓存失败: {e}")
+            return None
+
+        if not cached:
+            record_cache_miss(_CONTEXT_CACHE, "redis")
+            return None
+
+        record_cache_hit(_CONTEXT_CACHE, "redis")
+        return ConversationContext.from_json(cached)
+
+    async def put(self, context: ConversationContext) -> bool:
+        """
+        写入对话上下文（只保留最近 max_messages 条消息）
+
+        Args:
+            context: 对话上下文
+
+        Returns:
+            是否设置成功
+        """
+        if not self.enabled:
+            return False
+        context.messages = context.messages[-self.max_messages:]
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.setex(
+                self._get_key(context.conversation_id),
+                self.ttl,
+                context.to_json(),
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"写入对话上下文缓存失败: {e}")
+            return False
+
+    async def append(
+        self,
+        conversation_id: Any,
+        role: str,
+        content: str,
+        timestamp: datetime,
+    ) -> Optional[ConversationContext]:
+        """
+        向缓存的上下文追加一条消息并分配序号
+
+        Args:
+            conversation_id: 对话ID
+            role: 消息角色（user/assistant）
+            content: 消息内容
+            timestamp: 消息时间
+
+        Returns:
+            追加后的上下文（新消息序号为 message_count），如果未命中返回None；
+            对话已不在进行中时返回未追加的上下文（status 不是 active）
+        """
+        if not self.enabled:
+            return None
+        message = json.dumps(
+            {"role": role, "content": content, "timestamp": timestamp.isoformat()},
+            ensure_ascii=False,
+        )
+        try:
+            redis_client = await self._get_redis()
+            if self._append_script is None:
+                self._append_script = redis_client.register_script(_APPEND_SCRIPT)
+            updated = await self._append_script(
+                keys=[self._get_key(conversation_id)],
+                args=[message, self.max_messages, self.ttl],
+            )
+        except Exception as e:
+            logger.warning(f"追加对话上下文缓存失败: {e}")
+            return None
+
+        if not updated:
+            record_cache_miss(_CONTEXT_CACHE, "redis")
+            return None
+
+        record_cache_hit(_CONTEXT_CACHE, "redis")
+        return ConversationContext.from_json(updated)
+
+    async def mark_status(self, conversation_id: Any, status: str) -> bool:
+        """
+        更新缓存中的对话状态（保留剩余过期时间）
+
+        对话结束后标记状态，之后的追加请求直接被拒绝，不会写入新消息。
+
+        Args:
+            conversation_id: 对话ID
+            status: 对话状态
+
+        Returns:
+            是否更新成功（未命中返回 False）
+        """
+        if not self.enabled:
+            return False
+        try:
+            redis_client = await self._get_redis()
+            if self._mark_status_script is None:
+                self._mark_status_script = redis_client.register_script(_MARK_STATUS_SCRIPT)
+            updated = await self._mark_status_script(
+                keys=[self._get_key(conversation_id)],
+                args=[status],
+            )
+            return bool(updated)
+        except Exception as e:
+            logger.warning(f"更新对话上下文状态失败: {e}")
+            return False
+
+    async def invalidate(self, conversation_id: Any) -> bool:
+        """
+        删除对话上下文
+
+        在对话完成或后台持久化失败时调用，下次请求从数据库重新加载。
+
+        Args:
+            conversation_id: 对话ID
+
+        Returns:
+            是否删除成功
+        """
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.delete(self._get_key(conversation_id))
+            return True
+        except Exception as e:
+            logger.warning(f"删除对话上下文缓存失败: {e}")
+            return False
+
+    async def close(self):
+        """关闭 Redis 连接"""
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+            self._append_script = None
+            self._mark_status_script = None
+
+
+# 全局缓存实例
+_conversation_context_cache: Optional[ConversationContextCache] = None
+
+
+def get_conversation_context_cache() -> ConversationContextCache:
+    """
+    获取对话上下文缓存实例（单例模式）
+
+    Returns:
+        ConversationContextCache: 缓存实例
+    """
+    global _conversation_context_cache
+    if _conversation_context_cache is None:
+        _conversation_context_cache = ConversationContextCache()
+    return _conversation_context_cache
@@ -2,23 +2,34 @@
 AI Conversation Service - Async Version
 使用 ZhipuAI 提供对话式英语口语练习服务
 """
+import asyncio
 import json
 import logging
 import re
+import time
+import uuid
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Set, Tuple, Union
 
-from sqlalchemy import select
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from sqlalchemy.orm.attributes import flag_modified
 
+from app.core.config import get_settings
+from app.db.session_manager import get_session_maker
 from app.models.conversation import (
     Conversation,
     ConversationScenario,
     ConversationStatus
 )
+from app.models.conversation_message import ConversationMessage
 from app.models.student import Student
+from app.services.conversation_context_cache import (
+    ConversationContext,
+    get_conversation_context_cache,
+)
+from app.services.llm_response_cache import get_llm_response_cache
 from app.services.zhipu_service import get_zhipuai_service
 
 logger = logging.getLogger(__name__)
@@ -103,9 +114,35 @@ class ConversationService:
         }
     }
 
+    # 对话回复的生成参数
+    REPLY_TEMPERATURE = 0.7
+    REPLY_MAX_TOKENS = 500
+
+    # 保存的对话回复最大字符数
+    REPLY_MAX_CHARS = 500
+
+    # 流式回复开头缓冲到该字符数后再判断是否为思考过程
+    STREAM_DECISION_CHARS = 32
+
+    # 模型把思考过程写入回复正文时出现的标记
+    THINKING_MARKERS = [
+        '**分析**', '**检查**', '**确定**', '**优化**', '**替代**', '**选择**',
+        '分析', '检查', '确定', '优化', '替代', '选择', '对照', '起草', '草稿'
+    ]
+
+    # 作为上下文发送给 AI 的最近消息数
+    CONTEXT_MESSAGE_LIMIT = 10
+
+    # 对话评分的生成温度
+    SCORE_TEMPERATURE = 0.3
+
     def __init__(self):
         """初始化对话服务"""
         self.zhipu_service = get_zhipuai_service()
+        self.context_cache = get_conversation_context_cache()
+        self.response_cache = get_llm_response_cache()
+        # 对话ID -> 尚未完成的后台消息写入任务
+        self._pending_writes: Dict[uuid.UUID, Set[asyncio.Task]] = {}
 
     async def create_conversation(
         self,
@@ -148,7 +185,7 @@ class ConversationService:
             scenario=scenario,
             level=level.upper(),
             status=ConversationStatus.ACTIVE,
-            messages="[]"
+            message_count=0
         )
 
         db.add(conversation)
@@ -178,6 +215,94 @@ class ConversationService:
         Returns:
             AI 回复消息
 
+        Raises:
+            ValueError: 如果对话不存在或未激活
+        """
+        api_messages = await self.prepare_reply(db, conversation_id, user_message)
+
+        # 获取 AI 回复
+        try:
+            response = await self.zhipu_service.chat_completion(
+                messages=api_messages,
+                temperature=self.REPLY_TEMPERATURE,
+                max_tokens=self.REPLY_MAX_TOKENS
+            )
+            raw_message = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+            # 临时调试：记录原始响应
+            logger.info(f"Raw AI response: {raw_message[:200]}...")
+        except Exception as e:
+            logger.error(f"Error getting AI response: {e}")
+            raise
+
+        return await self.save_reply(db, conversation_id, raw_message)
+
+    async def prepare_reply(
+        self,
+        db: AsyncSession,
+        conversation_id: str,
+        user_message: str
+    ) -> List[Dict[str, str]]:
+        """
+        保存用户消息并构建请求 AI 回复的消息列表
+
+        上下文缓存命中时只需一次 Redis 往返，消息在后台写入数据库；
+        未命中时从数据库加载对话并回填缓存。
+
+        Args:
+            db: 数据库会话
+            conversation_id: 对话 ID (UUID)
+            user_message: 用户消息内容
+
+        Returns:
+            发送给 AI 的消息列表（系统提示 + 最近消息）
+
+        Raises:
+            ValueError: 如果对话不存在或未激活
+        """
+        timestamp = datetime.utcnow()
+        context = await self.context_cache.append(conversation_id, "user", user_message, timestamp)
+        if context is not None:
+            # 缓存的对话状态不是进行中时脚本不会追加消息
+            if context.status != ConversationStatus.ACTIVE:
+                raise ValueError(
+                    f"Conversation {conversation_id} is not active "
+                    f"(status: {context.status})"
+                )
+            self._persist_message_later(
+                conversation_id, context.message_count, "user", user_message, timestamp
+            )
+        else:
+            context = await self._load_context(db, conversation_id, user_message)
+
+        # 构建 API 消息
+        api_messages = [{"role": "system", "content": context.system_prompt}]
+        for msg in context.messages[-self.CONTEXT_MESSAGE_LIMIT:]:
+            api_messages.append({
+                "role": msg["role"],
+                "content": msg["content"]
+            })
+        return api_messages
+
+    async def _load_context(
+        self,
+        db: AsyncSession,
+        conversation_id: str,
+        user_message: str
+    ) -> ConversationContext:
+        """
+        从数据库加载对话上下文（缓存未命中时）
+
+        追加用户消息后读取最近消息，并回填上下文缓存。
+
+        Args:
+            db: 数据库会话
+            conversation_id: 对话 ID (UUID)
+            user_message: 用户消息内容
+
+        Returns:
+            包含新用户消息的对话上下文
+
         Raises:
             ValueError: 如果对话不存在或未激活
         """
@@ -196,71 +321,334 @@ class ConversationService:
                 f"(status: {conversation.status})"
             )
 
-        # 添加用户消息 - 重新获取对话以确保有最新数据
-        await db.refresh(conversation)
-        current_messages = conversation.get_messages()
-        current_messages.append({
-            "role": "user",
-            "content": user_message,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        conversation.messages = json.dumps(current_messages)
-        flag_modified(conversation, "messages")
-
-        # 立即刷新以确保消息被正确保存
-        await db.flush()
+        # 同一对话尚未写入的后台消息先落库，保证序号连续
+        await self.flush_pending_writes(conversation.id)
 
-        # 准备 AI 消息
-        system_prompt = self._get_system_prompt(
-            conversation.scenario,
-            conversation.level
+        # 追加用户消息（只写入一行，不重写历史消息）
+        seq = await self._append_message(db, conversation.id, "user", user_message)
+
+        # 获取最近消息作为上下文（只读取最后 N 行）
+        recent_messages = await self.get_recent_messages(
+            db, conversation.id, limit=self.CONTEXT_MESSAGE_LIMIT
         )
 
-        # 获取最近消息作为上下文（需要重新刷新以确保获取最新数据）
-        await db.refresh(conversation)
-        recent_messages = conversation.get_recent_messages(limit=10)
+        context = ConversationContext(
+            conversation_id=str(conversation.id),
+            scenario=conversation.scenario.value,
+            level=conversation.level,
+            system_prompt=self._get_system_prompt(conversation.scenario, conversation.level),
+            message_count=seq,
+            messages=recent_messages,
+            status=ConversationStatus.ACTIVE.value
+        )
+        await self.context_cache.put(context)
+        return context
 
-        # 构建 API 消息
-        api_messages = [{"role": "system", "content": system_prompt}]
-        for msg in recent_messages:
-            api_messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
+    async def stream_reply(
+        self,
+        api_messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        """
+        流式获取 AI 回复
 
-        # 获取 AI 回复
-        try:
-            response = await self.zhipu_service.chat_completion(
-                messages=api_messages,
-                temperature=0.7,
-                max_tokens=500
+        先缓冲回复开头判断是否包含思考过程：
+        - 普通回复：之后收到增量文本立即产出（末尾的空白和 * 等到结束时再决定）
+        - 含思考过程：缓冲完整回复，结束时只产出提取后的最终回复
+
+        产出文本拼接后即为要保存的回复，调用方使用
+        save_reply(..., extracted=True) 原样保存一次。
+
+        Args:
+            api_messages: prepare_reply 构建的消息列表
+
+        Yields:
+            str: 回复的增量文本（已过滤思考过程）
+        """
+        started = time.monotonic()
+        raw = ""
+        sent = ""
+        plain: Optional[bool] = None  # None 表示尚未判断
+        async for delta in self.zhipu_service.chat_completion_stream(
+            messages=api_messages,
+            temperature=self.REPLY_TEMPERATURE,
+            max_tokens=self.REPLY_MAX_TOKENS
+        ):
+            raw += delta
+            if plain is None:
+                head = self._strip_reply_head(raw)
+                if len(head) < self.STREAM_DECISION_CHARS:
+                    continue
+                plain = not self._has_thinking(raw) and any(c.isalpha() for c in head)
+            if not plain:
+                continue
+
+            # 末尾的空白和 * 可能在结束时被去掉，暂不产出
+            stable = re.sub(r'[\s*]+$', '', self._strip_reply_head(raw))[:self.REPLY_MAX_CHARS]
+            if len(stable) > len(sent):
+                if not sent:
+                    logger.info(f"AI reply first token after {time.monotonic() - started:.2f}s")
+                yield stable[len(sent):]
+                sent = stable
+
+        final = self._clean_plain_reply(raw) if plain else self._extract_final_response(raw)
+        if len(final) > len(sent):
+            yield final[len(sent):]
+
+    async def save_reply(
+        self,
+        db: AsyncSession,
+        conversation_id: str,
+        raw_message: str,
+        extracted: bool = False
+    ) -> str:
+        """
+        保存 AI 回复
+
+        Args:
+            db: 数据库会话
+            conversation_id: 对话 ID (UUID)
+            raw_message: 模型返回的原始回复
+            extracted: 是否已过滤思考过程（stream_reply 产出的文本），为 True 时原样保存
+
+        Returns:
+            保存的回复（已过滤思考过程）
+
+        Raises:
+            ValueError: 如果对话不存在
+        """
+        # 提取最终对话回复（过滤掉思考过程）
+        ai_message = raw_message if extracted else self._extract_final_response(raw_message)
+
+        logger.info(f"Extracted response: {ai_message[:100]}...")
+
+        # 添加 AI 消息到对话（缓存命中时在后台写入数据库）
+        timestamp = datetime.utcnow()
+        context = await self.context_cache.append(conversation_id, "assistant", ai_message, timestamp)
+        if context is not None and context.status == ConversationStatus.ACTIVE:
+            self._persist_message_later(
+                conversation_id, context.message_count, "assistant", ai_message, timestamp
             )
-            raw_message = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        else:
+            await self.flush_pending_writes(conversation_id)
+            await self._append_message(db, conversation_id, "assistant", ai_message)
 
-            # 临时调试：记录原始响应
-            logger.info(f"Raw AI response: {raw_message[:200]}...")
+        return ai_message
 
-            # 提取最终对话回复（过滤掉思考过程）
-            ai_message = self._extract_final_response(raw_message)
+    def _persist_message_later(
+        self,
+        conversation_id: Union[str, uuid.UUID],
+        seq: int,
+        role: str,
+        content: str,
+        created_at: datetime
+    ) -> None:
+        """
+        在后台把缓存中已分配序号的消息写入数据库（write-behind）
 
-            logger.info(f"Extracted response: {ai_message[:100]}...")
-        except Exception as e:
-            logger.error(f"Error getting AI response: {e}")
-            raise
+        使用独立的数据库会话，不占用请求的事务，失败时按指数退避重试。
+        """
+        conversation_uuid = self._to_uuid(conversation_id)
+        task = asyncio.create_task(
+            self._persist_message(conversation_uuid, seq, role, content, created_at)
+        )
+        pending = self._pending_writes.setdefault(conversation_uuid, set())
+        pending.add(task)
 
-        # 添加 AI 消息到对话
-        current_messages = conversation.get_messages()
-        current_messages.append({
-            "role": "assistant",
-            "content": ai_message,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        conversation.messages = json.dumps(current_messages)
-        flag_modified(conversation, "messages")
+        def _done(finished: asyncio.Task) -> None:
+            pending.discard(finished)
+            if not pending:
+                self._pending_writes.pop(conversation_uuid, None)
 
+        task.add_done_callback(_done)
+
+    async def _persist_message(
+        self,
+        conversation_id: uuid.UUID,
+        seq: int,
+        role: str,
+        content: str,
+        created_at: datetime
+    ) -> None:
+        """
+        写入一条后台消息
+
+        - 写入失败时按指数退避重试，重试期间保留上下文缓存（消息仍在缓存中）
+        - 序号已被占用时（Redis 不可用期间其他请求走数据库分配了序号），
+          改由数据库重新分配序号，并删除序号已落后的上下文缓存
+        - 重试耗尽后删除上下文缓存，下次请求从数据库重新加载
+        """
+        settings = get_settings()
+        attempts = settings.CONVERSATION_WRITE_BEHIND_RETRIES + 1
+        delay = settings.CONVERSATION_WRITE_BEHIND_RETRY_DELAY
+        allocate_in_db = False
+        attempt = 0
+        while True:
+            try:
+                async with get_session_maker()() as db:
+                    if allocate_in_db:
+                        seq = await self._append_message(
+                            db, conversation_id, role, content, created_at=created_at
+                        )
+                    else:
+                        db.add(ConversationMessage(
+                            conversation_id=conversation_id,
+                            seq=seq,
+                            role=role,
+                            content=content,
+                            created_at=created_at
+                        ))
+                        # 后台写入可能乱序完成，消息数只增不减
+                        await db.execute(
+                            update(Conversation)
+                            .where(Conversation.id == conversation_id)
+                            .values(message_count=func.greatest(Conversation.message_count, seq))
+                            .execution_options(synchronize_session=False)
+                        )
+                    await db.commit()
+            except IntegrityError as e:
+                if not allocate_in_db:
+                    logger.warning(
+                        f"Seq {seq} of conversation {conversation_id} is taken, "
+                        f"allocating a new one in the database: {e}"
+                    )
+                    allocate_in_db = True
+                    continue
+                error = e
+            except Exception as e:
+                error = e
+            else:
+                if allocate_in_db:
+                    await self.context_cache.invalidate(conversation_id)
+                return
+
+            attempt += 1
+            if attempt >= attempts:
+                break
+            logger.warning(
+                f"Failed to persist message {seq} of conversation {conversation_id} "
+                f"(attempt {attempt}/{attempts}): {error}"
+            )
+            await asyncio.sleep(delay * 2 ** (attempt - 1))
+
+        logger.error(f"Failed to persist message {seq} of conversation {conversation_id}: {error}")
+        await self.context_cache.invalidate(conversation_id)
+
+    async def flush_pending_writes(
+        self,
+        conversation_id: Optional[Union[str, uuid.UUID]] = None
+    ) -> None:
+        """
+        等待后台消息写入完成
+
+        Args:
+            conversation_id: 对话 ID，为 None 时等待所有对话（用于应用关闭时）
+        """
+        if conversation_id is None:
+            tasks = [task for pending in self._pending_writes.values() for task in pending]
+        else:
+            tasks = list(self._pending_writes.get(self._to_uuid(conversation_id), ()))
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _append_message(
+        self,
+        db: AsyncSession,
+        conversation_id: Union[str, uuid.UUID],
+        role: str,
+        content: str,
+        created_at: Optional[datetime] = None
+    ) -> int:
+        """
+        追加一条消息
+
+        先原子递增 conversations.message_count 分配序号，再插入消息行。
+        每轮的写入量与对话长度无关。
+
+        Args:
+            db: 数据库会话
+            conversation_id: 对话 ID (UUID)
+            role: 消息角色（user/assistant）
+            content: 消息内容
+            created_at: 消息时间（后台写入时保留原始时间），默认为当前时间
+
+        Returns:
+            消息序号
+
+        Raises:
+            ValueError: 如果对话不存在
+        """
+        conversation_uuid = self._to_uuid(conversation_id)
+        result = await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_uuid)
+            .values(message_count=Conversation.message_count + 1)
+            .returning(Conversation.message_count)
+            .execution_options(synchronize_session=False)
+        )
+        seq = result.scalar_one_or_none()
+        if seq is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+
+        db.add(ConversationMessage(
+            conversation_id=conversation_uuid,
+            seq=seq,
+            role=role,
+            content=content,
+            created_at=created_at or datetime.utcnow()
+        ))
         await db.flush()
+        return seq
 
-        return ai_message
+    async def get_recent_messages(
+        self,
+        db: AsyncSession,
+        conversation_id: Union[str, uuid.UUID],
+        limit: int = CONTEXT_MESSAGE_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """
+        获取最近的消息（按 (conversation_id, seq) 索引倒序读取 N 行）
+
+        Args:
+            db: 数据库会话
+            conversation_id: 对话 ID (UUID)
+            limit: 返回消息上限
+
+        Returns:
+            按时间正序排列的消息字典列表
+        """
+        result = await db.execute(
+            select(ConversationMessage)
+            .where(ConversationMessage.conversation_id == self._to_uuid(conversation_id))
+            .order_by(ConversationMessage.seq.desc())
+            .limit(limit)
+        )
+        return [message.to_dict() for message in reversed(result.scalars().all())]
+
+    async def get_messages(
+        self,
+        db: AsyncSession,
+        conversation_id: Union[str, uuid.UUID]
+    ) -> List[Dict[str, Any]]:
+        """
+        获取对话的全部消息
+
+        Args:
+            db: 数据库会话
+            conversation_id: 对话 ID (UUID)
+
+        Returns:
+            按时间正序排列的消息字典列表
+        """
+        result = await db.execute(
+            select(ConversationMessage)
+            .where(ConversationMessage.conversation_id == self._to_uuid(conversation_id))
+            .order_by(ConversationMessage.seq)
+        )
+        return [message.to_dict() for message in result.scalars().all()]
+
+    @staticmethod
+    def _to_uuid(value: Union[str, uuid.UUID]) -> uuid.UUID:
+        return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
 
     async def complete_conversation(
         self,
@@ -295,11 +683,10 @@ class ConversationService:
                 f"(status: {conversation.status})"
             )
 
-        # 刷新以确保获取最新的消息
-        await db.refresh(conversation)
-
-        # 获取所有消息
-        messages = conversation.get_messages()
+        # 对话结束后不再使用上下文缓存，等待后台消息写入后读取所有消息
+        await self.context_cache.invalidate(conversation.id)
+        await self.flush_pending_writes(conversation.id)
+        messages = await self.get_messages(db, conversation.id)
 
         if len(messages) < 2:
             # 消息太少无法评分
@@ -310,6 +697,8 @@ class ConversationService:
                 "对话太短，无法进行详细评估。"
                 "下次尝试进行更长的对话！"
             )
+            # 并发请求可能已重新填充缓存，标记为已完成以拒绝后续消息
+            await self.context_cache.mark_status(conversation.id, ConversationStatus.COMPLETED.value)
             return {
                 "fluency_score": 50.0,
                 "vocabulary_score": 50.0,
@@ -343,6 +732,7 @@ class ConversationService:
         conversation.recommendations = json_lib.dumps(scores.get("recommendations", []))
 
         await db.flush()
+        await self.context_cache.mark_status(conversation.id, ConversationStatus.COMPLETED.value)
 
         logger.info(
             f"Completed conversation {conversation_id} with overall score {scores['overall_score']}"
@@ -350,6 +740,23 @@ class ConversationService:
 
         return scores
 
+    def _has_thinking(self, raw_response: str) -> bool:
+        """响应中是否出现思考过程标记"""
+        return any(marker in raw_response for marker in self.THINKING_MARKERS)
+
+    @staticmethod
+    def _strip_reply_head(raw_response: str) -> str:
+        """去掉回复开头的空白和 markdown 加粗标记"""
+        return re.sub(r'^\*\*+', '', raw_response.lstrip()).lstrip()
+
+    def _clean_plain_reply(self, raw_response: str) -> str:
+        """清理不含思考过程的普通回复"""
+        cleaned = raw_response.strip()
+        # 移除可能的markdown格式标记
+        cleaned = re.sub(r'^\*\*+', '', cleaned)  # 移除开头的 **
+        cleaned = re.sub(r'\*\*+$', '', cleaned)  # 移除结尾的 **
+        return cleaned.strip()[:self.REPLY_MAX_CHARS]  # 限制长度但保持完整
+
     def _extract_final_response(self, raw_response: str) -> str:
         """
         从 AI 原始响应中提取最终对话回复
@@ -361,23 +768,15 @@ class ConversationService:
             return ""
 
         # 首先检查：如果响应看起来像正常对话（没有明显的思考标记），直接返回
-        thinking_markers = ['**分析**', '**检查**', '**确定**', '**优化**', '**替代**', '**选择**',
-                          '分析', '检查', '确定', '优化', '替代', '选择', '对照', '起草', '草稿']
-        has_thinking = any(marker in raw_response for marker in thinking_markers)
-
         # 如果没有明显的思考标记，且响应以大写字母开头或包含完整句子，直接使用
-        if not has_thinking:
+        if not self._has_thinking(raw_response):
             # 清理可能的引用但保持主要内容
-            cleaned = raw_response.strip()
-            # 移除可能的markdown格式标记
-            cleaned = re.sub(r'^\*\*+', '', cleaned)  # 移除开头的 **
-            cleaned = re.sub(r'\*\*+$', '', cleaned)  # 移除结尾的 **
-            cleaned = cleaned.strip()
+            cleaned = self._clean_plain_reply(raw_response)
 
             # 检查是否看起来像对话（包含字母和空格，长度合理）
             if len(cleaned) > 10 and any(c.isalpha() for c in cleaned):
                 logger.info(f"No thinking markers detected, using raw response: {cleaned[:50]}...")
-                return cleaned[:500]  # 限制长度但保持完整
+                return cleaned
 
         # 方法1: 查找 "**选择:*" 或 "选择:" 标记后的引号内容
         selection_patterns = [
@@ -595,19 +994,32 @@ class ConversationService:
 5. 建议应与对话场景相关
 """
 
-        try:
+        score_messages = [
+            {
+                "role": "system",
+                "content": "你是一位经验丰富的英语语言评估专家，擅长分析学生的口语表现并提供有针对性的改进建议。"
+            },
+            {"role": "user", "content": prompt}
+        ]
+
+        async def generate() -> Tuple[str, int]:
             response = await self.zhipu_service.chat_completion(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一位经验丰富的英语语言评估专家，擅长分析学生的口语表现并提供有针对性的改进建议。"
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
+                messages=score_messages,
+                temperature=self.SCORE_TEMPERATURE
             )
-
             content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            # 无法解析的响应直接走默认评分，不写入缓存
+            json.loads(content)
+            return content, response.get("usage", {}).get("total_tokens", 0)
+
+        try:
+            # 相同对话的重复评分（如重试完成对话）复用缓存结果
+            content = await self.response_cache.get_or_generate(
+                "conversation_scores",
+                score_messages,
+                {"model": self.zhipu_service.model, "temperature": self.SCORE_TEMPERATURE},
+                generate,
+            )
 
             # 尝试解析 JSON
             result = json.loads(content)
@@ -0,0 +1,478 @@
+"""
+每日统计汇总服务 - AI英语教学系统
+增量维护 student_daily_stats 汇总表，并为趋势图、周报、学习报告提供按天读取接口
+
+归档规则（与原先直接扫描明细表时的分组方式一致）：
+- 练习按 created_at 日期归档；完成相关指标在完成时计入创建日期
+- 错题按 first_mistaken_at 日期归档；状态分布随错题状态变更调整
+
+增量更新与业务写入在同一事务内执行（调用方负责 commit），
+通过 INSERT ... ON CONFLICT DO UPDATE 原子累加，并发写入无需加锁。
+"""
+import logging
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Integer, and_, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Mistake, Practice, PracticeStatus, StudentDailyStats
+
+logger = logging.getLogger(__name__)
+
+_UNIQUE_CONSTRAINT = "uq_student_daily_stats_student_date"
+
+# 汇总表中可直接相加的计数列
+_COUNTER_COLUMNS = (
+    "practice_count",
+    "completed_count",
+    "correct_rate_sum",
+    "correct_rate_count",
+    "score_sum",
+    "score_count",
+    "time_spent_seconds",
+    "mistake_count",
+)
+
+
+def _jsonb_add(column, deltas: Dict[str, int]):
+    """
+    构造 JSONB 计数字典的原子累加表达式
+
+    column || jsonb_build_object(key, coalesce((column->>key)::int, 0) + delta, ...)
+    """
+    pairs: List[Any] = []
+    for key, delta in deltas.items():
+        pairs.extend([key, func.coalesce(column[key].astext.cast(Integer), 0) + delta])
+    return func.coalesce(column, func.jsonb_build_object()).op("||")(
+        func.jsonb_build_object(*pairs)
+    )
+
+
+def _merge_counts(target: Dict[str, int], counts: Optional[Dict[str, Any]]) -> None:
+    for key, value in (counts or {}).items():
+        target[key] = target.get(key, 0) + int(value)
+
+
+class DailyStatsService:
+    """
+    每日统计汇总服务类
+
+    核心功能：
+    1. 练习创建/完成、错题创建/状态变更/删除时增量更新汇总行
+    2. 按日期范围读取汇总行（O(天数)）
+    3. 从明细表回填或重建汇总数据
+    """
+
+    def __init__(self, db: AsyncSession):
+        """
+        初始化每日统计服务
+
+        Args:
+            db: 数据库会话
+        """
+        self.db = db
+
+    # ==================== 增量更新 ====================
+
+    async def record_practice_created(self, practice: Practice) -> None:
+        """
+        记录新建练习
+
+        Args:
+            practice: 练习记录（created_at 需已赋值）
+        """
+        await self._increment(
+            practice.student_id,
+            practice.created_at.date(),
+            {"practice_count": 1},
+        )
+
+    async def record_practice_completed(self, practice: Practice) -> None:
+        """
+        记录练习完成，计入练习创建日期
+
+        Args:
+            practice: 已完成的练习记录
+        """
+        counters: Dict[str, Any] = {
+            "completed_count": 1,
+            "time_spent_seconds": practice.time_spent or 0,
+        }
+        if practice.correct_rate is not None:
+            counters["correct_rate_sum"] = practice.correct_rate
+            counters["correct_rate_count"] = 1
+        if practice.score is not None:
+            counters["score_sum"] = practice.score
+            counters["score_count"] = 1
+
+        await self._increment(practice.student_id, practice.created_at.date(), counters)
+
+    async def record_mistake_created(self, mistake: Mistake) -> None:
+        """
+        记录新建错题
+
+        Args:
+            mistake: 错题记录（first_mistaken_at 需已赋值）
+        """
+        await self.record_mistakes_created([mistake])
+
+    async def record_mistakes_created(self, mistakes: Sequence[Mistake]) -> None:
+        """
+        批量记录新建错题，同一学生同一天只累加一次
+
+        Args:
+            mistakes: 错题记录列表（first_mistaken_at 需已赋值）
+        """
+        groups: Dict[tuple, Dict[str, Dict[str, int]]] = {}
+        for mistake in mistakes:
+            group = groups.setdefault(
+                (mistake.student_id, mistake.first_mistaken_at.date()),
+                {"by_type": {}, "by_status": {}},
+            )
+            _merge_counts(group["by_type"], {mistake.mistake_type: 1})
+            _merge_counts(group["by_status"], {mistake.status: 1})
+
+        for (student_id, stat_date), group in groups.items():
+            await self._increment(
+                student_id,
+                stat_date,
+                {"mistake_count": sum(group["by_type"].values())},
+                mistakes_by_type=group["by_type"],
+                mistakes_by_status=group["by_status"],
+            )
+
+    async def record_mistake_status_changed(self, mistake: Mistake, old_status: str) -> None:
+        """
+        记录错题状态变更
+
+        Args:
+            mistake: 错题记录（status 为新状态）
+            old_status: 变更前的状态
+        """
+        if old_status == mistake.status:
+            return
+
+        await self._adjust(
+            mistake.student_id,
+            mistake.first_mistaken_at.date(),
+            mistakes_by_status={old_status: -1, mistake.status: 1},
+        )
+
+    async def record_mistake_deleted(self, mistake: Mistake) -> None:
+        """
+        记录错题删除
+
+        Args:
+            mistake: 即将删除的错题记录
+        """
+        await self._adjust(
+            mistake.student_id,
+            mistake.first_mistaken_at.date(),
+            counters={"mistake_count": -1},
+            mistakes_by_type={mistake.mistake_type: -1},
+            mistakes_by_status={mistake.status: -1},
+        )
+
+    async def _increment(
+        self,
+        student_id: uuid.UUID,
+        stat_date: date,
+        counters: Dict[str, Any],
+        mistakes_by_type: Optional[Dict[str, int]] = None,
+        mistakes_by_status: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """累加汇总行，不存在时插入"""
+        stmt = pg_insert(StudentDailyStats).values(
+            id=uuid.uuid4(),
+            student_id=student_id,
+            stat_date=stat_date,
+            mistakes_by_type=mistakes_by_type or {},
+            mistakes_by_status=mistakes_by_status or {},
+            **counters,
+        )
+
+        set_: Dict[str, Any] = {
+            name: getattr(StudentDailyStats, name) + stmt.excluded[name]
+            for name in counters
+        }
+        if mistakes_by_type:
+            set_["mistakes_by_type"] = _jsonb_add(StudentDailyStats.mistakes_by_type, mistakes_by_type)
+        if mistakes_by_status:
+            set_["mistakes_by_status"] = _jsonb_add(StudentDailyStats.mistakes_by_status, mistakes_by_status)
+        set_["updated_at"] = func.now()
+
+        await self.db.execute(
+            stmt.on_conflict_do_update(constraint=_UNIQUE_CONSTRAINT, set_=set_)
+        )
+
+    async def _adjust(
+        self,
+        student_id: uuid.UUID,
+        stat_date: date,
+        counters: Optional[Dict[str, Any]] = None,
+        mistakes_by_type: Optional[Dict[str, int]] = None,
+        mistakes_by_status: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        调整已存在的汇总行
+
+        只更新不插入：汇总行不存在说明该日尚未回填，交给回填任务重建，
+        避免写入负数计数。
+        """
+        values: Dict[str, Any] = {
+            name: getattr(StudentDailyStats, name) + delta
+            for name, delta in (counters or {}).items()
+        }
+        if mistakes_by_type:
+            values["mistakes_by_type"] = _jsonb_add(StudentDailyStats.mistakes_by_type, mistakes_by_type)
+        if mistakes_by_status:
+            values["mistakes_by_status"] = _jsonb_add(StudentDailyStats.mistakes_by_status, mistakes_by_status)
+        values["updated_at"] = func.now()
+
+        await self.db.execute(
+            update(StudentDailyStats)
+            .where(
+                and_(
+                    StudentDailyStats.student_id == student_id,
+                    StudentDailyStats.stat_date == stat_date,
+                )
+            )
+            .values(**values)
+        )
+
+    # ==================== 读取 ====================
+
+    async def get_daily_stats(
+        self,
+        student_id: uuid.UUID,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[StudentDailyStats]:
+        """
+        获取日期范围内的汇总行（按日期升序，闭区间）
+
+        Args:
+            student_id: 学生ID
+            start_date: 开始日期（为空则不限）
+            end_date: 结束日期（为空则不限）
+
+        Returns:
+            List[StudentDailyStats]: 汇总行列表
+        """
+        query = select(StudentDailyStats).where(StudentDailyStats.student_id == student_id)
+        if start_date is not None:
+            query = query.where(StudentDailyStats.stat_date >= start_date)
+        if end_date is not None:
+            query = query.where(StudentDailyStats.stat_date <= end_date)
+
+        result = await self.db.execute(query.order_by(StudentDailyStats.stat_date))
+        return list(result.scalars().all())
+
+    async def summarize(
+        self,
+        student_id: uuid.UUID,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        汇总日期范围内的统计数据
+
+        Args:
+            student_id: 学生ID
+            start_date: 开始日期（为空则不限）
+            end_date: 结束日期（为空则不限）
+
+        Returns:
+            Dict[str, Any]: 各计数列之和，以及：
+                - avg_correct_rate: 平均正确率（0-1）
+                - avg_score: 平均得分（0-100）
+                - mistakes_by_type / mistakes_by_status: 错题分布
+                - days: 参与汇总的天数
+        """
+        rows = await self.get_daily_stats(student_id, start_date, end_date)
+        return self.summarize_rows(rows)
+
+    @staticmethod
+    def summarize_rows(rows: Sequence[StudentDailyStats]) -> Dict[str, Any]:
+        """
+        合并多天的汇总行
+
+        Args:
+            rows: 汇总行列表
+
+        Returns:
+            Dict[str, Any]: 同 summarize()
+        """
+        summary: Dict[str, Any] = {name: 0 for name in _COUNTER_COLUMNS}
+        by_type: Dict[str, int] = {}
+        by_status: Dict[str, int] = {}
+
+        for row in rows:
+            for name in _COUNTER_COLUMNS:
+                summary[name] += getattr(row, name) or 0
+            _merge_counts(by_type, row.mistakes_by_type)
+            _merge_counts(by_status, row.mistakes_by_status)
+
+        summary["avg_correct_rate"] = (
+            summary["correct_rate_sum"] / summary["correct_rate_count"]
+            if summary["correct_rate_count"] else 0
+        )
+        summary["avg_score"] = (
+            summary["score_sum"] / summary["score_count"] if summary["score_count"] else 0
+        )
+        # 状态变更可能让某些计数归零，不对外展示
+        summary["mistakes_by_type"] = {k: v for k, v in by_type.items() if v}
+        summary["mistakes_by_status"] = {k: v for k, v in by_status.items() if v}
+        summary["days"] = len(rows)
+        return summary
+
+    # ==================== 回填 ====================
+
+    async def backfill(
+        self,
+        student_ids: Optional[Sequence[uuid.UUID]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> int:
+        """
+        从练习/错题明细重建汇总行
+
+        先删除范围内的汇总行，再用一条 INSERT ... SELECT 按天聚合写入，
+        可重复执行。调用方负责 commit。
+
+        Args:
+            student_ids: 学生ID列表（为空则全部学生）
+            start_date: 开始日期（为空则不限）
+            end_date: 结束日期（为空则不限，闭区间）
+
+        Returns:
+            int: 写入的汇总行数
+        """
+        params: Dict[str, Any] = {}
+        practice_filters = ["TRUE"]
+        mistake_filters = ["TRUE"]
+        stats_filters = ["TRUE"]
+
+        if student_ids is not None:
+            params["student_ids"] = list(student_ids)
+            practice_filters.append("student_id = ANY(:student_ids)")
+            mistake_filters.append("student_id = ANY(:student_ids)")
+            stats_filters.append("student_id = ANY(:student_ids)")
+        if start_date is not None:
+            params["start_date"] = start_date
+            practice_filters.append("created_at >= :start_date")
+            mistake_filters.append("first_mistaken_at >= :start_date")
+            stats_filters.append("stat_date >= :start_date")
+        if end_date is not None:
+            params["end_date"] = end_date
+            params["end_before"] = end_date + timedelta(days=1)
+            practice_filters.append("created_at < :end_before")
+            mistake_filters.append("first_mistaken_at < :end_before")
+            stats_filters.append("stat_date <= :end_date")
+
+        practice_where = " AND ".join(practice_filters)
+        mistake_where = " AND ".join(mistake_filters)
+
+        await self.db.execute(
+            text(f"DELETE FROM student_daily_stats WHERE {' AND '.join(stats_filters)}"),
+            params,
+        )
+
+        result = await self.db.execute(
+            text(f"""
+                WITH practice_days AS (
+                    SELECT
+                        student_id,
+                        DATE(created_at) AS stat_date,
+                        COUNT(*) AS practice_count,
+                        COUNT(*) FILTER (WHERE status = :completed) AS completed_count,
+                        COALESCE(SUM(correct_rate) FILTER (WHERE status = :completed), 0) AS correct_rate_sum,
+                        COUNT(correct_rate) FILTER (WHERE status = :completed) AS correct_rate_count,
+                        COALESCE(SUM(score) FILTER (WHERE status = :completed), 0) AS score_sum,
+                        COUNT(score) FILTER (WHERE status = :completed) AS score_count,
+                        COALESCE(SUM(time_spent) FILTER (WHERE status = :completed), 0) AS time_spent_seconds
+                    FROM practices
+                    WHERE {practice_where}
+                    GROUP BY student_id, DATE(created_at)
+                ),
+                mistake_types AS (
+                    SELECT student_id, stat_date, SUM(n) AS mistake_count,
+                           jsonb_object_agg(mistake_type, n) AS mistakes_by_type
+                    FROM (
+                        SELECT student_id, DATE(first_mistaken_at) AS stat_date,
+                               mistake_type, COUNT(*) AS n
+                        FROM mistakes
+                        WHERE {mistake_where}
+                        GROUP BY student_id, DATE(first_mistaken_at), mistake_type
+                    ) t
+                    GROUP BY student_id, stat_date
+                ),
+                mistake_statuses AS (
+                    SELECT student_id, stat_date,
+                           jsonb_object_agg(status, n) AS mistakes_by_status
+                    FROM (
+                        SELECT student_id, DATE(first_mistaken_at) AS stat_date,
+                               status, COUNT(*) AS n
+                        FROM mistakes
+                        WHERE {mistake_where}
+                        GROUP BY student_id, DATE(first_mistaken_at), status
+                    ) s
+                    GROUP BY student_id, stat_date
+                )
+                INSERT INTO student_daily_stats (
+                    id, student_id, stat_date,
+                    practice_count, completed_count,
+                    correct_rate_sum, correct_rate_count,
+                    score_sum, score_count, time_spent_seconds,
+                    mistake_count, mistakes_by_type, mistakes_by_status, updated_at
+                )
+                SELECT
+                    gen_random_uuid(),
+                    COALESCE(p.student_id, m.student_id),
+                    COALESCE(p.stat_date, m.stat_date),
+                    COALESCE(p.practice_count, 0),
+                    COALESCE(p.completed_count, 0),
+                    COALESCE(p.correct_rate_sum, 0),
+                    COALESCE(p.correct_rate_count, 0),
+                    COALESCE(p.score_sum, 0),
+                    COALESCE(p.score_count, 0),
+                    COALESCE(p.time_spent_seconds, 0),
+                    COALESCE(m.mistake_count, 0),
+                    COALESCE(m.mistakes_by_type, '{{}}'::jsonb),
+                    COALESCE(s.mistakes_by_status, '{{}}'::jsonb),
+                    NOW()
+                FROM practice_days p
+                FULL OUTER JOIN mistake_types m
+                    ON m.student_id = p.student_id AND m.stat_date = p.stat_date
+                LEFT JOIN mistake_statuses s
+                    ON s.student_id = m.student_id AND s.stat_date = m.stat_date
+                ON CONFLICT ON CONSTRAINT {_UNIQUE_CONSTRAINT} DO UPDATE SET
+                    practice_count = EXCLUDED.practice_count,
+                    completed_count = EXCLUDED.completed_count,
+                    correct_rate_sum = EXCLUDED.correct_rate_sum,
+                    correct_rate_count = EXCLUDED.correct_rate_count,
+                    score_sum = EXCLUDED.score_sum,
+                    score_count = EXCLUDED.score_count,
+                    time_spent_seconds = EXCLUDED.time_spent_seconds,
+                    mistake_count = EXCLUDED.mistake_count,
+                    mistakes_by_type = EXCLUDED.mistakes_by_type,
+                    mistakes_by_status = EXCLUDED.mistakes_by_status,
+                    updated_at = EXCLUDED.updated_at
+            """),
+            {**params, "completed": PracticeStatus.COMPLETED.value},
+        )
+
+        logger.info(
+            "回填每日统计完成: students=%s, rows=%s",
+            len(student_ids) if student_ids is not None else "all",
+            result.rowcount,
+        )
+        return result.rowcount
+
+
+def get_daily_stats_service(db: AsyncSession) -> DailyStatsService:
+    """获取每日统计服务实例"""
+    return DailyStatsService(db)
@@ -0,0 +1,52 @@
+"""
+文档生成器输出流
+
+Word/PPTX 文档是 ZIP 包。ZipFile 写入可 seek 的文件时会回写每个条目的本地文件头，
+已写出的字节之后还会被修改，无法边生成边传输。
+
+ForwardOnlyWriter 不支持 seek，ZipFile 会改用数据描述符（data descriptor）
+记录条目大小和 CRC，写出的字节不再被修改，可以立即交给下游传输。
+生成完整字节和流式生成都使用该写入器，两种方式得到的文档完全一致。
+"""
+import io
+from typing import Any, Callable
+
+
+class ForwardOnlyWriter:
+    """只能顺序写入的二进制输出流"""
+
+    def __init__(self, write: Callable[[bytes], Any]) -> None:
+        """
+        初始化输出流
+
+        Args:
+            write: 接收数据块的写入函数
+        """
+        self._write = write
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        size = len(data)
+        if size:
+            # memoryview 等缓冲区在写入后可能被复用，这里复制为 bytes
+            self._write(bytes(data))
+            self._position += size
+        return size
+
+    def tell(self) -> int:
+        return self._position
+
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        raise io.UnsupportedOperation("ForwardOnlyWriter 不支持 seek")
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
@@ -6,10 +6,11 @@ PDF文档生成器 - AI英语教学系统
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from app.models.lesson_plan import LessonPlan
 from app.services.content_renderer_service import ContentRendererService
+from app.services.document_generators.output_stream import ForwardOnlyWriter
 from app.services.pdf_renderer_service import PdfRendererService
 
 logger = logging.getLogger(__name__)
@@ -88,17 +89,7 @@ class PDFDocumentGenerator:
             ValueError: 如果教案数据无效
             RuntimeError: 如果 PDF 生成失败
         """
-        # 验证教案
-        if not lesson_plan or not lesson_plan.title:
-            raise ValueError("教案标题不能为空")
-
-        # 验证章节列表
-        if include_sections is not None:
-            invalid_sections = set(include_sections) - set(self.SUPPORTED_SECTIONS)
-            if invalid_sections:
-                raise ValueError(
-                    f"不支持的章节: {invalid_sections}. " f"支持的章节: {self.SUPPORTED_SECTIONS}"
-                )
+        self._validate_lesson_plan(lesson_plan, include_sections)
 
         try:
             # 使用 ContentRenderer 渲染为 Markdown
@@ -128,6 +119,62 @@ class PDFDocumentGenerator:
             logger.error(f"PDF生成失败: {e}")
             raise RuntimeError(f"PDF生成失败: {e}") from e
 
+    async def write_lesson_plan_to(
+        self,
+        lesson_plan: LessonPlan,
+        write: Callable[[bytes], Any],
+        include_sections: Optional[List[str]] = None,
+    ) -> None:
+        """
+        从 LessonPlan 生成 PDF 并边渲染边写出
+
+        写出的字节与 generate_from_lesson_plan 的返回值一致，
+        write 在渲染线程中调用，可以阻塞（用于背压）。
+
+        Args:
+            lesson_plan: 教案数据模型
+            write: 接收数据块的写入函数
+            include_sections: 要包含的章节列表（None 表示全部）
+
+        Raises:
+            ValueError: 如果教案数据无效
+            RuntimeError: 如果 PDF 生成失败
+        """
+        self._validate_lesson_plan(lesson_plan, include_sections)
+
+        try:
+            markdown_content = self.content_service.render_lesson_plan(
+                lesson_plan,
+                include_sections=include_sections,
+            )
+            await self.pdf_service.write_markdown_to_pdf(
+                markdown_content=markdown_content,
+                target=ForwardOnlyWriter(write),
+                title=lesson_plan.title,
+            )
+
+        except Exception as e:
+            logger.error(f"PDF生成失败: {e}")
+            raise RuntimeError(f"PDF生成失败: {e}") from e
+
+    def _validate_lesson_plan(
+        self,
+        lesson_plan: LessonPlan,
+        include_sections: Optional[List[str]],
+    ) -> None:
+        """验证教案和章节列表"""
+        # 验证教案
+        if not lesson_plan or not lesson_plan.title:
+            raise ValueError("教案标题不能为空")
+
+        # 验证章节列表
+        if include_sections is not None:
+            invalid_sections = set(include_sections) - set(self.SUPPORTED_SECTIONS)
+            if invalid_sections:
+                raise ValueError(
+                    f"不支持的章节: {invalid_sections}. " f"支持的章节: {self.SUPPORTED_SECTIONS}"
+                )
+
     async def generate(
         self,
         content: Dict[str, Any],
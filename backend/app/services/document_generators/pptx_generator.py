@@ -6,13 +6,15 @@ PPTX文档生成器 - AI英语教学系统
 """
 import logging
 from io import BytesIO
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from pptx import Presentation
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN
 from pptx.util import Inches, Pt
 
+from app.services.document_generators.output_stream import ForwardOnlyWriter
+
 logger = logging.getLogger(__name__)
 
 
@@ -106,57 +108,92 @@ class PPTXDocumentGenerator:
             Exception: 如果文档生成失败
         """
         try:
-            # 验证必要字段
-            if not content.get("title"):
-                raise ValueError("教案标题不能为空")
-
-            # 创建新演示文稿
-            self.prs = Presentation()
-
-            # 添加标题页
-            self._add_title_slide(content, template_vars)
-
-            # 添加概述页
-            self._add_overview_slide(content, template_vars)
-
-            # 添加教学目标页
-            if content.get("objectives"):
-                self._add_objectives_slide(content["objectives"])
+            self._build(content, template_vars)
 
-            # 添加核心词汇页
-            if content.get("vocabulary"):
-                self._add_vocabulary_slides(content["vocabulary"])
+            # 保存到字节流
+            ppt_bytes = self._save_to_bytes()
 
-            # 添加语法点页
-            if content.get("grammar_points"):
-                self._add_grammar_points_slides(content["grammar_points"])
+            logger.info(f"PPTX文档生成成功: {content.get('title')}, 共 {len(self.prs.slides)} 页")
+            return ppt_bytes
 
-            # 添加教学流程页
-            if content.get("teaching_structure"):
-                self._add_teaching_structure_slides(content["teaching_structure"])
+        except Exception as e:
+            logger.error(f"PPTX文档生成失败: {str(e)}")
+            raise Exception(f"PPTX文档生成失败: {str(e)}")
 
-            # 添加分层材料页
-            if content.get("leveled_materials"):
-                self._add_leveled_materials_slides(content["leveled_materials"])
+    def write_to(
+        self,
+        content: Dict[str, Any],
+        template_vars: Dict[str, Any],
+        write: Callable[[bytes], Any],
+    ) -> None:
+        """
+        生成演示文稿并边生成边写出
 
-            # 添加练习题页
-            if content.get("exercises"):
-                self._add_exercises_slides(content["exercises"])
+        保存时每写出一段数据就调用一次 write，不在内存中保留完整文档，
+        写出的字节与 generate 的返回值完全一致。write 可以阻塞（用于背压）。
 
-            # 添加教学反思页（如果有）
-            if content.get("teaching_notes"):
-                self._add_notes_slide(content["teaching_notes"])
+        Args:
+            content: 教案内容数据（同 generate）
+            template_vars: 模板变量（同 generate）
+            write: 接收数据块的写入函数
 
-            # 保存到字节流
-            ppt_bytes = self._save_to_bytes()
+        Raises:
+            ValueError: 如果内容数据无效
+            Exception: 如果文档生成失败
+        """
+        try:
+            self._build(content, template_vars)
+            self.prs.save(ForwardOnlyWriter(write))
 
             logger.info(f"PPTX文档生成成功: {content.get('title')}, 共 {len(self.prs.slides)} 页")
-            return ppt_bytes
 
         except Exception as e:
             logger.error(f"PPTX文档生成失败: {str(e)}")
             raise Exception(f"PPTX文档生成失败: {str(e)}")
 
+    def _build(self, content: Dict[str, Any], template_vars: Dict[str, Any]) -> None:
+        """构建演示文稿对象（不保存）"""
+        # 验证必要字段
+        if not content.get("title"):
+            raise ValueError("教案标题不能为空")
+
+        # 创建新演示文稿
+        self.prs = Presentation()
+
+        # 添加标题页
+        self._add_title_slide(content, template_vars)
+
+        # 添加概述页
+        self._add_overview_slide(content, template_vars)
+
+        # 添加教学目标页
+        if content.get("objectives"):
+            self._add_objectives_slide(content["objectives"])
+
+        # 添加核心词汇页
+        if content.get("vocabulary"):
+            self._add_vocabulary_slides(content["vocabulary"])
+
+        # 添加语法点页
+        if content.get("grammar_points"):
+            self._add_grammar_points_slides(content["grammar_points"])
+
+        # 添加教学流程页
+        if content.get("teaching_structure"):
+            self._add_teaching_structure_slides(content["teaching_structure"])
+
+        # 添加分层材料页
+        if content.get("leveled_materials"):
+            self._add_leveled_materials_slides(content["leveled_materials"])
+
+        # 添加练习题页
+        if content.get("exercises"):
+            self._add_exercises_slides(content["exercises"])
+
+        # 添加教学反思页（如果有）
+        if content.get("teaching_notes"):
+            self._add_notes_slide(content["teaching_notes"])
+
     def _save_to_bytes(self) -> bytes:
         """
         将演示文稿保存到字节流
@@ -164,10 +201,10 @@ class PPTXDocumentGenerator:
         Returns:
             bytes: 演示文稿的二进制内容
         """
+        # 与 write_to 使用相同的顺序写入方式，保证两者输出一致
         ppt_stream = BytesIO()
-        self.prs.save(ppt_stream)
-        ppt_stream.seek(0)
-        return ppt_stream.read()
+        self.prs.save(ForwardOnlyWriter(ppt_stream.write))
+        return ppt_stream.getvalue()
 
     def _add_title_slide(self, content: Dict[str, Any], template_vars: Dict[str, Any]) -> None:
         """
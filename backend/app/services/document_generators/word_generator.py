@@ -6,13 +6,15 @@ Word文档生成器 - AI英语教学系统
 """
 import logging
 from io import BytesIO
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.shared import Inches, Pt, RGBColor
 from docx.oxml.ns import qn
 
+from app.services.document_generators.output_stream import ForwardOnlyWriter
+
 logger = logging.getLogger(__name__)
 
 
@@ -104,68 +106,103 @@ class WordDocumentGenerator:
             Exception: 如果文档生成失败
         """
         try:
-            # 验证必要字段
-            if not content.get("title"):
-                raise ValueError("教案标题不能为空")
+            self._build(content, template_vars)
 
-            # 创建新文档
-            self.doc = Document()
+            # 保存到字节流
+            doc_bytes = self._save_to_bytes()
 
-            # 设置文档默认字体
-            self._setup_document_styles()
+            logger.info(f"Word文档生成成功: {content.get('title')}")
+            return doc_bytes
 
-            # 添加封面页
-            self._add_cover_page(content, template_vars)
+        except Exception as e:
+            logger.error(f"Word文档生成失败: {str(e)}")
+            raise Exception(f"Word文档生成失败: {str(e)}")
 
-            # 添加分页
-            self.doc.add_page_break()
+    def write_to(
+        self,
+        content: Dict[str, Any],
+        template_vars: Dict[str, Any],
+        write: Callable[[bytes], Any],
+    ) -> None:
+        """
+        生成 Word 文档并边生成边写出
 
-            # 添加基本信息
-            self._add_overview(content, template_vars)
+        保存时每写出一段数据就调用一次 write，不在内存中保留完整文档，
+        写出的字节与 generate 的返回值完全一致。write 可以阻塞（用于背压）。
 
-            # 添加教学目标
-            if content.get("objectives"):
-                self._add_objectives(content["objectives"])
+        Args:
+            content: 教案内容数据（同 generate）
+            template_vars: 模板变量（同 generate）
+            write: 接收数据块的写入函数
 
-            # 添加教学流程
-            if content.get("teaching_structure"):
-                self._add_teaching_structure(content["teaching_structure"])
+        Raises:
+            ValueError: 如果内容数据无效
+            Exception: 如果文档生成失败
+        """
+        try:
+            self._build(content, template_vars)
+            self.doc.save(ForwardOnlyWriter(write))
 
-            # 添加核心词汇
-            if content.get("vocabulary"):
-                self._add_vocabulary_table(content["vocabulary"])
+            logger.info(f"Word文档生成成功: {content.get('title')}")
 
-            # 添加语法点
-            if content.get("grammar_points"):
-                self._add_grammar_points(content["grammar_points"])
+        except Exception as e:
+            logger.error(f"Word文档生成失败: {str(e)}")
+            raise Exception(f"Word文档生成失败: {str(e)}")
 
-            # 添加分层材料
-            if content.get("leveled_materials"):
-                self._add_leveled_materials(content["leveled_materials"])
+    def _build(self, content: Dict[str, Any], template_vars: Dict[str, Any]) -> None:
+        """构建 Word 文档对象（不保存）"""
+        # 验证必要字段
+        if not content.get("title"):
+            raise ValueError("教案标题不能为空")
 
-            # 添加练习题
-            if content.get("exercises"):
-                self._add_exercises(content["exercises"])
+        # 创建新文档
+        self.doc = Document()
 
-            # 添加PPT大纲
-            if content.get("ppt_outline"):
-                self._add_ppt_outline(content["ppt_outline"])
+        # 设置文档默认字体
+        self._setup_document_styles()
 
-            # 添加教学反思（如果有）
-            if content.get("teaching_notes"):
-                self.doc.add_page_break()
-                self._add_heading("教学反思", level=1)
-                p = self.doc.add_paragraph(content["teaching_notes"])
+        # 添加封面页
+        self._add_cover_page(content, template_vars)
 
-            # 保存到字节流
-            doc_bytes = self._save_to_bytes()
+        # 添加分页
+        self.doc.add_page_break()
 
-            logger.info(f"Word文档生成成功: {content.get('title')}")
-            return doc_bytes
+        # 添加基本信息
+        self._add_overview(content, template_vars)
 
-        except Exception as e:
-            logger.error(f"Word文档生成失败: {str(e)}")
-            raise Exception(f"Word文档生成失败: {str(e)}")
+        # 添加教学目标
+        if content.get("objectives"):
+            self._add_objectives(content["objectives"])
+
+        # 添加教学流程
+        if content.get("teaching_structure"):
+            self._add_teaching_structure(content["teaching_structure"])
+
+        # 添加核心词汇
+        if content.get("vocabulary"):
+            self._add_vocabulary_table(content["vocabulary"])
+
+        # 添加语法点
+        if content.get("grammar_points"):
+            self._add_grammar_points(content["grammar_points"])
+
+        # 添加分层材料
+        if content.get("leveled_materials"):
+            self._add_leveled_materials(content["leveled_materials"])
+
+        # 添加练习题
+        if content.get("exercises"):
+            self._add_exercises(content["exercises"])
+
+        # 添加PPT大纲
+        if content.get("ppt_outline"):
+            self._add_ppt_outline(content["ppt_outline"])
+
+        # 添加教学反思（如果有）
+        if content.get("teaching_notes"):
+            self.doc.add_page_break()
+            self._add_heading("教学反思", level=1)
+            p = self.doc.add_paragraph(content["teaching_notes"])
 
     def _setup_document_styles(self) -> None:
         """设置文档默认样式（包括中文字体）"""
@@ -185,10 +222,10 @@ class WordDocumentGenerator:
         Returns:
             bytes: 文档的二进制内容
         """
+        # 与 write_to 使用相同的顺序写入方式，保证两者输出一致
         doc_stream = BytesIO()
-        self.doc.save(doc_stream)
-        doc_stream.seek(0)
-        return doc_stream.read()
+        self.doc.save(ForwardOnlyWriter(doc_stream.write))
+        return doc_stream.getvalue()
 
     def _add_cover_page(self, content: Dict[str, Any], template_vars: Dict[str, Any]) -> None:
         """
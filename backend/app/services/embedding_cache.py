@@ -0,0 +1,358 @@
+"""
+向量嵌入缓存 - AI英语教学系统
+两级缓存：进程内LRU + Redis，相同文本不重复调用嵌入API
+
+缓存键：(provider, model, 规范化文本的SHA-256)
+存储格式：float32 二进制（2048维约8KB），比JSON浮点列表小约4倍
+"""
+import hashlib
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+from app.metrics.cache_metrics import (
+    record_cache_eviction,
+    record_cache_hit,
+    record_cache_miss,
+    update_local_cache_size,
+)
+
+logger = logging.getLogger(__name__)
+
+_CACHE_NAME = "embedding"
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：Unicode NFC + 折叠空白，保留大小写（嵌入模型区分大小写）"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class LocalLRUCache:
+    """
+    进程内LRU缓存
+
+    - 按条目字节数限制总容量，超出时淘汰最久未使用的条目
+    - 每个条目带过期时间，读取时惰性清理
+    """
+
+    def __init__(self, max_bytes: int, ttl: int, name: str = _CACHE_NAME):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self._remove(key)
+            record_cache_eviction(self.name, "expired")
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        if key in self._data:
+            self._remove(key)
+
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._size += len(value)
+
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            record_cache_eviction(self.name, "size")
+
+        update_local_cache_size(self.name, len(self._data), self._size)
+
+    def delete(self, key: str) -> None:
+        if key in self._data:
+            self._remove(key)
+            update_local_cache_size(self.name, len(self._data), self._size)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._size = 0
+        update_local_cache_size(self.name, 0, 0)
+
+    def _remove(self, key: str) -> None:
+        _, value = self._data.pop(key)
+        self._size -= len(value)
+
+
+class EmbeddingCache:
+    """
+    向量嵌入两级缓存
+
+    使用示例：
+        ```python
+        cache = get_embedding_cache()
+        vectors = await cache.get_or_generate(
+            "zhipuai", "embedding-3", texts, zhipuai_service.batch_generate_embeddings
+        )
+        ```
+
+    Redis 不可用时自动退化为仅进程内缓存，并在一段时间内不再尝试连接。
+    """
+
+    _KEY_PREFIX = "cache:embedding:"
+    # Redis失败后的退避时间（秒）
+    _REDIS_RETRY_INTERVAL = 30
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        ttl: Optional[int] = None,
+        local_ttl: Optional[int] = None,
+        local_max_bytes: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        """
+        初始化嵌入缓存
+
+        Args:
+            redis_client: Redis 客户端（需 decode_responses=False），默认按配置懒加载
+            ttl: Redis 缓存时间（秒）
+            local_ttl: 进程内缓存时间（秒）
+            local_max_bytes: 进程内缓存容量上限（字节）
+            enabled: 是否启用缓存
+        """
+        settings = get_settings()
+        self.enabled = settings.EMBEDDING_CACHE_ENABLED if enabled is None else enabled
+        self.ttl = ttl or settings.EMBEDDING_CACHE_TTL
+        self.local = LocalLRUCache(
+            max_bytes=local_max_bytes or settings.EMBEDDING_CACHE_LOCAL_MAX_BYTES,
+            ttl=local_ttl or settings.EMBEDDING_CACHE_LOCAL_TTL,
+        )
+        self._redis = redis_client
+        self._redis_disabled_until = 0.0
+        self._stats: Dict[str, int] = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    async def _get_redis(self) -> Optional[redis.Redis]:
+        """获取 Redis 客户端（懒加载），处于退避期时返回None"""
+        if time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            settings = get_settings()
+            self._redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=False,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+            )
+        return self._redis
+
+    def _on_redis_error(self, error: Exception) -> None:
+        logger.warning(f"Embedding cache Redis unavailable, using local cache only: {error}")
+        self._redis_disabled_until = time.monotonic() + self._REDIS_RETRY_INTERVAL
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str) -> str:
+        """生成缓存键"""
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{provider}:{model}:{digest}"
+
+    @staticmethod
+    def _encode(vector: Sequence[float]) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _decode(data: bytes) -> List[float]:
+        return np.frombuffer(data, dtype=np.float32).tolist()
+
+    async def get_many(
+        self,
+        provider: str,
+        model: str,
+        texts: Sequence[str],
+    ) -> List[Optional[List[float]]]:
+        """
+        批量查询缓存
+
+        Args:
+            provider: 嵌入服务提供商
+            model: 嵌入模型
+            texts: 文本列表
+
+        Returns:
+            与 texts 一一对应的向量，未命中为None
+        """
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+
+        keys = [self.make_key(provider, model, t) for t in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        # 第一级：进程内LRU
+        remote_indices = []
+        for i, key in enumerate(keys):
+            data = self.local.get(key)
+            if data is not None:
+                results[i] = self._decode(data)
+            else:
+                remote_indices.append(i)
+
+        local_hits = len(texts) - len(remote_indices)
+        record_cache_hit(_CACHE_NAME, "local", local_hits)
+        record_cache_miss(_CACHE_NAME, "local", len(remote_indices))
+        self._stats["local_hits"] += local_hits
+
+        # 第二级：Redis（一次MGET）
+        redis_hits = 0
+        if remote_indices:
+            client = await self._get_redis()
+            if client is not None:
+                try:
+                    values = await client.mget(
+                        [self._KEY_PREFIX + keys[i] for i in remote_indices]
+                    )
+                    for i, data in zip(remote_indices, values):
+                        if data:
+                            results[i] = self._decode(data)
+                            self.local.set(keys[i], data)
+                            redis_hits += 1
+                except Exception as e:
+                    self._on_redis_error(e)
+
+            record_cache_hit(_CACHE_NAME, "redis", redis_hits)
+            record_cache_miss(_CACHE_NAME, "redis", len(remote_indices) - redis_hits)
+
+        self._stats["redis_hits"] += redis_hits
+        self._stats["misses"] += len(remote_indices) - redis_hits
+        return results
+
+    async def set_many(
+        self,
+        provider: str,
+        model: str,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+    ) -> None:
+        """
+        批量写入缓存
+
+        Args:
+            provider: 嵌入服务提供商
+            model: 嵌入模型
+            texts: 文本列表
+            vectors: 与 texts 一一对应的向量
+        """
+        if not self.enabled or not texts:
+            return
+
+        entries = {}
+        for text, vector in zip(texts, vectors):
+            key = self.make_key(provider, model, text)
+            data = self._encode(vector)
+            self.local.set(key, data)
+            entries[self._KEY_PREFIX + key] = data
+
+        client = await self._get_redis()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for key, data in entries.items():
+                    pipe.setex(key, self.ttl, data)
+                await pipe.execute()
+        except Exception as e:
+            self._on_redis_error(e)
+
+    async def get_or_generate(
+        self,
+        provider: str,
+        model: str,
+        texts: Sequence[str],
+        generate: Callable[[List[str]], Awaitable[List[List[float]]]],
+    ) -> List[List[float]]:
+        """
+        查询缓存，只为未命中的文本调用 generate，并写回缓存
+
+        批次内重复的文本只生成一次。
+
+        Args:
+            provider: 嵌入服务提供商
+            model: 嵌入模型
+            texts: 文本列表
+            generate: 批量生成函数
+
+        Returns:
+            与 texts 一一对应的向量列表
+        """
+        if not self.enabled:
+            return await generate(list(texts))
+
+        results = await self.get_many(provider, model, texts)
+
+        # 未命中的文本去重后再生成
+        pending: Dict[str, List[int]] = {}
+        for i, vector in enumerate(results):
+            if vector is None:
+                pending.setdefault(normalize_text(texts[i]), []).append(i)
+
+        if pending:
+            miss_texts = [texts[indices[0]] for indices in pending.values()]
+            vectors = await generate(miss_texts)
+            for indices, vector in zip(pending.values(), vectors):
+                for i in indices:
+                    results[i] = vector
+            await self.set_many(provider, model, miss_texts, vectors)
+
+        return results
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            命中/未命中计数、命中率和本地缓存容量
+        """
+        total = sum(self._stats.values())
+        hits = self._stats["local_hits"] + self._stats["redis_hits"]
+        return {
+            **self._stats,
+            "hit_rate": hits / total if total else 0.0,
+            "local_entries": len(self.local),
+            "local_bytes": self.local.size_bytes,
+        }
+
+    def clear_local(self) -> None:
+        """清空进程内缓存"""
+        self.local.clear()
+
+
+# 创建全局单例
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    获取嵌入缓存单例
+
+    Returns:
+        EmbeddingCache: 嵌入缓存实例
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
@@ -3,7 +3,7 @@
 支持智谱AI、OpenAI等多种嵌入服务
 """
 import asyncio
-from typing import List, Optional, Dict, Any
+from typing import Awaitable, Callable, List, Optional, Dict, Any
 
 from openai import AsyncOpenAI
 from tenacity import (
@@ -14,6 +14,7 @@ from tenacity import (
 )
 
 from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache, get_embedding_cache
 from app.services.zhipu_service import get_zhipuai_service
 
 
@@ -23,12 +24,17 @@ class EmbeddingService:
     支持多种AI提供商：智谱AI（主要）、OpenAI（备用）
     """
 
-    def __init__(self, provider: Optional[str] = None):
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None
+    ):
         """
         初始化嵌入服务
 
         Args:
             provider: AI服务提供商 ("zhipuai", "openai", None=使用默认)
+            cache: 嵌入缓存（默认使用全局两级缓存）
         """
         self.provider = provider or settings.AI_PROVIDER
         self.embedding_dim = settings.QDRANT_VECTOR_SIZE
@@ -36,6 +42,37 @@ class EmbeddingService:
         # 懒加载服务
         self._zhipuai_service = None
         self._openai_client = None
+        self._cache = cache
+
+    def _get_cache(self) -> EmbeddingCache:
+        """获取嵌入缓存"""
+        if self._cache is None:
+            self._cache = get_embedding_cache()
+        return self._cache
+
+    async def _cached_embeddings(
+        self,
+        provider: str,
+        model: str,
+        texts: List[str],
+        generate: Callable[[List[str]], Awaitable[List[List[float]]]]
+    ) -> List[List[float]]:
+        """经过缓存生成向量，只对未命中的文本调用 generate"""
+        return await self._get_cache().get_or_generate(provider, model, texts, generate)
+
+    async def _cached_embedding(
+        self,
+        provider: str,
+        model: str,
+        text: str,
+        generate: Callable[[str], Awaitable[List[float]]]
+    ) -> List[float]:
+        """经过缓存生成单条向量"""
+        async def _generate(texts: List[str]) -> List[List[float]]:
+            return [await generate(texts[0])]
+
+        vectors = await self._cached_embeddings(provider, model, [text], _generate)
+        return vectors[0]
 
     def _get_zhipuai_service(self):
         """获取智谱AI服务"""
@@ -86,7 +123,11 @@ class EmbeddingService:
         if ai_provider == "zhipuai":
             # 使用智谱AI
             try:
-                return await self._get_zhipuai_service().generate_embedding(text)
+                zhipuai_service = self._get_zhipuai_service()
+                return await self._cached_embedding(
+                    "zhipuai", zhipuai_service.embedding_model, text,
+                    zhipuai_service.generate_embedding
+                )
             except Exception as e:
                 if provider == "zhipuai":  # 明确指定使用智谱AI，失败则抛出异常
                     raise
@@ -96,7 +137,11 @@ class EmbeddingService:
 
         if ai_provider == "openai" and settings.OPENAI_API_KEY:
             # 使用OpenAI
-            return await self._generate_openai_embedding(text, model)
+            embedding_model = model or settings.OPENAI_EMBEDDING_MODEL
+            return await self._cached_embedding(
+                "openai", embedding_model, text,
+                lambda t: self._generate_openai_embedding(t, embedding_model)
+            )
 
         raise ValueError(f"没有可用的AI服务提供商（当前: {ai_provider}）")
 
@@ -154,9 +199,13 @@ class EmbeddingService:
         ai_provider = provider or self.provider
 
         if ai_provider == "zhipuai":
-            # 智谱AI支持原生批量请求
+            # 智谱AI支持原生批量请求，只请求缓存未命中的文本
             try:
-                return await self._get_zhipuai_service().batch_generate_embeddings(valid_texts)
+                zhipuai_service = self._get_zhipuai_service()
+                return await self._cached_embeddings(
+                    "zhipuai", zhipuai_service.embedding_model, valid_texts,
+                    zhipuai_service.batch_generate_embeddings
+                )
             except Exception as e:
                 if provider == "zhipuai":
                     raise
@@ -165,7 +214,7 @@ class EmbeddingService:
                 ai_provider = "openai"
 
         if ai_provider == "openai":
-            # OpenAI需要分批处理
+            # OpenAI需要分批处理（逐条调用 generate_embedding，已经过缓存）
             embeddings = []
             for i in range(0, len(valid_texts), batch_size):
                 batch = valid_texts[i:i + batch_size]
@@ -187,7 +236,7 @@ class EmbeddingService:
 
         raise ValueError(f"没有可用的AI服务提供商（当前: {ai_provider}）")
 
-    async def generate_content_embedding(
+    def build_content_text(
         self,
         title: str,
         content_text: Optional[str] = None,
@@ -195,9 +244,9 @@ class EmbeddingService:
         topic: Optional[str] = None,
         difficulty_level: Optional[str] = None,
         exam_type: Optional[str] = None,
-    ) -> List[float]:
+    ) -> str:
         """
-        为学习内容生成向量嵌入
+        构建用于生成学习内容向量的文本
 
         Args:
             title: 内容标题
@@ -208,12 +257,11 @@ class EmbeddingService:
             exam_type: 考试类型
 
         Returns:
-            List[float]: 向量嵌入
+            str: 组合后的文本
 
         Note:
-            组合多个字段生成更有意义的向量表示
+            索引、导入去重等场景共用此格式，保证向量处于同一语义空间
         """
-        # 构建用于生成向量的文本
         parts = [title]
 
         if description:
@@ -234,7 +282,42 @@ class EmbeddingService:
             parts.append(truncated_content)
 
         # 组合所有部分
-        combined_text = "\n\n".join(parts)
+        return "\n\n".join(parts)
+
+    async def generate_content_embedding(
+        self,
+        title: str,
+        content_text: Optional[str] = None,
+        description: Optional[str] = None,
+        topic: Optional[str] = None,
+        difficulty_level: Optional[str] = None,
+        exam_type: Optional[str] = None,
+    ) -> List[float]:
+        """
+        为学习内容生成向量嵌入
+
+        Args:
+            title: 内容标题
+            content_text: 内容正文
+            description: 内容描述
+            topic: 主题
+            difficulty_level: 难度等级
+            exam_type: 考试类型
+
+        Returns:
+            List[float]: 向量嵌入
+
+        Note:
+            组合多个字段生成更有意义的向量表示
+        """
+        combined_text = self.build_content_text(
+            title=title,
+            content_text=content_text,
+            description=description,
+            topic=topic,
+            difficulty_level=difficulty_level,
+            exam_type=exam_type,
+        )
 
         return await self.generate_embedding(combined_text)
 
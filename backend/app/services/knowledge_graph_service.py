@@ -14,6 +14,7 @@ from app.models.knowledge_graph import KnowledgeGraph
 from app.models.student import Student
 from app.services.ai_service import get_ai_service
 from app.services.graph_rules import RuleEngine
+from app.services.recommendation_cache_service import get_recommendation_cache
 
 
 class KnowledgeGraphService:
@@ -219,6 +220,10 @@ class KnowledgeGraphService:
         student.current_cefr_level = cefr_level
         await db.commit()
 
+        # 图谱和CEFR等级变化后，当日推荐需要重新生成
+        cache = await get_recommendation_cache()
+        await cache.invalidate_daily(student_id)
+
         # 8. 返回诊断结果
         return {
             "success": True,
@@ -6,12 +6,14 @@ import uuid
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import select, func, and_, case
+from sqlalchemy import JSON, and_, case, cast, func, literal, select, true
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models import Student, Practice, Mistake, MistakeStatus, MistakeType, LearningReport
+from app.models import KnowledgeGraph, Student, Mistake, MistakeStatus, MistakeType, LearningReport
 from app.services.ai_service import AIService
+from app.services.class_summary_service import get_class_summary_service
+from app.services.daily_stats_service import get_daily_stats_service
 from app.services.knowledge_graph_service import get_knowledge_graph_service
 
 
@@ -21,6 +23,8 @@ class LearningReportService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.kg_service = get_knowledge_graph_service()
+        self.daily_stats_service = get_daily_stats_service(db)
+        self.class_summary_service = get_class_summary_service(db)
 
     async def generate_report(
         self,
@@ -88,6 +92,9 @@ class LearningReportService:
         await self.db.commit()
         await self.db.refresh(learning_report)
 
+        # 新报告计入班级汇总，学生所在班级的缓存失效
+        await self.class_summary_service.invalidate_for_student(student_id)
+
         # 添加数据库生成的字段到返回值
         report["id"] = str(learning_report.id)
         report["created_at"] = learning_report.created_at.isoformat()
@@ -106,54 +113,21 @@ class LearningReportService:
 
         包括: 练习次数、正确率、学习时长、错题数量等
         """
-        # 获取练习数据
-        practice_result = await self.db.execute(
-            select(Practice)
-            .where(
-                and_(
-                    Practice.student_id == student_id,
-                    Practice.created_at >= period_start,
-                    Practice.created_at <= period_end,
-                )
-            )
+        # 读取每日统计汇总（按天粒度，O(天数)行），不扫描练习/错题明细
+        summary = await self.daily_stats_service.summarize(
+            student_id, period_start.date(), period_end.date()
         )
-        practices = practice_result.scalars().all()
-
-        # 统计练习数据
-        total_practices = len(practices)
-        completed_practices = sum(1 for p in practices if p.status == "completed")
-
-        # 计算平均正确率
-        correct_rates = [p.correct_rate for p in practices if p.correct_rate is not None]
-        avg_correct_rate = sum(correct_rates) / len(correct_rates) if correct_rates else 0
-
-        # 计算总学习时长（分钟）
-        total_duration = sum(p.duration or 0 for p in practices)
 
-        # 获取错题统计
-        mistake_result = await self.db.execute(
-            select(Mistake)
-            .where(
-                and_(
-                    Mistake.student_id == student_id,
-                    Mistake.first_mistaken_at >= period_start,
-                    Mistake.first_mistaken_at <= period_end,
-                )
-            )
-        )
-        mistakes = mistake_result.scalars().all()
+        total_practices = summary["practice_count"]
+        completed_practices = summary["completed_count"]
+        avg_correct_rate = summary["avg_correct_rate"]
 
-        # 按类型统计错题
-        mistake_by_type = {}
-        for m in mistakes:
-            mtype = m.mistake_type
-            mistake_by_type[mtype] = mistake_by_type.get(mtype, 0) + 1
+        # 计算总学习时长（分钟），time_spent 以秒记录
+        total_duration = summary["time_spent_seconds"] // 60
 
-        # 按状态统计错题
-        mistake_by_status = {}
-        for m in mistakes:
-            status = m.status
-            mistake_by_status[status] = mistake_by_status.get(status, 0) + 1
+        total_mistakes = summary["mistake_count"]
+        mistake_by_type = summary["mistakes_by_type"]
+        mistake_by_status = summary["mistakes_by_status"]
 
         return {
             "total_practices": total_practices,
@@ -162,7 +136,7 @@ class LearningReportService:
             "avg_correct_rate": round(avg_correct_rate * 100, 2),
             "total_duration_minutes": total_duration,
             "total_duration_hours": round(total_duration / 60, 2),
-            "total_mistakes": len(mistakes),
+            "total_mistakes": total_mistakes,
             "mistake_by_type": mistake_by_type,
             "mistake_by_status": mistake_by_status,
             "period_days": (period_end - period_start).days,
@@ -179,15 +153,17 @@ class LearningReportService:
 
         从知识图谱获取历史能力值，计算趋势和增长
         """
-        # 获取学生的知识图谱
+        # 只读取知识图谱中的能力节点和更新时间（一次查询，不加载学生和完整图谱）
         kg_result = await self.db.execute(
-            select(Student)
-            .options(selectinload(Student.knowledge_graph))
-            .where(Student.id == student_id)
+            select(
+                KnowledgeGraph.nodes["abilities"].label("abilities"),
+                KnowledgeGraph.updated_at,
+            )
+            .where(KnowledgeGraph.student_id == student_id)
         )
-        student = kg_result.scalar_one_or_none()
+        kg_row = kg_result.one_or_none()
 
-        if not student or not student.knowledge_graph:
+        if kg_row is None:
             # 没有知识图谱，返回默认值
             return {
                 "current_abilities": {},
@@ -197,14 +173,11 @@ class LearningReportService:
                 "overall_progress": 0,
             }
 
-        kg = student.knowledge_graph
-        nodes = kg.nodes or {}
-
         # 获取当前能力值
-        abilities = nodes.get("abilities", {})
+        abilities = kg_row.abilities if isinstance(kg_row.abilities, dict) else {}
 
         # 获取最后更新时间
-        last_updated = kg.updated_at.isoformat() if kg.updated_at else None
+        last_updated = kg_row.updated_at.isoformat() if kg_row.updated_at else None
 
         # 能力雷达图数据
         radar_data = []
@@ -250,48 +223,56 @@ class LearningReportService:
 
         识别高频错误、未掌握的知识点
         """
-        # 获取错题数据
-        mistake_result = await self.db.execute(
-            select(Mistake)
-            .where(
-                and_(
-                    Mistake.student_id == student_id,
-                    Mistake.first_mistaken_at >= period_start,
-                    Mistake.first_mistaken_at <= period_end,
-                    Mistake.status != MistakeStatus.MASTERED,  # 排除已掌握的
-                )
-            )
+        conditions = and_(
+            Mistake.student_id == student_id,
+            Mistake.first_mistaken_at >= period_start,
+            Mistake.first_mistaken_at <= period_end,
+            Mistake.status != MistakeStatus.MASTERED,  # 排除已掌握的
         )
-        mistakes = mistake_result.scalars().all()
-
-        # 统计知识点
-        knowledge_point_counts = {}
-        for m in mistakes:
-            if m.knowledge_points:
-                for kp in m.knowledge_points:
-                    knowledge_point_counts[kp] = knowledge_point_counts.get(kp, 0) + 1
-
-        # 排序找出高频薄弱点
-        sorted_weak_points = sorted(
-            knowledge_point_counts.items(),
-            key=lambda x: x[1],
-            reverse=True
+
+        # 按知识点计数：展开 JSON 数组后在数据库中分组
+        # knowledge_points 为 JSON null 或非数组时按空数组处理，避免展开函数报错中断整个报告
+        knowledge_points_array = case(
+            (
+                func.json_typeof(Mistake.knowledge_points) == "array",
+                Mistake.knowledge_points,
+            ),
+            else_=cast(literal("[]"), JSON),
+        )
+        knowledge_point = (
+            func.json_array_elements_text(knowledge_points_array)
+            .table_valued("value")
+            .lateral("kp")
         )
+        kp_result = await self.db.execute(
+            select(knowledge_point.c.value, func.count().label("count"))
+            .select_from(Mistake)
+            .join(knowledge_point, true())
+            .where(conditions)
+            .group_by(knowledge_point.c.value)
+            .order_by(func.count().desc(), knowledge_point.c.value)
+        )
+        sorted_weak_points = [(kp, count) for kp, count in kp_result.all()]
 
-        # 按主题统计
-        topic_counts = {}
-        for m in mistakes:
-            topic = m.topic or "未分类"
-            topic_counts[topic] = topic_counts.get(topic, 0) + 1
+        # 按主题和难度分组计数
+        group_result = await self.db.execute(
+            select(Mistake.topic, Mistake.difficulty_level, func.count(Mistake.id))
+            .where(conditions)
+            .group_by(Mistake.topic, Mistake.difficulty_level)
+        )
 
-        # 按难度统计
+        total_unmastered = 0
+        topic_counts = {}
         difficulty_counts = {}
-        for m in mistakes:
-            diff = m.difficulty_level or "unknown"
-            difficulty_counts[diff] = difficulty_counts.get(diff, 0) + 1
+        for topic, difficulty, count in group_result.all():
+            total_unmastered += count
+            topic = topic or "未分类"
+            topic_counts[topic] = topic_counts.get(topic, 0) + count
+            diff = difficulty or "unknown"
+            difficulty_counts[diff] = difficulty_counts.get(diff, 0) + count
 
         return {
-            "total_unmastered": len(mistakes),
+            "total_unmastered": total_unmastered,
             "knowledge_points": dict(sorted_weak_points[:10]),  # 只取前10个
             "knowledge_point_counts": dict(sorted_weak_points),
             "by_topic": topic_counts,
@@ -557,6 +538,38 @@ class LearningReportService:
         from app.models.student import Student
         from app.models.user import User
 
+        teacher_filter = [
+            ClassInfo.head_teacher_id == teacher_id,
+            ClassStudent.enrollment_status == "active",
+            ClassInfo.status == "active",
+        ]
+        # 如果指定了班级ID，添加筛选
+        if class_id:
+            teacher_filter.append(ClassInfo.id == class_id)
+
+        teacher_students = (
+            select(ClassStudent.student_id)
+            .join(ClassInfo, ClassStudent.class_id == ClassInfo.id)
+            .where(and_(*teacher_filter))
+        )
+
+        # 每个学生的最新报告：窗口函数一次编号（只扫描该教师学生的报告），
+        # 避免逐行相关子查询
+        latest_reports = (
+            select(
+                LearningReport.id,
+                LearningReport.student_id,
+                LearningReport.created_at,
+                LearningReport.report_type,
+                func.row_number().over(
+                    partition_by=LearningReport.student_id,
+                    order_by=(LearningReport.created_at.desc(), LearningReport.id),
+                ).label("rn"),
+            )
+            .where(LearningReport.student_id.in_(teacher_students))
+            .subquery("latest_reports")
+        )
+
         # 构建查询：获取教师负责的班级下的学生
         query = (
             select(
@@ -567,9 +580,9 @@ class LearningReportService:
                 ClassInfo.id.label("class_id"),
                 ClassInfo.name.label("class_name"),
                 ClassInfo.grade,
-                LearningReport.id.label("latest_report_id"),
-                LearningReport.created_at.label("latest_report_created_at"),
-                LearningReport.report_type.label("latest_report_type"),
+                latest_reports.c.id.label("latest_report_id"),
+                latest_reports.c.created_at.label("latest_report_created_at"),
+                latest_reports.c.report_type.label("latest_report_type"),
             )
             .select_from(Student)
             .join(User, Student.user_id == User.id)
@@ -577,32 +590,25 @@ class LearningReportService:
             .join(ClassInfo, ClassStudent.class_id == ClassInfo.id)
             .join(
                 # 获取最新的学习报告（LEFT JOIN）
-                LearningReport,
+                latest_reports,
                 and_(
-                    LearningReport.student_id == Student.id,
-                    LearningReport.created_at == (
-                        select(func.max(LearningReport.created_at))
-                        .where(LearningReport.student_id == Student.id)
-                        .correlate(Student)
-                    ),
+                    latest_reports.c.student_id == Student.id,
+                    latest_reports.c.rn == 1,
                 ),
                 isouter=True,
             )
-            .where(
-                and_(
-                    ClassInfo.head_teacher_id == teacher_id,
-                    ClassStudent.enrollment_status == "active",
-                    ClassInfo.status == "active",
-                )
-            )
+            .where(and_(*teacher_filter))
         )
 
-        # 如果指定了班级ID，添加筛选
-        if class_id:
-            query = query.where(ClassInfo.id == class_id)
-
-        # 查询总数
-        count_query = select(func.count()).select_from(query.subquery())
+        # 查询总数（最新报告每个学生至多一行，不影响计数）
+        count_query = (
+            select(func.count())
+            .select_from(ClassStudent)
+            .join(ClassInfo, ClassStudent.class_id == ClassInfo.id)
+            .join(Student, Student.id == ClassStudent.student_id)
+            .join(User, Student.user_id == User.id)
+            .where(and_(*teacher_filter))
+        )
         count_result = await self.db.execute(count_query)
         total = count_result.scalar()
 
@@ -742,192 +748,49 @@ class LearningReportService:
         Raises:
             HTTPException: 如果班级不属于该教师
         """
-        from app.models.class_model import ClassInfo, ClassStudent
-        from app.models.student import Student
-        from app.models.user import User
         from fastapi import HTTPException, status
 
-        # 确定时间范围
-        if not period_end:
-            period_end = datetime.utcnow()
-        if not period_start:
-            period_start = period_end - timedelta(days=30)
-
-        # 验证班级是否属于该教师
-        result = await self.db.execute(
-            select(ClassInfo)
-            .where(
-                and_(
-                    ClassInfo.id == class_id,
-                    ClassInfo.head_teacher_id == teacher_id,
-                    ClassInfo.status == "active",
-                )
-            )
+        summaries = await self.class_summary_service.summarize_classes(
+            teacher_id=teacher_id,
+            class_ids=[class_id],
+            period_start=period_start,
+            period_end=period_end,
         )
-        class_info = result.scalar_one_or_none()
 
-        if not class_info:
+        # 班级不属于该教师或已停用时结果为空
+        if not summaries:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="班级不存在或不属于该教师"
             )
 
-        # 获取班级学生总数
-        total_students_result = await self.db.execute(
-            select(func.count(ClassStudent.id))
-            .select_from(ClassStudent)
-            .where(
-                and_(
-                    ClassStudent.class_id == class_id,
-                    ClassStudent.enrollment_status == "active",
-                )
-            )
-        )
-        total_students = total_students_result.scalar()
+        return summaries[0]
 
-        # 获取有报告的学生数（活跃学生）
-        active_students_result = await self.db.execute(
-            select(func.count(func.distinct(LearningReport.student_id)))
-            .select_from(LearningReport)
-            .join(ClassStudent, LearningReport.student_id == ClassStudent.student_id)
-            .where(
-                and_(
-                    ClassStudent.class_id == class_id,
-                    ClassStudent.enrollment_status == "active",
-                    LearningReport.created_at >= period_start,
-                    LearningReport.created_at <= period_end,
-                )
-            )
-        )
-        active_students = active_students_result.scalar() or 0
+    async def generate_class_summaries(
+        self,
+        teacher_id: uuid.UUID,
+        class_ids: Optional[List[uuid.UUID]] = None,
+        period_start: Optional[datetime] = None,
+        period_end: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        批量生成教师多个班级的学习状况汇总
 
-        # 获取班级整体统计数据
-        stats_result = await self.db.execute(
-            select(
-                func.avg(LearningReport.statistics["completion_rate"].asfloat()),
-                func.avg(LearningReport.statistics["avg_correct_rate"].asfloat()),
-                func.sum(LearningReport.statistics["total_duration_minutes"].asfloat()),
-            )
-            .select_from(LearningReport)
-            .join(ClassStudent, LearningReport.student_id == ClassStudent.student_id)
-            .where(
-                and_(
-                    ClassStudent.class_id == class_id,
-                    ClassStudent.enrollment_status == "active",
-                    LearningReport.created_at >= period_start,
-                    LearningReport.created_at <= period_end,
-                )
-            )
-        )
-        stats = stats_result.one()
-        avg_completion_rate = float(stats[0]) if stats[0] else 0.0
-        avg_correct_rate = float(stats[1]) if stats[1] else 0.0
-        total_study_hours = float(stats[2]) / 60.0 if stats[2] else 0.0
-
-        # 获取能力分布统计
-        ability_result = await self.db.execute(
-            select(LearningReport.ability_analysis)
-            .select_from(LearningReport)
-            .join(ClassStudent, LearningReport.student_id == ClassStudent.student_id)
-            .where(
-                and_(
-                    ClassStudent.class_id == class_id,
-                    ClassStudent.enrollment_status == "active",
-                    LearningReport.created_at >= period_start,
-                    LearningReport.created_at <= period_end,
-                )
-            )
-            .order_by(LearningReport.created_at.desc())
-            .limit(50)  # 取最近的报告
-        )
-        ability_data = ability_result.scalars().all()
-
-        # 计算班级整体能力分布
-        ability_distribution = {
-            "listening": 0.0,
-            "reading": 0.0,
-            "speaking": 0.0,
-            "writing": 0.0,
-            "grammar": 0.0,
-            "vocabulary": 0.0,
-        }
+        Args:
+            teacher_id: 教师ID
+            class_ids: 班级ID列表（为空则为该教师的全部在读班级）
+            period_start: 统计开始时间
+            period_end: 统计结束时间
 
-        if ability_data:
-            for ability in ability_data:
-                if ability and "ability_radar" in ability:
-                    for item in ability["ability_radar"]:
-                        name = item.get("name", "").lower()
-                        value = item.get("value", 0)
-                        if "听力" in name or "listening" in name:
-                            ability_distribution["listening"] += value
-                        elif "阅读" in name or "reading" in name:
-                            ability_distribution["reading"] += value
-                        elif "口语" in name or "speaking" in name:
-                            ability_distribution["speaking"] += value
-                        elif "写作" in name or "writing" in name:
-                            ability_distribution["writing"] += value
-                        elif "语法" in name or "grammar" in name:
-                            ability_distribution["grammar"] += value
-                        elif "词汇" in name or "vocabulary" in name:
-                            ability_distribution["vocabulary"] += value
-
-            # 计算平均值
-            count = len([d for d in ability_data if d])
-            if count > 0:
-                for key in ability_distribution:
-                    ability_distribution[key] = round(ability_distribution[key] / count, 2)
-
-        # 获取薄弱知识点汇总
-        weak_points_result = await self.db.execute(
-            select(LearningReport.weak_points)
-            .select_from(LearningReport)
-            .join(ClassStudent, LearningReport.student_id == ClassStudent.student_id)
-            .where(
-                and_(
-                    ClassStudent.class_id == class_id,
-                    ClassStudent.enrollment_status == "active",
-                    LearningReport.created_at >= period_start,
-                    LearningReport.created_at <= period_end,
-                )
-            )
+        Returns:
+            List[dict]: 班级学习状况汇总列表（不属于该教师的班级会被忽略）
+        """
+        return await self.class_summary_service.summarize_classes(
+            teacher_id=teacher_id,
+            class_ids=class_ids,
+            period_start=period_start,
+            period_end=period_end,
         )
-        weak_points_data = weak_points_result.scalars().all()
-
-        # 汇总薄弱知识点
-        weak_points_summary = {}
-        if weak_points_data:
-            for wp in weak_points_data:
-                if wp and "knowledge_points" in wp:
-                    for kp, count in wp["knowledge_points"].items():
-                        weak_points_summary[kp] = weak_points_summary.get(kp, 0) + count
-
-            # 排序并取前10个
-            sorted_weak_points = sorted(
-                weak_points_summary.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]
-
-            weak_points_summary = [{"knowledge_point": kp, "affected_students": count}
-                                 for kp, count in sorted_weak_points]
-        else:
-            weak_points_summary = []
-
-        return {
-            "class_id": str(class_id),
-            "class_name": class_info.name,
-            "total_students": total_students,
-            "active_students": active_students,
-            "overall_stats": {
-                "avg_completion_rate": round(avg_completion_rate, 2),
-                "avg_correct_rate": round(avg_correct_rate, 2),
-                "total_study_hours": round(total_study_hours, 2),
-            },
-            "ability_distribution": ability_distribution,
-            "top_weak_points": weak_points_summary,
-            "period_start": period_start.isoformat(),
-            "period_end": period_end.isoformat(),
-        }
 
 
 def get_learning_report_service(db: AsyncSession) -> LearningReportService:
@@ -2,11 +2,13 @@
 教案生成服务 - AI英语教学系统
 使用ZhipuAI驱动的教案生成功能
 """
+import asyncio
 import json
+import logging
 import time
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel
 from sqlalchemy import func, select
@@ -19,6 +21,7 @@ from tenacity import (
 )
 
 from app.core.config import settings
+from app.db.session_manager import get_session_maker
 from app.models import LessonPlan, LessonPlanTemplate
 from app.schemas.lesson_plan import (
     ExerciseItem,
@@ -31,8 +34,23 @@ from app.schemas.lesson_plan import (
     TeachingStep,
     VocabularyItem,
 )
+from app.services.llm_response_cache import SemanticKey, get_llm_response_cache
 from app.services.zhipu_service import ZhipuAIService
 
+logger = logging.getLogger(__name__)
+
+# 流水线中的一个待生成章节：(章节名, 章节内的键, 生成函数)
+SectionJob = Tuple[str, Optional[str], Callable[[], Awaitable[Any]]]
+
+
+def _is_json(content: str) -> bool:
+    """响应是否为有效JSON（无效响应不写入缓存）"""
+    try:
+        json.loads(content)
+        return True
+    except (TypeError, ValueError):
+        return False
+
 
 class LessonPlanGenerationResult(BaseModel):
     """教案生成结果"""
@@ -54,9 +72,12 @@ class LessonPlanService:
     def __init__(self):
         """初始化教案服务"""
         self.zhipu_service = ZhipuAIService()
+        self.response_cache = get_llm_response_cache()
         self.model = settings.ZHIPUAI_MODEL
         self.temperature = settings.ZHIPUAI_TEMPERATURE
         self.max_tokens = settings.ZHIPUAI_MAX_TOKENS
+        # 流水线生成中的后台章节任务 -> (教案ID, 教师ID)
+        self._section_tasks: Dict[asyncio.Task, Tuple[uuid.UUID, uuid.UUID]] = {}
 
     @retry(
         retry=retry_if_exception_type((ConnectionError, TimeoutError)),
@@ -68,6 +89,7 @@ class LessonPlanService:
         db: AsyncSession,
         teacher_id: uuid.UUID,
         request: GenerateLessonPlanRequest,
+        use_cache: bool = True,
     ) -> LessonPlan:
         """
         生成完整教案
@@ -76,6 +98,7 @@ class LessonPlanService:
             db: 数据库会话
             teacher_id: 教师ID
             request: 生成教案请求
+            use_cache: 是否复用相同请求的缓存结果，重新生成时传 False
 
         Returns:
             LessonPlan: 生成的教案
@@ -108,7 +131,13 @@ class LessonPlanService:
 
         try:
             # 调用AI生成教案，使用长超时（10分钟）
-            response_text = await self._call_zhipu_json(messages, use_long_timeout=True)
+            response_text = await self._call_zhipu_json(
+                messages,
+                use_long_timeout=True,
+                call_site="lesson_plan",
+                semantic=self._lesson_semantic_key(request, skeleton_only=False),
+                use_cache=use_cache,
+            )
 
             # 解析响应
             result = self._parse_lesson_plan_response(response_text, request)
@@ -143,6 +172,390 @@ class LessonPlanService:
         except Exception as e:
             raise ConnectionError(f"教案生成失败: {str(e)}")
 
+    @retry(
+        retry=retry_if_exception_type((ConnectionError, TimeoutError)),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+    )
+    async def generate_lesson_plan_pipelined(
+        self,
+        db: AsyncSession,
+        teacher_id: uuid.UUID,
+        request: GenerateLessonPlanRequest,
+        use_cache: bool = True,
+    ) -> LessonPlan:
+        """
+        流水线生成教案
+
+        先用一次较小的调用生成教案骨架（教学目标、词汇、语法点、教学流程），
+        保存后立即返回（状态为 generating）。分层材料、练习题和PPT大纲在后台
+        并发生成（受 ZhipuAI 服务的速率限制和并发信号量约束），每完成一节就
+        写入数据库并通过 WebSocket 推送给教师，全部完成后状态变为 generated。
+
+        Args:
+            db: 数据库会话
+            teacher_id: 教师ID
+            request: 生成教案请求
+            use_cache: 是否复用相同请求的缓存结果，重新生成时传 False
+
+        Returns:
+            LessonPlan: 只包含骨架的教案
+
+        Raises:
+            ValueError: 如果输入数据无效
+            ConnectionError: 如果API调用失败
+        """
+        start_time = time.time()
+
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "你是一个专业的英语教学专家，拥有20年的英语教学经验。"
+                    "你擅长根据教师的需求，生成实用、简洁的英语教案。"
+                    "教案需要符合CEFR标准，结合目标考试特点。"
+                    "请严格按照JSON格式返回，确保JSON完整有效。"
+                )
+            },
+            {
+                "role": "user",
+                "content": self._build_simple_lesson_prompt(request, skeleton_only=True)
+            }
+        ]
+
+        try:
+            response_text = await self._call_zhipu_json(
+                messages,
+                use_long_timeout=True,
+                call_site="lesson_plan",
+                semantic=self._lesson_semantic_key(request, skeleton_only=True),
+                use_cache=use_cache,
+            )
+            skeleton = self._parse_lesson_plan_response(response_text, request)
+            jobs = self._build_section_jobs(request, skeleton, use_cache)
+
+            lesson_plan = LessonPlan(
+                teacher_id=teacher_id,
+                title=request.title,
+                topic=request.topic,
+                level=request.level,
+                duration=request.duration,
+                target_exam=request.target_exam,
+                status="generating" if jobs else "generated",
+                ai_generation_params=request.model_dump(),
+                objectives=skeleton.get("objectives", {}),
+                vocabulary=skeleton.get("vocabulary", {}),
+                grammar_points=skeleton.get("grammar_points", []),
+                teaching_structure=skeleton.get("structure", {}),
+                leveled_materials=[],
+                exercises={},
+                ppt_outline=[],
+                generation_time_ms=int((time.time() - start_time) * 1000),
+                last_generated_at=datetime.utcnow(),
+            )
+
+            db.add(lesson_plan)
+            await db.commit()
+            await db.refresh(lesson_plan)
+
+        except Exception as e:
+            raise ConnectionError(f"教案生成失败: {str(e)}")
+
+        await self._push_generation_event(teacher_id, "section", {
+            "lesson_plan_id": str(lesson_plan.id),
+            "section": "skeleton",
+            "key": None,
+            "content": {
+                "objectives": lesson_plan.objectives,
+                "vocabulary": lesson_plan.vocabulary,
+                "grammar_points": lesson_plan.grammar_points,
+                "structure": lesson_plan.teaching_structure,
+            },
+            "error": None,
+            "completed": 0,
+            "total": len(jobs),
+            "status": lesson_plan.status,
+        })
+
+        if jobs:
+            task = asyncio.create_task(
+                self._generate_sections(lesson_plan.id, teacher_id, request, jobs, start_time)
+            )
+            self._section_tasks[task] = (lesson_plan.id, teacher_id)
+            task.add_done_callback(lambda done: self._section_tasks.pop(done, None))
+
+        return lesson_plan
+
+    def _build_section_jobs(
+        self,
+        request: GenerateLessonPlanRequest,
+        skeleton: Dict[str, Any],
+        use_cache: bool = True,
+    ) -> List[SectionJob]:
+        """
+        根据请求和教案骨架构建待并发生成的章节
+
+        每个等级的分层材料、每种题型的练习题各为一个章节，PPT大纲基于教学流程生成。
+
+        Args:
+            request: 生成教案请求
+            skeleton: 解析后的教案骨架
+            use_cache: 是否复用缓存结果
+
+        Returns:
+            List[SectionJob]: 待生成章节列表
+        """
+        jobs: List[SectionJob] = []
+
+        if request.include_leveled_materials:
+            base_content = self._build_leveled_base_content(request, skeleton)
+            for level in request.leveled_levels:
+                jobs.append((
+                    "leveled_materials",
+                    level,
+                    lambda level=level: self._generate_leveled_material(
+                        base_content, level, use_cache
+                    ),
+                ))
+
+        if request.include_exercises and request.exercise_types:
+            # exercise_count 为总题数，平均分配到各题型
+            count = max(1, request.exercise_count // len(request.exercise_types))
+            for exercise_type in request.exercise_types:
+                jobs.append((
+                    "exercises",
+                    exercise_type,
+                    lambda exercise_type=exercise_type: self._generate_exercise_items(
+                        request.topic, request.level, exercise_type, count, use_cache
+                    ),
+                ))
+
+        if request.include_ppt:
+            structure = skeleton.get("structure", {})
+            jobs.append((
+                "ppt_outline",
+                None,
+                lambda: self._generate_ppt_slides(LessonPlanStructure(**structure), use_cache),
+            ))
+
+        return jobs
+
+    def _build_leveled_base_content(
+        self, request: GenerateLessonPlanRequest, skeleton: Dict[str, Any]
+    ) -> str:
+        """根据教案骨架构建分层材料的基础内容"""
+        words = [
+            vocab.get("word", "")
+            for vocabs in skeleton.get("vocabulary", {}).values()
+            if isinstance(vocabs, list)
+            for vocab in vocabs
+            if isinstance(vocab, dict)
+        ]
+        grammar = [
+            gp.get("name", "")
+            for gp in skeleton.get("grammar_points", [])
+            if isinstance(gp, dict)
+        ]
+        presentation = skeleton.get("structure", {}).get("presentation") or {}
+
+        parts = [f"标题: {request.title}", f"主题: {request.topic}"]
+        if words:
+            parts.append(f"核心词汇: {', '.join(w for w in words if w)}")
+        if grammar:
+            parts.append(f"语法点: {', '.join(g for g in grammar if g)}")
+        if isinstance(presentation, dict) and presentation.get("description"):
+            parts.append(f"讲解内容: {presentation['description']}")
+        return "\n".join(parts)
+
+    async def _generate_sections(
+        self,
+        lesson_plan_id: uuid.UUID,
+        teacher_id: uuid.UUID,
+        request: GenerateLessonPlanRequest,
+        jobs: List[SectionJob],
+        start_time: float,
+    ) -> None:
+        """
+        并发生成剩余章节，按完成顺序逐节保存并推送
+
+        使用独立的数据库会话（请求会话在返回骨架后即关闭）。
+        单个章节失败只推送错误，不影响其他章节；全部完成后部分章节失败的教案
+        状态为 partial，全部章节失败为 failed。流水线本身出错时教案标记为 failed
+        并推送 error 事件。
+
+        Args:
+            lesson_plan_id: 教案ID
+            teacher_id: 教师ID
+            request: 生成教案请求
+            jobs: 待生成章节列表
+            start_time: 流水线开始时间，用于记录总生成耗时
+        """
+        async def run(job: SectionJob) -> Tuple[str, Optional[str], Any, Optional[Exception]]:
+            section, key, generate = job
+            try:
+                return section, key, await generate(), None
+            except Exception as e:
+                return section, key, None, e
+
+        tasks = [asyncio.create_task(run(job)) for job in jobs]
+        try:
+            async with get_session_maker()() as db:
+                lesson_plan = await db.get(LessonPlan, lesson_plan_id)
+                if lesson_plan is None:
+                    return
+
+                completed = 0
+                failed_sections: List[Dict[str, Optional[str]]] = []
+                for next_done in asyncio.as_completed(tasks):
+                    section, key, value, error = await next_done
+                    completed += 1
+
+                    content = None
+                    if error is not None:
+                        logger.warning(f"教案 {lesson_plan_id} 生成{section}({key})失败: {error}")
+                        failed_sections.append({"section": section, "key": key})
+                    else:
+                        content = self._apply_section(lesson_plan, request, section, key, value)
+                        await db.commit()
+
+                    await self._push_generation_event(teacher_id, "section", {
+                        "lesson_plan_id": str(lesson_plan_id),
+                        "section": section,
+                        "key": key,
+                        "content": content,
+                        "error": str(error) if error is not None else None,
+                        "completed": completed,
+                        "total": len(jobs),
+                        "status": "generating",
+                    })
+
+                if not failed_sections:
+                    final_status = "generated"
+                elif len(failed_sections) < len(jobs):
+                    final_status = "partial"
+                else:
+                    final_status = "failed"
+                lesson_plan.status = final_status
+                lesson_plan.generation_time_ms = int((time.time() - start_time) * 1000)
+                lesson_plan.last_generated_at = datetime.utcnow()
+                await db.commit()
+
+            await self._push_generation_event(teacher_id, "completed", {
+                "lesson_plan_id": str(lesson_plan_id),
+                "status": final_status,
+                "failed_sections": failed_sections,
+                "generation_time_ms": int((time.time() - start_time) * 1000),
+            })
+        except Exception as e:
+            logger.error(f"教案 {lesson_plan_id} 流水线生成失败: {e}")
+            await self._mark_generation_failed(lesson_plan_id, teacher_id, e)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def drain_section_tasks(self, timeout: float) -> None:
+        """
+        等待后台章节生成完成（应用关闭时调用）
+
+        超时后取消剩余任务，并把对应教案标记为 failed、推送 error 事件，
+        避免重启后教案一直停留在 generating 状态。
+
+        Args:
+            timeout: 最长等待时间（秒）
+        """
+        tasks = dict(self._section_tasks)
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if not pending:
+            return
+
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(f"应用关闭，中断 {len(pending)} 个教案的流水线生成")
+        for task in pending:
+            lesson_plan_id, teacher_id = tasks[task]
+            await self._mark_generation_failed(
+                lesson_plan_id, teacher_id, RuntimeError("服务重启，教案生成已中断")
+            )
+
+    async def _mark_generation_failed(
+        self, lesson_plan_id: uuid.UUID, teacher_id: uuid.UUID, error: Exception
+    ) -> None:
+        """
+        流水线出错时把教案标记为 failed 并推送 error 事件
+
+        使用新的数据库会话，出错的会话可能已不可用。
+        """
+        try:
+            async with get_session_maker()() as db:
+                lesson_plan = await db.get(LessonPlan, lesson_plan_id)
+                if lesson_plan is not None:
+                    lesson_plan.status = "failed"
+                    await db.commit()
+        except Exception as e:
+            logger.error(f"标记教案 {lesson_plan_id} 生成失败时出错: {e}")
+
+        await self._push_generation_event(teacher_id, "error", {
+            "lesson_plan_id": str(lesson_plan_id),
+            "status": "failed",
+            "error": str(error),
+        })
+
+    def _apply_section(
+        self,
+        lesson_plan: LessonPlan,
+        request: GenerateLessonPlanRequest,
+        section: str,
+        key: Optional[str],
+        value: Any,
+    ) -> Any:
+        """
+        把生成完成的章节合并到教案
+
+        JSON 列整体重新赋值，确保 SQLAlchemy 检测到变更。
+
+        Returns:
+            推送给教师的章节内容
+        """
+        if section == "leveled_materials":
+            content = value.model_dump()
+            materials = [*(lesson_plan.leveled_materials or []), content]
+            # 按请求的等级顺序排列，与完成顺序无关
+            order = {level: index for index, level in enumerate(request.leveled_levels)}
+            materials.sort(key=lambda m: order.get(m.get("level"), len(order)))
+            lesson_plan.leveled_materials = materials
+        elif section == "exercises":
+            content = [item.model_dump() for item in value]
+            lesson_plan.exercises = {**(lesson_plan.exercises or {}), key: content}
+        else:
+            content = [slide.model_dump() for slide in value]
+            lesson_plan.ppt_outline = content
+        return content
+
+    async def _push_generation_event(
+        self, teacher_id: uuid.UUID, action: str, data: Dict[str, Any]
+    ) -> None:
+        """
+        通过WebSocket推送教案生成进度
+
+        Args:
+            teacher_id: 教师ID
+            action: section（一个章节完成）、completed（全部完成）或 error（流水线出错）
+            data: 事件数据
+        """
+        try:
+            # 导入WebSocket管理器（避免循环导入）
+            from app.websocket.manager import manager
+
+            await manager.send_personal_message(
+                {"type": "lesson_plan_generation", "action": action, "data": data},
+                teacher_id,
+            )
+        except Exception as e:
+            logger.warning(f"推送教案生成进度失败: {e}")
+
     async def generate_difficulty_levels(
         self,
         db: AsyncSession,
@@ -165,26 +578,8 @@ class LessonPlanService:
         materials = []
 
         for level in target_levels:
-            prompt = self._build_leveled_material_prompt(base_content, level)
-
-            messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        f"你是一个专业的英语教材编写专家。"
-                        f"请根据CEFR {level}等级标准，改写以下内容。"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-
             try:
-                response_text = await self._call_zhipu_json(messages)
-                material_data = json.loads(response_text)
-                materials.append(LeveledMaterial(**material_data))
+                materials.append(await self._generate_leveled_material(base_content, level))
             except Exception as e:
                 # 如果单个等级生成失败，记录但继续
                 print(f"生成{level}等级材料失败: {str(e)}")
@@ -218,28 +613,10 @@ class LessonPlanService:
         exercises = {}
 
         for exercise_type in exercise_types:
-            prompt = self._build_exercise_prompt(topic, level, exercise_type, count)
-
-            messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "你是一个专业的英语教学专家。"
-                        "请根据主题和等级，生成高质量的练习题。"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-
             try:
-                response_text = await self._call_zhipu_json(messages)
-                exercise_data = json.loads(response_text)
-                exercises[exercise_type] = [
-                    ExerciseItem(**item) for item in exercise_data.get("exercises", [])
-                ]
+                exercises[exercise_type] = await self._generate_exercise_items(
+                    topic, level, exercise_type, count
+                )
             except Exception as e:
                 print(f"生成{exercise_type}题型失败: {str(e)}")
                 exercises[exercise_type] = []
@@ -263,8 +640,59 @@ class LessonPlanService:
         Returns:
             List[PPTSlide]: PPT幻灯片列表
         """
-        prompt = self._build_ppt_prompt(structure)
+        try:
+            return await self._generate_ppt_slides(structure)
+        except Exception as e:
+            print(f"生成PPT大纲失败: {str(e)}")
+            return []
 
+    async def _generate_leveled_material(
+        self, base_content: str, level: str, use_cache: bool = True
+    ) -> LeveledMaterial:
+        """生成单个等级的分层材料（失败时抛出异常）"""
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    f"你是一个专业的英语教材编写专家。"
+                    f"请根据CEFR {level}等级标准，改写以下内容。"
+                )
+            },
+            {
+                "role": "user",
+                "content": self._build_leveled_material_prompt(base_content, level)
+            }
+        ]
+
+        response_text = await self._call_zhipu_json(messages, use_cache=use_cache)
+        return LeveledMaterial(**json.loads(response_text))
+
+    async def _generate_exercise_items(
+        self, topic: str, level: str, exercise_type: str, count: int, use_cache: bool = True
+    ) -> List[ExerciseItem]:
+        """生成单个题型的练习题（失败时抛出异常）"""
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "你是一个专业的英语教学专家。"
+                    "请根据主题和等级，生成高质量的练习题。"
+                )
+            },
+            {
+                "role": "user",
+                "content": self._build_exercise_prompt(topic, level, exercise_type, count)
+            }
+        ]
+
+        response_text = await self._call_zhipu_json(messages, use_cache=use_cache)
+        exercise_data = json.loads(response_text)
+        return [ExerciseItem(**item) for item in exercise_data.get("exercises", [])]
+
+    async def _generate_ppt_slides(
+        self, structure: LessonPlanStructure, use_cache: bool = True
+    ) -> List[PPTSlide]:
+        """生成PPT大纲（失败时抛出异常）"""
         messages = [
             {
                 "role": "system",
@@ -275,17 +703,13 @@ class LessonPlanService:
             },
             {
                 "role": "user",
-                "content": prompt
+                "content": self._build_ppt_prompt(structure)
             }
         ]
 
-        try:
-            response_text = await self._call_zhipu_json(messages)
-            ppt_data = json.loads(response_text)
-            return [PPTSlide(**slide) for slide in ppt_data.get("slides", [])]
-        except Exception as e:
-            print(f"生成PPT大纲失败: {str(e)}")
-            return []
+        response_text = await self._call_zhipu_json(messages, use_cache=use_cache)
+        ppt_data = json.loads(response_text)
+        return [PPTSlide(**slide) for slide in ppt_data.get("slides", [])]
 
     def _build_lesson_prompt(self, request: GenerateLessonPlanRequest) -> str:
         """
@@ -431,7 +855,9 @@ class LessonPlanService:
 
         return "".join(prompt_parts)
 
-    def _build_simple_lesson_prompt(self, request: GenerateLessonPlanRequest) -> str:
+    def _build_simple_lesson_prompt(
+        self, request: GenerateLessonPlanRequest, skeleton_only: bool = False
+    ) -> str:
         """
         构建简化版教案生成提示词（用于快速生成）
 
@@ -439,6 +865,8 @@ class LessonPlanService:
 
         Args:
             request: 生成教案请求
+            skeleton_only: 是否只生成教案骨架（教学目标、词汇、语法点、教学流程），
+                分层材料、练习题和PPT大纲由流水线单独生成
 
         Returns:
             str: 构建的提示词
@@ -563,6 +991,12 @@ class LessonPlanService:
         prompt_parts.append('      "student_actions": [],\n')
         prompt_parts.append('      "materials": []\n')
         prompt_parts.append('    }\n')
+        if skeleton_only:
+            prompt_parts.append('  }\n')
+            prompt_parts.append("}\n")
+            prompt_parts.append("```\n")
+            return "".join(prompt_parts)
+
         prompt_parts.append('  },\n')
         prompt_parts.append('  "leveled_materials": [],\n')
         prompt_parts.append('  "exercises": {\n')
@@ -701,14 +1135,20 @@ class LessonPlanService:
     async def _call_zhipu_json(
         self,
         messages: List[Dict[str, str]],
-        use_long_timeout: bool = False
+        use_long_timeout: bool = False,
+        call_site: str = "lesson_plan_section",
+        semantic: Optional[SemanticKey] = None,
+        use_cache: bool = True,
     ) -> str:
         """
-        调用ZhipuAI API（JSON mode）
+        调用ZhipuAI API（JSON mode），相同提示词的结果经大模型响应缓存复用
 
         Args:
             messages: 对话消息
             use_long_timeout: 是否使用长超时（用于教案生成）
+            call_site: 缓存调用点，决定缓存时间
+            semantic: 语义查找键（可选）
+            use_cache: 是否使用缓存，重新生成时传 False
 
         Returns:
             str: AI生成的JSON响应
@@ -716,10 +1156,10 @@ class LessonPlanService:
         Raises:
             ConnectionError: 如果API调用失败
         """
-        try:
-            # 教案生成使用更长的超时时间（10分钟）
-            timeout = settings.ZHIPUAI_LESSON_PLAN_TIMEOUT if use_long_timeout else None
+        # 教案生成使用更长的超时时间（10分钟）
+        timeout = settings.ZHIPUAI_LESSON_PLAN_TIMEOUT if use_long_timeout else None
 
+        async def generate() -> Tuple[str, int]:
             response = await self.zhipu_service.chat_completion(
                 messages=messages,
                 temperature=self.temperature,
@@ -730,21 +1170,54 @@ class LessonPlanService:
 
             # 获取响应内容
             choices = response.get("choices", [])
-            if choices:
-                message = choices[0].get("message", {})
-                content = message.get("content", "")
-                reasoning_content = message.get("reasoning_content", "")
+            if not choices:
+                raise ConnectionError("ZhipuAI返回空响应")
 
-                # 如果 content 为空但有 reasoning_content，使用 reasoning_content
-                if not content and reasoning_content:
-                    return reasoning_content
-                return content
+            message = choices[0].get("message", {})
+            content = message.get("content", "")
+            reasoning_content = message.get("reasoning_content", "")
 
-            raise ConnectionError("ZhipuAI返回空响应")
+            # 如果 content 为空但有 reasoning_content，使用 reasoning_content
+            if not content and reasoning_content:
+                content = reasoning_content
+            return content, response.get("usage", {}).get("total_tokens", 0)
 
+        try:
+            return await self.response_cache.get_or_generate(
+                call_site,
+                messages,
+                {
+                    "model": self.model,
+                    "temperature": self.temperature,
+                    "max_tokens": self.max_tokens,
+                    "response_format": "json_object",
+                },
+                generate,
+                semantic=semantic,
+                use_cache=use_cache,
+                validate=_is_json,
+            )
         except Exception as e:
             raise ConnectionError(f"ZhipuAI API调用失败: {str(e)}")
 
+    def _lesson_semantic_key(
+        self, request: GenerateLessonPlanRequest, skeleton_only: bool
+    ) -> SemanticKey:
+        """
+        构建教案生成的语义查找键
+
+        等级、时长和目标考试必须一致，标题、主题和重点领域允许近似。
+        """
+        return SemanticKey(
+            scope="|".join([
+                "skeleton" if skeleton_only else "full",
+                request.level,
+                str(request.duration),
+                request.target_exam or "",
+            ]),
+            text="\n".join([request.title, request.topic, ", ".join(request.focus_areas)]),
+        )
+
     def _parse_lesson_plan_response(
         self, response_text: str, request: GenerateLessonPlanRequest
     ) -> Dict[str, Any]:
@@ -0,0 +1,418 @@
+"""
+大模型响应缓存 - AI英语教学系统
+相同提示词的确定性调用（教案生成、对话评分等）直接复用已生成的结果
+
+缓存键：(调用点, 模型与生成参数, 规范化消息的SHA-256)
+缓存内容（String `cache:llm:{call_site}:{digest}`，JSON）：响应内容、消耗的 token 数、生成耗时
+
+可选的语义查找：调用方把请求拆成必须完全一致的部分（scope，如等级/时长/考试）
+和允许近似的部分（text，如标题/主题）。精确未命中时对 text 生成向量，
+与同一 scope 下已缓存请求的向量比较，余弦相似度达到阈值即复用其响应。
+向量索引存放在 Hash `cache:llm:semantic:{call_site}:{scope_digest}`，
+字段为请求摘要，值为 `{写入时间毫秒}:{base64 向量}`（分区满时淘汰最早写入的向量）。
+"""
+import base64
+import hashlib
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+from app.metrics.llm_cache_metrics import record_llm_cache_request, record_llm_cache_savings
+from app.services.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# 各调用点的缓存时间（秒），未登记或为 0 的调用点不缓存
+LLM_CACHE_TTLS: dict[str, int] = {
+    "lesson_plan": 7 * 24 * 3600,
+    "lesson_plan_section": 7 * 24 * 3600,
+    "conversation_scores": 30 * 24 * 3600,
+}
+
+
+@dataclass
+class SemanticKey:
+    """语义查找键"""
+
+    # 必须完全一致的部分（如等级、时长、目标考试）
+    scope: str
+    # 允许近似匹配的部分（如标题、主题）
+    text: str
+
+
+@dataclass
+class CachedResponse:
+    """缓存的响应"""
+
+    content: str
+    # 原始调用消耗的 token 数和生成耗时，命中时计入节省的成本
+    total_tokens: int = 0
+    latency_ms: int = 0
+
+
+def _encode_index_entry(vector: np.ndarray) -> str:
+    """编码语义索引条目（写入时间 + 向量）"""
+    encoded = base64.b64encode(vector.tobytes()).decode("ascii")
+    return f"{int(time.time() * 1000)}:{encoded}"
+
+
+def _decode_index_entry(raw: str) -> Tuple[int, np.ndarray]:
+    """
+    解码语义索引条目，返回 (写入时间毫秒, 向量)
+
+    没有写入时间的旧条目视为最早写入。
+
+    Raises:
+        ValueError: 条目损坏（包括 base64 解码失败）
+    """
+    inserted_at, _, encoded = raw.rpartition(":")
+    vector = np.frombuffer(base64.b64decode(encoded, validate=True), dtype=np.float32)
+    return int(inserted_at or 0), vector
+
+
+def make_cache_key(messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """
+    生成缓存键
+
+    消息内容做 Unicode NFC 和空白折叠，生成参数按键排序，
+    仅空白或参数顺序不同的请求得到相同的键。
+    """
+    payload = json.dumps(
+        {
+            "messages": [[m["role"], normalize_text(m["content"])] for m in messages],
+            "params": params,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    大模型响应缓存
+
+    使用示例：
+        ```python
+        cache = get_llm_response_cache()
+        content = await cache.get_or_generate(
+            "lesson_plan", messages, {"model": model, "temperature": 0.7}, generate
+        )
+        ```
+
+    generate 返回 (响应内容, 消耗的 token 数)。需要每次得到不同结果的
+    创作类调用（如重新生成）传入 use_cache=False：不读取缓存，
+    新结果写回缓存覆盖旧结果，之后的相同请求不会再拿到被替换的旧响应。
+    """
+
+    _PREFIX = "cache:llm:"
+    _SEMANTIC_PREFIX = "cache:llm:semantic:"
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        embed: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            redis_client: Redis 客户端实例，如果未提供则从配置创建
+            embed: 语义查找使用的向量生成函数，默认使用嵌入服务（带嵌入缓存）
+        """
+        self._redis = redis_client
+        self._embed_func = embed
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "saved_tokens": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用响应缓存"""
+        return get_settings().LLM_RESPONSE_CACHE_ENABLED
+
+    @property
+    def semantic_enabled(self) -> bool:
+        """是否启用语义查找"""
+        return get_settings().LLM_RESPONSE_CACHE_SEMANTIC_ENABLED
+
+    async def _get_redis(self) -> redis.Redis:
+        """获取 Redis 客户端（懒加载）"""
+        if self._redis is None:
+            settings = get_settings()
+            self._redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                max_connections=settings.REDIS_MAX_CONNECTIONS
+            )
+        return self._redis
+
+    def _get_key(self, call_site: str, digest: str) -> str:
+        return f"{self._PREFIX}{call_site}:{digest}"
+
+    def _get_semantic_key(self, call_site: str, params: Dict[str, Any], scope: str) -> str:
+        scope_digest = hashlib.sha256(
+            json.dumps({"params": params, "scope": scope}, ensure_ascii=False, sort_keys=True)
+            .encode("utf-8")
+        ).hexdigest()
+        return f"{self._SEMANTIC_PREFIX}{call_site}:{scope_digest}"
+
+    async def get_or_generate(
+        self,
+        call_site: str,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any],
+        generate: Callable[[], Awaitable[Tuple[str, int]]],
+        semantic: Optional[SemanticKey] = None,
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        """
+        查询缓存，未命中时调用 generate 并写回缓存
+
+        Args:
+            call_site: 调用点名称，决定缓存时间（见 LLM_CACHE_TTLS）
+            messages: 发送给模型的消息
+            params: 影响输出的生成参数（模型、温度、最大token数、响应格式等）
+            generate: 实际调用模型的函数，返回 (响应内容, 消耗的 token 数)
+            semantic: 语义查找键，为空时只做精确查找
+            use_cache: 是否读取缓存，创作类调用传 False（新结果仍写回缓存）
+            validate: 响应校验函数，校验失败的响应不写入缓存
+
+        Returns:
+            响应内容
+        """
+        ttl = LLM_CACHE_TTLS.get(call_site, 0)
+        if not (self.enabled and ttl > 0):
+            record_llm_cache_request(call_site, "bypass")
+            content, _ = await generate()
+            return content
+
+        digest = make_cache_key(messages, params)
+        if not use_cache:
+            # 重新生成：不读取缓存，新结果覆盖旧结果
+            record_llm_cache_request(call_site, "refresh")
+            content, _ = await self._generate_and_store(call_site, digest, generate, validate, ttl)
+            return content
+
+        cached = await self._get(call_site, digest)
+        result = "hit"
+
+        vector = None
+        semantic_key = None
+        if cached is None and semantic is not None and self.semantic_enabled:
+            semantic_key = self._get_semantic_key(call_site, params, semantic.scope)
+            vector = await self._embed(semantic.text)
+            if vector is not None:
+                cached = await self._find_similar(call_site, semantic_key, vector)
+                result = "semantic_hit"
+
+        if cached is not None:
+            record_llm_cache_request(call_site, result)
+            record_llm_cache_savings(call_site, cached.total_tokens, cached.latency_ms / 1000)
+            self._stats["hits" if result == "hit" else "semantic_hits"] += 1
+            self._stats["saved_tokens"] += cached.total_tokens
+            return cached.content
+
+        record_llm_cache_request(call_site, "miss")
+        self._stats["misses"] += 1
+
+        content, stored = await self._generate_and_store(call_site, digest, generate, validate, ttl)
+        if stored and vector is not None:
+            await self._index(semantic_key, digest, vector, ttl)
+        return content
+
+    async def _generate_and_store(
+        self,
+        call_site: str,
+        digest: str,
+        generate: Callable[[], Awaitable[Tuple[str, int]]],
+        validate: Optional[Callable[[str], bool]],
+        ttl: int,
+    ) -> Tuple[str, bool]:
+        """调用模型生成响应，校验通过后写入缓存，返回 (响应内容, 是否已写入)"""
+        start = time.perf_counter()
+        content, total_tokens = await generate()
+        latency_ms = int((time.perf_counter() - start) * 1000)
+
+        if validate is not None and not validate(content):
+            return content, False
+        stored = await self._put(
+            call_site, digest, CachedResponse(content, total_tokens, latency_ms), ttl
+        )
+        return content, stored
+
+    async def _get(self, call_site: str, digest: str) -> Optional[CachedResponse]:
+        """按精确键读取缓存"""
+        try:
+            redis_client = await self._get_redis()
+            cached = await redis_client.get(self._get_key(call_site, digest))
+        except Exception as e:
+            logger.warning(f"读取大模型响应缓存失败: {e}")
+            return None
+        if not cached:
+            return None
+        try:
+            return CachedResponse(**json.loads(cached))
+        except (ValueError, TypeError) as e:
+            # 损坏或旧格式的缓存按未命中处理，重新生成后覆盖
+            logger.warning(f"解析大模型响应缓存失败: {e}")
+            return None
+
+    async def _put(
+        self, call_site: str, digest: str, response: CachedResponse, ttl: int
+    ) -> bool:
+        """写入缓存"""
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.setex(
+                self._get_key(call_site, digest),
+                ttl,
+                json.dumps(asdict(response), ensure_ascii=False),
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"写入大模型响应缓存失败: {e}")
+            return False
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """生成归一化的查询向量，失败时返回None（退化为只做精确查找）"""
+        try:
+            if self._embed_func is None:
+                from app.services.embedding_service import get_embedding_service
+
+                self._embed_func = get_embedding_service().generate_embedding
+            vector = np.asarray(await self._embed_func(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"生成语义缓存向量失败: {e}")
+            return None
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    async def _find_similar(
+        self, call_site: str, semantic_key: str, vector: np.ndarray
+    ) -> Optional[CachedResponse]:
+        """在同一语义分区内查找最相似的已缓存请求"""
+        try:
+            redis_client = await self._get_redis()
+            entries = await redis_client.hgetall(semantic_key)
+        except Exception as e:
+            logger.warning(f"读取语义缓存索引失败: {e}")
+            return None
+        if not entries:
+            return None
+
+        # 逐条解码，损坏或维度不同（如更换嵌入模型前写入）的向量从索引中清理
+        digests: List[str] = []
+        vectors: List[np.ndarray] = []
+        broken: List[str] = []
+        for digest, raw in entries.items():
+            try:
+                _, entry_vector = _decode_index_entry(raw)
+            except ValueError:
+                broken.append(digest)
+                continue
+            if entry_vector.shape != vector.shape:
+                broken.append(digest)
+                continue
+            digests.append(digest)
+            vectors.append(entry_vector)
+
+        if broken:
+            logger.warning(f"清理 {len(broken)} 个无效的语义缓存向量: {semantic_key}")
+            try:
+                await redis_client.hdel(semantic_key, *broken)
+            except Exception as e:
+                logger.warning(f"清理语义缓存索引失败: {e}")
+        if not vectors:
+            return None
+
+        try:
+            scores = np.stack(vectors) @ vector
+        except Exception as e:
+            logger.warning(f"计算语义缓存相似度失败: {e}")
+            return None
+        best = int(np.argmax(scores))
+        if scores[best] < get_settings().LLM_RESPONSE_CACHE_SEMANTIC_THRESHOLD:
+            return None
+
+        cached = await self._get(call_site, digests[best])
+        if cached is None:
+            # 响应已过期，清理索引中的向量
+            try:
+                await redis_client.hdel(semantic_key, digests[best])
+            except Exception as e:
+                logger.warning(f"清理语义缓存索引失败: {e}")
+        return cached
+
+    async def _index(
+        self, semantic_key: str, digest: str, vector: np.ndarray, ttl: int
+    ) -> None:
+        """把请求向量加入语义分区，分区满时淘汰最早写入的向量"""
+        try:
+            redis_client = await self._get_redis()
+            max_entries = get_settings().LLM_RESPONSE_CACHE_SEMANTIC_MAX_ENTRIES
+            if await redis_client.hlen(semantic_key) >= max_entries:
+                entries = await redis_client.hgetall(semantic_key)
+                if entries:
+                    oldest = min(entries, key=lambda field: self._inserted_at(entries[field]))
+                    await redis_client.hdel(semantic_key, oldest)
+            await redis_client.hset(semantic_key, digest, _encode_index_entry(vector))
+            await redis_client.expire(semantic_key, ttl)
+        except Exception as e:
+            logger.warning(f"写入语义缓存索引失败: {e}")
+
+    @staticmethod
+    def _inserted_at(raw: str) -> int:
+        """索引条目的写入时间，损坏的条目最先淘汰"""
+        try:
+            return _decode_index_entry(raw)[0]
+        except ValueError:
+            return -1
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            命中/未命中计数、命中率和节省的 token 数
+        """
+        lookups = self._stats["hits"] + self._stats["semantic_hits"] + self._stats["misses"]
+        hits = self._stats["hits"] + self._stats["semantic_hits"]
+        return {
+            **self._stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    async def close(self):
+        """关闭 Redis 连接"""
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+# 全局缓存实例
+_llm_response_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """
+    获取大模型响应缓存实例（单例模式）
+
+    Returns:
+        LLMResponseCache: 缓存实例
+    """
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        _llm_response_cache = LLMResponseCache()
+    return _llm_response_cache
@@ -0,0 +1,182 @@
+"""
+错题分析缓存服务 - AI英语教学系统
+缓存错题AI分析结果，相同的错误答案在不同学生之间复用
+
+缓存策略：
+- Key `cache:mistake_analysis:{sha256}`，由规范化的
+  (题目, 错误答案, 正确答案, 错题类型, 学生水平) 计算
+- 同一道题的同一种错误在成百上千名学生中反复出现，分析结果与学生无关
+- 多个错题通过 MGET / pipeline 一次读写，7天过期
+"""
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+from app.metrics.cache_metrics import record_cache_hit, record_cache_miss
+from app.services.mistake_analysis_schemas import MistakeAnalysisResponse
+from app.services.mistake_service import normalize_answer_text
+
+logger = logging.getLogger(__name__)
+
+_MISTAKE_ANALYSIS_CACHE = "mistake_analysis"
+
+
+def build_analysis_cache_key(
+    question: str,
+    wrong_answer: str,
+    correct_answer: str,
+    mistake_type: str,
+    student_level: Optional[str] = None,
+) -> str:
+    """
+    计算错题分析缓存指纹
+
+    Args:
+        question: 题目内容
+        wrong_answer: 学生的错误答案
+        correct_answer: 正确答案
+        mistake_type: 错题类型
+        student_level: 学生英语水平
+
+    Returns:
+        str: 64位十六进制 SHA-256
+    """
+    parts = [
+        normalize_answer_text(question),
+        normalize_answer_text(wrong_answer),
+        normalize_answer_text(correct_answer),
+        (mistake_type or "").lower(),
+        (student_level or "").upper(),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class MistakeAnalysisCacheService:
+    """
+    错题分析缓存服务
+
+    使用示例：
+        ```python
+        cache = await get_mistake_analysis_cache()
+        cached = await cache.get_many(keys)
+        missing = [key for key in keys if key not in cached]
+        ...
+        await cache.set_many(analyzed)
+        ```
+    """
+
+    # 缓存 Key 前缀
+    _PREFIX = "cache:mistake_analysis:"
+
+    # TTL配置（秒）
+    _TTL = 7 * 24 * 3600  # 7天（分析结果只取决于题目和答案）
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        """
+        初始化缓存服务
+
+        Args:
+            redis_client: Redis 客户端实例，如果未提供则从配置创建
+        """
+        self._redis = redis_client
+        self._settings = None  # 懒加载配置
+
+    async def _get_redis(self) -> redis.Redis:
+        """获取 Redis 客户端（懒加载）"""
+        if self._redis is None:
+            if self._settings is None:
+                self._settings = get_settings()
+            self._redis = redis.from_url(
+                self._settings.REDIS_URL,
+                decode_responses=True,
+                max_connections=self._settings.REDIS_MAX_CONNECTIONS
+            )
+        return self._redis
+
+    def _get_key(self, fingerprint: str) -> str:
+        """获取错题分析缓存 Key"""
+        return f"{self._PREFIX}{fingerprint}"
+
+    async def get_many(self, fingerprints: Iterable[str]) -> Dict[str, MistakeAnalysisResponse]:
+        """
+        批量获取错题分析缓存
+
+        Args:
+            fingerprints: 错题分析指纹列表（build_analysis_cache_key 的结果）
+
+        Returns:
+            Dict[str, MistakeAnalysisResponse]: 命中的分析结果（未命中的指纹不在结果中）
+        """
+        fingerprints = list(fingerprints)
+        if not fingerprints:
+            return {}
+
+        try:
+            redis_client = await self._get_redis()
+            values = await redis_client.mget([self._get_key(fp) for fp in fingerprints])
+        except Exception as e:
+            logger.warning(f"读取错题分析缓存失败: {e}")
+            return {}
+
+        cached = {}
+        for fingerprint, value in zip(fingerprints, values):
+            if not value:
+                record_cache_miss(_MISTAKE_ANALYSIS_CACHE, "redis")
+                continue
+            try:
+                cached[fingerprint] = MistakeAnalysisResponse.model_validate_json(value)
+                record_cache_hit(_MISTAKE_ANALYSIS_CACHE, "redis")
+            except Exception as e:
+                logger.warning(f"错题分析缓存数据无效: {e}")
+                record_cache_miss(_MISTAKE_ANALYSIS_CACHE, "redis")
+        return cached
+
+    async def set_many(self, analyses: Dict[str, MistakeAnalysisResponse]) -> bool:
+        """
+        批量写入错题分析缓存
+
+        Args:
+            analyses: 指纹到分析结果的映射
+
+        Returns:
+            是否设置成功
+        """
+        if not analyses:
+            return True
+
+        try:
+            redis_client = await self._get_redis()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for fingerprint, analysis in analyses.items():
+                    pipe.setex(self._get_key(fingerprint), self._TTL, analysis.model_dump_json())
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"写入错题分析缓存失败: {e}")
+            return False
+
+    async def close(self):
+        """关闭 Redis 连接"""
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+# 全局缓存服务实例
+_mistake_analysis_cache: Optional[MistakeAnalysisCacheService] = None
+
+
+async def get_mistake_analysis_cache() -> MistakeAnalysisCacheService:
+    """
+    获取错题分析缓存服务实例（单例模式）
+
+    Returns:
+        MistakeAnalysisCacheService: 缓存服务实例
+    """
+    global _mistake_analysis_cache
+    if _mistake_analysis_cache is None:
+        _mistake_analysis_cache = MistakeAnalysisCacheService()
+    return _mistake_analysis_cache
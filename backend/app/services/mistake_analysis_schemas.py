@@ -107,3 +107,8 @@ class BatchMistakeAnalysisResponse(BaseModel):
     common_patterns: List[str] = Field(default_factory=list, description="常见错误模式")
     overall_recommendations: List[str] = Field(default_factory=list, description="总体学习建议")
     priority_topics: List[str] = Field(default_factory=list, description="需要重点关注的话题")
+
+
+class PackedMistakeAnalysisResponse(BaseModel):
+    """多道错题合并分析响应（一次提示词分析多道错题）"""
+    analyses: List[MistakeAnalysisResponse] = Field(..., description="按题目编号顺序排列的分析结果")
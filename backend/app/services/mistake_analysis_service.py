@@ -1,20 +1,38 @@
 """
 错题AI分析服务 - AI英语教学系统
 使用AI为错题生成详细解析和个性化学习建议
+
+批量分析：
+1. 按 (题目, 错误答案, 正确答案, 类型, 水平) 指纹去重并读取分析缓存
+2. 未命中的错题每 PACK_SIZE 道合并为一个结构化提示词（共享说明部分）
+3. 各组以有限并发调用AI（调用仍经过智谱AI的速率限制器）
+4. 带 fingerprint_id 的错题在缓存未命中时复用错题指纹上保存的同水平分析，
+   新的分析结果按学生水平写回指纹（由调用方提交事务）；AI失败时的备用分析不写回
 """
+import asyncio
 import json
+import logging
+import uuid
 from typing import Any, Dict, List, Optional
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.ai_service import get_ai_service
+from app.services.mistake_analysis_cache_service import (
+    build_analysis_cache_key,
+    get_mistake_analysis_cache,
+)
+from app.services.mistake_fingerprint_service import get_mistake_fingerprint_service
 from app.services.mistake_analysis_schemas import (
     MistakeAnalysisRequest,
     MistakeAnalysisResponse,
     BatchMistakeAnalysisResponse,
+    PackedMistakeAnalysisResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class MistakeAnalysisService:
     """
@@ -28,6 +46,12 @@ class MistakeAnalysisService:
     5. 制定复习计划
     """
 
+    # 批量分析的最大并发AI调用数（低于智谱AI服务的并发上限，避免占满共享配额）
+    MAX_CONCURRENT_ANALYSES = 4
+
+    # 每个合并提示词包含的错题数（单题时直接使用单题提示词）
+    PACK_SIZE = 4
+
     def __init__(self, db: AsyncSession):
         """
         初始化错题AI分析服务
@@ -37,6 +61,7 @@ class MistakeAnalysisService:
         """
         self.db = db
         self.ai_service = get_ai_service()
+        self.fingerprint_service = get_mistake_fingerprint_service(db)
 
     async def analyze_mistake(
         self,
@@ -48,11 +73,14 @@ class MistakeAnalysisService:
         difficulty_level: Optional[str] = None,
         mistake_count: int = 1,
         student_level: Optional[str] = None,
+        fingerprint_id: Optional[uuid.UUID] = None,
     ) -> MistakeAnalysisResponse:
         """
         分析单个错题
 
         使用AI生成详细的错误解析和学习建议。
+        优先复用缓存和错题指纹上已有的分析结果。
+        AI未返回有效分析时返回备用基础分析，备用分析不写入缓存和错题指纹。
 
         Args:
             question: 题目内容
@@ -63,6 +91,7 @@ class MistakeAnalysisService:
             difficulty_level: 难度等级
             mistake_count: 错误次数
             student_level: 学生英语水平
+            fingerprint_id: 错题指纹ID（可选）
 
         Returns:
             MistakeAnalysisResponse: AI分析结果
@@ -79,21 +108,46 @@ class MistakeAnalysisService:
             student_level=student_level,
         )
 
+        # 相同错误在不同学生之间复用分析结果
+        cache = await get_mistake_analysis_cache()
+        fingerprint = self._cache_key(request_data)
+        cached = await cache.get_many([fingerprint])
+        if fingerprint in cached:
+            return cached[fingerprint]
+
+        stored = await self._load_fingerprint_analyses({fingerprint: fingerprint_id}, student_level)
+        if fingerprint in stored:
+            await cache.set_many(stored)
+            return stored[fingerprint]
+
+        result = await self._analyze_single(request_data)
+        if result is None:
+            return self._create_fallback_analysis(request_data.model_dump())
+
+        await cache.set_many({fingerprint: result})
+        await self._save_fingerprint_analyses(
+            {fingerprint: result}, {fingerprint: fingerprint_id}, student_level
+        )
+        return result
+
+    async def _analyze_single(
+        self, request_data: MistakeAnalysisRequest
+    ) -> Optional[MistakeAnalysisResponse]:
+        """调用AI分析单个错题（JSON模式失败时退回文本模式，仍无法解析时返回None）"""
         # 生成分析提示词
         prompt = self._build_analysis_prompt(request_data)
 
         # 调用AI获取分析结果
         try:
-            response_content = await self.ai_service.generate_json(
-                prompt=prompt,
+            return await self.ai_service.chat_completion_structured(
+                messages=[{"role": "user", "content": prompt}],
                 response_model=MistakeAnalysisResponse,
                 temperature=0.7,  # 适中的创造性
             )
-            return response_content
 
         except Exception as e:
             # 如果JSON模式失败，尝试文本模式然后手动解析
-            print(f"JSON模式失败，尝试文本模式: {e}")
+            logger.warning(f"JSON模式失败，尝试文本模式: {e}")
             return await self._analyze_with_text_mode(request_data)
 
     async def analyze_mistakes_batch(
@@ -105,6 +159,7 @@ class MistakeAnalysisService:
         批量分析错题
 
         对多个错题进行批量分析，识别常见错误模式。
+        相同错误只分析一次并复用缓存，未命中的错题合并提示词后以有限并发调用AI。
 
         Args:
             mistakes_data: 错题数据列表，每个包含：
@@ -115,37 +170,70 @@ class MistakeAnalysisService:
                 - topic: 主题（可选）
                 - difficulty_level: 难度（可选）
                 - mistake_count: 错误次数（可选）
+                - fingerprint_id: 错题指纹ID（可选）
             student_level: 学生英语水平
 
         Returns:
             BatchMistakeAnalysisResponse: 批量分析结果
         """
-        # 逐个分析每个错题
+        requests = [
+            MistakeAnalysisRequest(
+                question=mistake_data["question"],
+                wrong_answer=mistake_data["wrong_answer"],
+                correct_answer=mistake_data["correct_answer"],
+                mistake_type=mistake_data["mistake_type"],
+                topic=mistake_data.get("topic"),
+                difficulty_level=mistake_data.get("difficulty_level"),
+                mistake_count=mistake_data.get("mistake_count", 1),
+                student_level=student_level,
+            )
+            for mistake_data in mistakes_data
+        ]
+        fingerprints = [self._cache_key(request) for request in requests]
+
+        # 同一批次内的相同错误只分析一次
+        unique: Dict[str, MistakeAnalysisRequest] = {}
+        fingerprint_ids: Dict[str, Optional[uuid.UUID]] = {}
+        for fingerprint, request, mistake_data in zip(fingerprints, requests, mistakes_data):
+            unique.setdefault(fingerprint, request)
+            if not fingerprint_ids.get(fingerprint):
+                fingerprint_ids[fingerprint] = mistake_data.get("fingerprint_id")
+
+        cache = await get_mistake_analysis_cache()
+        analyses = await cache.get_many(list(unique))
+
+        # 缓存未命中时复用错题指纹上保存的分析（其他学生已分析过的相同错误）
+        stored = await self._load_fingerprint_analyses(
+            {fp: fingerprint_ids.get(fp) for fp in unique if fp not in analyses},
+            student_level,
+        )
+        if stored:
+            analyses.update(stored)
+            await cache.set_many(stored)
+
+        missing = [(fp, request) for fp, request in unique.items() if fp not in analyses]
+        analyzed = await self._analyze_missing(missing) if missing else {}
+        if analyzed:
+            analyses.update(analyzed)
+            await cache.set_many(analyzed)
+            await self._save_fingerprint_analyses(analyzed, fingerprint_ids, student_level)
+
         results = []
-        for mistake_data in mistakes_data:
-            try:
-                result = await self.analyze_mistake(
-                    question=mistake_data["question"],
-                    wrong_answer=mistake_data["wrong_answer"],
-                    correct_answer=mistake_data["correct_answer"],
-                    mistake_type=mistake_data["mistake_type"],
-                    topic=mistake_data.get("topic"),
-                    difficulty_level=mistake_data.get("difficulty_level"),
-                    mistake_count=mistake_data.get("mistake_count", 1),
-                    student_level=student_level,
-                )
-                results.append(result)
-            except Exception as e:
-                print(f"分析错题失败: {e}")
-                # 创建一个基础的分析结果
-                results.append(self._create_fallback_analysis(mistake_data))
+        for fingerprint, mistake_data in zip(fingerprints, mistakes_data):
+            result = analyses.get(fingerprint)
+            # 分析失败时创建一个基础的分析结果（不写入缓存）
+            results.append(result or self._create_fallback_analysis(mistake_data))
 
         # 生成整体总结
         summary_prompt = self._build_summary_prompt(results, student_level)
-        summary = await self.ai_service.generate_text(
-            prompt=summary_prompt,
-            max_tokens=500,
-        )
+        try:
+            summary = await self.ai_service.chat_completion(
+                messages=[{"role": "user", "content": summary_prompt}],
+                max_tokens=500,
+            )
+        except Exception as e:
+            logger.warning(f"生成批量分析总结失败: {e}")
+            summary = f"本次共分析{len(results)}道错题，请重点复习下方列出的常见错误和知识点。"
 
         # 识别常见错误模式
         common_patterns = await self._identify_common_patterns(results)
@@ -166,6 +254,169 @@ class MistakeAnalysisService:
             priority_topics=priority_topics,
         )
 
+    async def _analyze_missing(
+        self,
+        missing: List[tuple],
+    ) -> Dict[str, MistakeAnalysisResponse]:
+        """
+        有限并发分析缓存未命中的错题
+
+        Args:
+            missing: (指纹, 分析请求) 列表（已去重）
+
+        Returns:
+            Dict[str, MistakeAnalysisResponse]: 分析成功的结果（失败的指纹不在结果中）
+        """
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_ANALYSES)
+
+        async def run_pack(pack: List[tuple]) -> Dict[str, MistakeAnalysisResponse]:
+            async with semaphore:
+                return await self._analyze_pack(pack)
+
+        packs = [missing[i:i + self.PACK_SIZE] for i in range(0, len(missing), self.PACK_SIZE)]
+        analyzed: Dict[str, MistakeAnalysisResponse] = {}
+        for pack_result in await asyncio.gather(*(run_pack(pack) for pack in packs)):
+            analyzed.update(pack_result)
+        return analyzed
+
+    async def _analyze_pack(self, pack: List[tuple]) -> Dict[str, MistakeAnalysisResponse]:
+        """
+        分析一组错题：多道题合并为一个提示词，结果数量不符或失败时逐题分析
+        """
+        if len(pack) > 1:
+            try:
+                response = await self.ai_service.chat_completion_structured(
+                    messages=[{
+                        "role": "user",
+                        "content": self._build_packed_analysis_prompt([r for _, r in pack]),
+                    }],
+                    response_model=PackedMistakeAnalysisResponse,
+                    temperature=0.7,
+                )
+                if len(response.analyses) == len(pack):
+                    return {fp: analysis for (fp, _), analysis in zip(pack, response.analyses)}
+                logger.warning(
+                    f"合并分析返回 {len(response.analyses)} 条结果，期望 {len(pack)} 条，改为逐题分析"
+                )
+            except Exception as e:
+                logger.warning(f"合并分析失败，改为逐题分析: {e}")
+
+        analyzed = {}
+        for fingerprint, request in pack:
+            try:
+                result = await self._analyze_single(request)
+            except Exception as e:
+                logger.warning(f"分析错题失败: {e}")
+                continue
+            if result is not None:
+                analyzed[fingerprint] = result
+        return analyzed
+
+    async def _load_fingerprint_analyses(
+        self,
+        fingerprint_ids: Dict[str, Optional[uuid.UUID]],
+        student_level: Optional[str] = None,
+    ) -> Dict[str, MistakeAnalysisResponse]:
+        """
+        读取错题指纹上保存的同水平分析
+
+        Args:
+            fingerprint_ids: 分析缓存指纹到错题指纹ID的映射
+            student_level: 学生英语水平（与分析缓存键一致）
+
+        Returns:
+            Dict[str, MistakeAnalysisResponse]: 命中的分析结果（按分析缓存指纹）
+        """
+        stored = await self.fingerprint_service.get_analyses(fingerprint_ids.values(), student_level)
+        analyses = {}
+        for fingerprint, fingerprint_id in fingerprint_ids.items():
+            if fingerprint_id not in stored:
+                continue
+            try:
+                analyses[fingerprint] = MistakeAnalysisResponse.model_validate(stored[fingerprint_id])
+            except Exception as e:
+                logger.warning(f"错题指纹分析数据无效: {e}")
+        return analyses
+
+    async def _save_fingerprint_analyses(
+        self,
+        analyses: Dict[str, MistakeAnalysisResponse],
+        fingerprint_ids: Dict[str, Optional[uuid.UUID]],
+        student_level: Optional[str] = None,
+    ) -> None:
+        """将AI生成的分析结果按学生水平写回错题指纹（调用方已排除备用分析，不提交事务）"""
+        await self.fingerprint_service.save_analyses(
+            {
+                fingerprint_ids[fingerprint]: analysis.model_dump(mode="json")
+                for fingerprint, analysis in analyses.items()
+                if fingerprint_ids.get(fingerprint)
+            },
+            student_level,
+        )
+
+    @staticmethod
+    def _cache_key(request: MistakeAnalysisRequest) -> str:
+        """分析请求的缓存指纹"""
+        return build_analysis_cache_key(
+            request.question,
+            request.wrong_answer,
+            request.correct_answer,
+            request.mistake_type,
+            request.student_level,
+        )
+
+    def _build_packed_analysis_prompt(self, requests: List[MistakeAnalysisRequest]) -> str:
+        """
+        构建多道错题合并分析的提示词
+
+        分析要求只出现一次，多道题共享，比逐题提示词节省输入token和请求次数。
+
+        Args:
+            requests: 分析请求列表
+
+        Returns:
+            str: 完整的合并分析提示词
+        """
+        items = []
+        for index, request in enumerate(requests, start=1):
+            instructions = self._get_type_specific_instructions(request.mistake_type)
+            lines = [
+                f"### 第{index}题",
+                f"- **题目类型**: {self._get_mistake_type_name(request.mistake_type)}",
+                f"- **题目**: {request.question}",
+                f"- **学生答案**: {request.wrong_answer}",
+                f"- **正确答案**: {request.correct_answer}",
+                f"- **错误次数**: {request.mistake_count}次",
+            ]
+            if request.topic:
+                lines.append(f"- **主题**: {request.topic}")
+            if request.difficulty_level:
+                lines.append(f"- **难度**: {request.difficulty_level}")
+            lines.append(
+                f"- **专项分析**: {instructions['analysis_field']}: {instructions['analysis_instruction']}"
+            )
+            items.append("\n".join(lines))
+
+        level = requests[0].student_level
+        return f"""你是一位经验丰富的英语教学专家，擅长分析学生的英语错误并提供个性化学习建议。
+
+请分别分析以下{len(requests)}道错题：
+
+{chr(10).join(items)}
+
+{f"学生水平：{level}" if level else ""}
+
+## 分析要求
+
+请以JSON格式返回 {{"analyses": [...]}}，数组中按题号顺序为每道题给出一个分析对象，共{len(requests)}个，每个对象包含：
+mistake_category（错误分类）、severity（"轻微"/"中等"/"严重"）、explanation（详细解释）、
+correct_approach（正确方法）、题目对应的专项分析字段、root_cause（primary_cause/secondary_causes/knowledge_gaps）、
+knowledge_points（3-5个知识点标签）、recommendations（2-4条，含priority/category/title/description）、
+review_plan（review_frequency/next_review_days/mastery_criteria/review_method）、encouragement（一句鼓励语）。
+
+请确保每道题的分析准确、独立，建议具体可行。
+"""
+
     def _build_analysis_prompt(self, request: MistakeAnalysisRequest) -> str:
         """
         构建错题分析的提示词
@@ -393,14 +644,14 @@ class MistakeAnalysisService:
     async def _analyze_with_text_mode(
         self,
         request: MistakeAnalysisRequest,
-    ) -> MistakeAnalysisResponse:
-        """使用文本模式进行分析的备用方法"""
+    ) -> Optional[MistakeAnalysisResponse]:
+        """使用文本模式进行分析的备用方法（响应中没有可解析的JSON时返回None）"""
         prompt = self._build_analysis_prompt(request) + """
 
 请以JSON格式返回结果，确保JSON格式正确。"""
 
-        response_text = await self.ai_service.generate_text(
-            prompt=prompt,
+        response_text = await self.ai_service.chat_completion(
+            messages=[{"role": "user", "content": prompt}],
             max_tokens=2000,
         )
 
@@ -415,16 +666,12 @@ class MistakeAnalysisService:
             if json_match:
                 return MistakeAnalysisResponse.model_validate_json(json_match.group())
 
-        # 如果还是失败，返回基础分析
-        return self._create_fallback_analysis({
-            "question": request.question,
-            "wrong_answer": request.wrong_answer,
-            "correct_answer": request.correct_answer,
-            "mistake_type": request.mistake_type,
-        })
+        # 如果还是失败，由调用方使用备用基础分析（不写入缓存）
+        logger.warning("文本模式响应中没有可解析的JSON")
+        return None
 
     def _create_fallback_analysis(self, mistake_data: Dict[str, Any]) -> MistakeAnalysisResponse:
-        """创建备用基础分析（当AI分析失败时）"""
+        """创建备用基础分析（当AI分析失败时，只用于本次响应，不写入缓存和错题指纹）"""
         from app.services.mistake_analysis_schemas import (
             RootCause,
             LearningRecommendation,
@@ -441,9 +688,9 @@ class MistakeAnalysisService:
             root_cause=RootCause(
                 primary_cause="需要进一步分析",
                 secondary_causes=["基础不牢固", "练习不足"],
-                knowledge_gaps=[mistake_data.get("topic", "相关知识点")],
+                knowledge_gaps=[mistake_data.get("topic") or "相关知识点"],
             ),
-            knowledge_points=[mistake_data.get("topic", "基础")],
+            knowledge_points=[mistake_data.get("topic") or "基础"],
             recommendations=[
                 LearningRecommendation(
                     priority=1,
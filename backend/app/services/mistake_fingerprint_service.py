@@ -0,0 +1,281 @@
+"""
+错题指纹服务 - AI英语教学系统
+维护跨学生共享的错题指纹，并提供按指纹的AI分析复用和"最常见错误"统计
+
+- 错题写入时与错题合并语句在同一事务内 upsert 指纹（调用方负责 commit）
+- AI分析结果按学生水平保存在指纹上（ai_analysis = {水平: 分析}），
+  相同水平的其他学生遇到相同错误时直接复用
+- 班级常见错误：班级学生的错题按 fingerprint_id 分组，再关联小表取展示字段
+"""
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ClassInfo, ClassStudent, Mistake, MistakeFingerprint
+
+logger = logging.getLogger(__name__)
+
+# 未指定学生水平时分析结果使用的键
+DEFAULT_ANALYSIS_LEVEL = "default"
+
+
+def analysis_level_key(student_level: Optional[str]) -> str:
+    """指纹分析按学生水平存放的键"""
+    return student_level or DEFAULT_ANALYSIS_LEVEL
+
+
+class MistakeFingerprintService:
+    """
+    错题指纹服务类
+
+    核心功能：
+    1. 批量 upsert 错题指纹并累加出现次数
+    2. 读取/保存指纹上的共享AI分析
+    3. 按指纹统计全局和班级的最常见错误
+    """
+
+    # 单条 upsert 语句的最大行数
+    _UPSERT_CHUNK_SIZE = 2000
+
+    def __init__(self, db: AsyncSession):
+        """
+        初始化错题指纹服务
+
+        Args:
+            db: 数据库会话
+        """
+        self.db = db
+
+    async def upsert_fingerprints(self, rows: Sequence[Dict[str, Any]]) -> Dict[str, uuid.UUID]:
+        """
+        批量写入错题指纹（INSERT ... ON CONFLICT DO UPDATE，不提交事务）
+
+        Args:
+            rows: 指纹行，每行包含 fingerprint、question_hash、question、
+                wrong_answer、correct_answer、mistake_type、occurrences
+
+        Returns:
+            Dict[str, uuid.UUID]: 指纹到指纹ID的映射
+        """
+        merged: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            current = merged.get(row["fingerprint"])
+            if current is None:
+                merged[row["fingerprint"]] = {
+                    "id": uuid.uuid4(),
+                    "fingerprint": row["fingerprint"],
+                    "question_hash": row["question_hash"],
+                    "question": row["question"],
+                    "wrong_answer": row["wrong_answer"],
+                    "correct_answer": row["correct_answer"],
+                    "mistake_type": row["mistake_type"],
+                    "occurrence_count": row.get("occurrences", 1),
+                }
+            else:
+                current["occurrence_count"] += row.get("occurrences", 1)
+
+        values = list(merged.values())
+        ids: Dict[str, uuid.UUID] = {}
+        for start in range(0, len(values), self._UPSERT_CHUNK_SIZE):
+            stmt = pg_insert(MistakeFingerprint).values(values[start:start + self._UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[MistakeFingerprint.fingerprint],
+                set_={
+                    "occurrence_count": MistakeFingerprint.occurrence_count + stmt.excluded.occurrence_count,
+                    "last_seen_at": func.now(),
+                },
+            ).returning(MistakeFingerprint.id, MistakeFingerprint.fingerprint)
+
+            result = await self.db.execute(stmt)
+            ids.update({fingerprint: fingerprint_id for fingerprint_id, fingerprint in result.all()})
+        return ids
+
+    async def get_analyses(
+        self,
+        fingerprint_ids: Iterable[Optional[uuid.UUID]],
+        student_level: Optional[str] = None,
+    ) -> Dict[uuid.UUID, dict]:
+        """
+        读取指纹上已保存的指定学生水平的AI分析
+
+        Args:
+            fingerprint_ids: 指纹ID列表（None 会被忽略）
+            student_level: 学生英语水平
+
+        Returns:
+            Dict[uuid.UUID, dict]: 指纹ID到分析结果的映射（该水平未分析的指纹不在结果中）
+        """
+        ids = list({fid for fid in fingerprint_ids if fid})
+        if not ids:
+            return {}
+
+        result = await self.db.execute(
+            select(MistakeFingerprint.id, MistakeFingerprint.ai_analysis).where(
+                and_(
+                    MistakeFingerprint.id.in_(ids),
+                    MistakeFingerprint.ai_analysis.isnot(None),
+                )
+            )
+        )
+        level = analysis_level_key(student_level)
+        return {
+            fingerprint_id: by_level[level]
+            for fingerprint_id, by_level in result.all()
+            if isinstance(by_level, dict) and isinstance(by_level.get(level), dict)
+        }
+
+    async def save_analyses(
+        self,
+        analyses: Dict[uuid.UUID, dict],
+        student_level: Optional[str] = None,
+    ) -> None:
+        """
+        保存指定学生水平的AI分析到指纹（保留其他水平的分析，按主键批量更新，不提交事务）
+
+        Args:
+            analyses: 指纹ID到分析结果的映射
+            student_level: 学生英语水平
+        """
+        if not analyses:
+            return
+
+        # 锁定待更新的指纹，避免并发保存不同水平的分析时互相覆盖
+        result = await self.db.execute(
+            select(MistakeFingerprint.id, MistakeFingerprint.ai_analysis)
+            .where(MistakeFingerprint.id.in_(list(analyses)))
+            .with_for_update()
+        )
+        existing = {fingerprint_id: by_level or {} for fingerprint_id, by_level in result.all()}
+
+        level = analysis_level_key(student_level)
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": fingerprint_id,
+                "ai_analysis": {**existing[fingerprint_id], level: analysis},
+                "analyzed_at": now,
+            }
+            for fingerprint_id, analysis in analyses.items()
+            if fingerprint_id in existing
+        ]
+        if rows:
+            await self.db.execute(update(MistakeFingerprint), rows)
+
+    async def get_common_mistakes(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        全局最常见错误（直接读取指纹表）
+
+        Args:
+            limit: 返回数量
+
+        Returns:
+            List[Dict[str, Any]]: 按出现次数降序的错误列表
+        """
+        result = await self.db.execute(
+            select(MistakeFingerprint)
+            .order_by(MistakeFingerprint.occurrence_count.desc())
+            .limit(limit)
+        )
+        return [
+            self._fingerprint_to_dict(fingerprint, occurrences=fingerprint.occurrence_count)
+            for fingerprint in result.scalars().all()
+        ]
+
+    async def get_class_common_mistakes(
+        self,
+        class_id: uuid.UUID,
+        teacher_id: Optional[uuid.UUID] = None,
+        limit: int = 10,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        班级最常见错误（按指纹分组统计班级学生的错题）
+
+        Args:
+            class_id: 班级ID
+            teacher_id: 教师ID（提供时校验班级归属）
+            limit: 返回数量
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: 按出错学生数、出错次数降序的错误列表；
+            班级不存在或不属于该教师时返回 None
+        """
+        class_query = select(ClassInfo.id).where(ClassInfo.id == class_id)
+        if teacher_id is not None:
+            class_query = class_query.where(ClassInfo.head_teacher_id == teacher_id)
+        if (await self.db.execute(class_query)).scalar_one_or_none() is None:
+            return None
+
+        roster = (
+            select(ClassStudent.student_id)
+            .where(
+                and_(
+                    ClassStudent.class_id == class_id,
+                    ClassStudent.enrollment_status == "active",
+                )
+            )
+        )
+        counts = (
+            select(
+                Mistake.fingerprint_id,
+                func.count(func.distinct(Mistake.student_id)).label("student_count"),
+                func.sum(Mistake.mistake_count).label("occurrences"),
+            )
+            .where(
+                and_(
+                    Mistake.student_id.in_(roster),
+                    Mistake.fingerprint_id.isnot(None),
+                )
+            )
+            .group_by(Mistake.fingerprint_id)
+            .order_by(func.count(func.distinct(Mistake.student_id)).desc(), func.sum(Mistake.mistake_count).desc())
+            .limit(limit)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(MistakeFingerprint, counts.c.student_count, counts.c.occurrences)
+            .join(counts, counts.c.fingerprint_id == MistakeFingerprint.id)
+            .order_by(counts.c.student_count.desc(), counts.c.occurrences.desc())
+        )
+        return [
+            self._fingerprint_to_dict(
+                fingerprint, occurrences=int(occurrences or 0), student_count=student_count
+            )
+            for fingerprint, student_count, occurrences in result.all()
+        ]
+
+    @staticmethod
+    def _fingerprint_to_dict(
+        fingerprint: MistakeFingerprint,
+        occurrences: int,
+        student_count: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """将错题指纹转换为展示字典"""
+        item = {
+            "fingerprint_id": str(fingerprint.id),
+            "question": fingerprint.question,
+            "wrong_answer": fingerprint.wrong_answer,
+            "correct_answer": fingerprint.correct_answer,
+            "mistake_type": fingerprint.mistake_type,
+            "occurrences": occurrences,
+            "mistake_category": next(
+                (
+                    analysis.get("mistake_category")
+                    for analysis in (fingerprint.ai_analysis or {}).values()
+                    if isinstance(analysis, dict)
+                ),
+                None,
+            ),
+        }
+        if student_count is not None:
+            item["student_count"] = student_count
+        return item
+
+
+def get_mistake_fingerprint_service(db: AsyncSession) -> MistakeFingerprintService:
+    """获取错题指纹服务实例"""
+    return MistakeFingerprintService(db)
@@ -1,16 +1,50 @@
 """
 智能复习服务 - AI英语教学系统
 基于艾宾浩斯遗忘曲线提供智能错题复习提醒
+
+下次复习时间持久化在 mistakes.next_review_at（创建和每次复习时更新），
+复习清单、紧急复习、推荐和日历均为 (student_id, status, next_review_at)
+索引上的范围查询，优先级分数和日历分桶在 SQL 中计算。
 """
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from sqlalchemy import select, and_, or_, func as sql_func
+from sqlalchemy import Date, select, and_, case, cast, literal, func as sql_func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Mistake, MistakeStatus
 
+# 艾宾浩斯遗忘曲线复习间隔（天）
+EBINGHAUS_INTERVALS = [1, 3, 7, 14, 30]
+
+# 需要复习的错题状态
+_REVIEW_STATUSES = (MistakeStatus.PENDING.value, MistakeStatus.REVIEWING.value)
+
+
+def compute_next_review_at(
+    review_count: int,
+    first_mistaken_at: datetime,
+    last_reviewed_at: Optional[datetime] = None,
+) -> datetime:
+    """
+    计算下次复习时间
+
+    从未复习时基于首次错误时间，否则基于上次复习时间，间隔按复习次数取艾宾浩斯间隔。
+    与迁移 20260210_1000 中回填历史数据的 SQL 表达式保持一致。
+
+    Args:
+        review_count: 已复习次数
+        first_mistaken_at: 首次错误时间
+        last_reviewed_at: 上次复习时间
+
+    Returns:
+        下次复习时间
+    """
+    interval_days = EBINGHAUS_INTERVALS[min(review_count or 0, len(EBINGHAUS_INTERVALS) - 1)]
+    base = first_mistaken_at if last_reviewed_at is None else last_reviewed_at
+    return base + timedelta(days=interval_days)
+
 
 class MistakeReviewService:
     """
@@ -32,11 +66,14 @@ class MistakeReviewService:
     """
 
     # 艾宾浩斯遗忘曲线复习间隔（天）
-    EBINGHAUS_INTERVALS = [1, 3, 7, 14, 30]
+    EBINGHAUS_INTERVALS = EBINGHAUS_INTERVALS
 
     # 紧急复习阈值（小时）- 超过此时间未复习视为紧急
     URGENT_THRESHOLD_HOURS = 24
 
+    # 今日清单中新错题（从未复习）的最大数量
+    NEW_MISTAKE_LIMIT = 5
+
     def __init__(self, db: AsyncSession):
         """
         初始化智能复习服务
@@ -75,15 +112,11 @@ class MistakeReviewService:
         Returns:
             下次复习时间
         """
-        # 获取间隔天数
-        interval_days = self._get_review_interval(mistake.review_count)
-
-        # 如果从未复习，基于首次错误时间
-        if mistake.last_reviewed_at is None:
-            return mistake.first_mistaken_at + timedelta(days=interval_days)
-
-        # 基于上次复习时间计算
-        return mistake.last_reviewed_at + timedelta(days=interval_days)
+        return compute_next_review_at(
+            mistake.review_count,
+            mistake.first_mistaken_at,
+            mistake.last_reviewed_at,
+        )
 
     def is_overdue(self, mistake: Mistake) -> bool:
         """
@@ -160,10 +193,10 @@ class MistakeReviewService:
         """
         获取今日复习清单
 
-        包含：
+        包含（按此顺序，组内按优先级分数排序）：
         - 已过期的错题
         - 即将过期的错题（24小时内）
-        - 从未复习的新错题
+        - 从未复习的新错题（最多5道，清单未满时补充）
 
         Args:
             student_id: 学生ID
@@ -172,76 +205,72 @@ class MistakeReviewService:
         Returns:
             复习清单字典
         """
-        # 获取需要复习的错题
-        query = select(Mistake).where(
-            and_(
-                Mistake.student_id == student_id,
-                Mistake.status.in_([
-                    MistakeStatus.PENDING.value,
-                    MistakeStatus.REVIEWING.value,
-                ]),
+        now = datetime.utcnow()
+        horizon = now + timedelta(hours=self.URGENT_THRESHOLD_HOURS)
+
+        counts = (await self.db.execute(
+            select(
+                sql_func.count(Mistake.id).label("total"),
+                sql_func.count(Mistake.id).filter(Mistake.next_review_at < now).label("overdue"),
+                sql_func.count(Mistake.id).filter(
+                    and_(
+                        Mistake.next_review_at >= now,
+                        Mistake.next_review_at <= horizon,
+                        Mistake.review_count > 0,
+                    )
+                ).label("urgent"),
+            ).where(self._pending_filter(student_id))
+        )).one()
+
+        overdue = Mistake.next_review_at < now
+        score = self._priority_score_expression(now)
+
+        # 已过期 + 即将过期（已复习过）的错题
+        result = await self.db.execute(
+            select(Mistake, overdue.label("is_overdue"))
+            .where(
+                and_(
+                    self._pending_filter(student_id),
+                    Mistake.next_review_at <= horizon,
+                    (Mistake.review_count > 0) | overdue,
+                )
             )
+            .order_by(overdue.desc(), score.desc(), Mistake.next_review_at)
+            .limit(limit)
         )
-
-        result = await self.db.execute(query)
-        all_pending = result.scalars().all()
-
-        # 分类
-        overdue = []  # 已过期
-        urgent = []  # 即将过期
-        new_mistakes = []  # 新错题（从未复习）
-        normal = []  # 正常复习
-
-        now = datetime.utcnow()
-        urgent_threshold = now - timedelta(hours=self.URGENT_THRESHOLD_HOURS)
-
-        for mistake in all_pending:
-            next_review = self.calculate_next_review_time(mistake)
-
-            if mistake.review_count == 0:
-                # 从未复习的新错题
-                if now > mistake.first_mistaken_at + timedelta(days=1):
-                    # 超过1天还没复习
-                    overdue.append(mistake)
-                elif now > mistake.first_mistaken_at:
-                    # 今日需要复习
-                    new_mistakes.append(mistake)
-                else:
-                    normal.append(mistake)
-            elif now > next_review:
-                # 已过期
-                overdue.append(mistake)
-            elif next_review > urgent_threshold:
-                # 即将过期（24小时内）
-                urgent.append(mistake)
-            else:
-                normal.append(mistake)
-
-        # 计算优先级分数并排序
-        def sort_key(m: Mistake) -> float:
-            return -self.get_review_priority_score(m)
-
-        overdue.sort(key=sort_key)
-        urgent.sort(key=sort_key)
-        new_mistakes.sort(key=sort_key)
-        normal.sort(key=sort_key)
-
-        # 合并结果
-        prioritized = overdue + urgent + new_mistakes[:5] + normal[:limit - len(overdue) - len(urgent)]
-
-        # 转换为字典列表
         today_list = [
-            self._mistake_to_review_item(m, "overdue" if m in overdue else "urgent" if m in urgent else "new")
-            for m in prioritized[:limit]
+            self._mistake_to_review_item(mistake, "overdue" if is_overdue else "urgent")
+            for mistake, is_overdue in result.all()
         ]
 
+        # 清单未满时补充从未复习的新错题
+        remaining = min(self.NEW_MISTAKE_LIMIT, limit - len(today_list))
+        if remaining > 0:
+            result = await self.db.execute(
+                select(Mistake)
+                .where(
+                    and_(
+                        self._pending_filter(student_id),
+                        Mistake.next_review_at >= now,
+                        Mistake.next_review_at <= horizon,
+                        Mistake.review_count == 0,
+                    )
+                )
+                .order_by(score.desc(), Mistake.next_review_at)
+                .limit(remaining)
+            )
+            today_list.extend(
+                self._mistake_to_review_item(mistake, "new")
+                for mistake in result.scalars().all()
+            )
+
         return {
             "student_id": str(student_id),
             "date": now.strftime("%Y-%m-%d"),
-            "total_count": len(all_pending),
+            "total_count": counts.total or 0,
             "today_count": len(today_list),
-            "overdue_count": len(overdue),
-            "urgent_count": len(urgent),
+            "overdue_count": counts.overdue or 0,
+            "urgent_count": counts.urgent or 0,
             "review_list": today_list,
         }
 
@@ -258,39 +287,40 @@ class MistakeReviewService:
         Returns:
             紧急复习列表
         """
-        query = select(Mistake).where(
-            and_(
-                Mistake.student_id == student_id,
-                Mistake.status.in_([
-                    MistakeStatus.PENDING.value,
-                    MistakeStatus.REVIEWING.value,
-                ]),
-            )
+        now = datetime.utcnow()
+        due = and_(
+            self._pending_filter(student_id),
+            Mistake.next_review_at <= now + timedelta(hours=self.URGENT_THRESHOLD_HOURS),
         )
 
-        result = await self.db.execute(query)
-        all_pending = result.scalars().all()
-
-        # 筛选紧急项
-        urgent_items = []
-        for mistake in all_pending:
-            if self.is_urgent(mistake):
-                overdue_hours = 0
-                if self.is_overdue(mistake):
-                    next_review = self.calculate_next_review_time(mistake)
-                    overdue_hours = int((datetime.utcnow() - next_review).total_seconds() / 3600)
-
-                urgent_items.append(
-                    self._mistake_to_review_item(mistake, "overdue" if overdue_hours > 0 else "urgent")
-                )
+        total_urgent = (await self.db.execute(
+            select(sql_func.count(Mistake.id)).where(due)
+        )).scalar_one() or 0
 
-        # 按紧急程度排序
-        urgent_items.sort(key=lambda x: (-x["overdue_hours"], -x["mistake_count"]))
+        # 按过期小时数、错误次数排序
+        overdue_hours = sql_func.greatest(
+            sql_func.floor(
+                sql_func.extract("epoch", literal(now) - Mistake.next_review_at) / 3600
+            ),
+            0,
+        )
+        result = await self.db.execute(
+            select(Mistake)
+            .where(due)
+            .order_by(overdue_hours.desc(), Mistake.mistake_count.desc(), Mistake.next_review_at)
+            .limit(limit)
+        )
+
+        urgent_list = []
+        for mistake in result.scalars().all():
+            item = self._mistake_to_review_item(mistake)
+            item["review_type"] = "overdue" if item["overdue_hours"] > 0 else "urgent"
+            urgent_list.append(item)
 
         return {
             "student_id": str(student_id),
-            "total_urgent": len(urgent_items),
-            "urgent_list": urgent_items[:limit],
+            "total_urgent": total_urgent,
+            "urgent_list": urgent_list,
         }
 
     async def get_review_statistics(self, student_id: UUID) -> Dict[str, Any]:
@@ -363,7 +393,7 @@ class MistakeReviewService:
         """
         推荐复习题目（智能排序）
 
-        基于优先级分数排序，推荐最需要复习的错题
+        基于优先级分数排序，推荐最需要复习的错题（分数在 SQL 中计算，只取前N条）
 
         Args:
             student_id: 学生ID
@@ -372,48 +402,26 @@ class MistakeReviewService:
         Returns:
             推荐复习列表
         """
-        query = select(Mistake).where(
-            and_(
-                Mistake.student_id == student_id,
-                Mistake.status.in_([
-                    MistakeStatus.PENDING.value,
-                    MistakeStatus.REVIEWING.value,
-                ]),
-            )
-        )
-
-        result = await self.db.execute(query)
-        all_pending = result.scalars().all()
-
-        # 计算优先级并排序
-        scored = []
-        for mistake in all_pending:
-            score = self.get_review_priority_score(mistake)
-            next_review = self.calculate_next_review_time(mistake)
-
-            scored.append({
-                "mistake": mistake,
-                "score": score,
-                "next_review": next_review,
-                "is_overdue": self.is_overdue(mistake),
-            })
-
-        # 按分数降序排序
-        scored.sort(key=lambda x: (-x["score"], x["next_review"]))
+        now = datetime.utcnow()
+        score = self._priority_score_expression(now)
 
-        # 获取前N个
-        top_mistakes = scored[:limit]
+        result = await self.db.execute(
+            select(Mistake, score.label("score"), (Mistake.next_review_at < now).label("is_overdue"))
+            .where(self._pending_filter(student_id))
+            .order_by(score.desc(), Mistake.next_review_at)
+            .limit(limit)
+        )
+        top_mistakes = result.all()
 
         return {
             "student_id": str(student_id),
             "recommended_count": len(top_mistakes),
             "recommendations": [
                 {
-                    **self._mistake_to_review_item(m["mistake"], "overdue" if m["is_overdue"] else "normal"),
-                    "priority_score": round(m["score"], 1),
-                    "next_review_at": m["next_review"].strftime("%Y-%m-%d %H:%M"),
+                    **self._mistake_to_review_item(mistake, "overdue" if is_overdue else "normal"),
+                    "priority_score": round(float(score_value), 1),
                 }
-                for m in top_mistakes
+                for mistake, score_value, is_overdue in top_mistakes
             ],
         }
 
@@ -423,6 +431,8 @@ class MistakeReviewService:
         """
         获取复习日历（未来N天的复习计划）
 
+        已过期的错题计入今天。
+
         Args:
             student_id: 学生ID
             days: 天数
@@ -430,42 +440,29 @@ class MistakeReviewService:
         Returns:
             复习日历
         """
-        query = select(Mistake).where(
-            and_(
-                Mistake.student_id == student_id,
-                Mistake.status.in_([
-                    MistakeStatus.PENDING.value,
-                    MistakeStatus.REVIEWING.value,
-                ]),
+        today = datetime.utcnow().date()
+        end = today + timedelta(days=days)
+
+        review_date = sql_func.greatest(cast(Mistake.next_review_at, Date), today)
+        result = await self.db.execute(
+            select(Mistake, review_date.label("review_date"))
+            .where(
+                and_(
+                    self._pending_filter(student_id),
+                    Mistake.next_review_at < end,
+                )
             )
+            .order_by(Mistake.next_review_at)
         )
 
-        result = await self.db.execute(query)
-        all_pending = result.scalars().all()
-
-        # 按日期分组
-        calendar: Dict[str, List[Dict]] = {}
-        today = datetime.utcnow().date()
-
-        for mistake in all_pending:
-            next_review = self.calculate_next_review_time(mistake)
-            review_date = next_review.date()
-
-            # 只关注未来days天
-            if review_date < today:
-                review_date = today
-
-            for i in range(days):
-                date = today + timedelta(days=i)
-                date_str = date.strftime("%Y-%m-%d")
-
-                if date_str not in calendar:
-                    calendar[date_str] = []
-
-                if date == review_date:
-                    calendar[date_str].append(
-                        self._mistake_to_review_item(mistake, "scheduled")
-                    )
+        calendar: Dict[str, List[Dict]] = {
+            (today + timedelta(days=i)).strftime("%Y-%m-%d"): []
+            for i in range(days)
+        }
+        for mistake, bucket in result.all():
+            calendar[bucket.strftime("%Y-%m-%d")].append(
+                self._mistake_to_review_item(mistake, "scheduled")
+            )
 
         return {
             "student_id": str(student_id),
@@ -474,6 +471,41 @@ class MistakeReviewService:
             "calendar": calendar,
         }
 
+    @staticmethod
+    def _pending_filter(student_id: UUID):
+        """学生待复习错题的筛选条件（命中复习队列索引）"""
+        return and_(
+            Mistake.student_id == student_id,
+            Mistake.status.in_(_REVIEW_STATUSES),
+        )
+
+    def _priority_score_expression(self, now: datetime):
+        """
+        复习优先级分数的 SQL 表达式，与 get_review_priority_score 保持一致
+        """
+        overdue_days = sql_func.floor(
+            sql_func.extract("epoch", literal(now) - Mistake.next_review_at) / 86400
+        )
+        return (
+            # 1. 过期时间权重（0-40分）
+            case(
+                (Mistake.next_review_at < now, sql_func.least(40, overdue_days * 10 + 20)),
+                (
+                    Mistake.next_review_at <= now + timedelta(hours=self.URGENT_THRESHOLD_HOURS),
+                    20,
+                ),
+                else_=0,
+            )
+            # 2. 错误次数权重（0-30分）
+            + sql_func.least(30, Mistake.mistake_count * 6)
+            # 3. 从未复习奖励（10分）
+            + case((Mistake.review_count == 0, 10), else_=0)
+            # 4. 复习次数惩罚（0-20分）
+            + sql_func.greatest(0, 20 - Mistake.review_count * 4)
+            # 5. 新错题（最近7天内）额外奖励（10分）
+            + case((Mistake.first_mistaken_at > now - timedelta(days=7), 10), else_=0)
+        )
+
     def _mistake_to_review_item(
         self, mistake: Mistake, review_type: str = "normal"
     ) -> Dict[str, Any]:
@@ -2,14 +2,19 @@
 错题本服务 - AI英语教学系统
 处理错题的收集、分析、复习等业务逻辑
 """
+import hashlib
+import re
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
-from sqlalchemy import select, update, and_, or_, func as sql_func
+from sqlalchemy import select, update, and_, or_, case, literal_column, tuple_, func as sql_func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import (
+    ClassInfo,
+    ClassStudent,
     Mistake,
     MistakeStatus,
     MistakeType,
@@ -17,6 +22,64 @@ from app.models import (
     Student,
     Content,
 )
+from app.services.daily_stats_service import get_daily_stats_service
+from app.services.mistake_fingerprint_service import get_mistake_fingerprint_service
+from app.services.mistake_review_service import compute_next_review_at
+
+# 重复出错时重新置为待复习的状态（已忽略的错题保持不变）
+_REOPEN_STATUSES = (MistakeStatus.MASTERED.value, MistakeStatus.REVIEWING.value)
+
+
+# 与迁移中 SQL 的 \s 相同的空白集合（仅 ASCII 空白）。
+# str.split() 还会切分全角空格和 \x1c-\x1f 等字符，会与数据库回填的哈希不一致。
+_WHITESPACE_RE = re.compile(r"[ \t\n\r\f\v]+")
+
+
+def normalize_answer_text(value: str) -> str:
+    """
+    折叠空白并转小写
+
+    与迁移 20260209_1000 / 20260211_1000 中的 SQL 表达式
+    lower(btrim(regexp_replace(coalesce(x, ''), '\\s+', ' ', 'g'))) 保持一致：
+    只折叠 ASCII 空白、只去除首尾空格，
+    保证应用写入的哈希与数据库回填的哈希可以互相匹配。
+    """
+    return _WHITESPACE_RE.sub(" ", value or "").strip(" ").lower()
+
+
+def compute_question_hash(question: str, correct_answer: str) -> str:
+    """
+    计算题目哈希（规范化题干 + 正确答案）
+
+    与迁移 20260209_1000 中回填历史数据的 SQL 表达式保持一致。
+
+    Args:
+        question: 题目内容
+        correct_answer: 正确答案
+
+    Returns:
+        str: 64位十六进制 SHA-256
+    """
+    payload = f"{normalize_answer_text(question)}\x1f{normalize_answer_text(correct_answer)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compute_mistake_fingerprint(question: str, correct_answer: str, wrong_answer: str) -> str:
+    """
+    计算错题指纹（题目哈希 + 规范化错误答案），跨学生共享
+
+    与迁移 20260211_1000 中回填历史数据的 SQL 表达式保持一致。
+
+    Args:
+        question: 题目内容
+        correct_answer: 正确答案
+        wrong_answer: 学生错误答案
+
+    Returns:
+        str: 64位十六进制 SHA-256
+    """
+    payload = f"{compute_question_hash(question, correct_answer)}\x1f{normalize_answer_text(wrong_answer)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 class MistakeService:
@@ -36,6 +99,9 @@ class MistakeService:
     - 根据错题类型识别薄弱知识点
     """
 
+    # 单条合并语句的最大行数（每行约20个参数，asyncpg 单语句参数上限 32767）
+    _MERGE_CHUNK_SIZE = 1000
+
     def __init__(self, db: AsyncSession):
         """
         初始化错题本服务
@@ -44,6 +110,8 @@ class MistakeService:
             db: 数据库会话
         """
         self.db = db
+        self.daily_stats_service = get_daily_stats_service(db)
+        self.fingerprint_service = get_mistake_fingerprint_service(db)
 
     async def create_mistake(
         self,
@@ -77,32 +145,32 @@ class MistakeService:
             topic: 主题分类
             extra_metadata: 扩展元数据
 
+        同一学生的同一道题（规范化题干 + 正确答案相同，见 compute_question_hash）
+        不再新建记录，而是合并到已有错题：累加 mistake_count、更新最新错误答案，
+        已掌握/复习中的错题重新置为待复习，practice_id 保留首次出错的练习。
+
         Returns:
-            Mistake: 创建的错题记录
+            Mistake: 创建或合并后的错题记录，mistake_count > 1 表示合并到了已有错题
         """
-        mistake = Mistake(
+        row = self._build_mistake_row(
             student_id=student_id,
-            practice_id=practice_id,
-            content_id=content_id,
-            mistake_type=mistake_type.value,
             question=question,
             wrong_answer=wrong_answer,
             correct_answer=correct_answer,
+            mistake_type=mistake_type,
+            practice_id=practice_id,
+            content_id=content_id,
             explanation=explanation,
-            knowledge_points=knowledge_points or [],
+            knowledge_points=knowledge_points,
             difficulty_level=difficulty_level,
             topic=topic,
-            extra_metadata=extra_metadata or {},
-            status=MistakeStatus.PENDING.value,
-            first_mistaken_at=datetime.utcnow(),
-            last_mistaken_at=datetime.utcnow(),
+            extra_metadata=extra_metadata,
         )
 
-        self.db.add(mistake)
+        mistakes = await self.merge_mistakes([row])
         await self.db.commit()
-        await self.db.refresh(mistake)
 
-        return mistake
+        return mistakes[0]
 
     async def collect_mistakes_from_practice(
         self,
@@ -111,7 +179,7 @@ class MistakeService:
         """
         从练习记录中自动收集错题
 
-        分析练习记录中的错误答案，自动创建错题记录。
+        分析练习记录中的错误答案，一次合并写入错题本并提交一次事务。
 
         Args:
             practice_id: 练习记录ID
@@ -128,17 +196,244 @@ class MistakeService:
         if practice.status != "completed":
             raise ValueError("练习未完成，无法收集错题")
 
-        # 检查是否已收集过
-        existing_mistakes = await self.db.execute(
-            select(Mistake).where(Mistake.practice_id == practice_id)
-        )
-        if existing_mistakes.scalar_one_or_none():
+        # 检查是否已收集过（重复错题合并后 practice_id 指向首次出错的练习，不能据此判断）
+        if practice.mistakes_collected_at is not None:
             raise ValueError("该练习已收集过错题")
 
-        # 从练习结果中提取错题
-        mistakes = []
+        practice.mistakes_collected_at = datetime.utcnow()
+        rows = self._extract_mistake_rows(practice)
+        if not rows:
+            await self.db.commit()
+            return []
+
+        mistakes = await self.merge_mistakes(rows)
+        await self.db.commit()
+
+        # 同一练习中重复出现的题目合并为一条错题
+        return list({mistake.id: mistake for mistake in mistakes}.values())
+
+    async def collect_mistakes_from_practices(
+        self,
+        practice_ids: Sequence[uuid.UUID],
+    ) -> Dict[uuid.UUID, List[Mistake]]:
+        """
+        批量从练习记录中收集错题（考试结束后整班收集）
+
+        一条语句认领未收集的练习（标记 mistakes_collected_at）、一次查询练习、
+        一条合并写入，整体一次提交。不存在、未完成或已收集过的练习会被跳过。
+
+        Args:
+            practice_ids: 练习记录ID列表
+
+        Returns:
+            Dict[uuid.UUID, List[Mistake]]: 练习ID到收集到的错题列表的映射（仅包含实际收集的练习）
+        """
+        practice_ids = list(dict.fromkeys(practice_ids))
+        if not practice_ids:
+            return {}
+
+        # 条件更新认领练习，并发提交同一批练习时每份练习只会被收集一次
+        claimed = await self.db.execute(
+            update(Practice)
+            .where(
+                and_(
+                    Practice.id.in_(practice_ids),
+                    Practice.status == "completed",
+                    Practice.mistakes_collected_at.is_(None),
+                )
+            )
+            .values(mistakes_collected_at=datetime.utcnow())
+            .returning(Practice.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed_ids = list(claimed.scalars().all())
+        if not claimed_ids:
+            return {}
+
+        result = await self.db.execute(select(Practice).where(Practice.id.in_(claimed_ids)))
+        practices = list(result.scalars().all())
+
+        rows: List[Dict[str, Any]] = []
+        for practice in practices:
+            rows.extend(self._extract_mistake_rows(practice))
+        if not rows:
+            await self.db.commit()
+            return {}
+
+        mistakes = await self.merge_mistakes(rows)
+        await self.db.commit()
+
+        by_practice: Dict[uuid.UUID, Dict[uuid.UUID, Mistake]] = {}
+        for row, mistake in zip(rows, mistakes):
+            by_practice.setdefault(row["practice_id"], {})[mistake.id] = mistake
+        return {
+            practice_id: list(mistakes_by_id.values())
+            for practice_id, mistakes_by_id in by_practice.items()
+        }
+
+    async def filter_teacher_practices(
+        self,
+        practice_ids: Sequence[uuid.UUID],
+        teacher_id: uuid.UUID,
+    ) -> set[uuid.UUID]:
+        """
+        筛选属于教师所带班级在读学生的练习
+
+        Args:
+            practice_ids: 练习记录ID列表
+            teacher_id: 教师ID
+
+        Returns:
+            set[uuid.UUID]: 教师有权收集的练习ID（不存在的练习不会出现在结果中）
+        """
+        if not practice_ids:
+            return set()
+
+        result = await self.db.execute(
+            select(Practice.id)
+            .join(ClassStudent, ClassStudent.student_id == Practice.student_id)
+            .join(ClassInfo, ClassInfo.id == ClassStudent.class_id)
+            .where(
+                and_(
+                    Practice.id.in_(list(practice_ids)),
+                    ClassInfo.head_teacher_id == teacher_id,
+                    ClassStudent.enrollment_status == "active",
+                )
+            )
+            .distinct()
+        )
+        return set(result.scalars().all())
+
+    async def merge_mistakes(self, rows: Sequence[Dict[str, Any]]) -> List[Mistake]:
+        """
+        合并写入错题（INSERT ... ON CONFLICT DO UPDATE，不提交事务）
+
+        以 (student_id, question_hash) 识别同一学生的同一道题：
+        - 新题目插入错题记录
+        - 重复出错的题目累加 mistake_count、更新 last_mistaken_at 和最新错误答案，
+          已掌握/复习中的错题重新置为待复习；practice_id 保留首次出错的练习
+          （练习是否已收集由 Practice.mistakes_collected_at 记录）
+        每行同时累加到跨学生共享的错题指纹，错题的 fingerprint_id 指向最新错误答案的指纹。
+        同一批次内的重复题目先在内存中合并，每个分块只执行一条语句。
+
+        Args:
+            rows: 由 _build_mistake_row 构造的错题行
+
+        Returns:
+            List[Mistake]: 与 rows 一一对应的错题记录（重复行对应同一条记录）
+        """
+        if not rows:
+            return []
+
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            key = (row["student_id"], row["question_hash"])
+            current = merged.get(key)
+            if current is None:
+                merged[key] = dict(row)
+            else:
+                current["mistake_count"] += row["mistake_count"]
+                current["wrong_answer"] = row["wrong_answer"]
+                current["last_mistaken_at"] = row["last_mistaken_at"]
+
+        # 预先读取已有错题的状态，用于维护每日统计中的状态分布
+        existing = await self.db.execute(
+            select(Mistake.student_id, Mistake.question_hash, Mistake.status).where(
+                tuple_(Mistake.student_id, Mistake.question_hash).in_(list(merged))
+            )
+        )
+        old_statuses = {
+            (student_id, question_hash): status
+            for student_id, question_hash, status in existing.all()
+        }
+
+        fingerprints = [
+            compute_mistake_fingerprint(row["question"], row["correct_answer"], row["wrong_answer"])
+            for row in rows
+        ]
+        fingerprint_ids = await self.fingerprint_service.upsert_fingerprints([
+            {
+                "fingerprint": fingerprint,
+                "question_hash": row["question_hash"],
+                "question": row["question"],
+                "wrong_answer": row["wrong_answer"],
+                "correct_answer": row["correct_answer"],
+                "mistake_type": row["mistake_type"],
+                "occurrences": row["mistake_count"],
+            }
+            for row, fingerprint in zip(rows, fingerprints)
+        ])
+        # 行按输入顺序处理，同一题目最终指向最后一次的错误答案
+        for row, fingerprint in zip(rows, fingerprints):
+            merged[(row["student_id"], row["question_hash"])]["fingerprint_id"] = fingerprint_ids.get(fingerprint)
+
+        values = list(merged.values())
+        ids_by_key: Dict[tuple, uuid.UUID] = {}
+        inserted_ids = set()
+        for start in range(0, len(values), self._MERGE_CHUNK_SIZE):
+            chunk = values[start:start + self._MERGE_CHUNK_SIZE]
+            result = await self.db.execute(self._build_merge_statement(chunk))
+            for mistake_id, student_id, question_hash, inserted in result.all():
+                ids_by_key[(student_id, question_hash)] = mistake_id
+                if inserted:
+                    inserted_ids.add(mistake_id)
+
+        loaded = await self.db.execute(
+            select(Mistake)
+            .where(Mistake.id.in_(list(ids_by_key.values())))
+            .execution_options(populate_existing=True)
+        )
+        mistakes_by_id = {mistake.id: mistake for mistake in loaded.scalars().all()}
+
+        await self.daily_stats_service.record_mistakes_created(
+            [mistakes_by_id[mistake_id] for mistake_id in inserted_ids]
+        )
+        for key, mistake_id in ids_by_key.items():
+            old_status = old_statuses.get(key)
+            if mistake_id not in inserted_ids and old_status:
+                await self.daily_stats_service.record_mistake_status_changed(
+                    mistakes_by_id[mistake_id], old_status
+                )
+
+        return [
+            mistakes_by_id[ids_by_key[(row["student_id"], row["question_hash"])]]
+            for row in rows
+        ]
+
+    @staticmethod
+    def _build_merge_statement(values: List[Dict[str, Any]]):
+        """构造批量合并语句，返回 (id, student_id, question_hash, 是否新插入)"""
+        stmt = pg_insert(Mistake).values(values)
+        excluded = stmt.excluded
+        return stmt.on_conflict_do_update(
+            index_elements=[Mistake.student_id, Mistake.question_hash],
+            index_where=Mistake.question_hash.isnot(None),
+            set_={
+                "mistake_count": Mistake.mistake_count + excluded.mistake_count,
+                "last_mistaken_at": excluded.last_mistaken_at,
+                "wrong_answer": excluded.wrong_answer,
+                "fingerprint_id": excluded.fingerprint_id,
+                "status": case(
+                    (
+                        Mistake.status.in_(_REOPEN_STATUSES),
+                        MistakeStatus.PENDING.value,
+                    ),
+                    else_=Mistake.status,
+                ),
+                "updated_at": sql_func.now(),
+            },
+        ).returning(
+            Mistake.id,
+            Mistake.student_id,
+            Mistake.question_hash,
+            # xmax = 0 表示本行由 INSERT 产生，而非冲突后 UPDATE
+            literal_column("xmax = 0").label("inserted"),
+        )
+
+    def _extract_mistake_rows(self, practice: Practice) -> List[Dict[str, Any]]:
+        """从练习答案中提取错题行"""
+        rows = []
         answers = practice.answers or {}
-        result_details = practice.result_details or {}
 
         # 假设answers格式为: {question_index: {question, user_answer, correct_answer, is_correct}}
         for question_idx, answer_data in answers.items():
@@ -149,13 +444,13 @@ class MistakeService:
                     answer_data.get("question_type"),
                 )
 
-                mistake = await self.create_mistake(
+                rows.append(self._build_mistake_row(
                     student_id=practice.student_id,
                     question=answer_data.get("question", ""),
                     wrong_answer=answer_data.get("user_answer", ""),
                     correct_answer=answer_data.get("correct_answer", ""),
                     mistake_type=mistake_type,
-                    practice_id=practice_id,
+                    practice_id=practice.id,
                     content_id=practice.content_id,
                     difficulty_level=practice.difficulty_level,
                     topic=practice.topic,
@@ -164,10 +459,52 @@ class MistakeService:
                         "question_type": answer_data.get("question_type"),
                         "options": answer_data.get("options"),
                     },
-                )
-                mistakes.append(mistake)
+                ))
 
-        return mistakes
+        return rows
+
+    @staticmethod
+    def _build_mistake_row(
+        student_id: uuid.UUID,
+        question: str,
+        wrong_answer: str,
+        correct_answer: str,
+        mistake_type: MistakeType,
+        practice_id: Optional[uuid.UUID] = None,
+        content_id: Optional[uuid.UUID] = None,
+        explanation: Optional[str] = None,
+        knowledge_points: Optional[List[str]] = None,
+        difficulty_level: Optional[str] = None,
+        topic: Optional[str] = None,
+        extra_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """构造合并写入用的错题行（多行 VALUES 要求每行列集合一致）"""
+        now = datetime.utcnow()
+        return {
+            "id": uuid.uuid4(),
+            "student_id": student_id,
+            "practice_id": practice_id,
+            "content_id": content_id,
+            "mistake_type": mistake_type.value,
+            "status": MistakeStatus.PENDING.value,
+            "question": question,
+            "wrong_answer": wrong_answer,
+            "correct_answer": correct_answer,
+            "question_hash": compute_question_hash(question, correct_answer),
+            "fingerprint_id": None,
+            "explanation": explanation,
+            "knowledge_points": knowledge_points or [],
+            "difficulty_level": difficulty_level,
+            "topic": topic,
+            "mistake_count": 1,
+            "review_count": 0,
+            "needs_ai_analysis": True,
+            "ai_analysis": {},
+            "extra_metadata": extra_metadata or {},
+            "first_mistaken_at": now,
+            "last_mistaken_at": now,
+            "next_review_at": compute_next_review_at(0, now),
+        }
 
     async def get_mistake(
         self,
@@ -274,13 +611,18 @@ class MistakeService:
         """
         mistake = await self.get_mistake(mistake_id)
 
+        old_status = mistake.status
         mistake.status = status.value
 
         # 如果开始复习，更新复习时间
         if status == MistakeStatus.REVIEWING:
             mistake.last_reviewed_at = datetime.utcnow()
             mistake.review_count += 1
+            mistake.next_review_at = compute_next_review_at(
+                mistake.review_count, mistake.first_mistaken_at, mistake.last_reviewed_at
+            )
 
+        await self.daily_stats_service.record_mistake_status_changed(mistake, old_status)
         await self.db.commit()
         await self.db.refresh(mistake)
 
@@ -307,10 +649,14 @@ class MistakeService:
                 - review_count: 复习次数
         """
         mistake = await self.get_mistake(mistake_id)
+        old_status = mistake.status
 
-        # 更新复习次数
+        # 更新复习次数和下次复习时间
         mistake.review_count += 1
         mistake.last_reviewed_at = datetime.utcnow()
+        mistake.next_review_at = compute_next_review_at(
+            mistake.review_count, mistake.first_mistaken_at, mistake.last_reviewed_at
+        )
 
         mastered = False
 
@@ -328,6 +674,7 @@ class MistakeService:
             mistake.mistake_count += 1
             mistake.last_mistaken_at = datetime.utcnow()
 
+        await self.daily_stats_service.record_mistake_status_changed(mistake, old_status)
         await self.db.commit()
         await self.db.refresh(mistake)
 
@@ -10,7 +10,7 @@ PDF渲染服务 - AI英语教学系统
 import asyncio
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Dict, Optional
 
 from jinja2 import Environment, Template
 from weasyprint import CSS, HTML
@@ -280,7 +280,8 @@ class PdfRendererService:
         self,
         html_content: str,
         pdf_css: CSS,
-    ) -> bytes:
+        target: Optional[BinaryIO] = None,
+    ) -> Optional[bytes]:
         """
         同步方法：将 HTML 内容转换为 PDF
         在线程池中执行以避免阻塞事件循环
@@ -288,9 +289,10 @@ class PdfRendererService:
         Args:
             html_content: HTML 内容
             pdf_css: CSS 样式对象
+            target: 输出流（可选），提供时 PDF 直接顺序写入该流
 
         Returns:
-            PDF 字节数据
+            PDF 字节数据；提供 target 时返回 None
         """
         # 创建 HTML 对象并生成 PDF
         html_doc = HTML(
@@ -301,6 +303,7 @@ class PdfRendererService:
 
         # 生成 PDF 字节流（同步操作，在线程池中执行）
         pdf_bytes = html_doc.write_pdf(
+            target=target,
             stylesheets=[pdf_css],
             font_config=self.font_config,
             optimize_images=False,  # 不优化图片，保持原始质量
@@ -380,6 +383,50 @@ class PdfRendererService:
             logger.error(f"Failed to render PDF: {e}")
             raise RuntimeError(f"PDF rendering failed: {e}") from e
 
+    async def write_markdown_to_pdf(
+        self,
+        markdown_content: str,
+        target: BinaryIO,
+        title: str = "错题本",
+    ) -> None:
+        """
+        将 Markdown 内容渲染为 PDF 并写入输出流
+
+        PDF 在线程池中边渲染边写入 target，不在内存中保留完整的 PDF 字节。
+        target 的 write 可以阻塞（用于流式传输的背压）。
+
+        Args:
+            markdown_content: Markdown 格式的文本
+            target: 只需支持 write 的输出流
+            title: 文档标题
+
+        Raises:
+            ValueError: 输入内容为空
+            RuntimeError: PDF 生成失败
+        """
+        if not markdown_content:
+            raise ValueError("Markdown content cannot be empty")
+
+        try:
+            html_content = await self.markdown_to_html(markdown_content)
+            styled_html = await self.apply_pdf_styles(html_content, title)
+            pdf_css = await self._get_pdf_css()
+
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                self.get_executor(),
+                self._html_to_pdf_sync,
+                styled_html,
+                pdf_css,
+                target,
+            )
+
+            logger.info(f"PDF streamed successfully: {title}")
+
+        except Exception as e:
+            logger.error(f"Failed to render PDF: {e}")
+            raise RuntimeError(f"PDF rendering failed: {e}") from e
+
     async def render_template_to_pdf(
         self,
         template_name: str,
@@ -3,14 +3,17 @@
 处理练习记录的业务逻辑，包括自动更新知识图谱
 """
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Practice, PracticeStatus, PracticeType, Content, Student
+from app.services.class_summary_service import get_class_summary_service
+from app.services.daily_stats_service import get_daily_stats_service
 from app.services.knowledge_graph_service import get_knowledge_graph_service
+from app.services.recommendation_cache_service import get_recommendation_cache
 
 
 class PracticeService:
@@ -39,6 +42,8 @@ class PracticeService:
         """
         self.db = db
         self.kg_service = get_knowledge_graph_service()
+        self.daily_stats_service = get_daily_stats_service(db)
+        self.class_summary_service = get_class_summary_service(db)
 
     async def create_practice(
         self,
@@ -63,6 +68,8 @@ class PracticeService:
         Returns:
             Practice: 创建的练习记录
         """
+        # created_at 显式赋值，每日统计按该日期归档
+        now = datetime.utcnow()
         practice = Practice(
             student_id=student_id,
             content_id=content_id,
@@ -71,10 +78,12 @@ class PracticeService:
             total_questions=total_questions,
             difficulty_level=difficulty_level,
             topic=topic,
-            started_at=datetime.utcnow(),
+            started_at=now,
+            created_at=now,
         )
 
         self.db.add(practice)
+        await self.daily_stats_service.record_practice_created(practice)
         await self.db.commit()
         await self.db.refresh(practice)
 
@@ -134,9 +143,14 @@ class PracticeService:
             # 计算得分
             practice.score = correct_rate * 100
 
+            await self.daily_stats_service.record_practice_completed(practice)
+
         await self.db.commit()
         await self.db.refresh(practice)
 
+        if practice.status == PracticeStatus.COMPLETED.value:
+            await self.class_summary_service.invalidate_for_student(practice.student_id)
+
         return practice
 
     async def complete_practice(
@@ -236,9 +250,17 @@ class PracticeService:
                 "error": str(e),
             }
 
+        # 与练习状态在同一事务内更新每日统计
+        await self.daily_stats_service.record_practice_completed(practice)
+
         await self.db.commit()
         await self.db.refresh(practice)
 
+        # 练习完成（及图谱更新）后，当日推荐需要重新生成
+        cache = await get_recommendation_cache()
+        await cache.invalidate_daily(practice.student_id)
+        await self.class_summary_service.invalidate_for_student(practice.student_id)
+
         return {
             "practice": practice,
             "graph_updated": graph_updated,
@@ -333,75 +355,69 @@ class PracticeService:
                 - by_difficulty: 按难度统计
                 - recent_activity: 近期活动
         """
-        # 获取所有练习
-        query = select(Practice).where(Practice.student_id == student_id)
-        result = await self.db.execute(query)
-        all_practices = result.scalars().all()
-
-        # 基础统计
-        total_practices = len(all_practices)
-        completed_practices = [
-            p for p in all_practices
-            if p.status == PracticeStatus.COMPLETED.value
-        ]
-
-        # 平均得分
-        scores = [
-            p.score for p in completed_practices
-            if p.score is not None
-        ]
-        average_score = sum(scores) / len(scores) if scores else 0
-
-        # 总耗时
-        total_time_spent = sum(p.time_spent for p in all_practices)
-
-        # 按类型统计
+        # 总量、得分、耗时、近期活动读取每日统计汇总（O(天数)）
+        daily_rows = await self.daily_stats_service.get_daily_stats(student_id)
+        summary = self.daily_stats_service.summarize_rows(daily_rows)
+
+        # 近期活动（最近7天）
+        week_ago = (datetime.utcnow() - timedelta(days=7)).date()
+        recent_activity = sum(
+            row.practice_count for row in daily_rows if row.stat_date >= week_ago
+        )
+
+        # 按类型/难度分布由数据库分组计数，不加载练习记录
+        result = await self.db.execute(
+            select(
+                Practice.practice_type,
+                Practice.difficulty_level,
+                func.count(Practice.id).label("total"),
+                func.count(Practice.id).filter(
+                    Practice.status == PracticeStatus.COMPLETED.value
+                ).label("completed"),
+                func.sum(Practice.score).label("score_sum"),
+                func.count(Practice.score).label("score_count"),
+            )
+            .where(Practice.student_id == student_id)
+            .group_by(Practice.practice_type, Practice.difficulty_level)
+        )
+
         by_type: Dict[str, Dict[str, Any]] = {}
-        for practice in all_practices:
-            ptype = practice.practice_type
-            if ptype not in by_type:
-                by_type[ptype] = {
-                    "total": 0,
-                    "completed": 0,
-                    "average_score": 0,
-                }
-            by_type[ptype]["total"] += 1
-            if practice.status == PracticeStatus.COMPLETED.value:
-                by_type[ptype]["completed"] += 1
+        type_scores: Dict[str, List[float]] = {}
+        by_difficulty: Dict[str, int] = {}
+        for row in result.all():
+            stats = by_type.setdefault(
+                row.practice_type, {"total": 0, "completed": 0, "average_score": 0}
+            )
+            stats["total"] += row.total
+            stats["completed"] += row.completed
+            score = type_scores.setdefault(row.practice_type, [0.0, 0])
+            score[0] += float(row.score_sum or 0)
+            score[1] += row.score_count
+
+            if row.difficulty_level:
+                by_difficulty[row.difficulty_level] = (
+                    by_difficulty.get(row.difficulty_level, 0) + row.total
+                )
 
         # 计算各类型平均分
-        for ptype, stats in by_type.items():
-            type_scores = [
-                p.score for p in all_practices
-                if p.practice_type == ptype and p.score is not None
-            ]
-            if type_scores:
-                stats["average_score"] = sum(type_scores) / len(type_scores)
-
-        # 按难度统计
-        by_difficulty: Dict[str, int] = {}
-        for practice in all_practices:
-            if practice.difficulty_level:
-                difficulty = practice.difficulty_level
-                by_difficulty[difficulty] = by_difficulty.get(difficulty, 0) + 1
+        for ptype, (score_sum, score_count) in type_scores.items():
+            if score_count:
+                by_type[ptype]["average_score"] = score_sum / score_count
 
-        # 近期活动（最近7天）
-        from datetime import timedelta
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_activity = [
-            p for p in all_practices
-            if p.created_at >= week_ago
-        ]
+        total_practices = summary["practice_count"]
+        completed_practices = summary["completed_count"]
+        average_score = summary["avg_score"]
+        total_time_spent = summary["time_spent_seconds"]
 
         return {
             "student_id": str(student_id),
             "total_practices": total_practices,
-            "completed_practices": len(completed_practices),
+            "completed_practices": completed_practices,
             "average_score": round(average_score, 2),
             "total_time_spent": total_time_spent,
             "by_type": by_type,
             "by_difficulty": by_difficulty,
-            "recent_activity_count": len(recent_activity),
+            "recent_activity_count": recent_activity,
         }
 
     async def _get_practice(self, practice_id: uuid.UUID) -> Practice:
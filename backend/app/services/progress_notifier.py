@@ -1,44 +1,243 @@
 """
 进度通知服务
 提供统一的进度更新、完成通知和错误通知接口
+
+进度更新经过合并（coalesce）后再推送：
+- 距上次推送超过最小间隔，或进度变化达到最小幅度时立即推送
+- 其余更新只保留最新值，在最小间隔到期后补发（后值覆盖前值）
+- 完成、失败、取消前先补发未推送的最新进度，保证客户端看到最终状态
+- 长时间没有更新且未收到结束通知的合并器会被释放，避免常驻内存
 """
 
+import asyncio
 import logging
-from typing import Optional
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
 
+from app.core.config import get_settings
 from app.websocket.export_manager import ExportConnectionManager, export_manager
 
 logger = logging.getLogger(__name__)
 
 
-class ProgressNotifier:
+class ProgressCoalescer:
     """
-    进度通知服务
+    单个任务的进度合并器
 
-    封装 WebSocket 连接管理器，提供简洁的进度通知接口
+    使用示例：
+        ```python
+        coalescer = ProgressCoalescer(send, min_interval=0.5, min_delta=5)
+        for percent in range(101):
+            await coalescer.update(percent, "生成中...")
+        await coalescer.close()  # 补发最后一次进度
+        ```
     """
 
-    def __init__(self, manager: Optional[ExportConnectionManager] = None) -> None:
+    def __init__(
+        self,
+        send: Callable[[int, str], Awaitable[bool]],
+        min_interval: Optional[float] = None,
+        min_delta: Optional[int] = None,
+    ) -> None:
         """
-        初始化进度通知服务
+        初始化进度合并器
 
         Args:
-            manager: WebSocket 连接管理器，默认使用全局单例
+            send: 实际推送进度的函数 (progress, message) -> 是否成功
+            min_interval: 两次推送的最小间隔（秒），默认读取配置
+            min_delta: 不受间隔限制、立即推送的最小进度变化（百分点），默认读取配置
         """
-        self.manager = manager or export_manager
+        settings = get_settings()
+        self._send = send
+        self.min_interval = settings.EXPORT_PROGRESS_MIN_INTERVAL if min_interval is None else min_interval
+        self.min_delta = settings.EXPORT_PROGRESS_MIN_DELTA if min_delta is None else min_delta
+        self._last_sent: Optional[Tuple[int, str]] = None
+        self._last_sent_at = 0.0
+        self._pending: Optional[Tuple[int, str]] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # 同步回调提交的、尚未完成的进度更新
+        self._tasks: Set[asyncio.Task] = set()
+        self.last_activity = time.monotonic()
+        # 统计：实际推送数和被合并掉的更新数
+        self.sent_count = 0
+        self.dropped_count = 0
 
-    async def notify_progress(self, task_id: str, progress: int, message: str) -> bool:
+    def _should_send(self, progress: int, now: float) -> bool:
+        if self._last_sent is None:
+            return True
+        last_progress = self._last_sent[0]
+        if progress >= 100 or progress < last_progress:
+            return True
+        if progress == last_progress:
+            return False
+        return (
+            progress - last_progress >= self.min_delta
+            or now - self._last_sent_at >= self.min_interval
+        )
+
+    async def _emit(self, progress: int, message: str) -> bool:
+        self._cancel_scheduled_flush()
+        self._pending = None
+        self._last_sent = (progress, message)
+        self._last_sent_at = time.monotonic()
+        self.sent_count += 1
+        return await self._send(progress, message)
+
+    def _cancel_scheduled_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def _schedule_flush(self, now: float) -> None:
+        if self._flush_handle is not None:
+            return
+        delay = max(0.0, self.min_interval - (now - self._last_sent_at))
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def update(self, progress: int, message: str) -> bool:
         """
-        通知进度更新
+        提交一次进度更新
 
         Args:
-            task_id: 任务ID
             progress: 进度百分比 (0-100)
             message: 进度描述消息
 
         Returns:
-            bool: 通知是否成功
+            bool: 立即推送时返回推送结果；被合并延后时返回 True
+        """
+        now = time.monotonic()
+        self.last_activity = now
+        if self._should_send(progress, now):
+            return await self._emit(progress, message)
+
+        self.dropped_count += 1
+        if progress == self._last_sent[0]:
+            # 与上次推送的进度相同，无需补发
+            return True
+
+        # 只保留最新值，在最小间隔到期后补发
+        self._pending = (progress, message)
+        self._schedule_flush(now)
+        return True
+
+    def submit(self, progress: int, message: str) -> None:
+        """
+        在事件循环中提交一次进度更新（供同步回调使用）
+
+        提交的更新在 close 时等待完成，不会在任务结束后才推送。
+        """
+        task = asyncio.get_running_loop().create_task(self.update(progress, message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def is_idle(self, now: float, idle_timeout: float) -> bool:
+        """是否已空闲超过 idle_timeout 秒且没有待推送的进度"""
+        return (
+            not self._tasks
+            and self._pending is None
+            and self._flush_handle is None
+            and (self._flush_task is None or self._flush_task.done())
+            and now - self.last_activity >= idle_timeout
+        )
+
+    async def flush(self) -> bool:
+        """
+        立即推送尚未推送的最新进度
+
+        Returns:
+            bool: 是否推送成功（没有待推送进度时返回 True）
+        """
+        if self._pending is None:
+            self._cancel_scheduled_flush()
+            return True
+        return await self._emit(*self._pending)
+
+    async def close(self) -> bool:
+        """补发最终进度并停止定时补发（任务结束时调用）"""
+        self._cancel_scheduled_flush()
+        # 等待回调提交的进度更新，保证它们先于最终状态推送
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._cancel_scheduled_flush()
+        # 等待正在进行的定时补发完成，保证推送顺序
+        if self._flush_task is not None and not self._flush_task.done():
+            try:
+                await self._flush_task
+            except Exception:
+                pass
+        return await self.flush()
+
+
+class ProgressNotifier:
+    """
+    进度通知服务
+
+    封装 WebSocket 连接管理器，提供简洁的进度通知接口
+    """
+
+    def __init__(
+        self,
+        manager: Optional[ExportConnectionManager] = None,
+        min_interval: Optional[float] = None,
+        min_delta: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+    ) -> None:
         """
+        初始化进度通知服务
+
+        Args:
+            manager: WebSocket 连接管理器，默认使用全局单例
+            min_interval: 进度推送的最小间隔（秒），默认读取配置
+            min_delta: 立即推送的最小进度变化（百分点），默认读取配置
+            idle_timeout: 合并器空闲多少秒后释放，默认读取配置
+        """
+        self.manager = manager or export_manager
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self.idle_timeout = (
+            get_settings().EXPORT_PROGRESS_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        )
+        # task_id -> 进度合并器
+        self._coalescers: Dict[str, ProgressCoalescer] = {}
+
+    def _get_coalescer(self, task_id: str) -> ProgressCoalescer:
+        coalescer = self._coalescers.get(task_id)
+        if coalescer is None:
+            self._expire_idle()
+
+            async def send(progress: int, message: str) -> bool:
+                return await self._send_progress(task_id, progress, message)
+
+            coalescer = ProgressCoalescer(send, self.min_interval, self.min_delta)
+            self._coalescers[task_id] = coalescer
+        return coalescer
+
+    def _expire_idle(self) -> None:
+        """释放长时间没有更新的合并器（任务异常退出、未发送结束通知）"""
+        now = time.monotonic()
+        expired = [
+            task_id for task_id, coalescer in self._coalescers.items()
+            if coalescer.is_idle(now, self.idle_timeout)
+        ]
+        for task_id in expired:
+            del self._coalescers[task_id]
+        if expired:
+            logger.debug(f"释放 {len(expired)} 个空闲的进度合并器")
+
+    async def _finish(self, task_id: str) -> None:
+        """任务结束前补发最终进度并释放合并器"""
+        coalescer = self._coalescers.pop(task_id, None)
+        if coalescer is not None:
+            await coalescer.close()
+
+    async def _send_progress(self, task_id: str, progress: int, message: str) -> bool:
+        """推送一次进度（已经过合并）"""
         try:
             success = await self.manager.broadcast_progress(task_id, progress, message)
             if success:
@@ -48,6 +247,37 @@ class ProgressNotifier:
             logger.error(f"通知任务 {task_id} 进度失败: {e}", exc_info=e)
             return False
 
+    async def notify_progress(self, task_id: str, progress: int, message: str) -> bool:
+        """
+        通知进度更新（经过合并，冗余的中间进度不会推送）
+
+        Args:
+            task_id: 任务ID
+            progress: 进度百分比 (0-100)
+            message: 进度描述消息
+
+        Returns:
+            bool: 通知是否成功（被合并延后时返回 True）
+        """
+        return await self._get_coalescer(task_id).update(progress, message)
+
+    def progress_callback(self, task_id: str, message: str) -> Callable[[int], None]:
+        """
+        创建可传给 StreamingDocumentService 的同步进度回调
+
+        Args:
+            task_id: 任务ID
+            message: 进度描述消息
+
+        Returns:
+            Callable[[int], None]: 进度回调函数，须在事件循环线程中调用；
+            回调提交的更新在 notify_complete/notify_error/notify_cancelled 前推送完毕
+        """
+        def callback(percent: int) -> None:
+            self._get_coalescer(task_id).submit(percent, message)
+
+        return callback
+
     async def notify_complete(self, task_id: str, download_url: Optional[str] = None) -> bool:
         """
         通知任务完成
@@ -59,6 +289,7 @@ class ProgressNotifier:
         Returns:
             bool: 通知是否成功
         """
+        await self._finish(task_id)
         try:
             success = await self.manager.notify_complete(task_id, download_url)
             if success:
@@ -79,6 +310,7 @@ class ProgressNotifier:
         Returns:
             bool: 通知是否成功
         """
+        await self._finish(task_id)
         try:
             success = await self.manager.notify_error(task_id, error_message)
             if success:
@@ -98,6 +330,7 @@ class ProgressNotifier:
         Returns:
             bool: 通知是否成功
         """
+        await self._finish(task_id)
         try:
             success = await self.manager.notify_cancelled(task_id)
             if success:
@@ -0,0 +1,239 @@
+"""
+推荐结果缓存服务 - AI英语教学系统
+将每日推荐结果按 (学生, 日期) 物化到Redis，接口路径只需读取缓存
+
+缓存策略：
+- 每日推荐：Hash `cache:recommend:daily:{student_id}:{date}`，字段为过滤条件指纹，
+  练习完成 / 知识图谱更新 / 偏好修改时整体删除，次日自然过期
+- LLM精排结果：按精排输入（候选内容 + 画像摘要）的哈希缓存7天，
+  候选集合不变时刷新每日推荐也不会重复调用LLM
+"""
+import hashlib
+import json
+import logging
+import uuid
+from datetime import date, datetime
+from typing import List, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+from app.metrics.cache_metrics import record_cache_hit, record_cache_miss
+from app.schemas.recommendation import DailyContentResponse, RecommendationFilter
+
+logger = logging.getLogger(__name__)
+
+_DAILY_CACHE = "recommendation_daily"
+_RERANK_CACHE = "recommendation_rerank"
+
+
+class RecommendationCacheService:
+    """
+    推荐结果缓存服务
+
+    使用示例：
+        ```python
+        cache = await get_recommendation_cache()
+        response = await cache.get_daily(student_id, filter_params)
+        if response is None:
+            response = await build(...)
+            await cache.set_daily(student_id, response, filter_params)
+        ```
+    """
+
+    # 缓存 Key 前缀
+    _DAILY_PREFIX = "cache:recommend:daily:"
+    _RERANK_PREFIX = "cache:recommend:rerank:"
+
+    # TTL配置（秒）
+    _DAILY_TTL = 26 * 3600  # 覆盖当天，并给跨时区/预计算留出余量
+    _RERANK_TTL = 7 * 24 * 3600  # 7天（同样的候选和画像，精排结果稳定）
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        """
+        初始化缓存服务
+
+        Args:
+            redis_client: Redis 客户端实例，如果未提供则从配置创建
+        """
+        self._redis = redis_client
+        self._settings = None  # 懒加载配置
+
+    async def _get_redis(self) -> redis.Redis:
+        """获取 Redis 客户端（懒加载）"""
+        if self._redis is None:
+            if self._settings is None:
+                self._settings = get_settings()
+            self._redis = redis.from_url(
+                self._settings.REDIS_URL,
+                decode_responses=True,
+                max_connections=self._settings.REDIS_MAX_CONNECTIONS
+            )
+        return self._redis
+
+    def _get_daily_key(self, student_id: uuid.UUID, day: Optional[date] = None) -> str:
+        """获取每日推荐缓存 Key"""
+        day = day or datetime.now().date()
+        return f"{self._DAILY_PREFIX}{student_id}:{day.isoformat()}"
+
+    @staticmethod
+    def _get_filter_field(filter_params: Optional[RecommendationFilter]) -> str:
+        """获取过滤条件对应的 Hash 字段"""
+        if filter_params is None:
+            return "default"
+        payload = filter_params.model_dump_json(exclude_none=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _get_rerank_key(self, rerank_input: str) -> str:
+        """获取精排结果缓存 Key"""
+        digest = hashlib.sha256(rerank_input.encode("utf-8")).hexdigest()
+        return f"{self._RERANK_PREFIX}{digest}"
+
+    async def get_daily(
+        self,
+        student_id: uuid.UUID,
+        filter_params: Optional[RecommendationFilter] = None,
+    ) -> Optional[DailyContentResponse]:
+        """
+        获取当日推荐缓存
+
+        Args:
+            student_id: 学生ID
+            filter_params: 推荐过滤条件
+
+        Returns:
+            缓存的推荐结果，如果未命中返回None
+        """
+        try:
+            redis_client = await self._get_redis()
+            cached = await redis_client.hget(
+                self._get_daily_key(student_id),
+                self._get_filter_field(filter_params),
+            )
+        except Exception as e:
+            logger.warning(f"读取推荐缓存失败: {e}")
+            return None
+
+        if not cached:
+            record_cache_miss(_DAILY_CACHE, "redis")
+            return None
+
+        record_cache_hit(_DAILY_CACHE, "redis")
+        return DailyContentResponse.model_validate_json(cached)
+
+    async def set_daily(
+        self,
+        student_id: uuid.UUID,
+        response: DailyContentResponse,
+        filter_params: Optional[RecommendationFilter] = None,
+    ) -> bool:
+        """
+        写入当日推荐缓存
+
+        Args:
+            student_id: 学生ID
+            response: 推荐结果
+            filter_params: 推荐过滤条件
+
+        Returns:
+            是否设置成功
+        """
+        try:
+            redis_client = await self._get_redis()
+            key = self._get_daily_key(student_id)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, self._get_filter_field(filter_params), response.model_dump_json())
+                pipe.expire(key, self._DAILY_TTL)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"写入推荐缓存失败: {e}")
+            return False
+
+    async def invalidate_daily(self, student_id: uuid.UUID) -> bool:
+        """
+        使学生当日推荐缓存失效（所有过滤条件）
+
+        在练习完成、知识图谱更新、偏好修改后调用，下次请求或预计算时重新生成。
+
+        Args:
+            student_id: 学生ID
+
+        Returns:
+            是否删除成功
+        """
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.delete(self._get_daily_key(student_id))
+            return True
+        except Exception as e:
+            logger.warning(f"删除推荐缓存失败: {e}")
+            return False
+
+    async def get_rerank(self, rerank_input: str) -> Optional[List[int]]:
+        """
+        获取LLM精排结果缓存
+
+        Args:
+            rerank_input: 精排输入（决定LLM输出的全部内容，如完整prompt）
+
+        Returns:
+            缓存的排序（候选序号列表，从1开始），如果未命中返回None
+        """
+        try:
+            redis_client = await self._get_redis()
+            cached = await redis_client.get(self._get_rerank_key(rerank_input))
+        except Exception:
+            return None
+
+        if not cached:
+            record_cache_miss(_RERANK_CACHE, "redis")
+            return None
+
+        record_cache_hit(_RERANK_CACHE, "redis")
+        return json.loads(cached)
+
+    async def set_rerank(self, rerank_input: str, ranking: List[int]) -> bool:
+        """
+        写入LLM精排结果缓存
+
+        Args:
+            rerank_input: 精排输入
+            ranking: 排序（候选序号列表，从1开始）
+
+        Returns:
+            是否设置成功
+        """
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.setex(
+                self._get_rerank_key(rerank_input),
+                self._RERANK_TTL,
+                json.dumps(ranking),
+            )
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        """关闭 Redis 连接"""
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+# 全局缓存服务实例
+_recommendation_cache: Optional[RecommendationCacheService] = None
+
+
+async def get_recommendation_cache() -> RecommendationCacheService:
+    """
+    获取推荐缓存服务实例（单例模式）
+
+    Returns:
+        RecommendationCacheService: 缓存服务实例
+    """
+    global _recommendation_cache
+    if _recommendation_cache is None:
+        _recommendation_cache = RecommendationCacheService()
+    return _recommendation_cache
@@ -0,0 +1,233 @@
+"""
+推荐精排器 - AI英语教学系统
+在请求路径上替代LLM精排的本地轻量模型（纯CPU、确定性）
+
+特征（均归一化到 0~1 附近）：
+- difficulty_distance: 内容难度与 i+1 难度范围的距离（越小越好）
+- weak_point_overlap: 知识点/主题与薄弱知识点的重叠度
+- learning_point_overlap: 知识点与正在学习知识点的重叠度
+- topic_preference: 主题是否为学生偏好主题
+- popularity: 浏览/收藏热度（对数缩放）及是否精选
+- recency: 发布时间新鲜度（指数衰减）
+- vector_score: 向量召回相似度
+
+精排器通过注册表可插拔，配置项 RECOMMENDATION_RERANKER 选择实现。
+"""
+import math
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.core.config import get_settings
+from app.models import Content
+from app.schemas.recommendation import StudentProfile
+
+FEATURE_NAMES = (
+    "difficulty_distance",
+    "weak_point_overlap",
+    "learning_point_overlap",
+    "topic_preference",
+    "popularity",
+    "featured",
+    "recency",
+    "vector_score",
+)
+
+# 热度归一化上限：加权浏览量达到该值时 popularity 为 1
+_POPULARITY_CAP = 10000
+# 新鲜度半衰期（天）
+_RECENCY_HALF_LIFE_DAYS = 180
+
+
+@dataclass
+class RerankContext:
+    """精排所需的学生侧上下文"""
+    profile: StudentProfile
+    difficulty_range: List[str]
+    difficulty_order: Mapping[str, int]
+    vector_scores: Mapping[uuid.UUID, float] = field(default_factory=dict)
+    now: datetime = field(default_factory=datetime.utcnow)
+
+
+def extract_features(content: Content, context: RerankContext) -> Dict[str, float]:
+    """
+    提取单个候选内容的精排特征
+
+    Args:
+        content: 候选内容
+        context: 精排上下文
+
+    Returns:
+        Dict[str, float]: 特征名到特征值的映射
+    """
+    profile = context.profile
+    order = context.difficulty_order
+
+    # 难度距离：落在 i+1 范围内为0，否则为到范围边界的级数（6级难度归一化）
+    content_level = order.get(content.difficulty_level)
+    range_levels = [order[d] for d in context.difficulty_range if d in order]
+    if content_level is None or not range_levels:
+        difficulty_distance = 0.5
+    elif min(range_levels) <= content_level <= max(range_levels):
+        difficulty_distance = 0.0
+    else:
+        gap = min(abs(content_level - level) for level in range_levels)
+        difficulty_distance = gap / max(len(order) - 1, 1)
+
+    knowledge_points = set(content.knowledge_points or [])
+    weak_points = set(profile.weak_points[:5])
+    if content.topic:
+        knowledge_points.add(content.topic)
+    weak_overlap = len(knowledge_points & weak_points) / len(weak_points) if weak_points else 0.0
+
+    learning_points = set(profile.learning_points[:5])
+    learning_overlap = (
+        len(knowledge_points & learning_points) / len(learning_points) if learning_points else 0.0
+    )
+
+    views = (content.view_count or 0) + 5 * (content.favorite_count or 0)
+    popularity = min(math.log1p(views) / math.log1p(_POPULARITY_CAP), 1.0)
+
+    published = content.published_at or content.created_at
+    if published is not None:
+        age_days = max((context.now - published.replace(tzinfo=None)).days, 0)
+        recency = 0.5 ** (age_days / _RECENCY_HALF_LIFE_DAYS)
+    else:
+        recency = 0.0
+
+    return {
+        "difficulty_distance": difficulty_distance,
+        "weak_point_overlap": weak_overlap,
+        "learning_point_overlap": learning_overlap,
+        "topic_preference": 1.0 if content.topic and content.topic in profile.preferred_topics else 0.0,
+        "popularity": popularity,
+        "featured": 1.0 if content.is_featured else 0.0,
+        "recency": recency,
+        "vector_score": float(context.vector_scores.get(content.id, 0.0)),
+    }
+
+
+class Reranker(ABC):
+    """
+    精排器接口
+
+    子类只需实现 score()；rank() 负责特征提取与稳定排序（同分保持召回顺序）。
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def score(self, features: Dict[str, float]) -> float:
+        """
+        计算单个候选的精排分数
+
+        Args:
+            features: extract_features() 返回的特征
+
+        Returns:
+            float: 分数，越大越靠前
+        """
+
+    def rank(
+        self,
+        candidates: List[Content],
+        context: RerankContext,
+    ) -> List[Tuple[Content, float]]:
+        """
+        对候选内容排序
+
+        Args:
+            candidates: 候选内容列表
+            context: 精排上下文
+
+        Returns:
+            List[Tuple[Content, float]]: 按分数降序排列的 (内容, 分数)
+        """
+        scored = [
+            (content, self.score(extract_features(content, context)))
+            for content in candidates
+        ]
+        # sorted 是稳定排序，同分时保持召回顺序，保证结果确定
+        return sorted(scored, key=lambda item: item[1], reverse=True)
+
+
+class LinearReranker(Reranker):
+    """
+    线性精排器
+
+    score = bias + Σ weight_i * feature_i，默认权重参照原规则评分的比重设置：
+    i+1 难度匹配和薄弱点覆盖最重要，其次是召回相似度、偏好主题和内容质量。
+    """
+
+    name = "linear"
+
+    DEFAULT_WEIGHTS: Dict[str, float] = {
+        "difficulty_distance": -3.0,
+        "weak_point_overlap": 2.0,
+        "learning_point_overlap": 0.8,
+        "topic_preference": 1.2,
+        "popularity": 0.6,
+        "featured": 0.8,
+        "recency": 0.3,
+        "vector_score": 1.5,
+    }
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, bias: float = 0.0):
+        """
+        初始化线性精排器
+
+        Args:
+            weights: 特征权重（未给出的特征使用默认权重）
+            bias: 偏置
+        """
+        unknown = set(weights or {}) - set(FEATURE_NAMES)
+        if unknown:
+            raise ValueError(f"未知的精排特征: {sorted(unknown)}")
+        self.weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+        self.bias = bias
+
+    def score(self, features: Dict[str, float]) -> float:
+        return self.bias + sum(
+            weight * features.get(name, 0.0) for name, weight in self.weights.items()
+        )
+
+
+# 精排器注册表：名称 -> 工厂函数
+_RERANKERS: Dict[str, Callable[[], Reranker]] = {
+    LinearReranker.name: LinearReranker,
+}
+_reranker: Optional[Reranker] = None
+
+
+def register_reranker(name: str, factory: Callable[[], Reranker]) -> None:
+    """
+    注册精排器实现（如训练好的GBDT模型）
+
+    Args:
+        name: 精排器名称，对应配置项 RECOMMENDATION_RERANKER
+        factory: 无参工厂函数
+    """
+    global _reranker
+    _RERANKERS[name] = factory
+    _reranker = None
+
+
+def get_reranker() -> Reranker:
+    """
+    获取配置的精排器单例
+
+    Returns:
+        Reranker: 精排器实例
+
+    Raises:
+        ValueError: 配置的精排器未注册
+    """
+    global _reranker
+    if _reranker is None:
+        name = get_settings().RECOMMENDATION_RERANKER
+        if name not in _RERANKERS:
+            raise ValueError(f"未注册的精排器: {name}")
+        _reranker = _RERANKERS[name]()
+    return _reranker
@@ -4,14 +4,14 @@
 
 核心功能：
 - 学生画像构建
-- 三段式召回（向量召回 → 规则过滤 → AI精排）
+- 三段式召回（向量召回 → 规则过滤 → 精排）
 - i+1难度控制
 - 内容多样性保证
 """
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
 
 import numpy as np
@@ -29,9 +29,14 @@ from app.schemas.recommendation import (
     DailyContentResponse,
     RecommendationFilter,
 )
+from app.services.recommendation_cache_service import get_recommendation_cache
+from app.services.recommendation_reranker import RerankContext, get_reranker
 
 logger = logging.getLogger(__name__)
 
+# 后台LLM精排任务
+_background_tasks: set = set()
+
 
 class RecommendationService:
     """
@@ -40,11 +45,11 @@ class RecommendationService:
     实现基于i+1理论的智能内容推荐系统：
     1. 向量召回：基于Qdrant向量相似度进行初步召回
     2. 规则过滤：应用i+1理论、难度、主题等规则过滤
-    3. AI精排：使用LLM对候选内容进行精细化排序
+    3. 精排：使用本地精排模型对候选内容排序，可选异步LLM精排增强
 
     成本优化策略：
     - 90%的召回通过本地向量检索完成
-    - 仅对Top 10%候选内容使用AI精排
+    - 请求路径上不调用LLM，LLM精排仅在后台或离线预计算时执行
     """
 
     # 难度等级映射（用于i+1计算）
@@ -57,6 +62,11 @@ class RecommendationService:
         DifficultyLevel.PROFICIENT.value: 6,
     }
 
+    # 向量召回候选数
+    RECALL_TOP_K = 100
+    # 精排后保留的推荐数
+    RERANK_TOP_N = 5
+
     # CEFR到难度等级的映射
     CEFR_TO_DIFFICULTY = {
         "A1": DifficultyLevel.BEGINNER.value,
@@ -99,6 +109,44 @@ class RecommendationService:
         if not student:
             raise ValueError(f"学生不存在: {student_id}")
 
+        return RecommendationService._build_profile(student)
+
+    @staticmethod
+    async def get_student_profiles(
+        db: AsyncSession,
+        student_ids: List[uuid.UUID]
+    ) -> Dict[uuid.UUID, StudentProfile]:
+        """
+        批量获取学生画像（一次查询加载学生及知识图谱）
+
+        Args:
+            db: 数据库会话
+            student_ids: 学生ID列表
+
+        Returns:
+            Dict[uuid.UUID, StudentProfile]: 学生ID到画像的映射，不存在的学生不包含在内
+        """
+        result = await db.execute(
+            select(Student)
+            .options(selectinload(Student.knowledge_graph))
+            .where(Student.id.in_(student_ids))
+        )
+        return {
+            student.id: RecommendationService._build_profile(student)
+            for student in result.scalars().all()
+        }
+
+    @staticmethod
+    def _build_profile(student: Student) -> StudentProfile:
+        """
+        根据学生及其知识图谱构建学生画像
+
+        Args:
+            student: 学生对象（已加载knowledge_graph）
+
+        Returns:
+            StudentProfile: 学生画像
+        """
         # 从知识图谱获取能力评估
         abilities = {}
         mastered_points = []
@@ -143,15 +191,58 @@ class RecommendationService:
     async def recommend_daily(
         db: AsyncSession,
         student_id: uuid.UUID,
-        filter_params: Optional[RecommendationFilter] = None
+        filter_params: Optional[RecommendationFilter] = None,
+        use_cache: bool = True,
     ) -> DailyContentResponse:
         """
         每日内容推荐
 
+        优先读取按 (学生, 日期) 物化的推荐缓存；未命中时执行完整的
+        三段式推荐流程并写入缓存。练习完成、知识图谱更新、偏好修改时
+        缓存失效，夜间任务为活跃学生预计算。
+
+        Args:
+            db: 数据库会话
+            student_id: 学生ID
+            filter_params: 推荐过滤条件
+            use_cache: 是否读取缓存（预计算时传False强制重新生成）
+
+        Returns:
+            DailyContentResponse: 每日推荐响应
+        """
+        cache = await get_recommendation_cache()
+
+        if use_cache:
+            cached = await cache.get_daily(student_id, filter_params)
+            if cached is not None:
+                return cached
+
+        profile, ranked = await RecommendationService._recall_and_rank(
+            db=db,
+            student_id=student_id,
+            filter_params=filter_params,
+        )
+        response = await RecommendationService._build_response(profile, ranked)
+        await cache.set_daily(student_id, response, filter_params)
+
+        if settings.RECOMMENDATION_LLM_RERANK_ENABLED:
+            RecommendationService._schedule_llm_enhance(profile, ranked, filter_params)
+
+        return response
+
+    @staticmethod
+    async def _recall_and_rank(
+        db: AsyncSession,
+        student_id: uuid.UUID,
+        filter_params: Optional[RecommendationFilter] = None
+    ) -> Tuple[StudentProfile, List[Content]]:
+        """
+        召回并精排（不经过缓存）
+
         核心推荐方法，实现三段式召回策略：
         1. 向量召回：使用Qdrant进行语义相似度检索
         2. 规则过滤：应用i+1理论、难度、主题等规则
-        3. AI精排：使用LLM对Top候选进行精细化排序
+        3. 本地精排：使用本地精排模型对Top候选进行排序
 
         Args:
             db: 数据库会话
@@ -159,30 +250,181 @@ class RecommendationService:
             filter_params: 推荐过滤条件
 
         Returns:
-            DailyContentResponse: 每日推荐响应
+            Tuple[StudentProfile, List[Content]]: 学生画像和精排后的内容
         """
         # 1. 获取学生画像
         profile = await RecommendationService.get_student_profile(db, student_id)
 
-        # 2. 确定推荐难度范围（i+1理论）
+        # 2. 第一阶段：向量召回
+        vector_candidates, vector_scores = await RecommendationService._vector_recall(
+            db=db,
+            profile=profile,
+            top_k=RecommendationService.RECALL_TOP_K,
+        )
+
+        logger.info(f"向量召回候选数: {len(vector_candidates)}")
+
+        ranked = await RecommendationService._rank_candidates(
+            profile=profile,
+            vector_candidates=vector_candidates,
+            filter_params=filter_params,
+            vector_scores=vector_scores,
+        )
+        return profile, ranked
+
+    @staticmethod
+    async def recommend_daily_batch(
+        db: AsyncSession,
+        student_ids: List[uuid.UUID],
+        filter_params: Optional[RecommendationFilter] = None,
+    ) -> Dict[uuid.UUID, DailyContentResponse]:
+        """
+        批量生成每日推荐（用于夜间预计算）
+
+        与逐个调用 recommend_daily 结果一致，但召回阶段按批处理：
+        1. 一次查询加载所有学生画像
+        2. 按召回条件（目标考试 + 薄弱点/偏好签名）分组，每组查询文本只嵌入一次
+        3. 使用Qdrant批量搜索，每种过滤条件一次请求
+        4. 一次数据库查询取回所有候选内容，再分发给各个学生
+        5. 过滤、多样性控制和精排按学生执行，结果写入推荐缓存
+
+        Args:
+            db: 数据库会话
+            student_ids: 学生ID列表
+            filter_params: 推荐过滤条件
+
+        Returns:
+            Dict[uuid.UUID, DailyContentResponse]: 学生ID到推荐结果的映射，
+                不存在或生成失败的学生不包含在内
+        """
+        from app.services.vector_service import get_vector_service
+
+        top_k = RecommendationService.RECALL_TOP_K
+        profiles = await RecommendationService.get_student_profiles(db, student_ids)
+        if not profiles:
+            return {}
+
+        # 按召回条件分组：同一组学生的召回结果完全相同
+        groups: Dict[tuple, List[uuid.UUID]] = {}
+        for student_id, profile in profiles.items():
+            query_text, filters = RecommendationService._build_recall_query(profile)
+            key = (query_text, tuple(sorted(filters.items())))
+            groups.setdefault(key, []).append(student_id)
+
+        logger.info(f"批量推荐: {len(profiles)} 个学生, {len(groups)} 个召回分组")
+
+        group_keys = list(groups)
+        recalled: Dict[tuple, Optional[Dict[uuid.UUID, float]]] = {key: None for key in group_keys}
+
+        try:
+            vector_service = get_vector_service()
+            query_vectors = await vector_service.embedding_service.batch_generate_embeddings(
+                [key[0] for key in group_keys]
+            )
+
+            # 过滤条件不同的分组无法合并到同一个批量请求
+            by_filters: Dict[tuple, List[int]] = {}
+            for i, key in enumerate(group_keys):
+                by_filters.setdefault(key[1], []).append(i)
+
+            for filter_items, indices in by_filters.items():
+                results = await vector_service.batch_search_similar(
+                    query_vectors=[query_vectors[i] for i in indices],
+                    limit=top_k * 2,
+                    score_threshold=0.5,
+                    filters=dict(filter_items),
+                )
+                for i, vector_results in zip(indices, results):
+                    recalled[group_keys[i]] = RecommendationService._extract_scored_ids(
+                        vector_results, top_k
+                    )
+        except Exception as e:
+            logger.warning(f"批量向量搜索失败，使用数据库回退: {e}")
+
+        # 一次查询取回所有分组召回内容的并集
+        union_ids = {cid for scores in recalled.values() if scores for cid in scores}
+        content_map: Dict[uuid.UUID, Content] = {}
+        if union_ids:
+            result = await db.execute(
+                select(Content).where(
+                    and_(
+                        Content.id.in_(union_ids),
+                        Content.is_published == True,
+                    )
+                )
+            )
+            content_map = {c.id: c for c in result.scalars().all()}
+
+        cache = await get_recommendation_cache()
+        responses: Dict[uuid.UUID, DailyContentResponse] = {}
+
+        for key, group_student_ids in groups.items():
+            scores = recalled[key]
+            shared_candidates = (
+                [content_map[cid] for cid in scores if cid in content_map] if scores else None
+            )
+
+            for student_id in group_student_ids:
+                profile = profiles[student_id]
+                try:
+                    # 向量召回为空或失败时，与单个推荐一样回退到数据库查询
+                    if shared_candidates is not None:
+                        candidates, vector_scores = shared_candidates, scores
+                    else:
+                        candidates = await RecommendationService._db_recall(
+                            db=db, profile=profile, top_k=top_k
+                        )
+                        vector_scores = {}
+                    ranked = await RecommendationService._rank_candidates(
+                        profile=profile,
+                        vector_candidates=candidates,
+                        filter_params=filter_params,
+                        vector_scores=vector_scores,
+                    )
+                    response = None
+                    # 离线预计算不占用请求延迟，LLM精排直接同步执行
+                    if settings.RECOMMENDATION_LLM_RERANK_ENABLED:
+                        response = await RecommendationService._llm_enhance(profile, ranked)
+                    if response is None:
+                        response = await RecommendationService._build_response(profile, ranked)
+                except Exception as e:
+                    logger.warning(f"学生 {student_id} 推荐生成失败: {e}")
+                    continue
+
+                await cache.set_daily(student_id, response, filter_params)
+                responses[student_id] = response
+
+        return responses
+
+    @staticmethod
+    async def _rank_candidates(
+        profile: StudentProfile,
+        vector_candidates: List[Content],
+        filter_params: Optional[RecommendationFilter] = None,
+        vector_scores: Optional[Dict[uuid.UUID, float]] = None,
+    ) -> List[Content]:
+        """
+        对召回结果执行规则过滤、多样性控制和本地精排
+
+        Args:
+            profile: 学生画像
+            vector_candidates: 向量召回的候选内容
+            filter_params: 推荐过滤条件
+            vector_scores: 内容ID到向量召回相似度的映射
+
+        Returns:
+            List[Content]: 精排后的内容列表
+        """
+        # 确定推荐难度范围（i+1理论）
         target_difficulty = RecommendationService._get_target_difficulty(profile)
         difficulty_range = RecommendationService._get_i_plus_one_range(target_difficulty)
 
         logger.info(
-            f"学生 {student_id} 的推荐难度范围: {difficulty_range}, "
+            f"学生 {profile.student_id} 的推荐难度范围: {difficulty_range}, "
             f"目标难度: {target_difficulty}"
         )
 
-        # 3. 第一阶段：向量召回
-        vector_candidates = await RecommendationService._vector_recall(
-            db=db,
-            profile=profile,
-            top_k=100,  # 召回100个候选
-        )
-
-        logger.info(f"向量召回候选数: {len(vector_candidates)}")
-
-        # 4. 第二阶段：规则过滤
+        # 第二阶段：规则过滤
         filtered_candidates = await RecommendationService._filter_by_i_plus_one(
             candidates=vector_candidates,
             difficulty_range=difficulty_range,
@@ -192,7 +434,7 @@ class RecommendationService:
 
         logger.info(f"规则过滤后候选数: {len(filtered_candidates)}")
 
-        # 5. 内容多样性控制
+        # 内容多样性控制
         diversified = await RecommendationService._diversify_content(
             candidates=filtered_candidates,
             max_per_type=5,
@@ -201,21 +443,39 @@ class RecommendationService:
 
         logger.info(f"多样性控制后候选数: {len(diversified)}")
 
-        # 6. 第三阶段：AI精排（仅对Top 10%）
-        ai_reranked = await RecommendationService._ai_rerank(
-            candidates=diversified[:10],  # 仅精排Top 10
+        # 第三阶段：本地精排（仅对Top 10）
+        ranked = RecommendationService._local_rerank(
+            candidates=diversified[:10],
             profile=profile,
+            difficulty_range=difficulty_range,
+            vector_scores=vector_scores or {},
         )
 
-        logger.info(f"AI精排后候选数: {len(ai_reranked)}")
+        logger.info(f"精排后候选数: {len(ranked)}")
+        return ranked
+
+    @staticmethod
+    async def _build_response(
+        profile: StudentProfile,
+        ranked: List[Content],
+        ai_reranked_count: int = 0,
+    ) -> DailyContentResponse:
+        """
+        按类型分组精排结果并构建每日推荐响应
+
+        Args:
+            profile: 学生画像
+            ranked: 精排后的内容列表
+            ai_reranked_count: 经过LLM精排的内容数量
 
-        # 7. 按类型分组推荐
+        Returns:
+            DailyContentResponse: 每日推荐响应
+        """
         recommendations = await RecommendationService._group_recommendations(
-            candidates=ai_reranked,
+            candidates=ranked,
             profile=profile,
         )
 
-        # 8. 构建响应
         return DailyContentResponse(
             date=datetime.now(),
             student_profile_summary={
@@ -229,9 +489,9 @@ class RecommendationService:
             exercise_recommendations=recommendations.get("exercise", []),
             speaking_recommendations=recommendations.get("speaking", []),
             daily_goals=RecommendationService._generate_daily_goals(profile),
-            total_recommendations=len(ai_reranked),
+            total_recommendations=len(ranked),
             retrieval_strategy="three_stage",
-            ai_reranked_count=10,
+            ai_reranked_count=ai_reranked_count,
         )
 
     @staticmethod
@@ -300,7 +560,7 @@ class RecommendationService:
         db: AsyncSession,
         profile: StudentProfile,
         top_k: int = 100
-    ) -> List[Content]:
+    ) -> Tuple[List[Content], Dict[uuid.UUID, float]]:
         """
         第一阶段：向量召回
 
@@ -313,13 +573,60 @@ class RecommendationService:
             top_k: 召回数量
 
         Returns:
-            List[Content]: 召回的内容列表
+            Tuple[List[Content], Dict[uuid.UUID, float]]: 召回的内容列表，
+                以及内容ID到向量相似度的映射（数据库回退时为空）
         """
         from app.services.vector_service import get_vector_service
 
         vector_service = get_vector_service()
+        query_text, filters = RecommendationService._build_recall_query(profile)
+
+        # 使用向量搜索
+        try:
+            vector_results = await vector_service.search_by_text(
+                query_text=query_text,
+                limit=top_k * 2,
+                score_threshold=0.5,
+                filters=filters,
+            )
 
-        # 构建查询文本（基于学生画像）
+            # 如果向量搜索有结果，从数据库获取完整内容
+            vector_scores = RecommendationService._extract_scored_ids(vector_results, top_k)
+            if vector_scores:
+                result = await db.execute(
+                    select(Content).where(
+                        and_(
+                            Content.id.in_(vector_scores),
+                            Content.is_published == True,
+                        )
+                    )
+                )
+                contents = result.scalars().all()
+
+                # 按向量搜索结果的顺序排序
+                content_map = {c.id: c for c in contents}
+                return (
+                    [content_map[cid] for cid in vector_scores if cid in content_map],
+                    vector_scores,
+                )
+
+        except Exception as e:
+            logger.warning(f"向量搜索失败，使用数据库回退: {e}")
+
+        # 回退到数据库查询（如果向量搜索失败）
+        return await RecommendationService._db_recall(db, profile, top_k), {}
+
+    @staticmethod
+    def _build_recall_query(profile: StudentProfile) -> Tuple[str, Dict[str, Any]]:
+        """
+        根据学生画像构建向量召回的查询文本和过滤条件
+
+        Args:
+            profile: 学生画像
+
+        Returns:
+            Tuple[str, Dict[str, Any]]: (查询文本, 过滤条件)
+        """
         query_parts = []
 
         # 添加目标考试
@@ -338,8 +645,6 @@ class RecommendationService:
         if not query_parts:
             query_parts.append(f"英语学习 {profile.current_cefr_level}")
 
-        query_text = " ".join(query_parts)
-
         # 构建过滤条件
         filters = {
             "is_published": True,
@@ -349,57 +654,54 @@ class RecommendationService:
         if profile.target_exam:
             filters["exam_type"] = profile.target_exam
 
-        # 使用向量搜索
-        try:
-            vector_results = await vector_service.search_by_text(
-                query_text=query_text,
-                limit=top_k * 2,
-                score_threshold=0.5,
-                filters=filters,
-            )
+        return " ".join(query_parts), filters
 
-            # 提取内容ID
-            content_ids = []
-            for result in vector_results:
-                payload = result.get("payload", {})
-                content_id = payload.get("content_id")
-                if content_id:
-                    content_ids.append(content_id)
-
-            # 如果向量搜索有结果，从数据库获取完整内容
-            if content_ids:
-                import uuid as uuid_lib
-                uuid_ids = []
-                for cid in content_ids[:top_k]:
-                    try:
-                        uuid_ids.append(uuid_lib.UUID(cid))
-                    except ValueError:
-                        continue
+    @staticmethod
+    def _extract_scored_ids(
+        vector_results: List[Dict[str, Any]],
+        top_k: int
+    ) -> Dict[uuid.UUID, float]:
+        """
+        从向量搜索结果中按顺序提取前 top_k 个内容ID及相似度
 
-                if uuid_ids:
-                    result = await db.execute(
-                        select(Content).where(
-                            and_(
-                                Content.id.in_(uuid_ids),
-                                Content.is_published == True,
-                            )
-                        )
-                    )
-                    contents = result.scalars().all()
+        Args:
+            vector_results: 向量搜索结果
+            top_k: 最多返回的数量
 
-                    # 按向量搜索结果的顺序排序
-                    content_map = {c.id: c for c in contents}
-                    ordered_contents = []
-                    for cid in uuid_ids:
-                        if cid in content_map:
-                            ordered_contents.append(content_map[cid])
+        Returns:
+            Dict[uuid.UUID, float]: 内容ID到相似度的映射（保持搜索结果顺序）
+        """
+        scored = []
+        for result in vector_results:
+            content_id = result.get("payload", {}).get("content_id")
+            if content_id:
+                scored.append((content_id, result.get("score", 0.0)))
+
+        vector_scores = {}
+        for cid, score in scored[:top_k]:
+            try:
+                vector_scores[uuid.UUID(cid)] = score
+            except ValueError:
+                continue
+        return vector_scores
 
-                    return ordered_contents
+    @staticmethod
+    async def _db_recall(
+        db: AsyncSession,
+        profile: StudentProfile,
+        top_k: int = 100
+    ) -> List[Content]:
+        """
+        数据库召回（向量搜索失败或无结果时的回退）
 
-        except Exception as e:
-            logger.warning(f"向量搜索失败，使用数据库回退: {e}")
+        Args:
+            db: 数据库会话
+            profile: 学生画像
+            top_k: 召回数量
 
-        # 回退到数据库查询（如果向量搜索失败）
+        Returns:
+            List[Content]: 召回的内容列表
+        """
         conditions = [Content.is_published == True]
 
         if profile.target_exam:
@@ -424,6 +726,7 @@ class RecommendationService:
 
         result = await db.execute(query)
         return list(result.scalars().all())
+
     @staticmethod
     async def _filter_by_i_plus_one(
         candidates: List[Content],
@@ -529,45 +832,94 @@ class RecommendationService:
         return diversified
 
     @staticmethod
-    async def _ai_rerank(
+    def _local_rerank(
         candidates: List[Content],
-        profile: StudentProfile
+        profile: StudentProfile,
+        difficulty_range: List[str],
+        vector_scores: Dict[uuid.UUID, float],
     ) -> List[Content]:
         """
-        第三阶段：AI精排
+        第三阶段：本地精排
 
-        使用LLM对候选内容进行精细化排序。
-        这是成本优化的关键：仅对少量候选内容使用AI。
+        使用配置的本地精排模型（默认线性模型）对候选内容排序，
+        纯CPU计算、结果确定，不在请求路径上调用LLM。
 
         Args:
             candidates: 候选内容列表
             profile: 学生画像
+            difficulty_range: i+1难度范围
+            vector_scores: 内容ID到向量召回相似度的映射
 
         Returns:
-            List[Content]: 精排后的内容列表
+            List[Content]: 精排后的Top N内容
         """
         if not candidates:
             return []
 
-        # 对于少量候选（<=5），使用LLM精排
-        if len(candidates) <= 5:
-            return await RecommendationService._llm_rerank(candidates, profile)
-        
-        # 对于较多候选，先使用规则评分筛选，再对Top 5使用LLM精排
-        scored_candidates = []
-        for content in candidates:
-            score = await RecommendationService._calculate_recommendation_score(
-                content=content,
-                profile=profile
-            )
-            scored_candidates.append((content, score))
-        
-        # 按分数排序，取Top 5
-        scored_candidates.sort(key=lambda x: x[1], reverse=True)
-        top_5 = [c[0] for c in scored_candidates[:5]]
-        
-        # 对Top 5使用LLM精排
-        return await RecommendationService._llm_rerank(top_5, profile)
+        context = RerankContext(
+            profile=profile,
+            difficulty_range=difficulty_range,
+            difficulty_order=RecommendationService.DIFFICULTY_ORDER,
+            vector_scores=vector_scores,
+        )
+        ranked = get_reranker().rank(candidates, context)
+        return [content for content, _ in ranked[:RecommendationService.RERANK_TOP_N]]
+
+    @staticmethod
+    async def _llm_enhance(
+        profile: StudentProfile,
+        ranked: List[Content],
+    ) -> Optional[DailyContentResponse]:
+        """
+        使用LLM对本地精排结果重新排序（可选的增强步骤）
+
+        Args:
+            profile: 学生画像
+            ranked: 本地精排后的内容列表
+
+        Returns:
+            Optional[DailyContentResponse]: LLM精排后的响应，LLM未改变顺序时返回None
+        """
+        if not ranked:
+            return None
+
+        reranked = await RecommendationService._llm_rerank(ranked, profile)
+        if [c.id for c in reranked] == [c.id for c in ranked]:
+            return None
+
+        return await RecommendationService._build_response(
+            profile, reranked, ai_reranked_count=len(ranked)
+        )
+
+    @staticmethod
+    def _schedule_llm_enhance(
+        profile: StudentProfile,
+        ranked: List[Content],
+        filter_params: Optional[RecommendationFilter] = None,
+    ) -> None:
+        """
+        在后台执行LLM精排，完成后覆盖当日推荐缓存
+
+        接口先返回本地精排结果，LLM结果在下一次读取缓存时生效。
+
+        Args:
+            profile: 学生画像
+            ranked: 本地精排后的内容列表
+            filter_params: 推荐过滤条件
+        """
+        async def enhance() -> None:
+            try:
+                response = await RecommendationService._llm_enhance(profile, ranked)
+                if response is not None:
+                    cache = await get_recommendation_cache()
+                    await cache.set_daily(profile.student_id, response, filter_params)
+            except Exception as e:
+                logger.warning(f"LLM精排增强失败: {e}")
+
+        task = asyncio.create_task(enhance())
+        # 保持引用，避免任务在完成前被垃圾回收
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
 
     @staticmethod
     async def _llm_rerank(
@@ -586,7 +938,6 @@ class RecommendationService:
         """
         from app.services.zhipu_service import ZhipuAIService
         
-        llm_service = ZhipuAIService()
         
         # 构建LLM请求
         content_descriptions = []
@@ -640,7 +991,15 @@ class RecommendationService:
 其中ranking数组中的数字是对应内容列表的序号，按推荐优先级从高到低排序。
 """
 
+        # 相同的候选和画像会得到相同的prompt，直接复用之前的精排结果
+        cache = await get_recommendation_cache()
+        cached_ranking = await cache.get_rerank(prompt)
+        if cached_ranking is not None:
+            return RecommendationService._apply_ranking(candidates, cached_ranking)
+
         try:
+            llm_service = ZhipuAIService()
+
             # 调用LLM
             response = await llm_service.chat_completion(
                 messages=[
@@ -664,18 +1023,33 @@ class RecommendationService:
                 
                 # 根据ranking重新排序
                 ranking = result.get("ranking", list(range(1, len(candidates) + 1)))
-                reranked = []
-                for idx in ranking:
-                    if 1 <= idx <= len(candidates):
-                        reranked.append(candidates[idx - 1])
-                
-                return reranked
+                await cache.set_rerank(prompt, ranking)
+                return RecommendationService._apply_ranking(candidates, ranking)
             
         except Exception as e:
             logger.warning(f"LLM精排失败，使用原始顺序: {e}")
         
         # 失败时返回原始顺序
         return candidates
+
+    @staticmethod
+    def _apply_ranking(candidates: List[Content], ranking: List[int]) -> List[Content]:
+        """
+        按LLM返回的序号（从1开始）重排候选内容
+
+        Args:
+            candidates: 候选内容列表
+            ranking: 序号列表
+
+        Returns:
+            List[Content]: 重排后的内容列表
+        """
+        return [
+            candidates[idx - 1]
+            for idx in ranking
+            if isinstance(idx, int) and 1 <= idx <= len(candidates)
+        ]
+
     async def _calculate_recommendation_score(
         content: Content,
         profile: StudentProfile
@@ -0,0 +1,334 @@
+"""
+向量相似度引擎 - AI英语教学系统
+基于NumPy的批量相似度计算，用于内容/词汇语义去重
+
+- 预先归一化向量，余弦相似度退化为点积
+- 分块（tile）矩阵乘法，内存占用与 block_size² 成正比而不是 n²
+- 分组：默认与原逐对实现一致的“首项聚合”语义，可选并查集（union-find）传递闭包
+- 可选的近似模式（随机超平面LSH），用于超大规模导入
+"""
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 进度回调: (phase, current, total, message)
+ProgressCallback = Callable[[str, int, int, str], None]
+# 相似对接收器: (rows, cols)，rows < cols，均为全局索引
+PairSink = Callable[[np.ndarray, np.ndarray], None]
+
+# 默认分块大小：1024 x 1024 的float32相似度矩阵约 4MB
+DEFAULT_BLOCK_SIZE = 1024
+# auto 模式下超过此数量时切换到 LSH 近似模式
+DEFAULT_APPROXIMATE_MIN_SIZE = 50_000
+
+MODE_EXACT = "exact"
+MODE_LSH = "lsh"
+MODE_AUTO = "auto"
+
+
+def normalize_vectors(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    """将向量列表转换为行归一化的float32矩阵
+
+    空向量、维度不一致的向量和零向量会被置为零行，
+    与任何向量的相似度均为0（与原逐对实现的行为一致）。
+
+    Args:
+        vectors: 向量列表
+
+    Returns:
+        形状为 (n, dim) 的归一化矩阵
+    """
+    n = len(vectors)
+    dim = max((len(v) for v in vectors), default=0)
+    matrix = np.zeros((n, dim), dtype=np.float32)
+    if n == 0 or dim == 0:
+        return matrix
+
+    for i, vec in enumerate(vectors):
+        if len(vec) == dim:
+            matrix[i] = vec
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class UnionFind:
+    """并查集（路径压缩 + 按大小合并）"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+    def groups(self) -> List[Set[int]]:
+        """返回所有包含多个元素的组，按组内最小索引排序"""
+        members: Dict[int, Set[int]] = {}
+        for i in range(len(self.parent)):
+            root = self.find(i)
+            if self.size[root] > 1:
+                members.setdefault(root, set()).add(i)
+        return sorted(members.values(), key=min)
+
+
+def leader_groups(size: int, rows: np.ndarray, cols: np.ndarray) -> List[Set[int]]:
+    """按“首项聚合”语义对相似对分组
+
+    按索引顺序处理：尚未归组的 i 吸收所有尚未归组且与 i 相似的 j (j > i)。
+    与去重服务原有的逐对比较实现结果完全一致，但只遍历相似对。
+
+    Args:
+        size: 向量总数
+        rows: 相似对的较小索引
+        cols: 相似对的较大索引
+
+    Returns:
+        重复索引集合列表，按组内最小索引排序
+    """
+    if len(rows) == 0:
+        return []
+
+    order = np.lexsort((cols, rows))
+    rows, cols = rows[order], cols[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    ends = np.r_[starts[1:], len(rows)]
+
+    processed = np.zeros(size, dtype=bool)
+    groups: List[Set[int]] = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        leader = int(rows[start])
+        if processed[leader]:
+            continue
+        neighbors = cols[start:end]
+        neighbors = neighbors[~processed[neighbors]]
+        processed[leader] = True
+        if len(neighbors):
+            processed[neighbors] = True
+            groups.append({leader, *neighbors.tolist()})
+    return groups
+
+
+class SimilarityEngine:
+    """向量相似度引擎
+
+    使用示例：
+        ```python
+        engine = SimilarityEngine(threshold=0.85)
+        groups = engine.find_groups(vectors)          # [{0, 3, 5}, {1, 2}]
+        best = engine.max_similarity(new, existing)   # 每个新向量的最大相似度
+        ```
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        mode: str = MODE_EXACT,
+        approximate_min_size: int = DEFAULT_APPROXIMATE_MIN_SIZE,
+        lsh_bands: int = 32,
+        lsh_rows: int = 12,
+        seed: int = 42,
+        transitive: bool = False,
+    ):
+        """初始化相似度引擎
+
+        Args:
+            threshold: 相似度阈值（0-1），大于等于此值认为重复
+            block_size: 分块矩阵乘法的块大小
+            mode: exact（精确）、lsh（近似）、auto（按数据量自动选择）
+            approximate_min_size: auto 模式下启用 LSH 的最小向量数
+            lsh_bands: LSH 分带数（越多召回越高）
+            lsh_rows: 每带的超平面数（越多桶越小、候选越少）
+            seed: 随机超平面种子，保证结果可复现
+            transitive: 是否按传递闭包分组（并查集），A~B、B~C 时 A、B、C 归为一组
+        """
+        if mode not in (MODE_EXACT, MODE_LSH, MODE_AUTO):
+            raise ValueError(f"不支持的相似度模式: {mode}")
+
+        self.threshold = threshold
+        self.block_size = max(1, block_size)
+        self.mode = mode
+        self.approximate_min_size = approximate_min_size
+        self.lsh_bands = lsh_bands
+        self.lsh_rows = lsh_rows
+        self.seed = seed
+        self.transitive = transitive
+
+    def find_groups(
+        self,
+        vectors: Sequence[Sequence[float]],
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> List[Set[int]]:
+        """查找相似度超过阈值的向量组
+
+        Args:
+            vectors: 向量列表
+            progress_callback: 进度回调，每完成一个分块（或LSH分带）调用一次
+
+        Returns:
+            重复索引集合列表，例如 [{0, 3, 5}, {1, 2}]
+        """
+        n = len(vectors)
+        if n < 2:
+            return []
+
+        matrix = normalize_vectors(vectors)
+        use_lsh = self.mode == MODE_LSH or (
+            self.mode == MODE_AUTO and n >= self.approximate_min_size
+        )
+
+        if self.transitive:
+            uf = UnionFind(n)
+
+            def sink(rows: np.ndarray, cols: np.ndarray) -> None:
+                for r, c in zip(rows.tolist(), cols.tolist()):
+                    uf.union(r, c)
+        else:
+            chunks: List[Tuple[np.ndarray, np.ndarray]] = []
+
+            def sink(rows: np.ndarray, cols: np.ndarray) -> None:
+                chunks.append((rows, cols))
+
+        if use_lsh:
+            self._lsh_pairs(matrix, sink, progress_callback)
+        else:
+            self._exact_pairs(matrix, np.arange(n), sink, progress_callback)
+
+        if self.transitive:
+            return uf.groups()
+
+        if not chunks:
+            return []
+        rows = np.concatenate([c[0] for c in chunks])
+        cols = np.concatenate([c[1] for c in chunks])
+        if use_lsh:
+            # 同一对可能在多个分带中命中
+            pairs = np.unique(np.stack([rows, cols], axis=1), axis=0)
+            rows, cols = pairs[:, 0], pairs[:, 1]
+        return leader_groups(n, rows, cols)
+
+    def max_similarity(
+        self,
+        queries: Sequence[Sequence[float]],
+        references: Sequence[Sequence[float]],
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> np.ndarray:
+        """计算每个查询向量与参考向量集合的最大相似度
+
+        Args:
+            queries: 查询向量列表
+            references: 参考向量列表
+            progress_callback: 进度回调，每完成一个分块调用一次
+
+        Returns:
+            长度为 len(queries) 的最大相似度数组
+        """
+        result = np.zeros(len(queries), dtype=np.float32)
+        if len(queries) == 0 or len(references) == 0:
+            return result
+
+        query_matrix = normalize_vectors(queries)
+        reference_matrix = normalize_vectors(references)
+        if query_matrix.shape[1] != reference_matrix.shape[1]:
+            return result
+
+        bs = self.block_size
+        q_blocks = range(0, len(query_matrix), bs)
+        r_blocks = range(0, len(reference_matrix), bs)
+        total_tiles = len(q_blocks) * len(r_blocks)
+        tile = 0
+
+        for qi in q_blocks:
+            q_block = query_matrix[qi:qi + bs]
+            best = result[qi:qi + bs]
+            for rj in r_blocks:
+                sims = q_block @ reference_matrix[rj:rj + bs].T
+                np.maximum(best, sims.max(axis=1), out=best)
+                tile += 1
+                if progress_callback:
+                    progress_callback("comparing", tile, total_tiles, f"Compared tile {tile}/{total_tiles}")
+
+        return result
+
+    def _exact_pairs(
+        self,
+        matrix: np.ndarray,
+        indices: np.ndarray,
+        sink: PairSink,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> None:
+        """分块计算 matrix[indices] 内部的所有相似对并交给 sink"""
+        sub = matrix[indices]
+        bs = self.block_size
+        starts = range(0, len(sub), bs)
+        total_tiles = len(starts) * (len(starts) + 1) // 2
+        tile = 0
+
+        for bi, i in enumerate(starts):
+            block_i = sub[i:i + bs]
+            for j in starts[bi:]:
+                mask = (block_i @ sub[j:j + bs].T) >= self.threshold
+                if i == j:
+                    # 对角块只看上三角，排除自身和重复对
+                    mask = np.triu(mask, k=1)
+                rows, cols = np.nonzero(mask)
+                if len(rows):
+                    sink(indices[rows + i], indices[cols + j])
+
+                tile += 1
+                if progress_callback:
+                    progress_callback("comparing", tile, total_tiles, f"Compared tile {tile}/{total_tiles}")
+
+    def _lsh_pairs(
+        self,
+        matrix: np.ndarray,
+        sink: PairSink,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> None:
+        """随机超平面LSH：同桶向量作为候选，再做精确校验"""
+        rng = np.random.default_rng(self.seed)
+        planes = rng.standard_normal(
+            (matrix.shape[1], self.lsh_bands * self.lsh_rows)
+        ).astype(np.float32)
+
+        bits = (matrix @ planes) > 0
+        weights = 1 << np.arange(self.lsh_rows, dtype=np.int64)
+        signatures = bits.reshape(len(matrix), self.lsh_bands, self.lsh_rows) @ weights
+
+        # 零向量不参与分桶
+        valid = np.flatnonzero(np.any(matrix != 0, axis=1))
+
+        for band in range(self.lsh_bands):
+            keys = signatures[valid, band]
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            boundaries = np.flatnonzero(np.diff(sorted_keys)) + 1
+
+            for bucket in np.split(valid[order], boundaries):
+                if len(bucket) > 1:
+                    # 桶内索引有序，保证输出的相似对满足 rows < cols
+                    self._exact_pairs(matrix, np.sort(bucket), sink)
+
+            if progress_callback:
+                progress_callback(
+                    "comparing", band + 1, self.lsh_bands,
+                    f"LSH band {band + 1}/{self.lsh_bands}"
+                )
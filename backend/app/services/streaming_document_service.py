@@ -2,12 +2,15 @@
 流式文档生成服务 - AI英语教学系统
 
 支持大文件的边生成边传输，优化内存使用。
-使用异步生成器实现流式输出。
+文档在工作线程中生成并顺序写出，异步生成器在写出的同时产出数据块：
+- 首个数据块不必等待整个文档保存完成
+- 内存中不保留完整的文档字节
+- 下游读取慢时生成线程等待（背压）
 """
 
+import asyncio
 import logging
-from io import BytesIO
-from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
 from app.models.lesson_plan import LessonPlan
 from app.services.document_generators.pdf_generator import PDFDocumentGenerator
@@ -17,6 +20,77 @@ from app.services.document_generators.word_generator import WordDocumentGenerato
 logger = logging.getLogger(__name__)
 
 
+def _monotonic_progress(
+    progress_callback: Optional[Callable[[int], None]],
+) -> Optional[Callable[[int], None]]:
+    """
+    包装进度回调，只在进度增加时调用
+
+    分块传输时每个数据块都会计算一次进度，大文件会产生大量重复值。
+    """
+    if progress_callback is None:
+        return None
+    last = -1
+
+    def callback(percent: int) -> None:
+        nonlocal last
+        if percent > last:
+            last = percent
+            progress_callback(percent)
+
+    return callback
+
+
+class _ChunkPipe:
+    """
+    生成线程到事件循环的有界数据块管道
+
+    - write 在生成线程中调用，凑满 chunk_size 后放入有界队列
+    - 队列已满时 write 阻塞生成线程，直到下游取走数据（背压）
+    - 下游停止读取后 write 抛出 BrokenPipeError，生成线程随之退出
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, chunk_size: int, max_chunks: int) -> None:
+        self._loop = loop
+        self._chunk_size = chunk_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_chunks)
+        self._buffer = bytearray()
+        self._closed = False
+
+    def write(self, data: bytes) -> None:
+        """写入数据（在生成线程中调用）"""
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            if self._closed:
+                raise BrokenPipeError("下游已停止读取")
+            chunk = bytes(self._buffer[:self._chunk_size])
+            del self._buffer[:self._chunk_size]
+            asyncio.run_coroutine_threadsafe(self._queue.put(chunk), self._loop).result()
+
+    async def finish(self) -> None:
+        """写出剩余数据并标记结束（在事件循环中调用）"""
+        if self._closed:
+            return
+        if self._buffer:
+            await self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+        await self._queue.put(None)
+
+    async def get(self) -> Optional[bytes]:
+        """读取下一个数据块，None 表示结束"""
+        return await self._queue.get()
+
+    def close(self) -> None:
+        """下游停止读取"""
+        self._closed = True
+        self.drain()
+
+    def drain(self) -> None:
+        """丢弃已缓冲的数据块，唤醒阻塞的生成线程"""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+
 class StreamingDocumentService:
     """
     流式文档生成服务
@@ -28,8 +102,8 @@ class StreamingDocumentService:
     - 流式生成 Word 文档
     - 流式生成 PDF 文档
     - 流式生成 PPTX 文档
-    - 支持进度回调
-    - 内存优化（分块传输）
+    - 支持进度回调（只报告递增的进度值）
+    - 内存优化（边生成边传输，有界缓冲）
 
     使用示例：
         ```python
@@ -61,6 +135,9 @@ class StreamingDocumentService:
     # 最大块大小（1MB）
     MAX_CHUNK_SIZE = 1024 * 1024
 
+    # 生成线程领先下游的最大块数（超过后生成线程等待）
+    MAX_BUFFERED_CHUNKS = 8
+
     def __init__(self):
         """初始化流式文档生成服务"""
         self.word_generator = WordDocumentGenerator()
@@ -90,6 +167,7 @@ class StreamingDocumentService:
             ValueError: 如果内容数据无效或块大小超出范围
             Exception: 如果文档生成失败
         """
+        progress_callback = _monotonic_progress(progress_callback)
         try:
             # 验证块大小
             self._validate_chunk_size(chunk_size)
@@ -102,37 +180,21 @@ class StreamingDocumentService:
             if progress_callback:
                 progress_callback(0)
 
-            # 生成完整文档到内存
-            doc_bytes = self.word_generator.generate(content, template_vars)
+            # 生成器实例保存文档状态，每次生成使用独立实例以支持并发
+            generator = WordDocumentGenerator()
+            total_size = 0
+            async for chunk in self._stream_from_writer(
+                lambda write: asyncio.to_thread(generator.write_to, content, template_vars, write),
+                chunk_size,
+            ):
+                total_size += len(chunk)
+                yield chunk
 
             # 报告进度完成
             if progress_callback:
                 progress_callback(100)
 
-            # 流式传输文档数据
-            total_size = len(doc_bytes)
-            bytes_sent = 0
-
-            # 创建内存视图以高效分块
-            doc_stream = BytesIO(doc_bytes)
-
-            while True:
-                chunk = doc_stream.read(chunk_size)
-                if not chunk:
-                    break
-
-                bytes_sent += len(chunk)
-                yield chunk
-
-                # 更新进度
-                if progress_callback and total_size > 0:
-                    percent = int((bytes_sent / total_size) * 100)
-                    progress_callback(percent)
-
-            logger.info(
-                f"Word文档流式生成完成: {content.get('title')} "
-                f"({total_size} bytes, {len(doc_bytes) // chunk_size + 1} chunks)"
-            )
+            logger.info(f"Word文档流式生成完成: {content.get('title')} ({total_size} bytes)")
 
         except Exception as e:
             logger.error(f"Word文档流式生成失败: {str(e)}")
@@ -161,6 +223,7 @@ class StreamingDocumentService:
             ValueError: 如果教案数据无效或块大小超出范围
             Exception: 如果文档生成失败
         """
+        progress_callback = _monotonic_progress(progress_callback)
         try:
             # 验证块大小
             self._validate_chunk_size(chunk_size)
@@ -174,43 +237,21 @@ class StreamingDocumentService:
                 progress_callback(0)
                 progress_callback(10)  # 开始生成
 
-            # 生成完整文档到内存
-            pdf_bytes = await self.pdf_generator.generate_from_lesson_plan(
-                lesson_plan,
-                include_sections=include_sections,
-            )
-
-            # 报告生成完成
-            if progress_callback:
-                progress_callback(90)
-
-            # 流式传输文档数据
-            total_size = len(pdf_bytes)
-            bytes_sent = 0
-
-            pdf_stream = BytesIO(pdf_bytes)
-
-            while True:
-                chunk = pdf_stream.read(chunk_size)
-                if not chunk:
-                    break
-
-                bytes_sent += len(chunk)
+            total_size = 0
+            async for chunk in self._stream_from_writer(
+                lambda write: self.pdf_generator.write_lesson_plan_to(
+                    lesson_plan, write, include_sections=include_sections
+                ),
+                chunk_size,
+            ):
+                total_size += len(chunk)
                 yield chunk
 
-                # 更新进度
-                if progress_callback and total_size > 0:
-                    percent = int(10 + (bytes_sent / total_size) * 90)
-                    progress_callback(percent)
-
             # 报告完成
             if progress_callback:
                 progress_callback(100)
 
-            logger.info(
-                f"PDF文档流式生成完成: {lesson_plan.title} "
-                f"({total_size} bytes, {len(pdf_bytes) // chunk_size + 1} chunks)"
-            )
+            logger.info(f"PDF文档流式生成完成: {lesson_plan.title} ({total_size} bytes)")
 
         except Exception as e:
             logger.error(f"PDF文档流式生成失败: {str(e)}")
@@ -239,6 +280,7 @@ class StreamingDocumentService:
             ValueError: 如果内容数据无效或块大小超出范围
             Exception: 如果文档生成失败
         """
+        progress_callback = _monotonic_progress(progress_callback)
         try:
             # 验证块大小
             self._validate_chunk_size(chunk_size)
@@ -251,40 +293,70 @@ class StreamingDocumentService:
             if progress_callback:
                 progress_callback(0)
 
-            # 生成完整文档到内存
-            ppt_bytes = self.pptx_generator.generate(content, template_vars)
+            # 生成器实例保存演示文稿状态，每次生成使用独立实例以支持并发
+            generator = PPTXDocumentGenerator()
+            total_size = 0
+            async for chunk in self._stream_from_writer(
+                lambda write: asyncio.to_thread(generator.write_to, content, template_vars, write),
+                chunk_size,
+            ):
+                total_size += len(chunk)
+                yield chunk
 
             # 报告进度完成
             if progress_callback:
                 progress_callback(100)
 
-            # 流式传输文档数据
-            total_size = len(ppt_bytes)
-            bytes_sent = 0
+            logger.info(f"PPTX文档流式生成完成: {content.get('title')} ({total_size} bytes)")
 
-            ppt_stream = BytesIO(ppt_bytes)
+        except Exception as e:
+            logger.error(f"PPTX文档流式生成失败: {str(e)}")
+            raise Exception(f"PPTX文档流式生成失败: {str(e)}") from e
 
-            while True:
-                chunk = ppt_stream.read(chunk_size)
-                if not chunk:
-                    break
+    async def _stream_from_writer(
+        self,
+        produce: Callable[[Callable[[bytes], None]], Awaitable[None]],
+        chunk_size: int,
+    ) -> AsyncIterator[bytes]:
+        """
+        运行生成函数，并在它写出数据的同时产出数据块
 
-                bytes_sent += len(chunk)
-                yield chunk
+        Args:
+            produce: 生成函数，接收在工作线程中调用的 write 函数
+            chunk_size: 数据块大小（字节）
 
-                # 更新进度
-                if progress_callback and total_size > 0:
-                    percent = int((bytes_sent / total_size) * 100)
-                    progress_callback(percent)
+        Yields:
+            bytes: 文档数据块
 
-            logger.info(
-                f"PPTX文档流式生成完成: {content.get('title')} "
-                f"({total_size} bytes, {len(ppt_bytes) // chunk_size + 1} chunks)"
-            )
+        Raises:
+            Exception: 生成函数抛出的异常
+        """
+        pipe = _ChunkPipe(asyncio.get_running_loop(), chunk_size, self.MAX_BUFFERED_CHUNKS)
 
-        except Exception as e:
-            logger.error(f"PPTX文档流式生成失败: {str(e)}")
-            raise Exception(f"PPTX文档流式生成失败: {str(e)}") from e
+        async def run() -> None:
+            try:
+                await produce(pipe.write)
+            finally:
+                await pipe.finish()
+
+        producer = asyncio.create_task(run())
+        try:
+            while True:
+                chunk = await pipe.get()
+                if chunk is None:
+                    break
+                yield chunk
+            # 传播生成函数的异常
+            await producer
+        finally:
+            if not producer.done():
+                # 下游提前停止读取（如客户端断开）：让生成线程在下次写入时退出
+                pipe.close()
+                while not producer.done():
+                    pipe.drain()
+                    await asyncio.wait({producer}, timeout=0.05)
+            if not producer.cancelled() and producer.exception() is not None:
+                logger.debug(f"流式生成已中止: {producer.exception()}")
 
     def _validate_chunk_size(self, chunk_size: int) -> None:
         """
@@ -2,18 +2,24 @@
 向量搜索服务 - AI英语教学系统
 使用Qdrant向量数据库进行相似度搜索
 """
+import asyncio
+import inspect
+import logging
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from qdrant_client import AsyncQdrantClient, models
 from qdrant_client.http.exceptions import UnexpectedResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import String, cast, func, select, update
 
 from app.core.config import settings
 from app.models import Content, Vocabulary
 from app.services.embedding_service import get_embedding_service
 
+logger = logging.getLogger(__name__)
+
 
 class VectorService:
     """
@@ -161,20 +167,13 @@ class VectorService:
             content_text=content.content_text,
             description=content.description,
             topic=content.topic,
-            difficulty_level=content.difficulty_level.value if content.difficulty_level else None,
-            exam_type=content.exam_type.value if content.exam_type else None,
+            difficulty_level=content.difficulty_level,
+            exam_type=content.exam_type,
         )
 
-        # 构建元数据
-        metadata = {
-            "title": content.title,
-            "content_type": content.content_type.value,
-            "difficulty_level": content.difficulty_level.value,
-            "exam_type": content.exam_type.value if content.exam_type else None,
-            "topic": content.topic,
-            "tags": content.tags or [],
-            "is_published": content.is_published,
-        }
+        # 构建元数据（content_id 由 upsert_content 写入）
+        metadata = self.build_content_payload(content)
+        metadata.pop("content_id")
 
         # 插入向量
         point_id = await self.upsert_content(
@@ -221,26 +220,11 @@ class VectorService:
         client = self._get_client()
         collection = collection_name or self.CONTENT_COLLECTION
 
-        # 构建过滤条件
-        filter_conditions = None
-        if filters:
-            must_conditions = []
-            for key, value in filters.items():
-                if value is not None:
-                    must_conditions.append(
-                        models.FieldCondition(
-                            key=key,
-                            match=models.MatchValue(value=value)
-                        )
-                    )
-            if must_conditions:
-                filter_conditions = models.Filter(must=must_conditions)
-
         # 执行搜索（使用 query_points API）
         query_response = await client.query_points(
             collection_name=collection,
             query=query_vector,
-            query_filter=filter_conditions,
+            query_filter=self._build_filter(filters),
             limit=limit,
             score_threshold=score_threshold,
         )
@@ -256,6 +240,64 @@ class VectorService:
 
         return results
 
+    async def batch_search_similar(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int = 10,
+        score_threshold: float = 0.7,
+        filters: Optional[Dict[str, Any]] = None,
+        collection_name: str = None,
+        batch_size: int = 64,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量向量相似度搜索
+
+        Args:
+            query_vectors: 查询向量列表
+            limit: 每个查询返回的结果数量
+            score_threshold: 相似度阈值（0-1）
+            filters: 过滤条件，对所有查询生效
+            collection_name: 集合名称
+            batch_size: 每次请求包含的查询数量
+
+        Returns:
+            List[List[Dict]]: 与 query_vectors 一一对应的搜索结果
+
+        Note:
+            使用 query_batch_points，每 batch_size 个查询只需一次网络往返
+        """
+        client = self._get_client()
+        collection = collection_name or self.CONTENT_COLLECTION
+        query_filter = self._build_filter(filters)
+
+        results: List[List[Dict[str, Any]]] = []
+        for i in range(0, len(query_vectors), batch_size):
+            requests = [
+                models.QueryRequest(
+                    query=vector,
+                    filter=query_filter,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    with_payload=True,
+                )
+                for vector in query_vectors[i:i + batch_size]
+            ]
+            responses = await client.query_batch_points(
+                collection_name=collection,
+                requests=requests,
+            )
+            for response in responses:
+                results.append([
+                    {
+                        "id": point.id,
+                        "score": point.score,
+                        "payload": point.payload,
+                    }
+                    for point in response.points
+                ])
+
+        return results
+
     async def search_by_text(
         self,
         query_text: str,
@@ -363,6 +405,84 @@ class VectorService:
 
         return formatted_results[:limit]
 
+    async def upsert_contents_batch(
+        self,
+        contents: Sequence[Content],
+        vectors: Sequence[List[float]],
+        collection_name: str = None,
+    ) -> List[str]:
+        """
+        使用已生成的向量批量写入内容，并回填 vector_id
+
+        Args:
+            contents: Content模型实例列表
+            vectors: 与 contents 一一对应的向量
+            collection_name: 集合名称
+
+        Returns:
+            List[str]: Qdrant点ID列表
+
+        Note:
+            只修改 ORM 对象的 vector_id，由调用方负责提交事务
+        """
+        if not contents:
+            return []
+
+        client = self._get_client()
+        collection = collection_name or self.CONTENT_COLLECTION
+        await self.ensure_collection(collection)
+
+        points = [
+            models.PointStruct(
+                id=str(content.id),
+                vector=vector,
+                payload=self.build_content_payload(content),
+            )
+            for content, vector in zip(contents, vectors)
+        ]
+        await client.upsert(collection_name=collection, points=points)
+
+        point_ids = []
+        for content in contents:
+            content.vector_id = str(content.id)
+            point_ids.append(content.vector_id)
+        return point_ids
+
+    @staticmethod
+    def build_content_payload(content: Content) -> Dict[str, Any]:
+        """
+        构建内容在Qdrant中的payload
+
+        Args:
+            content: Content模型实例
+
+        Returns:
+            Dict: payload字典
+        """
+        return {
+            "content_id": str(content.id),
+            "title": content.title,
+            "content_type": content.content_type,
+            "difficulty_level": content.difficulty_level,
+            "exam_type": content.exam_type,
+            "topic": content.topic,
+            "tags": content.tags or [],
+            "is_published": content.is_published,
+        }
+
+    @staticmethod
+    def _build_filter(filters: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+        """将 {字段: 值} 转换为Qdrant过滤条件，忽略值为None的字段"""
+        if not filters:
+            return None
+
+        must_conditions = [
+            models.FieldCondition(key=key, match=models.MatchValue(value=value))
+            for key, value in filters.items()
+            if value is not None
+        ]
+        return models.Filter(must=must_conditions) if must_conditions else None
+
     async def delete_content(
         self,
         content_id: uuid.UUID,
@@ -508,137 +628,232 @@ class VectorService:
         batch_size: int = 50,
         progress_callback: Optional[callable] = None,
         collection_name: str = None,
+        start_after: Optional[uuid.UUID] = None,
+        checkpoint_callback: Optional[callable] = None,
+        embed_concurrency: int = 2,
+        queue_size: int = 4,
     ) -> dict:
         """
-        批量索引内容向量
+        批量索引内容向量（流式流水线）
+
+        三个阶段通过有界队列连接并发执行：
+        1. 按主键keyset分页读取内容（只取索引需要的列，不把整表读入内存）
+        2. 批量生成向量（embed_concurrency 个并发worker）
+        3. 批量Upsert到Qdrant，再用一条 UPDATE 回填整批的 vector_id
 
         Args:
             db: 数据库会话
             content_ids: 指定的内容ID列表，None表示索引所有未索引的内容
             batch_size: 每批处理数量
-            progress_callback: 进度回调函数(phase, current, total, message)
+            progress_callback: 进度回调函数(phase, current, total, message)，支持同步或异步函数
             collection_name: 集合名称
+            start_after: 从该内容ID之后继续（断点续传）
+            checkpoint_callback: 检查点回调(last_id)，在连续的批次全部成功后调用，
+                可持久化 last_id 并在下次通过 start_after 续传
+            embed_concurrency: 并发生成向量的批次数
+            queue_size: 每个阶段队列的最大批次数（背压）
 
         Returns:
-            索引统计信息 {"total": int, "indexed": int, "failed": int, "skipped": int}
+            索引统计信息 {"total": int, "indexed": int, "failed": int, "skipped": int, "last_id": str | None}
         """
-        # 获取待索引的内容
+        collection = collection_name or self.CONTENT_COLLECTION
+
+        conditions = []
         if content_ids is None:
             # 只索引未建立向量的内容
-            result = await db.execute(
-                select(Content).where(
-                    (Content.vector_id.is_(None)) | (Content.vector_id == '')
-                )
-            )
-            contents = result.scalars().all()
+            conditions.append((Content.vector_id.is_(None)) | (Content.vector_id == ''))
         else:
-            result = await db.execute(
-                select(Content).where(Content.id.in_(content_ids))
-            )
-            contents = result.scalars().all()
+            conditions.append(Content.id.in_(content_ids))
+        if start_after is not None:
+            conditions.append(Content.id > start_after)
 
-        total = len(contents)
-        indexed = 0
-        failed = 0
-        skipped = 0
+        total = (await db.execute(
+            select(func.count()).select_from(Content).where(*conditions)
+        )).scalar_one()
+
+        stats = {"total": total, "indexed": 0, "failed": 0, "skipped": 0, "last_id": None}
 
         if total == 0:
-            if progress_callback:
-                progress_callback("complete", 0, 0, "No contents to index")
-            return {"total": 0, "indexed": 0, "failed": 0, "skipped": 0}
-
-        # 批量处理
-        for i in range(0, total, batch_size):
-            batch = contents[i:i + batch_size]
-
-            if progress_callback:
-                progress_callback(
-                    "indexing",
-                    i,
-                    total,
-                    f"Processing batch {i // batch_size + 1}/{(total + batch_size - 1) // batch_size}"
-                )
+            await _notify(progress_callback, "complete", 0, 0, "No contents to index")
+            return stats
 
-            try:
-                # 生成向量
-                texts = []
-                for c in batch:
-                    text = self.embedding_service.generate_content_embedding(
-                        title=c.title,
-                        content_text=c.content_text,
-                        description=c.description,
-                        topic=c.topic,
-                        difficulty_level=c.difficulty_level if c.difficulty_level else None,
-                        exam_type=c.exam_type if c.exam_type else None,
-                    )
-                    texts.append((c.id, text))
+        await self.ensure_collection(collection)
+        client = self._get_client()
 
-                # 批量生成嵌入
-                embedding_texts = [t[1] for t in texts]
-                vectors = await self.embedding_service.batch_generate_embeddings(
-                    embedding_texts, batch_size=100
+        # AsyncSession 不能并发使用，读取和回填共用一把锁
+        db_lock = asyncio.Lock()
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        embed_concurrency = max(1, embed_concurrency)
+
+        async def produce() -> None:
+            last_id = start_after
+            seq = 0
+            while True:
+                stmt = (
+                    select(*_INDEX_COLUMNS)
+                    .where(*conditions)
+                    .order_by(Content.id)
+                    .limit(batch_size)
                 )
-
-                # 构建Qdrant点
-                points = []
-                for (content_id, _), vector in zip(texts, vectors):
-                    points.append(
-                        models.PointStruct(
-                            id=str(content_id),
-                            vector=vector,
-                            payload={
-                                "content_id": str(content_id),
-                                "title": next((c.title for c in batch if c.id == content_id), ""),
-                                "content_type": next((c.content_type for c in batch if c.id == content_id), ""),
-                                "difficulty_level": next((c.difficulty_level for c in batch if c.id == content_id), ""),
-                                "exam_type": next((c.exam_type for c in batch if c.id == content_id), None),
-                                "topic": next((c.topic for c in batch if c.id == content_id), None),
-                                "tags": next((c.tags for c in batch if c.id == content_id), []),
-                                "is_published": next((c.is_published for c in batch if c.id == content_id), True),
-                            }
+                if last_id is not None:
+                    stmt = stmt.where(Content.id > last_id)
+                async with db_lock:
+                    rows = (await db.execute(stmt)).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                await embed_queue.put(_IndexBatch(seq=seq, rows=rows))
+                seq += 1
+            for _ in range(embed_concurrency):
+                await embed_queue.put(None)
+
+        async def embed() -> None:
+            while (batch := await embed_queue.get()) is not None:
+                try:
+                    texts = [
+                        row.embedding_text or self.embedding_service.build_content_text(
+                            title=row.title,
+                            content_text=row.content_text,
+                            description=row.description,
+                            topic=row.topic,
+                            difficulty_level=row.difficulty_level,
+                            exam_type=row.exam_type,
                         )
+                        for row in batch.rows
+                    ]
+                    batch.vectors = await self.embedding_service.batch_generate_embeddings(
+                        texts, batch_size=100
                     )
-
-                # 确保集合存在
-                await self.ensure_collection(collection_name)
-
-                # 批量Upsert到Qdrant
-                await self.client.upsert(
-                    collection_name=collection_name or self.CONTENT_COLLECTION,
-                    points=points,
+                    if len(batch.vectors) != len(batch.rows):
+                        raise ValueError(
+                            f"Embedding count mismatch: {len(batch.vectors)} != {len(batch.rows)}"
+                        )
+                except Exception as e:
+                    batch.error = e
+                await upsert_queue.put(batch)
+            await upsert_queue.put(None)
+
+        async def upsert() -> None:
+            finished = 0
+            while finished < embed_concurrency:
+                batch = await upsert_queue.get()
+                if batch is None:
+                    finished += 1
+                    continue
+                if batch.error is None:
+                    try:
+                        await client.upsert(
+                            collection_name=collection,
+                            points=[
+                                models.PointStruct(
+                                    id=str(row.id),
+                                    vector=vector,
+                                    payload=self.build_content_payload(row),
+                                )
+                                for row, vector in zip(batch.rows, batch.vectors)
+                            ],
+                        )
+                    except Exception as e:
+                        batch.error = e
+                await write_queue.put(batch)
+            await write_queue.put(None)
+
+        async def write_back() -> None:
+            processed = 0
+            # 批次序号 -> 最后一条内容ID，失败的批次为None
+            completed: Dict[int, Optional[uuid.UUID]] = {}
+            next_seq = 0
+            while (batch := await write_queue.get()) is not None:
+                ids = [row.id for row in batch.rows]
+                if batch.error is None:
+                    try:
+                        # 一条UPDATE回填整批：vector_id 即内容ID的字符串形式
+                        async with db_lock:
+                            await db.execute(
+                                update(Content)
+                                .where(Content.id.in_(ids))
+                                .values(vector_id=cast(Content.id, String))
+                                .execution_options(synchronize_session=False)
+                            )
+                            await db.commit()
+                        stats["indexed"] += len(ids)
+                    except Exception as e:
+                        batch.error = e
+                        async with db_lock:
+                            await db.rollback()
+                if batch.error is not None:
+                    logger.error(f"Batch {batch.seq + 1} failed: {batch.error}")
+                    stats["failed"] += len(ids)
+
+                processed += len(ids)
+                await _notify(
+                    progress_callback, "indexing", processed, total,
+                    f"Processed batch {batch.seq + 1}"
                 )
 
-                # 更新数据库vector_id
-                for content_id, vector in zip([t[0] for t in texts], vectors):
-                    await db.execute(
-                        select(Content)
-                        .where(Content.id == content_id)
-                        .values(vector_id=str(content_id))
-                    )
-
-                indexed += len(batch)
-                await db.commit()
-
-            except Exception as e:
-                logger.error(f"Batch {i // batch_size + 1} failed: {e}")
-                failed += len(batch)
-                # 回滚当前批次的事务
-                await db.rollback()
-
-        if progress_callback:
-            progress_callback(
-                "complete",
-                total,
-                total,
-                f"Indexed: {indexed}, Failed: {failed}, Skipped: {skipped}"
-            )
+                # 检查点只推进到连续成功的批次，失败的批次阻止检查点继续前进，
+                # 保证从 last_id 续传时会重新处理失败及其之后的内容
+                completed[batch.seq] = ids[-1] if batch.error is None else None
+                advanced = False
+                while completed.get(next_seq) is not None:
+                    stats["last_id"] = str(completed.pop(next_seq))
+                    next_seq += 1
+                    advanced = True
+                if advanced and checkpoint_callback:
+                    await _notify(checkpoint_callback, stats["last_id"])
+
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(produce())
+            for _ in range(embed_concurrency):
+                tg.create_task(embed())
+            tg.create_task(upsert())
+            tg.create_task(write_back())
+
+        await _notify(
+            progress_callback,
+            "complete",
+            total,
+            total,
+            f"Indexed: {stats['indexed']}, Failed: {stats['failed']}, Skipped: {stats['skipped']}"
+        )
 
-        return {
-            "total": total,
-            "indexed": indexed,
-            "failed": failed,
-            "skipped": skipped
-        }
+        return stats
+
+
+# 索引流水线只读取需要的列，避免加载完整ORM对象
+_INDEX_COLUMNS = (
+    Content.id,
+    Content.title,
+    Content.description,
+    Content.content_text,
+    Content.embedding_text,
+    Content.content_type,
+    Content.difficulty_level,
+    Content.exam_type,
+    Content.topic,
+    Content.tags,
+    Content.is_published,
+)
+
+
+@dataclass
+class _IndexBatch:
+    """索引流水线中流转的批次"""
+    seq: int
+    rows: List[Any]
+    vectors: Optional[List[List[float]]] = None
+    error: Optional[Exception] = None
+
+
+async def _notify(callback: Optional[callable], *args: Any) -> None:
+    """调用回调，兼容同步和异步回调函数"""
+    if callback is None:
+        return
+    result = callback(*args)
+    if inspect.isawaitable(result):
+        await result
 
 
 # 创建全局单例
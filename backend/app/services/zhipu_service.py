@@ -3,9 +3,10 @@
 使用智谱AI的API进行对话和向量化
 """
 import asyncio
+import json
 import logging
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 
@@ -110,7 +111,7 @@ class ZhipuAIService:
             max_tokens: 最大token数
             top_p: top_p采样参数
             top_k: top_k采样参数
-            stream: 是否流式输出
+            stream: 是否流式输出（不支持，流式输出请使用 chat_completion_stream）
             response_format: 响应格式（支持JSON mode）
             timeout: 请求超时时间（秒），默认60秒
 
@@ -119,6 +120,8 @@ class ZhipuAIService:
         """
         if not self.api_key:
             raise ValueError("智谱AI API密钥未配置，请在.env中设置ZHIPUAI_API_KEY")
+        if stream:
+            raise ValueError("chat_completion 返回完整响应，流式输出请使用 chat_completion_stream")
 
         # 速率限制和并发控制
         await self._chat_rate_limiter.acquire()
@@ -170,6 +173,88 @@ class ZhipuAIService:
                 logger.error(f"智谱AI调用失败: {e}")
                 raise
 
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式聊天完成API调用
+
+        以 SSE 方式请求智谱AI，收到增量内容后立即产出。
+        只产出 delta.content，思考过程（reasoning_content）不产出。
+
+        Args:
+            messages: 对话消息列表
+            temperature: 温度参数
+            max_tokens: 最大token数
+            top_p: top_p采样参数
+            top_k: top_k采样参数
+            timeout: 请求超时时间（秒），默认60秒
+
+        Yields:
+            str: 回复的增量文本
+        """
+        if not self.api_key:
+            raise ValueError("智谱AI API密钥未配置，请在.env中设置ZHIPUAI_API_KEY")
+
+        # 速率限制和并发控制（并发名额在整个流式响应期间占用）
+        await self._chat_rate_limiter.acquire()
+
+        async with self._concurrency_semaphore:
+            payload = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature or self.temperature,
+                "max_tokens": max_tokens or self.max_tokens,
+                "top_p": top_p or settings.ZHIPUAI_TOP_P,
+                "top_k": top_k or settings.ZHIPUAI_TOP_K,
+                "stream": True
+            }
+
+            try:
+                logger.debug(f"调用智谱AI chat_completion_stream: {len(messages)} 条消息")
+                async with self.client.stream(
+                    "POST",
+                    "/chat/completions",
+                    json=payload,
+                    timeout=timeout or 60.0
+                ) as response:
+                    if response.is_error:
+                        # 流式响应需要先读取响应体，错误日志才能包含内容
+                        await response.aread()
+                    response.raise_for_status()
+
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except ValueError:
+                            logger.warning(f"无法解析智谱AI流式数据: {data[:100]}")
+                            continue
+
+                        choices = chunk.get("choices") or [{}]
+                        delta = choices[0].get("delta") or {}
+                        content = delta.get("content")
+                        if content:
+                            yield content
+
+                logger.debug("智谱AI chat_completion_stream 成功")
+            except httpx.HTTPStatusError as e:
+                logger.error(f"智谱AI API错误: {e.response.status_code} - {e.response.text}")
+                raise
+            except Exception as e:
+                logger.error(f"智谱AI流式调用失败: {e}")
+                raise
+
     async def generate_embedding(
         self,
         text: str,
@@ -347,6 +347,168 @@ def cleanup_expired_tasks():
     return {"cleaned_tasks": cleaned}
 
 
+# ============ 推荐预计算任务 ============
+
+@shared_task(
+    name="app.tasks.recommendation_tasks.precompute_daily_recommendations",
+)
+def precompute_daily_recommendations(active_days: int = 7, batch_size: int = 500):
+    """
+    为活跃学生预计算当日推荐（低峰期执行）
+
+    结果写入推荐缓存，白天的推荐接口只需读取缓存。
+
+    Args:
+        active_days: 最近多少天内登录过的学生视为活跃
+        batch_size: 每批处理的学生数（同批学生共享嵌入和向量检索）
+    """
+    stats = run_async(_precompute_daily_recommendations(active_days, batch_size))
+    logger.info(f"Precomputed daily recommendations: {stats}")
+    return stats
+
+
+async def _precompute_daily_recommendations(active_days: int, batch_size: int) -> dict:
+    """分批生成推荐，单批失败不影响其他批次"""
+    from datetime import timedelta
+
+    from app.models import Student
+    from app.services.recommendation_service import RecommendationService
+
+    since = datetime.utcnow() - timedelta(days=active_days)
+    stats = {"total": 0, "success": 0, "failed": 0}
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Student.id)
+            .join(User, Student.user_id == User.id)
+            .where(User.is_active.is_(True), User.last_login_at >= since)
+        )
+        student_ids = list(result.scalars().all())
+        stats["total"] = len(student_ids)
+
+        for start in range(0, len(student_ids), batch_size):
+            batch = student_ids[start:start + batch_size]
+            try:
+                responses = await RecommendationService.recommend_daily_batch(
+                    db=db, student_ids=batch
+                )
+                stats["success"] += len(responses)
+                stats["failed"] += len(batch) - len(responses)
+            except Exception as e:
+                logger.warning(f"Failed to precompute recommendations for batch at {start}: {e}")
+                stats["failed"] += len(batch)
+                await db.rollback()
+
+            # 释放本批加载的ORM对象，保持内存平稳
+            db.expunge_all()
+
+    return stats
+
+
+# ============ 每日统计回填任务 ============
+
+@shared_task(
+    name="app.tasks.report_tasks.backfill_student_daily_stats",
+)
+def backfill_student_daily_stats(days: Optional[int] = None, batch_size: int = 500):
+    """
+    从练习/错题明细重建学生每日统计汇总
+
+    上线时不带参数执行一次回填全部历史；定时任务以 days=2 重建最近两天，
+    修正增量更新遗漏（如回填前已存在错题的状态变更）。
+
+    Args:
+        days: 只重建最近多少天（为空则全部历史）
+        batch_size: 每批处理的学生数（每批单独提交）
+    """
+    stats = run_async(_backfill_student_daily_stats(days, batch_size))
+    logger.info(f"Backfilled student daily stats: {stats}")
+    return stats
+
+
+async def _backfill_student_daily_stats(days: Optional[int], batch_size: int) -> dict:
+    """按学生ID分批回填，单批失败不影响其他批次"""
+    from datetime import timedelta
+
+    from app.models import Student
+    from app.services.daily_stats_service import DailyStatsService
+
+    start_date = (datetime.utcnow() - timedelta(days=days)).date() if days else None
+    stats = {"students": 0, "rows": 0, "failed": 0}
+
+    async with AsyncSessionLocal() as db:
+        service = DailyStatsService(db)
+        last_id = None
+
+        while True:
+            query = select(Student.id).order_by(Student.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(Student.id > last_id)
+            batch = list((await db.execute(query)).scalars().all())
+            if not batch:
+                break
+            last_id = batch[-1]
+
+            try:
+                stats["rows"] += await service.backfill(student_ids=batch, start_date=start_date)
+                await db.commit()
+                stats["students"] += len(batch)
+            except Exception as e:
+                logger.warning(f"Failed to backfill daily stats for batch after {batch[0]}: {e}")
+                stats["failed"] += len(batch)
+                await db.rollback()
+
+    return stats
+
+
+# ============ 错题批量收集任务 ============
+
+@shared_task(
+    name="app.tasks.mistake_tasks.collect_mistakes_for_practices",
+)
+def collect_mistakes_for_practices(practice_ids: list, batch_size: int = 200):
+    """
+    批量从已完成的练习中收集错题
+
+    考试结束后整班提交时由接口投递，避免每份练习各占一个请求连接逐题提交。
+    整个任务只使用一个数据库连接，每批练习一条合并语句、一次提交。
+
+    Args:
+        practice_ids: 练习记录ID列表（字符串）
+        batch_size: 每批处理的练习数（每批单独提交）
+    """
+    stats = run_async(_collect_mistakes_for_practices(practice_ids, batch_size))
+    logger.info(f"Collected mistakes for practices: {stats}")
+    return stats
+
+
+async def _collect_mistakes_for_practices(practice_ids: list, batch_size: int) -> dict:
+    """分批收集错题，单批失败不影响其他批次"""
+    from app.services.mistake_service import MistakeService
+
+    ids = [UUID(str(practice_id)) for practice_id in practice_ids]
+    stats = {"practices": len(ids), "collected_practices": 0, "mistakes": 0, "failed": 0}
+
+    async with AsyncSessionLocal() as db:
+        service = MistakeService(db)
+
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            try:
+                collected = await service.collect_mistakes_from_practices(batch)
+                stats["collected_practices"] += len(collected)
+                stats["mistakes"] += sum(len(mistakes) for mistakes in collected.values())
+            except Exception as e:
+                logger.warning(f"Failed to collect mistakes for batch at {start}: {e}")
+                stats["failed"] += len(batch)
+                await db.rollback()
+
+            # 释放本批加载的ORM对象，保持内存平稳
+            db.expunge_all()
+
+    return stats
+
+
 # ============ 取消任务 ============
 
 @shared_task(
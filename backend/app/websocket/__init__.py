@@ -1,7 +1,8 @@
 """
 WebSocket 模块
 """
+from app.websocket.backplane import get_websocket_backplane
 from app.websocket.manager import manager
 from app.websocket.export_manager import export_manager
 
-__all__ = ["manager", "export_manager"]
+__all__ = ["manager", "export_manager", "get_websocket_backplane"]
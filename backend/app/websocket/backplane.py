@@ -0,0 +1,250 @@
+"""
+WebSocket 跨进程消息总线
+
+使用 Redis pub/sub 把 WebSocket 消息转发到持有连接的进程：
+- 频道按目标划分：ws:user:{user_id}、ws:task:{task_id}、ws:broadcast:all
+- 进程只订阅本地有连接的目标频道（首个连接时订阅，最后一个断开时退订）
+- 任何进程（包括没有监听器的 Celery worker）都可以发布
+- 消息带有来源进程ID，监听器忽略自己发布的消息（本地连接已直接投递）
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 消息处理函数：(target, message) -> None
+MessageHandler = Callable[[str, dict], Awaitable[None]]
+
+BROADCAST_TARGET = "all"
+
+
+class WebSocketBackplane:
+    """
+    基于 Redis pub/sub 的 WebSocket 消息总线
+
+    使用示例：
+        ```python
+        backplane = get_websocket_backplane()
+        backplane.register_handler("user", deliver_to_local_user)
+        await backplane.start()
+        await backplane.publish("user", str(user_id), {"type": "notification"})
+        ```
+    """
+
+    _CHANNEL_PREFIX = "ws:"
+
+    # 发布失败后暂停发布的时间（秒），避免 Redis 不可用时每条消息都等待连接超时
+    _PUBLISH_COOLDOWN = 5.0
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        """
+        初始化消息总线
+
+        Args:
+            redis_client: Redis 客户端，默认按配置懒加载
+        """
+        self.node_id = uuid.uuid4().hex
+        self._redis = redis_client
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handlers: Dict[str, MessageHandler] = {}
+        # 本进程需要订阅的频道（监听器未启动时只记录，启动后统一订阅）
+        self._channels: set[str] = {self._channel("broadcast", BROADCAST_TARGET)}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._publish_disabled_until = 0.0
+        self._pending_tasks: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用跨进程转发"""
+        return get_settings().WEBSOCKET_BACKPLANE_ENABLED
+
+    @property
+    def listening(self) -> bool:
+        """本进程的监听器是否在运行"""
+        return self._listener is not None and not self._listener.done()
+
+    def _channel(self, kind: str, target: str) -> str:
+        return f"{self._CHANNEL_PREFIX}{kind}:{target}"
+
+    async def _get_redis(self) -> redis.Redis:
+        """
+        获取 Redis 客户端（懒加载）
+
+        Celery 任务每次在新的事件循环中运行，客户端连接不能跨事件循环复用，
+        事件循环变化时重新创建客户端。
+        """
+        loop = asyncio.get_running_loop()
+        if self._redis is None or (self._redis_loop is not None and self._redis_loop is not loop):
+            settings = get_settings()
+            self._redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+            )
+            self._redis_loop = loop
+        return self._redis
+
+    def register_handler(self, kind: str, handler: MessageHandler) -> None:
+        """
+        注册某类目标的本地投递函数
+
+        Args:
+            kind: 目标类型（user/task/broadcast）
+            handler: 收到其他进程消息时调用的投递函数
+        """
+        self._handlers[kind] = handler
+
+    async def subscribe(self, kind: str, target: str) -> None:
+        """订阅目标频道（本地出现该目标的首个连接时调用）"""
+        channel = self._channel(kind, target)
+        self._channels.add(channel)
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.subscribe(channel)
+            except Exception as e:
+                logger.warning(f"订阅 WebSocket 频道 {channel} 失败: {e}")
+
+    def unsubscribe(self, kind: str, target: str) -> None:
+        """
+        退订目标频道（本地该目标的最后一个连接断开时调用）
+
+        连接管理器的 disconnect 是同步方法，退订命令在后台任务中发送。
+        """
+        channel = self._channel(kind, target)
+        self._channels.discard(channel)
+        if self._pubsub is not None:
+            task = asyncio.get_running_loop().create_task(self._unsubscribe(channel))
+            self._pending_tasks.add(task)
+            task.add_done_callback(self._pending_tasks.discard)
+
+    async def _unsubscribe(self, channel: str) -> None:
+        # 退订命令发出前又有新连接订阅了同一频道时保留订阅
+        if channel in self._channels or self._pubsub is None:
+            return
+        try:
+            await self._pubsub.unsubscribe(channel)
+        except Exception as e:
+            logger.warning(f"退订 WebSocket 频道 {channel} 失败: {e}")
+
+    async def publish(self, kind: str, target: str, message: dict) -> int:
+        """
+        向目标频道发布消息
+
+        Args:
+            kind: 目标类型（user/task/broadcast）
+            target: 目标ID
+            message: 消息内容
+
+        Returns:
+            int: 收到消息的进程数（包括本进程），发布失败或未启用时返回 0
+        """
+        if not self.enabled or time.monotonic() < self._publish_disabled_until:
+            return 0
+
+        envelope = json.dumps(
+            {"origin": self.node_id, "target": target, "message": message},
+            ensure_ascii=False,
+            default=str,
+        )
+        try:
+            redis_client = await self._get_redis()
+            return await redis_client.publish(self._channel(kind, target), envelope)
+        except Exception as e:
+            self._publish_disabled_until = time.monotonic() + self._PUBLISH_COOLDOWN
+            logger.warning(f"发布 WebSocket 消息失败，{self._PUBLISH_COOLDOWN} 秒内跳过跨进程转发: {e}")
+            return 0
+
+    async def _dispatch(self, raw: Dict[str, Any]) -> None:
+        """把收到的频道消息交给对应的本地投递函数"""
+        channel = raw.get("channel") or ""
+        kind = channel[len(self._CHANNEL_PREFIX):].split(":", 1)[0]
+        handler = self._handlers.get(kind)
+        if handler is None:
+            return
+
+        try:
+            envelope = json.loads(raw["data"])
+        except (TypeError, ValueError):
+            logger.warning(f"无法解析 WebSocket 频道 {channel} 的消息")
+            return
+        if envelope.get("origin") == self.node_id:
+            return
+
+        await handler(envelope["target"], envelope["message"])
+
+    async def _listen(self) -> None:
+        """监听循环：连接断开后自动重连并重新订阅"""
+        while True:
+            try:
+                redis_client = await self._get_redis()
+                self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(*self._channels)
+                while True:
+                    raw = await self._pubsub.get_message(timeout=1.0)
+                    if raw is not None:
+                        try:
+                            await self._dispatch(raw)
+                        except Exception as e:
+                            logger.error(f"投递跨进程 WebSocket 消息失败: {e}", exc_info=e)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket 消息总线连接中断，1 秒后重连: {e}")
+                await self._close_pubsub()
+                await asyncio.sleep(1.0)
+
+    async def _close_pubsub(self) -> None:
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
+
+    async def start(self) -> None:
+        """启动监听器（用于应用启动时，Celery worker 只发布不需要启动）"""
+        if not self.enabled or self.listening:
+            return
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"WebSocket 消息总线已启动: node={self.node_id}")
+
+    async def stop(self) -> None:
+        """停止监听器并关闭 Redis 连接（用于应用关闭时）"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._close_pubsub()
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+            self._redis_loop = None
+
+
+# 创建全局单例
+_websocket_backplane: Optional[WebSocketBackplane] = None
+
+
+def get_websocket_backplane() -> WebSocketBackplane:
+    """
+    获取 WebSocket 消息总线单例
+
+    Returns:
+        WebSocketBackplane: 消息总线实例
+    """
+    global _websocket_backplane
+    if _websocket_backplane is None:
+        _websocket_backplane = WebSocketBackplane()
+    return _websocket_backplane
@@ -0,0 +1,100 @@
+"""
+WebSocket 并发投递
+
+- 多个连接的发送并发执行（asyncio.gather），单个慢连接不阻塞其他连接
+- 每个连接限制同时进行中的发送数（背压），超过上限视为慢消费者
+- 单次发送超时同样视为慢消费者；慢消费者和发送失败的连接由调用方驱逐
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import WebSocket
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 驱逐慢消费者时使用的关闭码（1013: Try Again Later）
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class BoundedSender:
+    """带背压的 WebSocket 发送器"""
+
+    def __init__(
+        self,
+        max_pending: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+    ) -> None:
+        """
+        初始化发送器
+
+        Args:
+            max_pending: 每个连接同时进行中的最大发送数，默认读取配置
+            send_timeout: 单次发送超时（秒），默认读取配置
+        """
+        settings = get_settings()
+        self.max_pending = max_pending or settings.WEBSOCKET_MAX_PENDING_SENDS
+        self.send_timeout = send_timeout or settings.WEBSOCKET_SEND_TIMEOUT
+        # id(websocket) -> 进行中的发送数
+        self._pending: Dict[int, int] = {}
+
+    async def send(self, websocket: WebSocket, message: dict) -> bool:
+        """
+        向单个连接发送消息
+
+        Args:
+            websocket: WebSocket 连接
+            message: 消息内容
+
+        Returns:
+            bool: 是否发送成功（False 表示连接应被驱逐）
+        """
+        key = id(websocket)
+        pending = self._pending.get(key, 0)
+        if pending >= self.max_pending:
+            logger.warning(f"WebSocket 连接积压 {pending} 条未发送消息，按慢消费者处理")
+            return False
+
+        self._pending[key] = pending + 1
+        try:
+            await asyncio.wait_for(websocket.send_json(message), timeout=self.send_timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"WebSocket 发送超过 {self.send_timeout} 秒，按慢消费者处理")
+            return False
+        except Exception as e:
+            logger.warning(f"WebSocket 发送失败: {e}")
+            return False
+        finally:
+            remaining = self._pending.get(key, 1) - 1
+            if remaining > 0:
+                self._pending[key] = remaining
+            else:
+                self._pending.pop(key, None)
+
+    async def send_many(self, websockets: Iterable[WebSocket], message: dict) -> List[WebSocket]:
+        """
+        并发向多个连接发送同一条消息
+
+        Args:
+            websockets: WebSocket 连接
+            message: 消息内容
+
+        Returns:
+            List[WebSocket]: 发送失败、应被驱逐的连接
+        """
+        targets = list(websockets)
+        if not targets:
+            return []
+        results = await asyncio.gather(*(self.send(ws, message) for ws in targets))
+        return [ws for ws, ok in zip(targets, results) if not ok]
+
+
+async def close_quietly(websocket: WebSocket, code: int = SLOW_CONSUMER_CLOSE_CODE) -> None:
+    """关闭被驱逐的连接，忽略连接已断开等错误"""
+    try:
+        await asyncio.wait_for(websocket.close(code=code), timeout=1.0)
+    except Exception:
+        pass
@@ -1,6 +1,9 @@
 """
 教案导出 WebSocket 连接管理器
 管理导出任务的 WebSocket 连接，实现实时进度推送
+
+导出任务通常在 Celery worker 或其他 uvicorn 进程中执行，
+本进程没有该任务的连接时，消息通过消息总线转发给持有连接的进程。
 """
 
 import logging
@@ -8,6 +11,9 @@ from typing import Dict, Optional
 
 from fastapi import WebSocket
 
+from app.websocket.backplane import WebSocketBackplane, get_websocket_backplane
+from app.websocket.delivery import BoundedSender, close_quietly
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,9 +28,19 @@ class ExportConnectionManager:
     - 错误通知
     """
 
-    def __init__(self) -> None:
+    def __init__(self, backplane: Optional[WebSocketBackplane] = None) -> None:
+        """
+        初始化连接管理器
+
+        Args:
+            backplane: 跨进程消息总线，为空时只投递本进程的连接
+        """
         # task_id -> WebSocket 连接映射
         self.active_connections: Dict[str, WebSocket] = {}
+        self.backplane = backplane
+        self._sender = BoundedSender()
+        if backplane is not None:
+            backplane.register_handler("task", self._deliver_remote)
 
     async def connect(self, task_id: str, websocket: WebSocket) -> None:
         """
@@ -36,6 +52,8 @@ class ExportConnectionManager:
         """
         await websocket.accept()
         self.active_connections[task_id] = websocket
+        if self.backplane is not None:
+            await self.backplane.subscribe("task", task_id)
 
         # 发送连接确认消息
         await self.send_message(
@@ -52,6 +70,8 @@ class ExportConnectionManager:
         """
         if task_id in self.active_connections:
             del self.active_connections[task_id]
+            if self.backplane is not None:
+                self.backplane.unsubscribe("task", task_id)
             logger.info(f"WebSocket 已断开任务: {task_id}")
 
     async def send_message(self, task_id: str, message: dict) -> bool:
@@ -65,18 +85,34 @@ class ExportConnectionManager:
         Returns:
             bool: 发送是否成功
         """
-        if task_id not in self.active_connections:
-            logger.warning(f"任务 {task_id} 没有活跃的 WebSocket 连接")
-            return False
+        if task_id in self.active_connections:
+            return await self._deliver_local(task_id, message)
+
+        if self.backplane is not None:
+            # 本进程没有连接，转发给持有连接的进程
+            if await self.backplane.publish("task", task_id, message) > 0:
+                return True
+
+        logger.warning(f"任务 {task_id} 没有活跃的 WebSocket 连接")
+        return False
 
-        try:
-            await self.active_connections[task_id].send_json(message)
+    async def _deliver_local(self, task_id: str, message: dict) -> bool:
+        """投递到本进程中该任务的连接，发送失败或消费过慢时断开连接"""
+        websocket = self.active_connections[task_id]
+        if await self._sender.send(websocket, message):
             return True
-        except Exception as e:
-            logger.error(f"发送消息到任务 {task_id} 失败: {e}", exc_info=e)
-            # 发送失败时断开连接
+
+        logger.error(f"发送消息到任务 {task_id} 失败，断开连接")
+        # 连接已被替换时不影响新连接
+        if self.active_connections.get(task_id) is websocket:
             self.disconnect(task_id)
-            return False
+        await close_quietly(websocket)
+        return False
+
+    async def _deliver_remote(self, task_id: str, message: dict) -> None:
+        """投递其他进程发布的任务消息"""
+        if task_id in self.active_connections:
+            await self._deliver_local(task_id, message)
 
     async def broadcast_progress(self, task_id: str, progress: int, message: str) -> bool:
         """
@@ -188,4 +224,4 @@ class ExportConnectionManager:
 
 
 # 全局连接管理器单例
-export_manager = ExportConnectionManager()
+export_manager = ExportConnectionManager(get_websocket_backplane())
@@ -2,28 +2,49 @@
 WebSocket 连接管理器
 
 管理WebSocket连接，实现消息广播功能。
+
+- 本地连接并发投递，慢消费者和发送失败的连接会被驱逐
+- 配置消息总线后，消息同时发布到 Redis，由持有该用户连接的其他进程投递
 """
-import json
+import logging
 import uuid
-from typing import Dict, Set
+from typing import Dict, Optional, Set
 
 from fastapi import WebSocket
 
+from app.websocket.backplane import BROADCAST_TARGET, WebSocketBackplane, get_websocket_backplane
+from app.websocket.delivery import BoundedSender, close_quietly
+
+logger = logging.getLogger(__name__)
+
 
 class ConnectionManager:
     """WebSocket连接管理器"""
 
-    def __init__(self):
+    def __init__(self, backplane: Optional[WebSocketBackplane] = None):
+        """
+        初始化连接管理器
+
+        Args:
+            backplane: 跨进程消息总线，为空时只投递本进程的连接
+        """
         # user_id -> set of WebSocket connections
         self.active_connections: Dict[uuid.UUID, Set[WebSocket]] = {}
         # connection_id -> user_id mapping (for debugging)
-        self.connection_ids: Dict[id, uuid.UUID] = {}
+        self.connection_ids: Dict[int, uuid.UUID] = {}
+        self.backplane = backplane
+        self._sender = BoundedSender()
+        if backplane is not None:
+            backplane.register_handler("user", self._deliver_remote_user)
+            backplane.register_handler("broadcast", self._deliver_remote_broadcast)
 
     async def connect(self, websocket: WebSocket, user_id: uuid.UUID) -> None:
         """接受WebSocket连接"""
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = set()
+            if self.backplane is not None:
+                await self.backplane.subscribe("user", str(user_id))
         self.active_connections[user_id].add(websocket)
         self.connection_ids[id(websocket)] = user_id
 
@@ -34,23 +55,45 @@ class ConnectionManager:
             self.active_connections[user_id].discard(websocket)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
+                if self.backplane is not None:
+                    self.backplane.unsubscribe("user", str(user_id))
         if id(websocket) in self.connection_ids:
             del self.connection_ids[id(websocket)]
         return user_id
 
+    async def _evict(self, websocket: WebSocket) -> None:
+        """驱逐发送失败或消费过慢的连接"""
+        self.disconnect(websocket)
+        await close_quietly(websocket)
+
+    async def _deliver_local(self, message: dict, user_id: uuid.UUID) -> int:
+        """并发投递到本进程中该用户的连接，返回成功投递的连接数"""
+        connections = list(self.active_connections.get(user_id, ()))
+        failed = await self._sender.send_many(connections, message)
+        for conn in failed:
+            await self._evict(conn)
+        return len(connections) - len(failed)
+
+    async def _deliver_local_all(self, message: dict) -> None:
+        """并发投递到本进程的所有连接"""
+        connections = [conn for conns in self.active_connections.values() for conn in conns]
+        failed = await self._sender.send_many(connections, message)
+        for conn in failed:
+            await self._evict(conn)
+
+    async def _deliver_remote_user(self, target: str, message: dict) -> None:
+        """投递其他进程发布的用户消息"""
+        await self._deliver_local(message, uuid.UUID(target))
+
+    async def _deliver_remote_broadcast(self, target: str, message: dict) -> None:
+        """投递其他进程发布的全体广播"""
+        await self._deliver_local_all(message)
+
     async def send_personal_message(self, message: dict, user_id: uuid.UUID) -> None:
-        """发送个人消息"""
-        if user_id in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error sending message: {e}")
-                    disconnected.add(connection)
-            # 清理断开的连接
-            for conn in disconnected:
-                self.disconnect(conn)
+        """发送个人消息（用户可能在多个进程上有连接，总是同时发布到消息总线）"""
+        await self._deliver_local(message, user_id)
+        if self.backplane is not None:
+            await self.backplane.publish("user", str(user_id), message)
 
     async def broadcast_to_user(self, message: dict, user_id: uuid.UUID) -> None:
         """向指定用户广播消息"""
@@ -58,8 +101,9 @@ class ConnectionManager:
 
     async def broadcast_to_all(self, message: dict) -> None:
         """向所有连接的用户广播消息"""
-        for user_id in list(self.active_connections.keys()):
-            await self.broadcast_to_user(message, user_id)
+        await self._deliver_local_all(message)
+        if self.backplane is not None:
+            await self.backplane.publish("broadcast", BROADCAST_TARGET, message)
 
     def get_connection_count(self, user_id: uuid.UUID) -> int:
         """获取用户的连接数"""
@@ -71,4 +115,4 @@ class ConnectionManager:
 
 
 # 全局连接管理器单例
-manager = ConnectionManager()
+manager = ConnectionManager(get_websocket_backplane())
@@ -67,12 +67,17 @@ def parse_args():
     import_parser.add_argument("--content", type=str, help="内容JSON文件/目录")
     import_parser.add_argument("--vocabulary", type=str, help="词汇JSON文件/目录")
     import_parser.add_argument("--skip-duplicates", action="store_true", help="跳过去重")
+    import_parser.add_argument("--index", action="store_true", help="同时将导入内容的向量写入Qdrant")
 
     # index命令
     index_parser = subparsers.add_parser("index", help="向量索引")
     index_parser.add_argument("--batch-size", type=int, default=50, help="批处理大小")
     index_parser.add_argument("--content-id", type=str, action="append", help="指定内容ID")
     index_parser.add_argument("--all", action="store_true", help="索引所有未索引的内容")
+    index_parser.add_argument("--resume-after", type=str, help="从该内容ID之后继续索引（断点续传）")
+    index_parser.add_argument(
+        "--checkpoint-file", type=str, help="写入检查点（最后一个连续成功的内容ID）的文件，可用于 --resume-after"
+    )
 
     # deduplicate命令
     deduplicate_parser = subparsers.add_parser("deduplicate", help="执行语义去重")
@@ -117,7 +122,10 @@ async def cmd_init(args):
 
     async with async_session() as db:
         vector_service = VectorService()
-        import_service = ContentImportService(db, vector_service)
+        # 导入时直接写入去重生成的向量，后续批量索引只处理剩余内容
+        import_service = ContentImportService(
+            db, vector_service, index_vectors=not args.skip_index
+        )
 
         # 导入内容
         if args.content:
@@ -149,7 +157,9 @@ async def cmd_import(args):
         vector_service = VectorService()
 
         if args.content:
-            import_service = ContentImportService(db, vector_service)
+            import_service = ContentImportService(
+                db, vector_service, index_vectors=args.index
+            )
             success, failed = await import_service.import_from_file(
                 args.content, not args.skip_duplicates
             )
@@ -178,14 +188,25 @@ async def cmd_index(args):
             print("Please specify --content-id or --all")
             return
 
+        start_after = uuid.UUID(args.resume_after) if args.resume_after else None
+
+        def save_checkpoint(last_id: str) -> None:
+            """检查点推进时写入文件"""
+            if args.checkpoint_file:
+                Path(args.checkpoint_file).write_text(last_id, encoding="utf-8")
+
         print("Indexing vectors...")
         stats = await vector_service.batch_index_contents(
             db,
             content_ids=content_ids,
             batch_size=args.batch_size,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            start_after=start_after,
+            checkpoint_callback=save_checkpoint,
         )
         print(f"\nIndex results: {stats}")
+        if stats["failed"] and stats["last_id"]:
+            print(f"Some batches failed. Resume with: --resume-after {stats['last_id']}")
 
 
 async def cmd_deduplicate(args):
@@ -348,7 +369,7 @@ async def cmd_stats(args):
 async def cmd_update(args):
     """update命令处理"""
     async with async_session() as db:
-        import_service = ContentImportService(db)
+        import_service = ContentImportService(db, index_vectors=args.index)
 
         success, failed = await import_service.import_from_file(args.file)
         print(f"Update import: {success} success, {failed} failed")
@@ -3,13 +3,15 @@
 测试 WebSocket 连接、认证、进度通知等功能
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 from fastapi import HTTPException
 
 from app.websocket.export_manager import ExportConnectionManager, export_manager
-from app.services.progress_notifier import ProgressNotifier, progress_notifier
+from app.services.progress_notifier import ProgressCoalescer, ProgressNotifier, progress_notifier
 from app.models.export_task import TaskStatus
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -304,6 +306,117 @@ class TestProgressNotifier:
         assert notifier.get_active_count() == 2
 
 
+class TestProgressCoalescer:
+    """测试进度合并"""
+
+    @pytest.fixture
+    def sent(self) -> list:
+        return []
+
+    @pytest.fixture
+    def coalescer(self, sent) -> ProgressCoalescer:
+        async def send(progress: int, message: str) -> bool:
+            sent.append(progress)
+            return True
+
+        return ProgressCoalescer(send, min_interval=60, min_delta=10)
+
+    @pytest.mark.asyncio
+    async def test_small_steps_are_coalesced(self, coalescer, sent):
+        """测试逐块的小幅进度被合并"""
+        for percent in range(0, 100):
+            await coalescer.update(percent, "生成中...")
+
+        assert sent == list(range(0, 100, 10))
+        assert coalescer.dropped_count == 90
+
+    @pytest.mark.asyncio
+    async def test_final_state_is_flushed(self, coalescer, sent):
+        """测试结束时补发最后一次进度"""
+        await coalescer.update(0, "开始")
+        await coalescer.update(3, "生成中")
+        await coalescer.update(7, "生成中")
+
+        await coalescer.close()
+
+        assert sent == [0, 7]
+
+    @pytest.mark.asyncio
+    async def test_completion_always_sent(self, coalescer, sent):
+        """测试 100% 不受合并限制"""
+        await coalescer.update(95, "生成中")
+        await coalescer.update(100, "完成")
+
+        assert sent == [95, 100]
+
+    @pytest.mark.asyncio
+    async def test_trailing_update_sent_after_interval(self, sent):
+        """测试最小间隔到期后补发最新值"""
+        async def send(progress: int, message: str) -> bool:
+            sent.append(progress)
+            return True
+
+        coalescer = ProgressCoalescer(send, min_interval=0.01, min_delta=50)
+        await coalescer.update(10, "a")
+        await coalescer.update(11, "b")
+        await coalescer.update(12, "c")
+
+        await asyncio.sleep(0.05)
+
+        assert sent == [10, 12]
+
+    @pytest.mark.asyncio
+    async def test_notifier_flushes_before_complete(self):
+        """测试完成通知前补发未推送的进度"""
+        manager = ExportConnectionManager()
+        notifier = ProgressNotifier(manager, min_interval=60, min_delta=50)
+        mock_ws = MagicMock()
+        mock_ws.accept = AsyncMock()
+        mock_ws.send_json = AsyncMock()
+        task_id = str(uuid4())
+        await manager.connect(task_id, mock_ws)
+
+        await notifier.notify_progress(task_id, 10, "a")
+        await notifier.notify_progress(task_id, 20, "b")
+        await notifier.notify_complete(task_id, "/download")
+
+        messages = [call[0][0] for call in mock_ws.send_json.call_args_list]
+        assert [m.get("progress") for m in messages if m["type"] == "progress"] == [10, 20]
+        assert messages[-1]["type"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_callback_updates_sent_before_complete(self):
+        """测试同步回调提交的进度在完成通知前推送完毕"""
+        manager = ExportConnectionManager()
+        notifier = ProgressNotifier(manager, min_interval=60, min_delta=50)
+        mock_ws = MagicMock()
+        mock_ws.accept = AsyncMock()
+        mock_ws.send_json = AsyncMock()
+        task_id = str(uuid4())
+        await manager.connect(task_id, mock_ws)
+
+        callback = notifier.progress_callback(task_id, "生成中")
+        callback(0)
+        callback(10)
+        callback(100)
+        await notifier.notify_complete(task_id)
+
+        messages = [call[0][0] for call in mock_ws.send_json.call_args_list]
+        assert [m.get("progress") for m in messages if m["type"] == "progress"] == [0, 100]
+        assert messages[-1]["type"] == "completed"
+        assert task_id not in notifier._coalescers
+
+    @pytest.mark.asyncio
+    async def test_idle_coalescers_are_released(self):
+        """测试未收到结束通知的空闲合并器被释放"""
+        notifier = ProgressNotifier(ExportConnectionManager(), idle_timeout=0)
+        await notifier.notify_progress("stale", 30, "生成中")
+
+        await notifier.notify_progress("fresh", 10, "生成中")
+
+        assert set(notifier._coalescers) == {"fresh"}
+
+
 class TestWebSocketIntegration:
     """WebSocket 集成测试"""
 
@@ -0,0 +1,200 @@
+"""
+WebSocket 跨进程转发与并发投递测试
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.websocket.backplane import WebSocketBackplane
+from app.websocket.delivery import BoundedSender
+from app.websocket.export_manager import ExportConnectionManager
+from app.websocket.manager import ConnectionManager
+
+
+def make_websocket(send_json=None) -> MagicMock:
+    """创建模拟 WebSocket 连接"""
+    ws = MagicMock()
+    ws.accept = AsyncMock()
+    ws.close = AsyncMock()
+    ws.send_json = send_json or AsyncMock()
+    return ws
+
+
+def make_backplane(receivers: int = 1) -> WebSocketBackplane:
+    """创建使用模拟 Redis 的消息总线"""
+    redis_client = MagicMock()
+    redis_client.publish = AsyncMock(return_value=receivers)
+    return WebSocketBackplane(redis_client=redis_client)
+
+
+class TestBoundedSender:
+    """并发投递测试"""
+
+    @pytest.mark.asyncio
+    async def test_sends_concurrently(self):
+        started = []
+        release = asyncio.Event()
+
+        async def slow_send(message):
+            started.append(message)
+            await release.wait()
+
+        sender = BoundedSender(max_pending=4, send_timeout=1.0)
+        sockets = [make_websocket(AsyncMock(side_effect=slow_send)) for _ in range(3)]
+
+        task = asyncio.create_task(sender.send_many(sockets, {"type": "ping"}))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(started) == 3
+        release.set()
+
+        assert await task == []
+
+    @pytest.mark.asyncio
+    async def test_timeout_marks_slow_consumer(self):
+        async def hang(message):
+            await asyncio.sleep(10)
+
+        sender = BoundedSender(max_pending=4, send_timeout=0.01)
+        slow = make_websocket(AsyncMock(side_effect=hang))
+        fast = make_websocket()
+
+        failed = await sender.send_many([slow, fast], {"type": "ping"})
+
+        assert failed == [slow]
+
+    @pytest.mark.asyncio
+    async def test_backlog_limit_rejects_extra_sends(self):
+        release = asyncio.Event()
+
+        async def blocked(message):
+            await release.wait()
+
+        sender = BoundedSender(max_pending=1, send_timeout=1.0)
+        ws = make_websocket(AsyncMock(side_effect=blocked))
+
+        first = asyncio.create_task(sender.send(ws, {"n": 1}))
+        await asyncio.sleep(0)
+        assert await sender.send(ws, {"n": 2}) is False
+        release.set()
+        assert await first is True
+
+
+class TestConnectionManagerFanOut:
+    """用户连接投递测试"""
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_is_evicted(self):
+        manager = ConnectionManager()
+        user_id = uuid4()
+        good = make_websocket()
+        bad = make_websocket(AsyncMock(side_effect=Exception("closed")))
+        await manager.connect(good, user_id)
+        await manager.connect(bad, user_id)
+
+        await manager.send_personal_message({"type": "notification"}, user_id)
+
+        good.send_json.assert_awaited_once_with({"type": "notification"})
+        bad.close.assert_awaited_once()
+        assert manager.get_connection_count(user_id) == 1
+
+    @pytest.mark.asyncio
+    async def test_personal_message_is_published(self):
+        backplane = make_backplane()
+        manager = ConnectionManager(backplane)
+        user_id = uuid4()
+
+        await manager.send_personal_message({"type": "notification"}, user_id)
+
+        channel, payload = backplane._redis.publish.await_args.args
+        assert channel == f"ws:user:{user_id}"
+        assert json.loads(payload)["message"] == {"type": "notification"}
+
+    @pytest.mark.asyncio
+    async def test_remote_message_delivered_to_local_connections(self):
+        backplane = make_backplane()
+        manager = ConnectionManager(backplane)
+        user_id = uuid4()
+        ws = make_websocket()
+        await manager.connect(ws, user_id)
+
+        await backplane._dispatch({
+            "channel": f"ws:user:{user_id}",
+            "data": json.dumps({"origin": "other", "target": str(user_id), "message": {"type": "x"}}),
+        })
+
+        ws.send_json.assert_awaited_once_with({"type": "x"})
+
+    @pytest.mark.asyncio
+    async def test_own_messages_are_ignored(self):
+        backplane = make_backplane()
+        manager = ConnectionManager(backplane)
+        user_id = uuid4()
+        ws = make_websocket()
+        await manager.connect(ws, user_id)
+
+        await backplane._dispatch({
+            "channel": f"ws:user:{user_id}",
+            "data": json.dumps({"origin": backplane.node_id, "target": str(user_id), "message": {}}),
+        })
+
+        ws.send_json.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_subscription_follows_local_connections(self):
+        backplane = make_backplane()
+        manager = ConnectionManager(backplane)
+        user_id = uuid4()
+        ws = make_websocket()
+
+        await manager.connect(ws, user_id)
+        assert f"ws:user:{user_id}" in backplane._channels
+
+        manager.disconnect(ws)
+        assert f"ws:user:{user_id}" not in backplane._channels
+
+
+class TestExportManagerForwarding:
+    """导出任务消息转发测试"""
+
+    @pytest.mark.asyncio
+    async def test_forwards_when_connection_is_on_another_process(self):
+        backplane = make_backplane(receivers=1)
+        manager = ExportConnectionManager(backplane)
+        task_id = str(uuid4())
+
+        assert await manager.broadcast_progress(task_id, 40, "生成中...")
+
+        channel, payload = backplane._redis.publish.await_args.args
+        assert channel == f"ws:task:{task_id}"
+        assert json.loads(payload)["message"]["progress"] == 40
+
+    @pytest.mark.asyncio
+    async def test_no_receivers_returns_false(self):
+        manager = ExportConnectionManager(make_backplane(receivers=0))
+
+        assert not await manager.send_message(str(uuid4()), {"type": "test"})
+
+    @pytest.mark.asyncio
+    async def test_local_connection_skips_publish(self):
+        backplane = make_backplane()
+        manager = ExportConnectionManager(backplane)
+        task_id = str(uuid4())
+        await manager.connect(task_id, make_websocket())
+
+        assert await manager.send_message(task_id, {"type": "test"})
+        backplane._redis.publish.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_publish_failure_backs_off(self):
+        backplane = make_backplane()
+        backplane._redis.publish.side_effect = ConnectionError("down")
+        manager = ExportConnectionManager(backplane)
+
+        await manager.send_message("t1", {"type": "test"})
+        await manager.send_message("t2", {"type": "test"})
+
+        assert backplane._redis.publish.await_count == 1
@@ -396,8 +396,10 @@ async def db_engine():
     # 清理：先删除有外键依赖的表
     async with engine.begin() as conn:
         # 按照正确的顺序删除表，避免循环依赖问题
+        await conn.execute(text("DROP TABLE IF EXISTS student_daily_stats CASCADE"))
         await conn.execute(text("DROP TABLE IF EXISTS learning_reports CASCADE"))
         await conn.execute(text("DROP TABLE IF EXISTS mistakes CASCADE"))
+        await conn.execute(text("DROP TABLE IF EXISTS mistake_fingerprints CASCADE"))
         await conn.execute(text("DROP TABLE IF EXISTS practices CASCADE"))
         await conn.execute(text("DROP TABLE IF EXISTS conversation_messages CASCADE"))
         await conn.execute(text("DROP TABLE IF EXISTS conversations CASCADE"))
@@ -188,6 +188,7 @@ class TestDatabaseSchemaSync:
             ('practices', 'content_id'): ('contents', 'id'),
             ('mistakes', 'student_id'): ('students', 'id'),
             ('conversations', 'student_id'): ('students', 'id'),
+            ('conversation_messages', 'conversation_id'): ('conversations', 'id'),
             ('learning_reports', 'student_id'): ('students', 'id'),
         }
 
@@ -207,7 +208,6 @@ class TestDatabaseSchemaSync:
         这些列存储复杂结构数据:
         - students.knowledge_graph
         - practices.answers, result_details
-        - conversations.messages
         - learning_reports.statistics, recommendations
         """
         async with db_engine.connect() as conn:
@@ -227,7 +227,6 @@ class TestDatabaseSchemaSync:
             ('practices', 'result_details'): 'json',
             ('practices', 'graph_update'): 'json',
             ('practices', 'extra_metadata'): 'json',
-            ('conversations', 'messages'): 'jsonb',
             ('learning_reports', 'statistics'): 'json',
             ('learning_reports', 'ability_analysis'): 'json',
             ('learning_reports', 'weak_points'): 'json',
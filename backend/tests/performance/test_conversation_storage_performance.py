@@ -0,0 +1,70 @@
+"""
+对话消息存储性能测试
+验证 200 轮对话中每轮的写入和上下文读取开销不随对话长度增长
+
+运行方式：
+    pytest tests/performance/test_conversation_storage_performance.py -m performance -s
+"""
+import json
+import statistics
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ConversationScenario, Student
+from app.services.conversation_service import ConversationService
+
+TURNS = 200
+SAMPLE_TURNS = 20
+
+USER_MESSAGE = "I would like to order a cup of coffee and a piece of cake, please."
+ASSISTANT_MESSAGE = "Sure! Would you like your coffee hot or iced? We also have cheesecake today."
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+async def test_200_turn_conversation_per_turn_cost(db: AsyncSession, test_student: Student):
+    """
+    测试 200 轮对话的每轮开销
+
+    每轮：追加用户消息 + 读取最近上下文 + 追加回复，与 prepare_reply/save_reply 一致。
+    """
+    await db.flush()
+    service = ConversationService()
+    conversation = await service.create_conversation(
+        db=db,
+        student_id=str(test_student.id),
+        scenario=ConversationScenario.ORDERING_FOOD,
+        level="B1"
+    )
+
+    turn_times = []
+    for _ in range(TURNS):
+        start = time.perf_counter()
+        await service._append_message(db, conversation.id, "user", USER_MESSAGE)
+        context = await service.get_recent_messages(db, conversation.id)
+        await service._append_message(db, conversation.id, "assistant", ASSISTANT_MESSAGE)
+        turn_times.append(time.perf_counter() - start)
+
+        assert len(context) <= service.CONTEXT_MESSAGE_LIMIT
+
+    messages = await service.get_messages(db, conversation.id)
+    assert len(messages) == TURNS * 2
+    assert [m["role"] for m in messages[:2]] == ["user", "assistant"]
+
+    early = statistics.median(turn_times[:SAMPLE_TURNS])
+    late = statistics.median(turn_times[-SAMPLE_TURNS:])
+
+    # 旧实现每轮重写两次完整 JSON：写入量随轮数平方增长
+    message_bytes = len(json.dumps({"role": "user", "content": USER_MESSAGE, "timestamp": "2026-01-01T00:00:00"}))
+    legacy_bytes = sum(message_bytes * (2 * turn + 1) + message_bytes * (2 * turn + 2) for turn in range(TURNS))
+    append_bytes = message_bytes * TURNS * 2
+
+    print(f"\n{TURNS} 轮对话")
+    print(f"  前 {SAMPLE_TURNS} 轮每轮耗时中位数: {early * 1000:.2f}ms")
+    print(f"  后 {SAMPLE_TURNS} 轮每轮耗时中位数: {late * 1000:.2f}ms")
+    print(f"  消息写入量: 追加 {append_bytes / 1024:.0f}KB, 重写JSON约 {legacy_bytes / 1024 / 1024:.1f}MB")
+
+    # 每轮开销与对话长度无关（留出数据库抖动的余量）
+    assert late < early * 3
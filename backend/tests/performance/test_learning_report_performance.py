@@ -0,0 +1,148 @@
+"""
+学习报告统计性能测试
+对比逐行加载ORM对象统计与SQL聚合/每日统计汇总的耗时
+
+运行方式（需要测试数据库）：
+    pytest tests/performance/test_learning_report_performance.py -m performance -s
+"""
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import and_, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Mistake, MistakeStatus, Practice
+from app.services.daily_stats_service import DailyStatsService
+from app.services.learning_report_service import LearningReportService
+
+PRACTICE_COUNT = 100_000
+MISTAKE_COUNT = 20_000
+INSERT_CHUNK = 5_000
+
+KNOWLEDGE_POINTS = [f"kp_{i}" for i in range(40)]
+TOPICS = ["grammar", "vocabulary", "reading", "listening", None]
+MISTAKE_TYPES = ["grammar", "vocabulary", "reading", "listening", "writing"]
+MISTAKE_STATUSES = [s.value for s in MistakeStatus]
+
+
+async def _seed(db: AsyncSession, student_id: uuid.UUID, period_end: datetime) -> None:
+    """批量写入练习和错题数据"""
+    rng = random.Random(42)
+
+    for start in range(0, PRACTICE_COUNT, INSERT_CHUNK):
+        await db.execute(insert(Practice), [
+            {
+                "id": uuid.uuid4(),
+                "student_id": student_id,
+                "practice_type": "reading",
+                "status": rng.choice(["completed", "completed", "in_progress"]),
+                "correct_rate": rng.random(),
+                "time_spent": rng.randint(60, 1800),
+                "created_at": period_end - timedelta(minutes=rng.randint(0, 60 * 24 * 29)),
+            }
+            for _ in range(min(INSERT_CHUNK, PRACTICE_COUNT - start))
+        ])
+
+    for start in range(0, MISTAKE_COUNT, INSERT_CHUNK):
+        await db.execute(insert(Mistake), [
+            {
+                "id": uuid.uuid4(),
+                "student_id": student_id,
+                "mistake_type": rng.choice(MISTAKE_TYPES),
+                "status": rng.choice(MISTAKE_STATUSES),
+                "question": "q",
+                "wrong_answer": "a",
+                "correct_answer": "b",
+                "knowledge_points": rng.sample(KNOWLEDGE_POINTS, 3),
+                "topic": rng.choice(TOPICS),
+                "difficulty_level": rng.choice(["A2", "B1", "B2"]),
+                "first_mistaken_at": period_end - timedelta(minutes=rng.randint(0, 60 * 24 * 29)),
+            }
+            for _ in range(min(INSERT_CHUNK, MISTAKE_COUNT - start))
+        ])
+
+    await db.flush()
+
+
+async def _hydrating_statistics(db, student_id, period_start, period_end) -> dict:
+    """原实现：加载全部ORM对象后在Python中统计"""
+    practices = (await db.execute(
+        select(Practice).where(and_(
+            Practice.student_id == student_id,
+            Practice.created_at >= period_start,
+            Practice.created_at <= period_end,
+        ))
+    )).scalars().all()
+    mistakes = (await db.execute(
+        select(Mistake).where(and_(
+            Mistake.student_id == student_id,
+            Mistake.first_mistaken_at >= period_start,
+            Mistake.first_mistaken_at <= period_end,
+        ))
+    )).scalars().all()
+
+    # 正确率按已完成练习计算（与每日统计汇总口径一致）
+    correct_rates = [
+        p.correct_rate for p in practices
+        if p.status == "completed" and p.correct_rate is not None
+    ]
+    by_type = {}
+    knowledge_points = {}
+    for m in mistakes:
+        by_type[m.mistake_type] = by_type.get(m.mistake_type, 0) + 1
+        for kp in m.knowledge_points or []:
+            knowledge_points[kp] = knowledge_points.get(kp, 0) + 1
+
+    return {
+        "total_practices": len(practices),
+        "completed_practices": sum(1 for p in practices if p.status == "completed"),
+        "avg_correct_rate": sum(correct_rates) / len(correct_rates) if correct_rates else 0,
+        "total_mistakes": len(mistakes),
+        "mistake_by_type": by_type,
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+async def test_report_statistics_aggregation_performance(db: AsyncSession, test_student):
+    """
+    10万练习记录下，读取汇总的统计应明显快于逐行加载
+
+    同时校验两种实现的统计结果一致。
+    """
+    await db.flush()
+    period_end = datetime.utcnow()
+    period_start = period_end - timedelta(days=30)
+    await _seed(db, test_student.id, period_end)
+    await DailyStatsService(db).backfill(student_ids=[test_student.id])
+    db.expunge_all()
+
+    service = LearningReportService(db)
+
+    start = time.perf_counter()
+    legacy = await _hydrating_statistics(db, test_student.id, period_start, period_end)
+    legacy_ms = (time.perf_counter() - start) * 1000
+    db.expunge_all()
+
+    start = time.perf_counter()
+    statistics = await service.generate_statistics(test_student.id, period_start, period_end)
+    await service.analyze_weak_points(test_student.id, period_start, period_end)
+    aggregated_ms = (time.perf_counter() - start) * 1000
+
+    print(
+        f"\n{PRACTICE_COUNT} 练习 / {MISTAKE_COUNT} 错题: "
+        f"逐行加载 {legacy_ms:.0f}ms, 汇总读取 {aggregated_ms:.0f}ms, "
+        f"加速 {legacy_ms / aggregated_ms:.1f}x"
+    )
+
+    assert statistics["total_practices"] == legacy["total_practices"] == PRACTICE_COUNT
+    assert statistics["completed_practices"] == legacy["completed_practices"]
+    assert statistics["avg_correct_rate"] == pytest.approx(
+        round(legacy["avg_correct_rate"] * 100, 2), abs=0.01
+    )
+    assert statistics["total_mistakes"] == legacy["total_mistakes"]
+    assert statistics["mistake_by_type"] == legacy["mistake_by_type"]
+    assert aggregated_ms < legacy_ms
@@ -0,0 +1,167 @@
+"""
+推荐精排性能测试
+对比本地精排器与LLM精排的延迟和排序一致性
+
+运行方式：
+    pytest tests/performance/test_recommendation_rerank_performance.py -m performance -s
+
+设置 ZHIPUAI_API_KEY 时会额外调用真实LLM进行对比。
+"""
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import combinations
+from typing import List
+
+import pytest
+
+from app.core.config import settings
+from app.models import Content, ContentType
+from app.schemas.recommendation import StudentProfile
+from app.services.recommendation_reranker import LinearReranker, RerankContext
+from app.services.recommendation_service import RecommendationService
+
+TOPICS = ["grammar", "listening", "travel", "environment", "technology", "culture"]
+
+
+def _kendall_tau(a: List[uuid.UUID], b: List[uuid.UUID]) -> float:
+    """两个排序（相同元素）之间的 Kendall tau 相关系数"""
+    position = {item: i for i, item in enumerate(b)}
+    concordant = discordant = 0
+    for x, y in combinations(a, 2):
+        if position[x] < position[y]:
+            concordant += 1
+        else:
+            discordant += 1
+    total = concordant + discordant
+    return (concordant - discordant) / total if total else 1.0
+
+
+def _candidates(rng: random.Random, count: int = 10) -> List[Content]:
+    levels = list(RecommendationService.DIFFICULTY_ORDER)
+    return [
+        Content(
+            id=uuid.uuid4(),
+            title=f"Content {i}",
+            description=f"Practice material about {TOPICS[i % len(TOPICS)]}",
+            content_type=ContentType.READING.value,
+            difficulty_level=rng.choice(levels),
+            topic=rng.choice(TOPICS),
+            knowledge_points=rng.sample(TOPICS, 2),
+            view_count=rng.randint(0, 2000),
+            favorite_count=rng.randint(0, 50),
+            is_featured=rng.random() < 0.2,
+            created_at=datetime.utcnow() - timedelta(days=rng.randint(0, 720)),
+        )
+        for i in range(count)
+    ]
+
+
+def _profile() -> StudentProfile:
+    return StudentProfile(
+        student_id=uuid.uuid4(),
+        current_cefr_level="B1",
+        target_exam="cet4",
+        weak_points=["grammar", "listening"],
+        learning_points=["travel"],
+        preferred_topics=["technology"],
+    )
+
+
+def _context(profile: StudentProfile, candidates: List[Content], rng: random.Random) -> RerankContext:
+    target = RecommendationService._get_target_difficulty(profile)
+    return RerankContext(
+        profile=profile,
+        difficulty_range=RecommendationService._get_i_plus_one_range(target),
+        difficulty_order=RecommendationService.DIFFICULTY_ORDER,
+        vector_scores={c.id: rng.uniform(0.5, 0.95) for c in candidates},
+    )
+
+
+@pytest.mark.performance
+class TestRecommendationRerankPerformance:
+    """精排性能测试"""
+
+    def test_local_rerank_latency(self):
+        """本地精排10个候选的延迟应在毫秒级"""
+        rng = random.Random(42)
+        profile = _profile()
+        reranker = LinearReranker()
+        timings = []
+
+        for _ in range(1000):
+            candidates = _candidates(rng)
+            context = _context(profile, candidates, rng)
+            start = time.perf_counter()
+            reranker.rank(candidates, context)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        p50 = statistics.median(timings)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(f"\n本地精排延迟: p50={p50:.3f}ms, p95={p95:.3f}ms")
+
+        assert p95 < 5
+
+    @pytest.mark.asyncio
+    async def test_agreement_with_rule_score(self):
+        """与原规则评分排序的一致性（Kendall tau / Top5重合率）"""
+        rng = random.Random(7)
+        profile = _profile()
+        reranker = LinearReranker()
+        taus, overlaps = [], []
+
+        for _ in range(200):
+            candidates = _candidates(rng)
+            context = _context(profile, candidates, rng)
+            local = [c.id for c, _ in reranker.rank(candidates, context)]
+
+            scores = {
+                c.id: await RecommendationService._calculate_recommendation_score(
+                    content=c, profile=profile
+                )
+                for c in candidates
+            }
+            rule = sorted(scores, key=lambda cid: scores[cid], reverse=True)
+
+            taus.append(_kendall_tau(local, rule))
+            overlaps.append(len(set(local[:5]) & set(rule[:5])) / 5)
+
+        print(
+            f"\n与规则评分一致性: kendall_tau={statistics.mean(taus):.3f}, "
+            f"top5_overlap={statistics.mean(overlaps):.3f}"
+        )
+
+        assert statistics.mean(taus) > 0.3
+
+    @pytest.mark.asyncio
+    async def test_agreement_with_llm(self):
+        """与LLM精排的延迟和排序一致性对比（需要智谱AI密钥）"""
+        if not settings.ZHIPUAI_API_KEY:
+            pytest.skip("未配置 ZHIPUAI_API_KEY")
+
+        rng = random.Random(11)
+        profile = _profile()
+        reranker = LinearReranker()
+        local_ms, llm_ms, overlaps = [], [], []
+
+        for _ in range(5):
+            candidates = _candidates(rng, count=5)
+            context = _context(profile, candidates, rng)
+
+            start = time.perf_counter()
+            local = [c.id for c, _ in reranker.rank(candidates, context)]
+            local_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            llm = [c.id for c in await RecommendationService._llm_rerank(candidates, profile)]
+            llm_ms.append((time.perf_counter() - start) * 1000)
+
+            overlaps.append(len(set(local[:3]) & set(llm[:3])) / 3)
+
+        print(
+            f"\n本地精排: {statistics.mean(local_ms):.3f}ms, "
+            f"LLM精排: {statistics.mean(llm_ms):.0f}ms, "
+            f"top3_overlap={statistics.mean(overlaps):.3f}"
+        )
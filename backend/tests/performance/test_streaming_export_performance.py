@@ -0,0 +1,127 @@
+"""
+流式文档导出性能测试
+对比真正的流式生成与"完整生成后再分块"的首字节时间（TTFB）和内存峰值
+
+运行方式：
+    pytest tests/performance/test_streaming_export_performance.py -m performance -s
+"""
+import time
+import tracemalloc
+from io import BytesIO
+from typing import Any, AsyncIterator, Callable, Dict, Tuple
+
+import pytest
+
+from app.services.document_generators.pptx_generator import PPTXDocumentGenerator
+from app.services.document_generators.word_generator import WordDocumentGenerator
+from app.services.streaming_document_service import StreamingDocumentService
+
+SLIDE_COUNT = 100
+CHUNK_SIZE = StreamingDocumentService.DEFAULT_CHUNK_SIZE
+
+
+def _large_lesson_content() -> Dict[str, Any]:
+    """约 100 页幻灯片的教案内容（每个语法点一页）"""
+    return {
+        "title": "流式导出性能测试教案",
+        "level": "B2",
+        "topic": "Grammar Review",
+        "duration": 180,
+        "target_exam": "IELTS",
+        "objectives": {
+            "language_knowledge": [f"知识点{i}" for i in range(20)],
+        },
+        "grammar_points": [
+            {
+                "name": f"语法点{i}",
+                "description": f"语法点{i}的说明。" * 10,
+                "rule": f"规则{i}: subject + verb + object",
+                "examples": [f"Example sentence {i}-{j} for grammar review." for j in range(5)],
+                "common_mistakes": [f"常见错误{i}-{j}" for j in range(3)],
+            }
+            for i in range(SLIDE_COUNT)
+        ],
+        "teaching_notes": "教学反思。" * 500,
+    }
+
+
+async def _legacy_stream(generate: Callable[[], bytes]) -> AsyncIterator[bytes]:
+    """旧实现：完整生成文档后再从 BytesIO 中分块读取"""
+    buffer = BytesIO(generate())
+    while True:
+        chunk = buffer.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def _measure(stream: AsyncIterator[bytes]) -> Tuple[float, float, int, int]:
+    """
+    消费数据流并测量性能
+
+    Returns:
+        (首字节时间秒, 总耗时秒, 内存峰值字节, 文档大小字节)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    ttfb = None
+    total_size = 0
+    async for chunk in stream:
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        # 模拟下游发送后丢弃数据块，不在内存中累积文档
+        total_size += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb, elapsed, peak, total_size
+
+
+def _report(name: str, streaming: Tuple, legacy: Tuple) -> None:
+    print(f"\n{name} ({SLIDE_COUNT} 页教案, {streaming[3] / 1024:.0f}KB)")
+    print(f"  流式:   TTFB {streaming[0] * 1000:.0f}ms, 总耗时 {streaming[1] * 1000:.0f}ms, 内存峰值 {streaming[2] / 1024 / 1024:.1f}MB")
+    print(f"  非流式: TTFB {legacy[0] * 1000:.0f}ms, 总耗时 {legacy[1] * 1000:.0f}ms, 内存峰值 {legacy[2] / 1024 / 1024:.1f}MB")
+
+
+@pytest.mark.performance
+class TestStreamingExportPerformance:
+    """流式导出性能测试"""
+
+    @pytest.mark.asyncio
+    async def test_pptx_streaming_ttfb_and_memory(self):
+        """测试 100 页 PPTX 流式导出的首字节时间和内存峰值"""
+        content = _large_lesson_content()
+        service = StreamingDocumentService()
+
+        streaming = await _measure(service.stream_generate_pptx(content, {}, chunk_size=CHUNK_SIZE))
+        legacy = await _measure(
+            _legacy_stream(lambda: PPTXDocumentGenerator().generate(content, {}))
+        )
+        _report("PPTX", streaming, legacy)
+
+        # 两种方式输出的文档大小一致
+        assert streaming[3] == legacy[3]
+        # 首个数据块在文档保存完成前产出
+        assert streaming[0] < legacy[0]
+        # 内存中不再同时保留完整文档字节和 BytesIO 副本
+        assert streaming[2] < legacy[2]
+
+    @pytest.mark.asyncio
+    async def test_word_streaming_ttfb_and_memory(self):
+        """测试同等规模 Word 流式导出的首字节时间和内存峰值"""
+        content = _large_lesson_content()
+        service = StreamingDocumentService()
+
+        streaming = await _measure(service.stream_generate_word(content, {}, chunk_size=CHUNK_SIZE))
+        legacy = await _measure(
+            _legacy_stream(lambda: WordDocumentGenerator().generate(content, {}))
+        )
+        _report("Word", streaming, legacy)
+
+        assert streaming[3] == legacy[3]
+        assert streaming[0] < legacy[0]
+        assert streaming[2] < legacy[2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s", "-m", "performance"])
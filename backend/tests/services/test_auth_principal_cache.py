@@ -0,0 +1,202 @@
+"""
+认证主体缓存测试
+"""
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api import deps
+from app.models import UserRole
+from app.services.auth_principal_cache import AuthPrincipal, AuthPrincipalCache
+
+
+class FakeRedis:
+    """模拟 Redis 客户端（decode_responses=True）"""
+
+    def __init__(self):
+        self.store = {}
+        self.get_calls = 0
+
+    async def get(self, key):
+        self.get_calls += 1
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+
+class BrokenRedis:
+    """模拟不可用的 Redis"""
+
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    async def setex(self, key, ttl, value):
+        raise ConnectionError("down")
+
+    async def delete(self, key):
+        raise ConnectionError("down")
+
+
+def _principal(**fields) -> AuthPrincipal:
+    values = dict(
+        user_id=uuid.uuid4(),
+        role=UserRole.STUDENT.value,
+        is_active=True,
+        is_superuser=False,
+        organization_id=uuid.uuid4(),
+        student_id=uuid.uuid4(),
+    )
+    values.update(fields)
+    return AuthPrincipal(**values)
+
+
+def _db_returning(principal: AuthPrincipal):
+    result = MagicMock()
+    result.first.return_value = (
+        principal.user_id,
+        principal.role,
+        principal.is_active,
+        principal.is_superuser,
+        principal.organization_id,
+        principal.student_id,
+        principal.teacher_id,
+    )
+    db = AsyncMock()
+    db.execute.return_value = result
+    return db
+
+
+class TestAuthPrincipalCache:
+    """两级缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self):
+        cache = AuthPrincipalCache(redis_client=FakeRedis())
+        principal = _principal()
+
+        await cache.set(principal, "v1")
+
+        assert await cache.get(principal.user_id, "v1") == principal
+
+    @pytest.mark.asyncio
+    async def test_local_tier_skips_redis(self):
+        redis_client = FakeRedis()
+        cache = AuthPrincipalCache(redis_client=redis_client)
+        principal = _principal()
+        await cache.set(principal, "v1")
+
+        await cache.get(principal.user_id, "v1")
+
+        assert redis_client.get_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_backfills_local(self):
+        redis_client = FakeRedis()
+        principal = _principal()
+        await AuthPrincipalCache(redis_client=redis_client).set(principal, None)
+
+        cache = AuthPrincipalCache(redis_client=redis_client)
+        assert await cache.get(principal.user_id) == principal
+        assert await cache.get(principal.user_id) == principal
+        assert redis_client.get_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_token_version_mismatch_is_a_miss(self):
+        cache = AuthPrincipalCache(redis_client=FakeRedis())
+        principal = _principal()
+        await cache.set(principal, "v1")
+
+        assert await cache.get(principal.user_id, "v2") is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_clears_both_tiers(self):
+        redis_client = FakeRedis()
+        cache = AuthPrincipalCache(redis_client=redis_client)
+        principal = _principal()
+        await cache.set(principal, "v1")
+
+        await cache.invalidate(principal.user_id)
+
+        assert await cache.get(principal.user_id, "v1") is None
+        assert redis_client.store == {}
+
+    @pytest.mark.asyncio
+    async def test_get_or_load_queries_once(self):
+        cache = AuthPrincipalCache(redis_client=FakeRedis())
+        principal = _principal(role=UserRole.TEACHER.value, student_id=None, teacher_id=uuid.uuid4())
+        db = _db_returning(principal)
+
+        first = await cache.get_or_load(db, principal.user_id, "v1")
+        second = await cache.get_or_load(db, principal.user_id, "v1")
+
+        assert first == second == principal
+        db.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_redis_unavailable_falls_back_to_database(self):
+        cache = AuthPrincipalCache(redis_client=BrokenRedis())
+        principal = _principal()
+        db = _db_returning(principal)
+
+        assert await cache.get_or_load(db, principal.user_id) == principal
+        # 进程内缓存仍然生效
+        assert await cache.get_or_load(db, principal.user_id) == principal
+        db.execute.assert_awaited_once()
+
+
+class TestCurrentPrincipalDependency:
+    """认证主体依赖测试"""
+
+    @pytest.fixture
+    def credentials(self):
+        return HTTPAuthorizationCredentials(scheme="Bearer", credentials="token")
+
+    @pytest.mark.asyncio
+    async def test_cached_principal_needs_no_database(self, monkeypatch, credentials):
+        principal = _principal()
+        cache = AuthPrincipalCache(redis_client=FakeRedis())
+        await cache.set(principal, None)
+        monkeypatch.setattr(deps, "validate_token", AsyncMock(return_value=str(principal.user_id)))
+        monkeypatch.setattr(deps, "get_token_version", lambda token: None)
+        monkeypatch.setattr(deps, "get_auth_principal_cache", lambda: cache)
+        db = AsyncMock()
+
+        assert await deps.get_current_principal(credentials, db) == principal
+        db.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_inactive_principal_rejected(self, monkeypatch, credentials):
+        principal = _principal(is_active=False)
+        cache = AuthPrincipalCache(redis_client=FakeRedis())
+        await cache.set(principal, None)
+        monkeypatch.setattr(deps, "validate_token", AsyncMock(return_value=str(principal.user_id)))
+        monkeypatch.setattr(deps, "get_token_version", lambda token: None)
+        monkeypatch.setattr(deps, "get_auth_principal_cache", lambda: cache)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await deps.get_current_principal(credentials, AsyncMock())
+
+        assert exc_info.value.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_student_dependency_rejects_teacher_without_query(self, monkeypatch, credentials):
+        principal = _principal(role=UserRole.TEACHER.value, student_id=None, teacher_id=uuid.uuid4())
+        cache = AuthPrincipalCache(redis_client=FakeRedis())
+        await cache.set(principal, None)
+        monkeypatch.setattr(deps, "validate_token", AsyncMock(return_value=str(principal.user_id)))
+        monkeypatch.setattr(deps, "get_token_version", lambda token: None)
+        monkeypatch.setattr(deps, "get_auth_principal_cache", lambda: cache)
+        db = AsyncMock()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await deps.get_current_student(credentials, db)
+
+        assert exc_info.value.status_code == 403
+        db.execute.assert_not_awaited()
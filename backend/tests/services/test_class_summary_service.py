@@ -0,0 +1,209 @@
+"""
+班级汇总服务测试
+"""
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.class_summary_cache_service import ClassSummaryCacheService
+from app.services.class_summary_service import ClassSummaryService, _aggregate_abilities
+from app.services.learning_report_service import LearningReportService
+
+PERIOD_START = datetime(2026, 1, 1)
+PERIOD_END = datetime(2026, 1, 31)
+
+
+class FakePipeline:
+    """模拟 Redis pipeline"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def hget(self, key, field):
+        self.commands.append(("hget", key, field))
+
+    def hset(self, key, field, value):
+        self.commands.append(("hset", key, field, value))
+
+    def expire(self, key, ttl):
+        self.commands.append(("expire", key, ttl))
+
+    async def execute(self):
+        results = []
+        for command, key, *args in self.commands:
+            if command == "hget":
+                results.append(self.redis.hashes.get(key, {}).get(args[0]))
+            elif command == "hset":
+                self.redis.hashes.setdefault(key, {})[args[0]] = args[1]
+                results.append(1)
+            else:
+                results.append(True)
+        return results
+
+
+class FakeRedis:
+    """模拟 Redis 客户端（decode_responses=True）"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def _result(rows):
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+def _overall_row(class_id, **fields):
+    values = dict(
+        class_id=class_id,
+        total_students=0,
+        active_students=0,
+        avg_completion_rate=None,
+        avg_correct_rate=None,
+        total_minutes=None,
+        practicing_students=None,
+        practice_count=None,
+        completed_count=None,
+        correct_rate_sum=None,
+        correct_rate_count=None,
+        time_spent_seconds=None,
+        mistake_count=None,
+    )
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+class TestAggregateAbilities:
+    """能力分布聚合测试"""
+
+    def test_maps_names_and_averages(self):
+        data = [
+            {"ability_radar": [{"name": "听力", "value": 60}, {"name": "Reading", "value": 80}]},
+            {"ability_radar": [{"name": "listening", "value": 80}]},
+            None,
+        ]
+
+        distribution = _aggregate_abilities(data)
+
+        assert distribution["listening"] == 70.0
+        assert distribution["reading"] == 40.0
+        assert distribution["writing"] == 0.0
+
+
+class TestComputeSummaries:
+    """集合查询结果映射测试"""
+
+    @pytest.mark.asyncio
+    async def test_queries_do_not_scale_with_classes(self):
+        class_a, class_b = uuid.uuid4(), uuid.uuid4()
+        db = AsyncMock()
+        db.execute.side_effect = [
+            _result([
+                _overall_row(
+                    class_a, total_students=30, active_students=12,
+                    avg_completion_rate=80.456, avg_correct_rate=70.0, total_minutes=600,
+                    practicing_students=20, practice_count=40, completed_count=30,
+                    correct_rate_sum=24.0, correct_rate_count=30, time_spent_seconds=36000,
+                    mistake_count=15,
+                ),
+                _overall_row(class_b, total_students=25),
+            ]),
+            _result([(class_a, {"ability_radar": [{"name": "语法", "value": 50}]})]),
+            _result([(class_a, "tense", 7.0), (class_a, "articles", 3.0)]),
+        ]
+
+        summaries = await ClassSummaryService(db)._compute_summaries(
+            [class_a, class_b], PERIOD_START, PERIOD_END
+        )
+
+        assert db.execute.await_count == 3
+        a = summaries[class_a]
+        assert a["active_students"] == 12
+        assert a["overall_stats"] == {
+            "avg_completion_rate": 80.46, "avg_correct_rate": 70.0, "total_study_hours": 10.0,
+        }
+        assert a["practice_stats"]["completion_rate"] == 75.0
+        assert a["practice_stats"]["avg_correct_rate"] == 80.0
+        assert a["practice_stats"]["study_hours"] == 10.0
+        assert a["ability_distribution"]["grammar"] == 50.0
+        assert a["top_weak_points"] == [
+            {"knowledge_point": "tense", "affected_students": 7},
+            {"knowledge_point": "articles", "affected_students": 3},
+        ]
+
+        b = summaries[class_b]
+        assert b["total_students"] == 25
+        assert b["active_students"] == 0
+        assert b["practice_stats"]["total_practices"] == 0
+        assert b["top_weak_points"] == []
+
+
+class TestSummarizeClasses:
+    """批量汇总与缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_cache_serves_second_call(self):
+        class_id = uuid.uuid4()
+        db = AsyncMock()
+        db.execute.return_value = _result([SimpleNamespace(id=class_id, name="一班")])
+        cache = ClassSummaryCacheService(redis_client=FakeRedis())
+        service = ClassSummaryService(db)
+        compute = AsyncMock(return_value={class_id: {"total_students": 3}})
+
+        with patch(
+            "app.services.class_summary_service.get_class_summary_cache",
+            AsyncMock(return_value=cache),
+        ), patch.object(service, "_compute_summaries", compute):
+            first = await service.summarize_classes(uuid.uuid4(), None, PERIOD_START, PERIOD_END)
+            second = await service.summarize_classes(uuid.uuid4(), None, PERIOD_START, PERIOD_END)
+
+            await cache.invalidate([class_id])
+            await service.summarize_classes(uuid.uuid4(), None, PERIOD_START, PERIOD_END)
+
+        assert first == second
+        assert first[0]["class_name"] == "一班"
+        assert first[0]["total_students"] == 3
+        assert first[0]["period_end"] == PERIOD_END.isoformat()
+        assert compute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_foreign_class_returns_empty(self):
+        db = AsyncMock()
+        db.execute.return_value = _result([])
+
+        summaries = await ClassSummaryService(db).summarize_classes(
+            uuid.uuid4(), [uuid.uuid4()], use_cache=False
+        )
+
+        assert summaries == []
+
+    @pytest.mark.asyncio
+    async def test_class_summary_not_found(self):
+        service = LearningReportService(AsyncMock())
+
+        with patch.object(
+            service.class_summary_service, "summarize_classes", AsyncMock(return_value=[])
+        ):
+            with pytest.raises(HTTPException) as exc_info:
+                await service.generate_class_summary(uuid.uuid4(), uuid.uuid4())
+
+        assert exc_info.value.status_code == 404
@@ -299,6 +299,95 @@ class TestContentImportService:
             }
         ]
 
+    @pytest.fixture
+    def mock_vector_service(self):
+        """创建模拟向量服务，嵌入文本构建沿用真实实现"""
+        from app.services.embedding_service import EmbeddingService
+
+        embedding_service = EmbeddingService()
+        embedding_service.batch_generate_embeddings = AsyncMock(return_value=[
+            [0.1, 0.2, 0.3],
+            [0.1, 0.2, 0.31],  # 与第一条重复
+            [0.9, 0.1, 0.0],   # 已存在于Qdrant
+            [0.0, 0.9, -0.5],  # 新内容
+        ])
+
+        vector_service = MagicMock()
+        vector_service.embedding_service = embedding_service
+        vector_service.batch_search_similar = AsyncMock(
+            side_effect=lambda vectors, **kwargs: [
+                [{"id": "existing", "score": 0.99}] if v == [0.9, 0.1, 0.0] else []
+                for v in vectors
+            ]
+        )
+        vector_service.upsert_contents_batch = AsyncMock()
+        return vector_service
+
+    @pytest.mark.asyncio
+    async def test_import_dedups_against_index_and_reuses_vectors(
+        self, mock_db, mock_vector_service
+    ):
+        """批次内与Qdrant中的重复均被跳过，每条内容只生成一次向量并直接用于写入"""
+        existing = MagicMock()
+        existing.scalar_one_or_none = MagicMock(return_value=None)
+        mock_db.execute.return_value = existing
+
+        service = ContentImportService(
+            mock_db, vector_service=mock_vector_service, index_vectors=True
+        )
+        contents = [
+            {"title": f"Article {i}", "content_type": "reading", "difficulty_level": "intermediate"}
+            for i in range(4)
+        ]
+
+        success, failed = await service.import_contents(contents)
+
+        assert (success, failed) == (2, 0)
+        mock_vector_service.embedding_service.batch_generate_embeddings.assert_awaited_once()
+        # 只对批次内去重后剩余的3条查询Qdrant
+        searched = mock_vector_service.batch_search_similar.await_args.args[0]
+        assert len(searched) == 3
+
+        indexed_contents, indexed_vectors = mock_vector_service.upsert_contents_batch.await_args.args
+        assert [c.title for c in indexed_contents] == ["Article 0", "Article 3"]
+        assert indexed_vectors == [[0.1, 0.2, 0.3], [0.0, 0.9, -0.5]]
+        assert indexed_contents[0].embedding_text.startswith("Article 0")
+
+    @pytest.mark.asyncio
+    async def test_import_without_dedup_or_indexing_skips_embedding(
+        self, mock_db, mock_vector_service
+    ):
+        """不去重且不索引时不生成向量"""
+        existing = MagicMock()
+        existing.scalar_one_or_none = MagicMock(return_value=None)
+        mock_db.execute.return_value = existing
+
+        service = ContentImportService(
+            mock_db, vector_service=mock_vector_service, index_vectors=False
+        )
+        contents = [
+            {"title": "Article", "content_type": "reading", "difficulty_level": "intermediate"}
+        ]
+
+        assert await service.import_contents(contents, skip_duplicates=False) == (1, 0)
+        mock_vector_service.embedding_service.batch_generate_embeddings.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_item_without_title_fails_alone(self, mock_db, mock_vector_service):
+        """缺少标题的条目单独记为失败，同批次其他内容正常导入"""
+        existing = MagicMock()
+        existing.scalar_one_or_none = MagicMock(return_value=None)
+        mock_db.execute.return_value = existing
+
+        service = ContentImportService(mock_db, vector_service=mock_vector_service)
+        contents = [
+            {"content_type": "reading", "difficulty_level": "intermediate"},
+            {"title": "Article", "content_type": "reading", "difficulty_level": "intermediate"},
+        ]
+
+        assert await service.import_contents(contents, skip_duplicates=False) == (1, 1)
+        mock_vector_service.upsert_contents_batch.assert_not_awaited()
+
 
 # ============================================================================
 # 测试数据文件
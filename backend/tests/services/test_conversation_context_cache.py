@@ -0,0 +1,233 @@
+"""
+对话上下文缓存测试
+"""
+import json
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.services.conversation_context_cache import ConversationContext, ConversationContextCache
+from app.services.conversation_service import ConversationService
+
+
+def make_context(message_count: int = 2, status: str = "active") -> ConversationContext:
+    return ConversationContext(
+        conversation_id="conv-1",
+        scenario="ordering_food",
+        level="B1",
+        system_prompt="你是一位友好耐心的英语对话伙伴。",
+        message_count=message_count,
+        messages=[
+            {"role": "user", "content": "Hi", "timestamp": "2026-01-01T00:00:00", "seq": 1},
+            {"role": "assistant", "content": "Hello!", "timestamp": "2026-01-01T00:00:01", "seq": 2},
+        ][:message_count],
+        status=status,
+    )
+
+
+def make_cache(script_result) -> tuple:
+    redis_client = MagicMock()
+    script = AsyncMock(return_value=script_result)
+    redis_client.register_script = MagicMock(return_value=script)
+    return ConversationContextCache(redis_client=redis_client, max_messages=10), script
+
+
+@pytest.fixture
+def settings():
+    values = SimpleNamespace(
+        CONVERSATION_CONTEXT_CACHE_ENABLED=True,
+        CONVERSATION_CONTEXT_CACHE_TTL=1800,
+    )
+    with patch("app.services.conversation_context_cache.get_settings", return_value=values):
+        yield values
+
+
+class TestConversationContextCache:
+    """上下文缓存读写测试"""
+
+    def test_empty_lua_array_is_decoded_as_list(self):
+        raw = json.dumps({**make_context(0).__dict__, "messages": {}})
+
+        assert ConversationContext.from_json(raw).messages == []
+
+    @pytest.mark.asyncio
+    async def test_append_hit_returns_updated_context(self, settings):
+        cache, script = make_cache(make_context().to_json())
+
+        context = await cache.append("conv-1", "user", "Hi", datetime(2026, 1, 1))
+
+        assert context.message_count == 2
+        kwargs = script.await_args.kwargs
+        assert kwargs["keys"] == ["cache:conversation:ctx:conv-1"]
+        assert json.loads(kwargs["args"][0])["content"] == "Hi"
+        assert kwargs["args"][1:] == [10, 1800]
+
+    @pytest.mark.asyncio
+    async def test_append_miss_returns_none(self, settings):
+        cache, _ = make_cache(None)
+
+        assert await cache.append("conv-1", "user", "Hi", datetime(2026, 1, 1)) is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_skips_redis(self, settings):
+        settings.CONVERSATION_CONTEXT_CACHE_ENABLED = False
+        cache, script = make_cache(make_context().to_json())
+
+        assert await cache.append("conv-1", "user", "Hi", datetime(2026, 1, 1)) is None
+        script.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_put_keeps_recent_messages(self, settings):
+        cache, _ = make_cache(None)
+        cache.max_messages = 1
+        cache._redis.setex = AsyncMock()
+
+        await cache.put(make_context())
+
+        _, ttl, payload = cache._redis.setex.await_args.args
+        assert ttl == 1800
+        assert [m["seq"] for m in json.loads(payload)["messages"]] == [2]
+
+    def test_context_without_status_defaults_to_active(self):
+        data = make_context().__dict__.copy()
+        del data["status"]
+
+        assert ConversationContext.from_json(json.dumps(data)).status == "active"
+
+    @pytest.mark.asyncio
+    async def test_mark_status_updates_cached_context(self, settings):
+        cache, script = make_cache(1)
+
+        assert await cache.mark_status("conv-1", "completed") is True
+        kwargs = script.await_args.kwargs
+        assert kwargs["keys"] == ["cache:conversation:ctx:conv-1"]
+        assert kwargs["args"] == ["completed"]
+
+
+class TestConversationServiceContextCache:
+    """对话服务使用上下文缓存测试"""
+
+    @pytest.fixture
+    def service(self):
+        cache = MagicMock()
+        cache.append = AsyncMock()
+        cache.put = AsyncMock()
+        with patch("app.services.conversation_service.get_zhipuai_service"), \
+                patch("app.services.conversation_service.get_conversation_context_cache", return_value=cache):
+            service = ConversationService()
+        service._persist_message_later = MagicMock()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_database(self, service):
+        service.context_cache.append.return_value = make_context()
+        db = AsyncMock()
+
+        api_messages = await service.prepare_reply(db, "conv-1", "Hi")
+
+        db.execute.assert_not_awaited()
+        assert api_messages[0] == {"role": "system", "content": make_context().system_prompt}
+        assert [m["content"] for m in api_messages[1:]] == ["Hi", "Hello!"]
+        args = service._persist_message_later.call_args.args
+        assert args[:4] == ("conv-1", 2, "user", "Hi")
+
+    @pytest.mark.asyncio
+    async def test_cache_miss_loads_from_database(self, service):
+        service.context_cache.append.return_value = None
+        service._load_context = AsyncMock(return_value=make_context(1))
+
+        api_messages = await service.prepare_reply(AsyncMock(), "conv-1", "Hi")
+
+        service._load_context.assert_awaited_once()
+        service._persist_message_later.assert_not_called()
+        assert len(api_messages) == 2
+
+    @pytest.mark.asyncio
+    async def test_reply_is_written_behind_on_hit(self, service):
+        service.context_cache.append.return_value = make_context()
+        db = AsyncMock()
+
+        saved = await service.save_reply(db, "conv-1", "Hello there, what would you like?")
+
+        db.execute.assert_not_awaited()
+        args = service._persist_message_later.call_args.args
+        assert args[:4] == ("conv-1", 2, "assistant", saved)
+
+    @pytest.mark.asyncio
+    async def test_inactive_cached_conversation_is_rejected(self, service):
+        service.context_cache.append.return_value = make_context(status="completed")
+
+        with pytest.raises(ValueError, match="not active"):
+            await service.prepare_reply(AsyncMock(), "conv-1", "Hi")
+
+        service._persist_message_later.assert_not_called()
+
+
+class TestWriteBehind:
+    """后台消息写入测试"""
+
+    @pytest.fixture
+    def db(self):
+        """每次打开会话都返回同一个模拟数据库会话"""
+        db = MagicMock()
+        db.execute = AsyncMock()
+        db.commit = AsyncMock()
+        session_context = MagicMock()
+        session_context.__aenter__ = AsyncMock(return_value=db)
+        session_context.__aexit__ = AsyncMock(return_value=False)
+        values = SimpleNamespace(
+            CONVERSATION_WRITE_BEHIND_RETRIES=2,
+            CONVERSATION_WRITE_BEHIND_RETRY_DELAY=0.5,
+        )
+        with patch("app.services.conversation_service.get_session_maker",
+                   return_value=MagicMock(return_value=session_context)), \
+                patch("app.services.conversation_service.get_settings", return_value=values), \
+                patch("app.services.conversation_service.asyncio.sleep", new=AsyncMock()) as sleep:
+            db.sleep = sleep
+            yield db
+
+    @pytest.fixture
+    def service(self):
+        cache = MagicMock()
+        cache.invalidate = AsyncMock()
+        with patch("app.services.conversation_service.get_zhipuai_service"), \
+                patch("app.services.conversation_service.get_conversation_context_cache", return_value=cache):
+            return ConversationService()
+
+    @pytest.mark.asyncio
+    async def test_transient_failure_is_retried_and_cache_kept(self, service, db):
+        db.commit.side_effect = [ConnectionError("db down"), None]
+
+        await service._persist_message(uuid.uuid4(), 3, "user", "Hi", datetime(2026, 1, 1))
+
+        assert db.commit.await_count == 2
+        assert [call.args[0] for call in db.sleep.await_args_list] == [0.5]
+        service.context_cache.invalidate.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_taken_seq_is_allocated_in_database(self, service, db):
+        db.commit.side_effect = [IntegrityError("INSERT", {}, Exception("duplicate seq")), None]
+        service._append_message = AsyncMock(return_value=7)
+        conversation_id = uuid.uuid4()
+
+        await service._persist_message(conversation_id, 3, "user", "Hi", datetime(2026, 1, 1))
+
+        service._append_message.assert_awaited_once()
+        assert service._append_message.await_args.kwargs["created_at"] == datetime(2026, 1, 1)
+        db.sleep.assert_not_awaited()
+        service.context_cache.invalidate.assert_awaited_once_with(conversation_id)
+
+    @pytest.mark.asyncio
+    async def test_exhausted_retries_drop_cached_context(self, service, db):
+        db.commit.side_effect = ConnectionError("db down")
+        conversation_id = uuid.uuid4()
+
+        await service._persist_message(conversation_id, 3, "user", "Hi", datetime(2026, 1, 1))
+
+        assert db.commit.await_count == 3
+        assert [call.args[0] for call in db.sleep.await_args_list] == [0.5, 1.0]
+        service.context_cache.invalidate.assert_awaited_once_with(conversation_id)
@@ -0,0 +1,177 @@
+"""
+对话回复流式输出测试
+
+- 智谱AI SSE 响应解析
+- 对话服务转发增量文本
+"""
+import json
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.services.conversation_service import ConversationService
+from app.services.zhipu_service import ZhipuAIService
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def make_sse_body(*deltas: str, done: bool = True) -> bytes:
+    """构造智谱AI流式响应体"""
+    lines = []
+    for delta in deltas:
+        chunk = {"choices": [{"index": 0, "delta": {"role": "assistant", "content": delta}}]}
+        lines.append(f"data: {json.dumps(chunk)}\n\n")
+    # 思考过程不应被产出
+    reasoning = {"choices": [{"index": 0, "delta": {"reasoning_content": "thinking"}}]}
+    lines.insert(0, f"data: {json.dumps(reasoning)}\n\n")
+    if done:
+        lines.append("data: [DONE]\n\n")
+    return "".join(lines).encode()
+
+
+def make_service(handler) -> ZhipuAIService:
+    """创建使用模拟 HTTP 传输的智谱AI服务"""
+    with patch("app.services.zhipu_service.settings") as settings:
+        settings.ZHIPUAI_API_KEY = "test-key"
+        settings.ZHIPUAI_BASE_URL = "https://example.test"
+        settings.ZHIPUAI_MODEL = "glm-test"
+        settings.ZHIPUAI_TEMPERATURE = 0.7
+        settings.ZHIPUAI_MAX_TOKENS = 1000
+        service = ZhipuAIService()
+    service.client = httpx.AsyncClient(
+        base_url="https://example.test",
+        transport=httpx.MockTransport(handler),
+    )
+    return service
+
+
+class TestChatCompletionStream:
+    """智谱AI流式调用测试"""
+
+    @pytest.mark.asyncio
+    async def test_yields_content_deltas(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=make_sse_body("Hello", ", ", "world!"))
+
+        service = make_service(handler)
+        deltas = [d async for d in service.chat_completion_stream(MESSAGES, top_p=0.9, top_k=5)]
+
+        assert deltas == ["Hello", ", ", "world!"]
+        assert requests[0]["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_http_error_is_raised(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(429, json={"error": "rate limited"})
+
+        service = make_service(handler)
+        with pytest.raises(httpx.HTTPStatusError):
+            async for _ in service.chat_completion_stream(MESSAGES, top_p=0.9, top_k=5):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_chat_completion_rejects_stream_flag(self):
+        service = make_service(lambda request: httpx.Response(200))
+
+        with pytest.raises(ValueError, match="chat_completion_stream"):
+            await service.chat_completion(MESSAGES, stream=True)
+
+
+class TestConversationStreamReply:
+    """对话服务流式回复测试"""
+
+    @pytest.fixture
+    def service(self):
+        zhipu = MagicMock()
+        zhipu.deltas = ["Sure, what would you like ", "to order ", "today?"]
+
+        async def fake_stream(**kwargs):
+            for delta in zhipu.deltas:
+                yield delta
+
+        zhipu.chat_completion_stream = MagicMock(side_effect=fake_stream)
+        # 上下文缓存未命中，消息直接写入数据库
+        cache = MagicMock()
+        cache.append = AsyncMock(return_value=None)
+        with patch("app.services.conversation_service.get_zhipuai_service", return_value=zhipu), \
+                patch("app.services.conversation_service.get_conversation_context_cache", return_value=cache):
+            yield ConversationService()
+
+    @pytest.mark.asyncio
+    async def test_stream_reply_forwards_deltas(self, service):
+        api_messages = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "hi"}]
+
+        deltas = [d async for d in service.stream_reply(api_messages)]
+
+        # 开头缓冲到足以判断后逐段产出
+        assert deltas == ["Sure, what would you like to order", " today?"]
+        kwargs = service.zhipu_service.chat_completion_stream.call_args.kwargs
+        assert kwargs["messages"] == api_messages
+        assert kwargs["max_tokens"] == ConversationService.REPLY_MAX_TOKENS
+
+    @pytest.mark.asyncio
+    async def test_save_reply_appends_assistant_message(self, service):
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = 3
+        db = AsyncMock()
+        db.add = MagicMock()
+        db.execute.return_value = result
+        conversation_id = str(uuid.uuid4())
+
+        saved = await service.save_reply(db, conversation_id, "Sure, what would you like?")
+
+        assert saved == "Sure, what would you like?"
+        message = db.add.call_args.args[0]
+        assert message.role == "assistant"
+        assert message.content == saved
+        assert message.seq == 3
+        db.flush.assert_awaited_once()
+
+    @staticmethod
+    async def stream_and_save(service, deltas):
+        """流式产出回复并按接口的方式保存，返回 (产出文本, 保存的消息)"""
+        service.zhipu_service.deltas = deltas
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = 3
+        db = AsyncMock()
+        db.add = MagicMock()
+        db.execute.return_value = result
+
+        streamed = "".join([d async for d in service.stream_reply(MESSAGES)])
+        await service.save_reply(db, str(uuid.uuid4()), streamed, extracted=True)
+        return streamed, db.add.call_args.args[0].content
+
+    @pytest.mark.asyncio
+    async def test_streamed_plain_reply_equals_saved_message(self, service):
+        streamed, saved = await self.stream_and_save(
+            service, ["  **Great", "! Where would you like ", "to go this weekend?", "** \n"]
+        )
+
+        assert streamed == saved == "Great! Where would you like to go this weekend?"
+
+    @pytest.mark.asyncio
+    async def test_thinking_is_not_streamed(self, service):
+        deltas = [
+            "**分析**: 用户想点餐，需要礼貌地询问。\n",
+            "草稿 1: \"What can I get for you today?\"\n",
+            "**选择**: \"What would you like to order today?\"",
+        ]
+
+        streamed, saved = await self.stream_and_save(service, deltas)
+
+        assert streamed == saved == "What would you like to order today?"
+        assert "分析" not in streamed
+
+    @pytest.mark.asyncio
+    async def test_long_reply_is_truncated_consistently(self, service):
+        streamed, saved = await self.stream_and_save(
+            service, ["This is a long answer. " * 10] * 5
+        )
+
+        assert streamed == saved
+        assert len(saved) == ConversationService.REPLY_MAX_CHARS
@@ -0,0 +1,179 @@
+"""
+每日统计汇总服务测试
+"""
+import uuid
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models import Mistake, Practice, StudentDailyStats
+from app.services.chart_data_service import ChartDataService
+from app.services.daily_stats_service import DailyStatsService
+
+
+def _row(stat_date: date, **fields) -> StudentDailyStats:
+    values = {
+        "practice_count": 0, "completed_count": 0,
+        "correct_rate_sum": 0.0, "correct_rate_count": 0,
+        "score_sum": 0.0, "score_count": 0,
+        "time_spent_seconds": 0, "mistake_count": 0,
+        "mistakes_by_type": {}, "mistakes_by_status": {},
+    }
+    values.update(fields)
+    return StudentDailyStats(student_id=uuid.uuid4(), stat_date=stat_date, **values)
+
+
+def _db_returning(rows):
+    db = AsyncMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rows
+    db.execute.return_value = result
+    return db
+
+
+def _sql(db) -> str:
+    statement = db.execute.await_args.args[0]
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def _mistake(**fields) -> Mistake:
+    values = dict(
+        student_id=uuid.uuid4(),
+        mistake_type="grammar",
+        status="pending",
+        first_mistaken_at=datetime(2026, 3, 2, 23, 59),
+    )
+    values.update(fields)
+    return Mistake(**values)
+
+
+class TestIncrementalUpdates:
+    """增量更新测试"""
+
+    @pytest.mark.asyncio
+    async def test_mistake_created_upserts_counts(self):
+        db = AsyncMock()
+        mistake = _mistake()
+
+        await DailyStatsService(db).record_mistake_created(mistake)
+
+        sql = _sql(db)
+        params = db.execute.await_args.args[0].compile(dialect=postgresql.dialect()).params
+        assert "ON CONFLICT ON CONSTRAINT uq_student_daily_stats_student_date" in sql
+        assert "mistake_count = (student_daily_stats.mistake_count + excluded.mistake_count)" in sql
+        assert "practice_count =" not in sql
+        assert params["stat_date"] == date(2026, 3, 2)
+        assert params["mistakes_by_type"] == {"grammar": 1}
+
+    @pytest.mark.asyncio
+    async def test_practice_completed_counts_created_date(self):
+        db = AsyncMock()
+        practice = Practice(
+            student_id=uuid.uuid4(),
+            created_at=datetime(2026, 3, 1, 22, 0),
+            correct_rate=None,
+            score=80.0,
+            time_spent=600,
+        )
+
+        await DailyStatsService(db).record_practice_completed(practice)
+
+        params = db.execute.await_args.args[0].compile(dialect=postgresql.dialect()).params
+        assert params["stat_date"] == date(2026, 3, 1)
+        assert params["completed_count"] == 1
+        assert params["score_sum"] == 80.0
+        assert params["time_spent_seconds"] == 600
+        # 没有正确率的练习不计入正确率平均
+        assert "correct_rate_sum = (" not in _sql(db)
+
+    @pytest.mark.asyncio
+    async def test_status_change_moves_count(self):
+        db = AsyncMock()
+        mistake = _mistake(status="mastered")
+
+        await DailyStatsService(db).record_mistake_status_changed(mistake, "pending")
+
+        sql = _sql(db)
+        assert sql.startswith("UPDATE student_daily_stats")
+        assert "mistakes_by_status" in sql
+        assert "mistake_count" not in sql
+
+    @pytest.mark.asyncio
+    async def test_unchanged_status_is_noop(self):
+        db = AsyncMock()
+
+        await DailyStatsService(db).record_mistake_status_changed(_mistake(), "pending")
+
+        db.execute.assert_not_awaited()
+
+
+class TestSummarize:
+    """汇总读取测试"""
+
+    def test_summarize_rows(self):
+        rows = [
+            _row(date(2026, 3, 1), practice_count=2, completed_count=2,
+                 correct_rate_sum=1.5, correct_rate_count=2, score_sum=150.0, score_count=2,
+                 mistake_count=1, mistakes_by_type={"grammar": 1},
+                 mistakes_by_status={"pending": 0, "mastered": 1}),
+            _row(date(2026, 3, 2), practice_count=1, mistake_count=2,
+                 mistakes_by_type={"grammar": 1, "listening": 1},
+                 mistakes_by_status={"pending": 2}),
+        ]
+
+        summary = DailyStatsService.summarize_rows(rows)
+
+        assert summary["practice_count"] == 3
+        assert summary["avg_correct_rate"] == 0.75
+        assert summary["avg_score"] == 75.0
+        assert summary["mistakes_by_type"] == {"grammar": 2, "listening": 1}
+        assert summary["mistakes_by_status"] == {"pending": 2, "mastered": 1}
+        assert summary["days"] == 2
+
+    def test_summarize_empty(self):
+        summary = DailyStatsService.summarize_rows([])
+
+        assert summary["practice_count"] == 0
+        assert summary["avg_correct_rate"] == 0
+        assert summary["mistakes_by_type"] == {}
+
+
+class TestChartDataFromDailyStats:
+    """图表数据读取每日统计测试"""
+
+    @pytest.mark.asyncio
+    async def test_learning_trend_single_query(self):
+        db = _db_returning([
+            _row(date(2026, 3, 1), practice_count=2, correct_rate_sum=1.6,
+                 correct_rate_count=2, time_spent_seconds=1800),
+            _row(date(2026, 3, 2), mistake_count=3),
+        ])
+
+        data = await ChartDataService(db).get_learning_trend_data(
+            uuid.uuid4(), datetime(2026, 3, 1), datetime(2026, 3, 7)
+        )
+
+        assert db.execute.await_count == 1
+        assert data["metrics"]["practices"] == [{"date": "2026-03-01", "count": 2}]
+        assert data["metrics"]["correctRate"] == [{"date": "2026-03-01", "rate": 80.0}]
+        assert data["metrics"]["duration"] == [{"date": "2026-03-01", "minutes": 30}]
+
+    @pytest.mark.asyncio
+    async def test_weekly_summary_groups_by_monday(self):
+        monday = date.today() - timedelta(days=date.today().weekday())
+        db = _db_returning([
+            _row(monday - timedelta(days=1), practice_count=1,
+                 correct_rate_sum=0.5, correct_rate_count=1, time_spent_seconds=600),
+            _row(monday, practice_count=2, correct_rate_sum=1.8,
+                 correct_rate_count=2, time_spent_seconds=1200),
+            _row(monday + timedelta(days=1), practice_count=1, time_spent_seconds=600),
+        ])
+
+        summary = await ChartDataService(db).get_weekly_summary(uuid.uuid4(), weeks=2)
+
+        assert [w["total_practices"] for w in summary["weeks"]] == [1, 3]
+        assert summary["weeks"][1]["week_start"] == datetime.combine(monday, datetime.min.time()).isoformat()
+        assert summary["weeks"][1]["avg_correct_rate"] == 90.0
+        assert summary["weeks"][1]["total_duration"] == 30
@@ -0,0 +1,185 @@
+"""
+向量嵌入缓存测试
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache, LocalLRUCache, normalize_text
+from app.services.embedding_service import EmbeddingService
+
+
+class FakePipeline:
+    """模拟 Redis pipeline"""
+
+    def __init__(self, store):
+        self.store = store
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+
+    async def execute(self):
+        for key, _, value in self.commands:
+            self.store[key] = value
+
+
+class FakeRedis:
+    """模拟 Redis 客户端（仅实现缓存用到的命令）"""
+
+    def __init__(self):
+        self.store = {}
+        self.mget_calls = 0
+
+    async def mget(self, keys):
+        self.mget_calls += 1
+        return [self.store.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.store)
+
+
+def _vector(seed: float, dim: int = 4):
+    return [seed + i for i in range(dim)]
+
+
+class TestNormalizeText:
+    """文本规范化测试"""
+
+    def test_collapses_whitespace_and_keeps_case(self):
+        assert normalize_text("  Hello \n\t World ") == "Hello World"
+        assert normalize_text("Hello") != normalize_text("hello")
+
+
+class TestLocalLRUCache:
+    """进程内LRU缓存测试"""
+
+    def test_evicts_least_recently_used_by_size(self):
+        cache = LocalLRUCache(max_bytes=8, ttl=60)
+        cache.set("a", b"1234")
+        cache.set("b", b"5678")
+        cache.get("a")  # a 变为最近使用
+        cache.set("c", b"9999")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1234"
+        assert cache.size_bytes == 8
+
+    def test_expired_entries_are_dropped(self):
+        cache = LocalLRUCache(max_bytes=1024, ttl=-1)
+        cache.set("a", b"1234")
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestEmbeddingCache:
+    """两级嵌入缓存测试"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return FakeRedis()
+
+    @pytest.fixture
+    def cache(self, redis_client):
+        return EmbeddingCache(redis_client=redis_client, enabled=True)
+
+    @pytest.mark.asyncio
+    async def test_only_misses_are_generated(self, cache):
+        generate = AsyncMock(side_effect=lambda texts: [_vector(len(t)) for t in texts])
+
+        first = await cache.get_or_generate("zhipuai", "embedding-3", ["a", "bb"], generate)
+        second = await cache.get_or_generate("zhipuai", "embedding-3", ["bb", "ccc"], generate)
+
+        assert first == [_vector(1), _vector(2)]
+        assert second == [_vector(2), _vector(3)]
+        assert generate.await_args_list[1].args[0] == ["ccc"]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_texts_in_batch_generated_once(self, cache):
+        generate = AsyncMock(side_effect=lambda texts: [_vector(1) for _ in texts])
+
+        result = await cache.get_or_generate("zhipuai", "embedding-3", ["x", " x ", "x"], generate)
+
+        assert len(result) == 3
+        assert generate.await_args.args[0] == ["x"]
+
+    @pytest.mark.asyncio
+    async def test_keys_include_provider_and_model(self, cache):
+        generate = AsyncMock(side_effect=lambda texts: [_vector(1) for _ in texts])
+
+        await cache.get_or_generate("zhipuai", "embedding-3", ["x"], generate)
+        await cache.get_or_generate("openai", "text-embedding-3-small", ["x"], generate)
+
+        assert generate.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_refills_local(self, cache, redis_client):
+        generate = AsyncMock(side_effect=lambda texts: [_vector(1) for _ in texts])
+        await cache.get_or_generate("zhipuai", "embedding-3", ["x"], generate)
+
+        # 模拟另一个进程：本地缓存为空，Redis中已有数据
+        cache.clear_local()
+        result = await cache.get_many("zhipuai", "embedding-3", ["x"])
+
+        assert result == [_vector(1)]
+        assert len(cache.local) == 1
+        stats = cache.get_stats()
+        assert stats["redis_hits"] == 1
+        assert stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_falls_back_to_local(self):
+        broken = MagicMock()
+        broken.mget = AsyncMock(side_effect=ConnectionError("down"))
+        cache = EmbeddingCache(redis_client=broken, enabled=True)
+        generate = AsyncMock(side_effect=lambda texts: [_vector(1) for _ in texts])
+
+        await cache.get_or_generate("zhipuai", "embedding-3", ["x"], generate)
+        result = await cache.get_or_generate("zhipuai", "embedding-3", ["x"], generate)
+
+        assert result == [_vector(1)]
+        assert generate.await_count == 1
+        # 进入退避期后不再访问Redis
+        assert broken.mget.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_passes_through(self, redis_client):
+        cache = EmbeddingCache(redis_client=redis_client, enabled=False)
+        generate = AsyncMock(side_effect=lambda texts: [_vector(1) for _ in texts])
+
+        await cache.get_or_generate("zhipuai", "embedding-3", ["x"], generate)
+        await cache.get_or_generate("zhipuai", "embedding-3", ["x"], generate)
+
+        assert generate.await_count == 2
+        assert redis_client.mget_calls == 0
+
+
+class TestEmbeddingServiceCaching:
+    """嵌入服务接入缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_batch_generate_uses_cache(self):
+        cache = EmbeddingCache(redis_client=FakeRedis(), enabled=True)
+        service = EmbeddingService(provider="zhipuai", cache=cache)
+        zhipuai_service = MagicMock()
+        zhipuai_service.embedding_model = "embedding-3"
+        zhipuai_service.batch_generate_embeddings = AsyncMock(
+            side_effect=lambda texts: [_vector(len(t)) for t in texts]
+        )
+        zhipuai_service.generate_embedding = AsyncMock(return_value=_vector(9))
+        service._zhipuai_service = zhipuai_service
+
+        await service.batch_generate_embeddings(["hello", "world!"])
+        vector = await service.generate_embedding("hello")
+
+        assert np.allclose(vector, _vector(5))
+        zhipuai_service.generate_embedding.assert_not_awaited()
+        assert zhipuai_service.batch_generate_embeddings.await_count == 1
@@ -4,14 +4,14 @@
 """
 import pytest
 import uuid
-from datetime import datetime, timedelta
-from unittest.mock import AsyncMock, patch
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.services.learning_report_service import LearningReportService, get_learning_report_service
-from app.models import User, UserRole, Student, Teacher, Organization
+from app.models import User, UserRole, Student, StudentDailyStats, Teacher, Organization
 from app.models.learning_report import LearningReport
 
 
@@ -83,22 +83,18 @@ class TestLearningReportService:
     @pytest.mark.asyncio
     async def test_analyze_ability_progress(self, service, mock_db):
         """测试能力分析"""
-        # 模拟学生和知识图谱
-        mock_student = type('Student', (), {
-            'knowledge_graph': type('KnowledgeGraph', (), {
-                'nodes': {
-                    'abilities': {
-                        'listening': {'level': 75, 'confidence': 0.8},
-                        'reading': {'level': 80, 'confidence': 0.9},
-                        'writing': {'level': 70, 'confidence': 0.7}
-                    }
-                },
-                'updated_at': datetime.utcnow()
-            })
+        # 模拟知识图谱中的能力节点
+        mock_row = type('Row', (), {
+            'abilities': {
+                'listening': {'level': 75, 'confidence': 0.8},
+                'reading': {'level': 80, 'confidence': 0.9},
+                'writing': {'level': 70, 'confidence': 0.7}
+            },
+            'updated_at': datetime.utcnow()
         })()
 
-        mock_result = AsyncMock()
-        mock_result.scalar_one_or_none.return_value = mock_student
+        mock_result = MagicMock()
+        mock_result.one_or_none.return_value = mock_row
         mock_db.execute.return_value = mock_result
 
         # 调用方法
@@ -238,6 +234,113 @@ class TestLearningReportService:
         assert "学生不存在或不属于该教师" in str(exc_info.value.detail)
 
 
+class TestLearningReportAggregation:
+    """学习报告聚合测试（数据库只返回汇总/聚合行）"""
+
+    @pytest.fixture
+    def mock_db(self):
+        db = AsyncMock(spec=AsyncSession)
+        return db
+
+    @staticmethod
+    def _result(rows=None):
+        result = MagicMock()
+        result.all.return_value = rows or []
+        return result
+
+    @staticmethod
+    def _daily_rows(*rows):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = [
+            StudentDailyStats(**{
+                "practice_count": 0, "completed_count": 0,
+                "correct_rate_sum": 0.0, "correct_rate_count": 0,
+                "score_sum": 0.0, "score_count": 0,
+                "time_spent_seconds": 0, "mistake_count": 0,
+                "mistakes_by_type": {}, "mistakes_by_status": {},
+                **row,
+            })
+            for row in rows
+        ]
+        return result
+
+    @pytest.mark.asyncio
+    async def test_generate_statistics_from_daily_stats(self, mock_db):
+        """每日统计汇总行合并为报告字段"""
+        mock_db.execute.return_value = self._daily_rows(
+            {
+                "stat_date": date(2026, 1, 2), "practice_count": 3, "completed_count": 2,
+                "correct_rate_sum": 1.51, "correct_rate_count": 2, "time_spent_seconds": 3600,
+                "mistake_count": 4,
+                "mistakes_by_type": {"grammar": 2, "vocabulary": 2},
+                "mistakes_by_status": {"pending": 3, "mastered": 1},
+            },
+            {
+                "stat_date": date(2026, 1, 5), "practice_count": 1, "completed_count": 1,
+                "time_spent_seconds": 3600, "mistake_count": 2,
+                "mistakes_by_type": {"grammar": 1, "vocabulary": 1},
+                "mistakes_by_status": {"pending": 2, "mastered": 0},
+            },
+        )
+        service = LearningReportService(mock_db)
+
+        statistics = await service.generate_statistics(
+            uuid.uuid4(), datetime(2026, 1, 1), datetime(2026, 1, 31)
+        )
+
+        assert mock_db.execute.await_count == 1
+        assert statistics["total_practices"] == 4
+        assert statistics["completion_rate"] == 75.0
+        assert statistics["avg_correct_rate"] == 75.5
+        assert statistics["total_duration_minutes"] == 120
+        assert statistics["total_duration_hours"] == 2.0
+        assert statistics["total_mistakes"] == 6
+        assert statistics["mistake_by_type"] == {"grammar": 3, "vocabulary": 3}
+        assert statistics["mistake_by_status"] == {"pending": 5, "mastered": 1}
+        assert statistics["period_days"] == 30
+
+    @pytest.mark.asyncio
+    async def test_generate_statistics_no_practices(self, mock_db):
+        mock_db.execute.return_value = self._daily_rows()
+        service = LearningReportService(mock_db)
+
+        statistics = await service.generate_statistics(
+            uuid.uuid4(), datetime(2026, 1, 1), datetime(2026, 1, 31)
+        )
+
+        assert statistics["completion_rate"] == 0
+        assert statistics["avg_correct_rate"] == 0
+        assert statistics["total_mistakes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_analyze_weak_points_from_aggregates(self, mock_db):
+        """知识点计数由数据库排序，主题/难度分组合并空值"""
+        kp_rows = [(f"kp{i}", 20 - i) for i in range(12)]
+        mock_db.execute.side_effect = [
+            self._result(rows=kp_rows),
+            self._result(rows=[
+                ("语法", "B1", 2),
+                (None, "B1", 1),
+                (None, None, 1),
+            ]),
+        ]
+        service = LearningReportService(mock_db)
+
+        weak_points = await service.analyze_weak_points(
+            uuid.uuid4(), datetime(2026, 1, 1), datetime(2026, 1, 31)
+        )
+
+        assert weak_points["total_unmastered"] == 4
+        assert list(weak_points["knowledge_points"]) == [f"kp{i}" for i in range(10)]
+        assert len(weak_points["knowledge_point_counts"]) == 12
+        assert weak_points["top_weak_points"][0] == {"point": "kp0", "count": 20}
+        assert weak_points["by_topic"] == {"语法": 2, "未分类": 2}
+        assert weak_points["by_difficulty"] == {"B1": 3, "unknown": 1}
+        # 非数组的 knowledge_points 在展开前被替换为空数组
+        kp_sql = str(mock_db.execute.await_args_list[0].args[0])
+        assert "json_typeof" in kp_sql
+
+
 class TestLearningReportServiceIntegration:
     """学习报告服务集成测试"""
 
@@ -304,8 +407,8 @@ class TestLearningReportServiceErrorHandling:
     async def test_analyze_ability_no_student(self, service, mock_db):
         """测试分析能力时学生不存在"""
         # 模拟查询返回None
-        mock_result = AsyncMock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result = MagicMock()
+        mock_result.one_or_none.return_value = None
         mock_db.execute.return_value = mock_result
 
         # 调用方法
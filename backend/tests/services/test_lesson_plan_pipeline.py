@@ -0,0 +1,274 @@
+"""
+教案流水线生成测试
+验证骨架先返回、剩余章节并发生成并按完成顺序逐节保存和推送
+"""
+import asyncio
+import json
+import time
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.schemas.lesson_plan import GenerateLessonPlanRequest
+from app.services.lesson_plan_service import LessonPlanService
+
+SECTION_DELAY = 0.2
+
+SKELETON = {
+    "objectives": {"language_knowledge": ["现在完成时"]},
+    "vocabulary": {"noun": [{"word": "experience"}]},
+    "grammar_points": [{"name": "现在完成时", "description": "have/has + 过去分词"}],
+    "structure": {
+        "presentation": {
+            "phase": "presentation",
+            "title": "讲解",
+            "duration": 15,
+            "description": "讲解现在完成时",
+        }
+    },
+}
+
+
+def leveled_response(level: str) -> str:
+    return json.dumps({
+        "level": level,
+        "title": f"{level} 阅读",
+        "content": "I have been to Beijing.",
+        "word_count": 5,
+        "difficulty_notes": "简单",
+    })
+
+
+EXERCISE_RESPONSE = json.dumps({
+    "exercises": [{
+        "id": "q1",
+        "type": "multiple_choice",
+        "question": "I ___ finished.",
+        "options": ["have", "has", "had", "having"],
+        "correct_answer": "have",
+        "explanation": "第一人称用 have",
+        "difficulty": "B1",
+    }]
+})
+
+PPT_RESPONSE = json.dumps({"slides": [{"slide_number": 1, "title": "封面"}]})
+
+
+@pytest.fixture
+def request_data() -> GenerateLessonPlanRequest:
+    return GenerateLessonPlanRequest(
+        title="现在完成时",
+        topic="现在完成时",
+        level="B1",
+        leveled_levels=["A1", "C1"],
+        exercise_count=4,
+        exercise_types=["multiple_choice", "fill_blank"],
+    )
+
+
+@pytest.fixture
+def service():
+    with patch("app.services.lesson_plan_service.ZhipuAIService"):
+        service = LessonPlanService()
+    service._push_generation_event = AsyncMock()
+    return service
+
+
+@pytest.fixture
+def session():
+    lesson_plan = SimpleNamespace(
+        id=uuid.uuid4(),
+        status="generating",
+        leveled_materials=[],
+        exercises={},
+        ppt_outline=[],
+        generation_time_ms=None,
+        last_generated_at=None,
+    )
+    db = MagicMock()
+    db.get = AsyncMock(return_value=lesson_plan)
+    db.commit = AsyncMock()
+    session_context = MagicMock()
+    session_context.__aenter__ = AsyncMock(return_value=db)
+    session_context.__aexit__ = AsyncMock(return_value=False)
+    with patch(
+        "app.services.lesson_plan_service.get_session_maker",
+        return_value=MagicMock(return_value=session_context),
+    ):
+        yield db, lesson_plan
+
+
+async def fake_llm(messages, **kwargs):
+    """按章节返回模拟响应，C1 材料最慢"""
+    prompt = messages[-1]["content"]
+    await asyncio.sleep(SECTION_DELAY * (2 if "CEFR C1" in prompt else 1))
+    if "改写以下内容" in prompt:
+        return leveled_response("C1" if "CEFR C1" in prompt else "A1")
+    if "练习" in messages[0]["content"]:
+        return EXERCISE_RESPONSE
+    return PPT_RESPONSE
+
+
+class TestLessonPlanPipeline:
+    """流水线生成测试"""
+
+    def test_skeleton_prompt_omits_fanned_out_sections(self, service, request_data):
+        prompt = service._build_simple_lesson_prompt(request_data, skeleton_only=True)
+
+        assert '"structure"' in prompt
+        assert '"exercises"' not in prompt
+        assert '"ppt_outline"' not in prompt
+
+    def test_section_jobs_follow_request(self, service, request_data):
+        request_data.include_ppt = False
+
+        jobs = service._build_section_jobs(request_data, SKELETON)
+
+        assert [(section, key) for section, key, _ in jobs] == [
+            ("leveled_materials", "A1"),
+            ("leveled_materials", "C1"),
+            ("exercises", "multiple_choice"),
+            ("exercises", "fill_blank"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_sections_run_concurrently_and_persist_in_completion_order(
+        self, service, request_data, session
+    ):
+        db, lesson_plan = session
+        service._call_zhipu_json = AsyncMock(side_effect=fake_llm)
+        jobs = service._build_section_jobs(request_data, SKELETON)
+
+        start = time.perf_counter()
+        await service._generate_sections(
+            lesson_plan.id, uuid.uuid4(), request_data, jobs, time.time()
+        )
+        elapsed = time.perf_counter() - start
+
+        # 总耗时接近最慢章节，而不是各章节之和
+        assert elapsed < SECTION_DELAY * 4
+        assert [m["level"] for m in lesson_plan.leveled_materials] == ["A1", "C1"]
+        assert set(lesson_plan.exercises) == {"multiple_choice", "fill_blank"}
+        assert lesson_plan.ppt_outline[0]["title"] == "封面"
+        assert lesson_plan.status == "generated"
+        assert db.commit.await_count == len(jobs) + 1
+
+        events = [call.args[1:] for call in service._push_generation_event.await_args_list]
+        sections = [data["key"] for action, data in events if action == "section"]
+        assert sections[-1] == "C1"
+        assert events[-1][0] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_failed_section_does_not_block_others(self, service, request_data, session):
+        _, lesson_plan = session
+
+        async def llm(messages, **kwargs):
+            if "CEFR A1" in messages[-1]["content"]:
+                raise ConnectionError("timeout")
+            return await fake_llm(messages)
+
+        service._call_zhipu_json = AsyncMock(side_effect=llm)
+        jobs = service._build_section_jobs(request_data, SKELETON)
+
+        await service._generate_sections(
+            lesson_plan.id, uuid.uuid4(), request_data, jobs, time.time()
+        )
+
+        assert [m["level"] for m in lesson_plan.leveled_materials] == ["C1"]
+        assert lesson_plan.status == "partial"
+        events = [call.args[1:] for call in service._push_generation_event.await_args_list]
+        errors = [data for action, data in events if action == "section" and data["error"]]
+        assert [data["key"] for data in errors] == ["A1"]
+        action, data = events[-1]
+        assert (action, data["status"]) == ("completed", "partial")
+        assert data["failed_sections"] == [{"section": "leveled_materials", "key": "A1"}]
+
+    @pytest.mark.asyncio
+    async def test_all_sections_failed_marks_plan_failed(self, service, request_data, session):
+        _, lesson_plan = session
+        service._call_zhipu_json = AsyncMock(side_effect=ConnectionError("timeout"))
+        jobs = service._build_section_jobs(request_data, SKELETON)
+
+        await service._generate_sections(
+            lesson_plan.id, uuid.uuid4(), request_data, jobs, time.time()
+        )
+
+        assert lesson_plan.status == "failed"
+        action, data = service._push_generation_event.await_args.args[1:]
+        assert (action, data["status"]) == ("completed", "failed")
+        assert len(data["failed_sections"]) == len(jobs)
+
+    @pytest.mark.asyncio
+    async def test_pipeline_error_marks_plan_failed(self, service, request_data, session):
+        _, lesson_plan = session
+        service._call_zhipu_json = AsyncMock(side_effect=fake_llm)
+        service._apply_section = MagicMock(side_effect=RuntimeError("bad section"))
+        jobs = service._build_section_jobs(request_data, SKELETON)
+
+        await service._generate_sections(
+            lesson_plan.id, uuid.uuid4(), request_data, jobs, time.time()
+        )
+
+        assert lesson_plan.status == "failed"
+        action, data = service._push_generation_event.await_args.args[1:]
+        assert action == "error"
+        assert data["status"] == "failed"
+        assert "bad section" in data["error"]
+
+    @pytest.mark.asyncio
+    async def test_pipeline_returns_skeleton_before_sections(self, service, request_data):
+        service._call_zhipu_json = AsyncMock(return_value=json.dumps(SKELETON))
+        service._generate_sections = AsyncMock()
+        db = MagicMock()
+        db.commit = AsyncMock()
+        db.refresh = AsyncMock()
+
+        lesson_plan = await service.generate_lesson_plan_pipelined(db, uuid.uuid4(), request_data)
+        await asyncio.gather(*service._section_tasks)
+
+        assert lesson_plan.status == "generating"
+        assert lesson_plan.leveled_materials == []
+        assert lesson_plan.objectives == SKELETON["objectives"]
+        service._call_zhipu_json.assert_awaited_once()
+        service._generate_sections.assert_awaited_once()
+        action, data = service._push_generation_event.await_args.args[1:]
+        assert (action, data["section"], data["total"]) == ("section", "skeleton", 5)
+
+    @pytest.mark.asyncio
+    async def test_shutdown_drain_marks_unfinished_plans_failed(self, service, request_data):
+        service._call_zhipu_json = AsyncMock(return_value=json.dumps(SKELETON))
+        async def never_finishes(*args):
+            await asyncio.sleep(60)
+
+        service._generate_sections = AsyncMock(side_effect=never_finishes)
+        service._mark_generation_failed = AsyncMock()
+        db = MagicMock()
+        db.commit = AsyncMock()
+        db.refresh = AsyncMock()
+        teacher_id = uuid.uuid4()
+        lesson_plan = await service.generate_lesson_plan_pipelined(db, teacher_id, request_data)
+        tasks = list(service._section_tasks)
+
+        await service.drain_section_tasks(timeout=0.01)
+
+        assert all(task.cancelled() for task in tasks)
+        assert not service._section_tasks
+        lesson_plan_id, failed_teacher_id, _ = service._mark_generation_failed.await_args.args
+        assert (lesson_plan_id, failed_teacher_id) == (lesson_plan.id, teacher_id)
+
+    @pytest.mark.asyncio
+    async def test_shutdown_drain_waits_for_finished_plans(self, service, request_data):
+        service._call_zhipu_json = AsyncMock(return_value=json.dumps(SKELETON))
+        service._generate_sections = AsyncMock()
+        service._mark_generation_failed = AsyncMock()
+        db = MagicMock()
+        db.commit = AsyncMock()
+        db.refresh = AsyncMock()
+        await service.generate_lesson_plan_pipelined(db, uuid.uuid4(), request_data)
+
+        await service.drain_section_tasks(timeout=1)
+
+        service._generate_sections.assert_awaited_once()
+        service._mark_generation_failed.assert_not_awaited()
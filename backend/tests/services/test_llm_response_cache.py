@@ -0,0 +1,265 @@
+"""
+大模型响应缓存测试
+"""
+import base64
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.llm_response_cache import (
+    LLM_CACHE_TTLS,
+    LLMResponseCache,
+    SemanticKey,
+    make_cache_key,
+)
+
+MESSAGES = [
+    {"role": "system", "content": "你是一个专业的英语教学专家。"},
+    {"role": "user", "content": "主题: Present Perfect\n等级: B1"},
+]
+PARAMS = {"model": "glm-4.7", "temperature": 0.7}
+
+
+def make_redis(cached=None, semantic_entries=None) -> MagicMock:
+    redis_client = MagicMock()
+    redis_client.get = AsyncMock(return_value=cached)
+    redis_client.setex = AsyncMock()
+    redis_client.hgetall = AsyncMock(return_value=semantic_entries or {})
+    redis_client.hlen = AsyncMock(return_value=0)
+    redis_client.hset = AsyncMock()
+    redis_client.hdel = AsyncMock()
+    redis_client.expire = AsyncMock()
+    return redis_client
+
+
+def encode_vector(vector) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+@pytest.fixture
+def settings():
+    values = SimpleNamespace(
+        LLM_RESPONSE_CACHE_ENABLED=True,
+        LLM_RESPONSE_CACHE_SEMANTIC_ENABLED=True,
+        LLM_RESPONSE_CACHE_SEMANTIC_THRESHOLD=0.97,
+        LLM_RESPONSE_CACHE_SEMANTIC_MAX_ENTRIES=200,
+    )
+    with patch("app.services.llm_response_cache.get_settings", return_value=values):
+        yield values
+
+
+class TestCacheKey:
+    """缓存键规范化测试"""
+
+    def test_whitespace_differences_share_key(self):
+        spaced = [{**m, "content": f"  {m['content'].replace(' ', '   ')}\n"} for m in MESSAGES]
+
+        assert make_cache_key(spaced, PARAMS) == make_cache_key(MESSAGES, PARAMS)
+
+    def test_generation_params_are_part_of_key(self):
+        assert make_cache_key(MESSAGES, PARAMS) != make_cache_key(
+            MESSAGES, {**PARAMS, "temperature": 0.3}
+        )
+
+
+class TestLLMResponseCache:
+    """响应缓存读写测试"""
+
+    @pytest.mark.asyncio
+    async def test_hit_skips_generation(self, settings):
+        cached = json.dumps({"content": '{"a": 1}', "total_tokens": 1200, "latency_ms": 8000})
+        cache = LLMResponseCache(redis_client=make_redis(cached))
+        generate = AsyncMock()
+
+        content = await cache.get_or_generate("lesson_plan", MESSAGES, PARAMS, generate)
+
+        assert content == '{"a": 1}'
+        generate.assert_not_awaited()
+        assert cache.get_stats()["saved_tokens"] == 1200
+
+    @pytest.mark.asyncio
+    async def test_miss_stores_with_call_site_ttl(self, settings):
+        redis_client = make_redis()
+        cache = LLMResponseCache(redis_client=redis_client)
+        generate = AsyncMock(return_value=('{"a": 1}', 300))
+
+        content = await cache.get_or_generate("conversation_scores", MESSAGES, PARAMS, generate)
+
+        assert content == '{"a": 1}'
+        key, ttl, payload = redis_client.setex.await_args.args
+        assert key.startswith("cache:llm:conversation_scores:")
+        assert ttl == LLM_CACHE_TTLS["conversation_scores"]
+        assert json.loads(payload)["total_tokens"] == 300
+
+    @pytest.mark.asyncio
+    async def test_unknown_call_site_bypasses_redis(self, settings):
+        redis_client = make_redis()
+        cache = LLMResponseCache(redis_client=redis_client)
+        generate = AsyncMock(return_value=("creative", 10))
+
+        await cache.get_or_generate("free_writing", MESSAGES, PARAMS, generate)
+
+        generate.assert_awaited_once()
+        redis_client.get.assert_not_awaited()
+        redis_client.setex.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_regenerate_skips_read_and_overwrites_entry(self, settings):
+        cached = json.dumps({"content": "old plan", "total_tokens": 900, "latency_ms": 5000})
+        redis_client = make_redis(cached)
+        cache = LLMResponseCache(redis_client=redis_client)
+
+        content = await cache.get_or_generate(
+            "lesson_plan", MESSAGES, PARAMS, AsyncMock(return_value=("new plan", 800)),
+            use_cache=False,
+        )
+
+        assert content == "new plan"
+        redis_client.get.assert_not_awaited()
+        key, _, payload = redis_client.setex.await_args.args
+        assert key == f"cache:llm:lesson_plan:{make_cache_key(MESSAGES, PARAMS)}"
+        assert json.loads(payload)["content"] == "new plan"
+
+    @pytest.mark.asyncio
+    async def test_invalid_regenerated_response_is_not_stored(self, settings):
+        redis_client = make_redis()
+        cache = LLMResponseCache(redis_client=redis_client)
+
+        await cache.get_or_generate(
+            "lesson_plan", MESSAGES, PARAMS, AsyncMock(return_value=("not json", 10)),
+            use_cache=False, validate=lambda content: content.startswith("{"),
+        )
+
+        redis_client.setex.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cached", [
+        "not json",
+        json.dumps(["a", "list"]),
+        json.dumps({"content": "plan", "unknown_field": 1}),
+    ])
+    async def test_corrupted_entry_is_treated_as_miss(self, settings, cached):
+        redis_client = make_redis(cached)
+        cache = LLMResponseCache(redis_client=redis_client)
+        generate = AsyncMock(return_value=("plan", 900))
+
+        content = await cache.get_or_generate("lesson_plan", MESSAGES, PARAMS, generate)
+
+        assert content == "plan"
+        generate.assert_awaited_once()
+        redis_client.setex.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_invalid_response_is_not_stored(self, settings):
+        redis_client = make_redis()
+        cache = LLMResponseCache(redis_client=redis_client)
+
+        await cache.get_or_generate(
+            "lesson_plan", MESSAGES, PARAMS, AsyncMock(return_value=("not json", 10)),
+            validate=lambda content: content.startswith("{"),
+        )
+
+        redis_client.setex.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_semantic_lookup_reuses_near_identical_request(self, settings):
+        cached = json.dumps({"content": "plan", "total_tokens": 900, "latency_ms": 5000})
+        redis_client = make_redis(semantic_entries={"other-digest": encode_vector([1.0, 0.01])})
+        # 精确键未命中，语义命中后按索引中的摘要读取响应
+        redis_client.get = AsyncMock(side_effect=[None, cached])
+        cache = LLMResponseCache(
+            redis_client=redis_client, embed=AsyncMock(return_value=[1.0, 0.0])
+        )
+        generate = AsyncMock()
+
+        content = await cache.get_or_generate(
+            "lesson_plan", MESSAGES, PARAMS, generate,
+            semantic=SemanticKey(scope="full|B1|45|", text="Present Perfect"),
+        )
+
+        assert content == "plan"
+        generate.assert_not_awaited()
+        assert redis_client.get.await_args.args[0] == "cache:llm:lesson_plan:other-digest"
+        assert cache.get_stats()["semantic_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_semantic_miss_indexes_new_request(self, settings):
+        redis_client = make_redis(semantic_entries={"other-digest": encode_vector([0.0, 1.0])})
+        cache = LLMResponseCache(
+            redis_client=redis_client, embed=AsyncMock(return_value=[1.0, 0.0])
+        )
+
+        await cache.get_or_generate(
+            "lesson_plan", MESSAGES, PARAMS, AsyncMock(return_value=("plan", 900)),
+            semantic=SemanticKey(scope="full|B1|45|", text="Present Perfect"),
+        )
+
+        semantic_key, digest, _ = redis_client.hset.await_args.args
+        assert semantic_key.startswith("cache:llm:semantic:lesson_plan:")
+        assert digest == make_cache_key(MESSAGES, PARAMS)
+
+    @pytest.mark.asyncio
+    async def test_invalid_index_entries_are_skipped_and_removed(self, settings):
+        cached = json.dumps({"content": "plan", "total_tokens": 900, "latency_ms": 5000})
+        redis_client = make_redis(semantic_entries={
+            # 更换嵌入模型前写入的三维向量
+            "old-model": encode_vector([1.0, 0.0, 0.0]),
+            "corrupted": "not base64!",
+            "other-digest": encode_vector([1.0, 0.01]),
+        })
+        redis_client.get = AsyncMock(side_effect=[None, cached])
+        cache = LLMResponseCache(
+            redis_client=redis_client, embed=AsyncMock(return_value=[1.0, 0.0])
+        )
+
+        content = await cache.get_or_generate(
+            "lesson_plan", MESSAGES, PARAMS, AsyncMock(),
+            semantic=SemanticKey(scope="full|B1|45|", text="Present Perfect"),
+        )
+
+        assert content == "plan"
+        key, *fields = redis_client.hdel.await_args.args
+        assert key.startswith("cache:llm:semantic:lesson_plan:")
+        assert sorted(fields) == ["corrupted", "old-model"]
+
+    @pytest.mark.asyncio
+    async def test_index_with_only_wrong_dimension_is_a_miss(self, settings):
+        redis_client = make_redis(semantic_entries={"old-model": encode_vector([1.0, 0.0, 0.0])})
+        cache = LLMResponseCache(
+            redis_client=redis_client, embed=AsyncMock(return_value=[1.0, 0.0])
+        )
+        generate = AsyncMock(return_value=("plan", 900))
+
+        content = await cache.get_or_generate(
+            "lesson_plan", MESSAGES, PARAMS, generate,
+            semantic=SemanticKey(scope="full|B1|45|", text="Present Perfect"),
+        )
+
+        assert content == "plan"
+        generate.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_full_index_evicts_oldest_vector(self, settings):
+        settings.LLM_RESPONSE_CACHE_SEMANTIC_MAX_ENTRIES = 2
+        vector = encode_vector([0.0, 1.0])
+        redis_client = make_redis()
+        redis_client.hlen = AsyncMock(return_value=2)
+        # 第一次读取用于相似查找（空），第二次用于淘汰
+        redis_client.hgetall = AsyncMock(side_effect=[
+            {}, {"newer": f"2000:{vector}", "oldest": f"1000:{vector}"},
+        ])
+        cache = LLMResponseCache(
+            redis_client=redis_client, embed=AsyncMock(return_value=[1.0, 0.0])
+        )
+
+        await cache.get_or_generate(
+            "lesson_plan", MESSAGES, PARAMS, AsyncMock(return_value=("plan", 900)),
+            semantic=SemanticKey(scope="full|B1|45|", text="Present Perfect"),
+        )
+
+        assert redis_client.hdel.await_args.args[1:] == ("oldest",)
+        stored = redis_client.hset.await_args.args[2]
+        assert stored.split(":")[0].isdigit()
@@ -0,0 +1,234 @@
+"""
+错题AI分析服务测试（批量分析：去重、缓存、合并提示词、有限并发）
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.mistake_analysis_cache_service import (
+    MistakeAnalysisCacheService,
+    build_analysis_cache_key,
+)
+from app.services.mistake_analysis_schemas import (
+    MistakeAnalysisResponse,
+    PackedMistakeAnalysisResponse,
+    ReviewPlan,
+    RootCause,
+)
+from app.services.mistake_analysis_service import MistakeAnalysisService
+
+
+class FakePipeline:
+    """模拟 Redis pipeline"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, value))
+
+    async def execute(self):
+        for key, value in self.commands:
+            self.redis.store[key] = value
+        return [True] * len(self.commands)
+
+
+class FakeRedis:
+    """模拟 Redis 客户端（decode_responses=True）"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def _analysis(category: str) -> MistakeAnalysisResponse:
+    return MistakeAnalysisResponse(
+        mistake_category=category,
+        severity="中等",
+        explanation=f"{category} 解释",
+        correct_approach="方法",
+        root_cause=RootCause(primary_cause="原因"),
+        knowledge_points=[category],
+        recommendations=[],
+        review_plan=ReviewPlan(
+            review_frequency="每天",
+            next_review_days=[1, 3],
+            mastery_criteria="连续答对",
+            review_method="重做",
+        ),
+        encouragement="加油",
+    )
+
+
+def _mistake(index: int, wrong_answer: str = "go") -> dict:
+    return {
+        "question": f"Question {index}: He ___ to school.",
+        "wrong_answer": wrong_answer,
+        "correct_answer": "goes",
+        "mistake_type": "grammar",
+    }
+
+
+class FakeAIService:
+    """模拟AI服务，记录调用并统计最大并发"""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def chat_completion_structured(self, messages, response_model, **kwargs):
+        self.calls.append(response_model)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+
+        if response_model is PackedMistakeAnalysisResponse:
+            count = messages[0]["content"].count("### 第")
+            return PackedMistakeAnalysisResponse(
+                analyses=[_analysis(f"packed-{i}") for i in range(count)]
+            )
+        return _analysis("single")
+
+    async def chat_completion(self, messages, **kwargs):
+        return "总结"
+
+
+@pytest.fixture
+def cache():
+    return MistakeAnalysisCacheService(redis_client=FakeRedis())
+
+
+@pytest.fixture
+def ai():
+    return FakeAIService()
+
+
+@pytest.fixture
+def service(cache, ai):
+    with patch(
+        "app.services.mistake_analysis_service.get_mistake_analysis_cache",
+        AsyncMock(return_value=cache),
+    ), patch("app.services.mistake_analysis_service.get_ai_service", return_value=ai):
+        yield MistakeAnalysisService(AsyncMock())
+
+
+class TestAnalysisCacheKey:
+    """分析缓存指纹测试"""
+
+    def test_normalizes_text(self):
+        assert build_analysis_cache_key(" He  GO ", "go", "goes", "grammar", "b1") == build_analysis_cache_key(
+            "he go", "Go", "goes ", "GRAMMAR", "B1"
+        )
+
+    def test_level_is_part_of_key(self):
+        assert build_analysis_cache_key("q", "a", "b", "grammar", "A2") != build_analysis_cache_key(
+            "q", "a", "b", "grammar", "B2"
+        )
+
+
+class TestBatchAnalysis:
+    """批量分析测试"""
+
+    @pytest.mark.asyncio
+    async def test_duplicates_analyzed_once(self, service, ai):
+        mistakes = [_mistake(1), _mistake(1), _mistake(1, wrong_answer=" GO ")]
+
+        result = await service.analyze_mistakes_batch(mistakes)
+
+        assert ai.calls == [MistakeAnalysisResponse]
+        assert len(result.results) == 3
+        assert {r.mistake_category for r in result.results} == {"single"}
+
+    @pytest.mark.asyncio
+    async def test_packs_missing_mistakes(self, service, ai):
+        mistakes = [_mistake(i) for i in range(5)]
+
+        result = await service.analyze_mistakes_batch(mistakes)
+
+        # 4道合并为一个提示词，剩余1道使用单题提示词
+        assert sorted(call.__name__ for call in ai.calls) == [
+            "MistakeAnalysisResponse",
+            "PackedMistakeAnalysisResponse",
+        ]
+        assert [r.mistake_category for r in result.results] == [
+            "packed-0", "packed-1", "packed-2", "packed-3", "single",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_cache_serves_repeated_batches(self, service, ai):
+        mistakes = [_mistake(i) for i in range(3)]
+
+        first = await service.analyze_mistakes_batch(mistakes)
+        calls_after_first = len(ai.calls)
+        second = await service.analyze_mistakes_batch(mistakes)
+
+        assert len(ai.calls) == calls_after_first
+        assert [r.mistake_category for r in second.results] == [r.mistake_category for r in first.results]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, service, ai):
+        service.PACK_SIZE = 1
+        mistakes = [_mistake(i) for i in range(12)]
+
+        await service.analyze_mistakes_batch(mistakes)
+
+        assert len(ai.calls) == 12
+        assert 1 < ai.max_active <= service.MAX_CONCURRENT_ANALYSES
+
+    @pytest.mark.asyncio
+    async def test_pack_count_mismatch_falls_back_to_single(self, service, ai):
+        async def short_pack(messages, response_model, **kwargs):
+            ai.calls.append(response_model)
+            if response_model is PackedMistakeAnalysisResponse:
+                return PackedMistakeAnalysisResponse(analyses=[_analysis("packed")])
+            return _analysis("single")
+
+        ai.chat_completion_structured = short_pack
+
+        result = await service.analyze_mistakes_batch([_mistake(1), _mistake(2)])
+
+        assert [r.mistake_category for r in result.results] == ["single", "single"]
+
+    @pytest.mark.asyncio
+    async def test_failed_analysis_uses_uncached_fallback(self, service, ai, cache):
+        ai.chat_completion_structured = AsyncMock(side_effect=ValueError("bad json"))
+        ai.chat_completion = AsyncMock(side_effect=ConnectionError("down"))
+
+        result = await service.analyze_mistakes_batch([_mistake(1)])
+
+        assert result.results[0].mistake_category == "需要进一步分析"
+        assert result.summary
+        assert cache._redis.store == {}
+
+    @pytest.mark.asyncio
+    async def test_unparseable_text_mode_fallback_is_not_stored(self, service, ai, cache):
+        ai.chat_completion_structured = AsyncMock(side_effect=ValueError("bad json"))
+        ai.chat_completion = AsyncMock(return_value="抱歉，我无法分析这道题。")
+        service.fingerprint_service = AsyncMock()
+        service.fingerprint_service.get_analyses.return_value = {}
+
+        single = await service.analyze_mistake(**_mistake(1))
+        batch = await service.analyze_mistakes_batch([_mistake(2)])
+
+        assert single.mistake_category == "需要进一步分析"
+        assert batch.results[0].mistake_category == "需要进一步分析"
+        assert cache._redis.store == {}
+        service.fingerprint_service.save_analyses.assert_not_awaited()
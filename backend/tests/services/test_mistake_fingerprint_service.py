@@ -0,0 +1,230 @@
+"""
+错题指纹服务测试（跨学生共享的错误模式）
+"""
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models import MistakeFingerprint
+from app.services.mistake_analysis_cache_service import MistakeAnalysisCacheService
+from app.services.mistake_analysis_service import MistakeAnalysisService
+from app.services.mistake_fingerprint_service import MistakeFingerprintService
+from tests.services.test_mistake_analysis_service import (
+    FakeAIService,
+    FakeRedis,
+    _analysis,
+    _mistake,
+)
+
+
+def _result(rows=None, scalar=None):
+    result = MagicMock()
+    result.all.return_value = rows or []
+    result.scalar_one_or_none.return_value = scalar
+    return result
+
+
+def _fingerprint_row(fingerprint: str, occurrences: int = 1) -> dict:
+    return {
+        "fingerprint": fingerprint,
+        "question_hash": "q" * 64,
+        "question": "He ___ to school.",
+        "wrong_answer": "go",
+        "correct_answer": "goes",
+        "mistake_type": "grammar",
+        "occurrences": occurrences,
+    }
+
+
+class TestUpsertFingerprints:
+    """指纹批量写入测试"""
+
+    @pytest.mark.asyncio
+    async def test_duplicates_summed_into_one_statement(self):
+        fingerprint_id = uuid.uuid4()
+        db = AsyncMock()
+        db.execute.return_value = _result(rows=[(fingerprint_id, "a" * 64)])
+
+        ids = await MistakeFingerprintService(db).upsert_fingerprints([
+            _fingerprint_row("a" * 64),
+            _fingerprint_row("a" * 64, occurrences=2),
+        ])
+
+        assert ids == {"a" * 64: fingerprint_id}
+        db.execute.assert_awaited_once()
+        compiled = db.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        assert "ON CONFLICT (fingerprint) DO UPDATE" in sql
+        assert "occurrence_count = (mistake_fingerprints.occurrence_count + excluded.occurrence_count)" in sql
+        assert compiled.params["occurrence_count_m0"] == 3
+        assert "occurrence_count_m1" not in compiled.params
+
+    @pytest.mark.asyncio
+    async def test_empty_input_does_not_query(self):
+        db = AsyncMock()
+
+        assert await MistakeFingerprintService(db).upsert_fingerprints([]) == {}
+        db.execute.assert_not_awaited()
+
+
+class TestAnalysesPerLevel:
+    """按学生水平保存分析测试"""
+
+    @pytest.mark.asyncio
+    async def test_only_matching_level_is_reused(self):
+        b1, legacy = uuid.uuid4(), uuid.uuid4()
+        db = AsyncMock()
+        db.execute.return_value = _result(rows=[
+            (b1, {"B1": {"mistake_category": "b1"}, "A2": {"mistake_category": "a2"}}),
+            (legacy, {"legacy": {"mistake_category": "old"}}),
+        ])
+
+        analyses = await MistakeFingerprintService(db).get_analyses([b1, legacy], "A2")
+
+        assert analyses == {b1: {"mistake_category": "a2"}}
+
+    @pytest.mark.asyncio
+    async def test_save_keeps_other_levels(self):
+        fingerprint_id = uuid.uuid4()
+        db = AsyncMock()
+        db.execute.side_effect = [
+            _result(rows=[(fingerprint_id, {"B1": {"mistake_category": "b1"}})]),
+            _result(),
+        ]
+
+        await MistakeFingerprintService(db).save_analyses(
+            {fingerprint_id: {"mistake_category": "a2"}}, "A2"
+        )
+
+        lock_sql = str(db.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+        assert "FOR UPDATE" in lock_sql
+        params = db.execute.await_args_list[1].args[1]
+        assert params[0]["ai_analysis"] == {
+            "B1": {"mistake_category": "b1"},
+            "A2": {"mistake_category": "a2"},
+        }
+
+
+class TestClassCommonMistakes:
+    """班级常见错误测试"""
+
+    @pytest.mark.asyncio
+    async def test_other_teachers_class_returns_none(self):
+        db = AsyncMock()
+        db.execute.return_value = _result(scalar=None)
+
+        result = await MistakeFingerprintService(db).get_class_common_mistakes(
+            uuid.uuid4(), teacher_id=uuid.uuid4()
+        )
+
+        assert result is None
+        db.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_groups_by_fingerprint(self):
+        class_id = uuid.uuid4()
+        fingerprint = MistakeFingerprint(
+            id=uuid.uuid4(),
+            question="He ___ to school.",
+            wrong_answer="go",
+            correct_answer="goes",
+            mistake_type="grammar",
+            ai_analysis={"B1": {"mistake_category": "主谓一致"}},
+        )
+        db = AsyncMock()
+        db.execute.side_effect = [
+            _result(scalar=class_id),
+            _result(rows=[(fingerprint, 12, 30)]),
+        ]
+
+        result = await MistakeFingerprintService(db).get_class_common_mistakes(class_id)
+
+        sql = str(db.execute.await_args_list[1].args[0].compile(dialect=postgresql.dialect()))
+        assert "GROUP BY mistakes.fingerprint_id" in sql
+        assert "count(distinct(mistakes.student_id))" in sql
+        assert result == [{
+            "fingerprint_id": str(fingerprint.id),
+            "question": "He ___ to school.",
+            "wrong_answer": "go",
+            "correct_answer": "goes",
+            "mistake_type": "grammar",
+            "occurrences": 30,
+            "mistake_category": "主谓一致",
+            "student_count": 12,
+        }]
+
+
+class TestSharedAnalysis:
+    """指纹上共享分析的复用测试"""
+
+    @pytest.fixture
+    def ai(self):
+        return FakeAIService()
+
+    @pytest.fixture
+    def service(self, ai):
+        cache = MistakeAnalysisCacheService(redis_client=FakeRedis())
+        with patch(
+            "app.services.mistake_analysis_service.get_mistake_analysis_cache",
+            AsyncMock(return_value=cache),
+        ), patch("app.services.mistake_analysis_service.get_ai_service", return_value=ai):
+            service = MistakeAnalysisService(AsyncMock())
+            service.fingerprint_service = AsyncMock()
+            yield service
+
+    @pytest.mark.asyncio
+    async def test_stored_analysis_skips_ai(self, service, ai):
+        fingerprint_id = uuid.uuid4()
+        service.fingerprint_service.get_analyses.return_value = {
+            fingerprint_id: _analysis("stored").model_dump(mode="json")
+        }
+
+        result = await service.analyze_mistakes_batch([{**_mistake(1), "fingerprint_id": fingerprint_id}])
+
+        assert ai.calls == []
+        assert result.results[0].mistake_category == "stored"
+        service.fingerprint_service.save_analyses.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_new_analysis_saved_to_fingerprint(self, service, ai):
+        fingerprint_id = uuid.uuid4()
+        service.fingerprint_service.get_analyses.return_value = {}
+
+        await service.analyze_mistake(
+            question="Q", wrong_answer="go", correct_answer="goes",
+            mistake_type="grammar", fingerprint_id=fingerprint_id,
+        )
+
+        assert ai.calls
+        saved, level = service.fingerprint_service.save_analyses.await_args.args
+        assert list(saved) == [fingerprint_id]
+        assert saved[fingerprint_id]["mistake_category"] == "single"
+        assert level is None
+
+    @pytest.mark.asyncio
+    async def test_lookup_and_save_use_student_level(self, service, ai):
+        fingerprint_id = uuid.uuid4()
+        service.fingerprint_service.get_analyses.return_value = {}
+
+        await service.analyze_mistakes_batch(
+            [{**_mistake(1), "fingerprint_id": fingerprint_id}], student_level="A2"
+        )
+
+        assert service.fingerprint_service.get_analyses.await_args.args[1] == "A2"
+        assert service.fingerprint_service.save_analyses.await_args.args[1] == "A2"
+
+    @pytest.mark.asyncio
+    async def test_fallback_analysis_is_not_saved_to_fingerprint(self, service, ai):
+        service.fingerprint_service.get_analyses.return_value = {}
+        ai.chat_completion_structured = AsyncMock(side_effect=ValueError("bad json"))
+        ai.chat_completion = AsyncMock(return_value="no json here")
+
+        result = await service.analyze_mistake(
+            question="Q", wrong_answer="go", correct_answer="goes",
+            mistake_type="grammar", fingerprint_id=uuid.uuid4(),
+        )
+
+        assert result.mistake_category == "需要进一步分析"
+        service.fingerprint_service.save_analyses.assert_not_awaited()
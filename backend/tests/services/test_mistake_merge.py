@@ -0,0 +1,253 @@
+"""
+错题合并写入与批量收集测试
+"""
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models import Mistake, MistakeType, Practice
+from app.services.daily_stats_service import DailyStatsService
+from app.services.mistake_service import (
+    MistakeService,
+    compute_mistake_fingerprint,
+    compute_question_hash,
+    normalize_answer_text,
+)
+
+
+def _result(rows=None, scalars=None):
+    result = MagicMock()
+    result.all.return_value = rows or []
+    result.scalars.return_value.all.return_value = scalars or []
+    return result
+
+
+def _row(student_id, question="He go to school.", wrong_answer="go", practice_id=None):
+    return MistakeService._build_mistake_row(
+        student_id=student_id,
+        question=question,
+        wrong_answer=wrong_answer,
+        correct_answer="goes",
+        mistake_type=MistakeType.GRAMMAR,
+        practice_id=practice_id,
+    )
+
+
+def _mistake_from_row(row, **fields) -> Mistake:
+    values = dict(row)
+    values.update(fields)
+    return Mistake(**values)
+
+
+def _practice(answers, **fields) -> Practice:
+    values = dict(
+        id=uuid.uuid4(),
+        student_id=uuid.uuid4(),
+        status="completed",
+        practice_type="reading",
+        answers=answers,
+    )
+    values.update(fields)
+    return Practice(**values)
+
+
+class TestQuestionHash:
+    """题目哈希测试"""
+
+    def test_normalizes_whitespace_and_case(self):
+        assert compute_question_hash("He  go to\nschool. ", "Goes") == compute_question_hash(
+            "he go to school.", "goes"
+        )
+
+    def test_normalization_matches_migration_sql(self):
+        # SQL 的 \s 只匹配 ASCII 空白，全角空格和 \x1f 分隔符不能被折叠
+        assert normalize_answer_text(" He\t go\r\n ") == "he go"
+        assert normalize_answer_text("a\u3000b") == "a\u3000b"
+        assert normalize_answer_text("a\x1fb") == "a\x1fb"
+
+    def test_correct_answer_is_part_of_key(self):
+        assert compute_question_hash("Fill in: ___", "a") != compute_question_hash("Fill in: ___", "an")
+
+    def test_fingerprint_distinguishes_wrong_answers(self):
+        assert compute_mistake_fingerprint("Q", "goes", " GO ") == compute_mistake_fingerprint("q", "goes", "go")
+        assert compute_mistake_fingerprint("Q", "goes", "go") != compute_mistake_fingerprint("Q", "goes", "goed")
+
+
+class TestMergeStatement:
+    """合并语句测试"""
+
+    def test_upsert_bumps_count_and_reopens(self):
+        stmt = MistakeService._build_merge_statement([_row(uuid.uuid4())])
+
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        assert "ON CONFLICT (student_id, question_hash) WHERE question_hash IS NOT NULL" in sql
+        assert "mistake_count = (mistakes.mistake_count + excluded.mistake_count)" in sql
+        assert "last_mistaken_at = excluded.last_mistaken_at" in sql
+        assert "fingerprint_id = excluded.fingerprint_id" in sql
+        # 重复出错保留首次出错的练习
+        assert "practice_id = excluded.practice_id" not in sql
+        assert "CASE WHEN (mistakes.status IN" in sql
+        assert "RETURNING mistakes.id, mistakes.student_id, mistakes.question_hash, xmax = 0 AS inserted" in sql
+
+
+class TestMergeMistakes:
+    """合并写入测试"""
+
+    @pytest.mark.asyncio
+    async def test_batch_duplicates_merged_into_one_row(self):
+        student_id = uuid.uuid4()
+        first_practice = uuid.uuid4()
+        first = _row(student_id, wrong_answer="go", practice_id=first_practice)
+        second = _row(
+            student_id, question="he go  to school.", wrong_answer="goed", practice_id=uuid.uuid4()
+        )
+        mistake = _mistake_from_row(first, mistake_count=2)
+        go_id, goed_id = uuid.uuid4(), uuid.uuid4()
+
+        db = AsyncMock()
+        db.execute.side_effect = [
+            _result(rows=[]),
+            _result(rows=[
+                (go_id, compute_mistake_fingerprint(first["question"], "goes", "go")),
+                (goed_id, compute_mistake_fingerprint(second["question"], "goes", "goed")),
+            ]),
+            _result(rows=[(first["id"], student_id, first["question_hash"], True)]),
+            _result(scalars=[mistake]),
+        ]
+        service = MistakeService(db)
+        service.daily_stats_service = AsyncMock()
+
+        mistakes = await service.merge_mistakes([first, second])
+
+        assert db.execute.await_count == 4
+        merge_params = db.execute.await_args_list[2].args[0].compile(
+            dialect=postgresql.dialect()
+        ).params
+        assert merge_params["mistake_count_m0"] == 2
+        assert merge_params["wrong_answer_m0"] == "goed"
+        assert merge_params["fingerprint_id_m0"] == goed_id
+        assert merge_params["practice_id_m0"] == first_practice
+        assert "mistake_count_m1" not in merge_params
+        assert mistakes == [mistake, mistake]
+        service.daily_stats_service.record_mistakes_created.assert_awaited_once_with([mistake])
+        service.daily_stats_service.record_mistake_status_changed.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_repeated_mastered_mistake_moves_status_count(self):
+        student_id = uuid.uuid4()
+        row = _row(student_id)
+        existing_id = uuid.uuid4()
+        mistake = _mistake_from_row(row, id=existing_id, status="pending", mistake_count=3)
+
+        db = AsyncMock()
+        db.execute.side_effect = [
+            _result(rows=[(student_id, row["question_hash"], "mastered")]),
+            _result(rows=[]),
+            _result(rows=[(existing_id, student_id, row["question_hash"], False)]),
+            _result(scalars=[mistake]),
+        ]
+        service = MistakeService(db)
+        service.daily_stats_service = AsyncMock()
+
+        await service.merge_mistakes([row])
+
+        service.daily_stats_service.record_mistakes_created.assert_awaited_once_with([])
+        service.daily_stats_service.record_mistake_status_changed.assert_awaited_once_with(
+            mistake, "mastered"
+        )
+
+
+class TestBulkCollection:
+    """批量收集测试"""
+
+    @pytest.mark.asyncio
+    async def test_claims_uncollected_practices_and_commits_once(self):
+        wrong = {"1": {"question": "Q1", "user_answer": "a", "correct_answer": "b", "is_correct": False},
+                 "2": {"question": "Q2", "user_answer": "c", "correct_answer": "c", "is_correct": True}}
+        fresh = _practice(wrong)
+        collected = _practice(wrong, mistakes_collected_at=datetime(2026, 3, 1))
+
+        db = AsyncMock()
+        db.execute.side_effect = [
+            _result(scalars=[fresh.id]),
+            _result(scalars=[fresh]),
+        ]
+        service = MistakeService(db)
+        merged = Mistake(id=uuid.uuid4())
+
+        with patch.object(service, "merge_mistakes", AsyncMock(return_value=[merged])) as merge:
+            result = await service.collect_mistakes_from_practices([fresh.id, collected.id])
+
+        claim_sql = str(db.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+        assert "practices.mistakes_collected_at IS NULL" in claim_sql
+        assert "RETURNING practices.id" in claim_sql
+        rows = merge.await_args.args[0]
+        assert len(rows) == 1
+        assert rows[0]["practice_id"] == fresh.id
+        assert result == {fresh.id: [merged]}
+        db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_practice_with_merged_mistakes_is_not_collected_twice(self):
+        wrong = {"1": {"question": "Q1", "user_answer": "a", "correct_answer": "b", "is_correct": False}}
+        # 错题已合并到之前练习的记录中，practice_id 不指向本练习
+        practice = _practice(wrong, mistakes_collected_at=datetime(2026, 3, 1))
+        db = AsyncMock()
+        db.get.return_value = practice
+
+        with pytest.raises(ValueError, match="已收集过"):
+            await MistakeService(db).collect_mistakes_from_practice(practice.id)
+
+        db.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_empty_input_does_not_query(self):
+        db = AsyncMock()
+
+        assert await MistakeService(db).collect_mistakes_from_practices([]) == {}
+        db.execute.assert_not_awaited()
+
+
+class TestTeacherPracticeFilter:
+    """批量收集归属校验测试"""
+
+    @pytest.mark.asyncio
+    async def test_filters_by_head_teacher_and_active_enrollment(self):
+        allowed = uuid.uuid4()
+        db = AsyncMock()
+        db.execute.return_value = _result(scalars=[allowed])
+
+        result = await MistakeService(db).filter_teacher_practices(
+            [allowed, uuid.uuid4()], uuid.uuid4()
+        )
+
+        assert result == {allowed}
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "classes.head_teacher_id" in sql
+        assert "class_students.enrollment_status" in sql
+
+
+class TestDailyStatsBulkCreate:
+    """批量错题计入每日统计测试"""
+
+    @pytest.mark.asyncio
+    async def test_groups_by_student_and_day(self):
+        db = AsyncMock()
+        student_id = uuid.uuid4()
+        day = datetime(2026, 3, 2, 9, 0)
+        mistakes = [
+            Mistake(student_id=student_id, mistake_type="grammar", status="pending", first_mistaken_at=day),
+            Mistake(student_id=student_id, mistake_type="reading", status="pending", first_mistaken_at=day),
+        ]
+
+        await DailyStatsService(db).record_mistakes_created(mistakes)
+
+        assert db.execute.await_count == 1
+        params = db.execute.await_args.args[0].compile(dialect=postgresql.dialect()).params
+        assert params["mistake_count"] == 2
+        assert params["mistakes_by_type"] == {"grammar": 1, "reading": 1}
+        assert params["mistakes_by_status"] == {"pending": 2}
@@ -5,16 +5,34 @@ import pytest
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from uuid import uuid4
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from app.services.mistake_review_service import MistakeReviewService
+from sqlalchemy.dialects import postgresql
+
+from app.services.mistake_review_service import MistakeReviewService, compute_next_review_at
 from app.models.mistake import Mistake, MistakeStatus
 
 
+def _counts_result(total=0, overdue=0, urgent=0):
+    """模拟今日清单的计数查询结果"""
+    result = MagicMock()
+    result.one.return_value = SimpleNamespace(total=total, overdue=overdue, urgent=urgent)
+    return result
+
+
+def _rows_result(rows):
+    """模拟多列查询结果"""
+    result = MagicMock()
+    result.all.return_value = rows
+    result.scalars.return_value.all.return_value = [row[0] for row in rows]
+    return result
+
+
 class TestMistakeReviewService:
     """智能复习服务测试类"""
 
@@ -237,10 +255,12 @@ class TestMistakeReviewServiceAsync:
         """测试空复习清单"""
         student_id = uuid4()
 
-        # 模拟空查询结果
-        mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = []
-        mock_db.execute = AsyncMock(return_value=mock_result)
+        # 模拟空查询结果：计数、到期错题、新错题
+        mock_db.execute = AsyncMock(side_effect=[
+            _counts_result(total=0),
+            _rows_result([]),
+            _rows_result([]),
+        ])
 
         result = await service.get_today_review_list(student_id)
 
@@ -253,10 +273,12 @@ class TestMistakeReviewServiceAsync:
         """测试有错题的复习清单"""
         student_id = sample_mistake.student_id
 
-        # 模拟查询结果
-        mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = [sample_mistake]
-        mock_db.execute = AsyncMock(return_value=mock_result)
+        # 模拟查询结果：计数、到期错题、新错题
+        mock_db.execute = AsyncMock(side_effect=[
+            _counts_result(total=1, overdue=1),
+            _rows_result([(sample_mistake, True)]),
+            _rows_result([]),
+        ])
 
         result = await service.get_today_review_list(student_id)
 
@@ -271,6 +293,7 @@ class TestMistakeReviewServiceAsync:
 
         # 模拟空查询结果
         mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 0
         mock_result.scalars.return_value.all.return_value = []
         mock_db.execute = AsyncMock(return_value=mock_result)
 
@@ -392,3 +415,100 @@ class TestMistakeReviewServiceHelpers:
         assert item["question_preview"] == "短问题"  # 不应该被截断
         assert item["topic"] is None
         assert item["review_type"] == "new"
+
+
+class TestReviewQueueQueries:
+    """复习队列范围查询测试"""
+
+    @pytest.fixture
+    def mock_db(self):
+        """创建模拟数据库会话"""
+        return AsyncMock()
+
+    @pytest.fixture
+    def service(self, mock_db):
+        """创建测试服务实例"""
+        return MistakeReviewService(mock_db)
+
+    def _mistake(self, **fields):
+        values = dict(
+            id=uuid4(),
+            student_id=uuid4(),
+            question="短问题",
+            mistake_type="grammar",
+            status=MistakeStatus.PENDING.value,
+            mistake_count=1,
+            review_count=1,
+            first_mistaken_at=datetime.utcnow() - timedelta(days=5),
+            last_reviewed_at=datetime.utcnow() - timedelta(days=1),
+        )
+        values.update(fields)
+        mistake = Mistake(**values)
+        mistake.next_review_at = compute_next_review_at(
+            mistake.review_count, mistake.first_mistaken_at, mistake.last_reviewed_at
+        )
+        return mistake
+
+    def _sql(self, mock_db, call_index=-1):
+        statement = mock_db.execute.await_args_list[call_index].args[0]
+        return str(statement.compile(dialect=postgresql.dialect()))
+
+    def test_compute_next_review_at(self):
+        """测试下次复习时间与艾宾浩斯间隔一致"""
+        first = datetime(2026, 3, 1, 8, 0)
+        reviewed = datetime(2026, 3, 4, 8, 0)
+
+        assert compute_next_review_at(0, first) == datetime(2026, 3, 2, 8, 0)
+        assert compute_next_review_at(2, first, reviewed) == datetime(2026, 3, 11, 8, 0)
+        assert compute_next_review_at(9, first, reviewed) == reviewed + timedelta(days=30)
+
+    @pytest.mark.asyncio
+    async def test_urgent_review_is_range_query_with_limit(self, service, mock_db):
+        """测试紧急复习为带 LIMIT 的范围查询"""
+        mistake = self._mistake(last_reviewed_at=datetime.utcnow() - timedelta(days=4))
+        result = MagicMock()
+        result.scalar_one.return_value = 1
+        result.scalars.return_value.all.return_value = [mistake]
+        mock_db.execute = AsyncMock(return_value=result)
+
+        data = await service.get_urgent_review(mistake.student_id, limit=5)
+
+        sql = self._sql(mock_db)
+        assert "mistakes.next_review_at <=" in sql
+        assert "LIMIT" in sql
+        assert data["total_urgent"] == 1
+        assert data["urgent_list"][0]["review_type"] == "overdue"
+
+    @pytest.mark.asyncio
+    async def test_calendar_buckets_in_sql(self, service, mock_db):
+        """测试日历分桶在 SQL 中完成，过期错题计入今天"""
+        today = datetime.utcnow().date()
+        overdue = self._mistake(last_reviewed_at=datetime.utcnow() - timedelta(days=10))
+        later = self._mistake(last_reviewed_at=datetime.utcnow())
+        mock_db.execute = AsyncMock(return_value=_rows_result([
+            (overdue, today),
+            (later, today + timedelta(days=3)),
+        ]))
+
+        data = await service.get_review_calendar(overdue.student_id, days=7)
+
+        sql = self._sql(mock_db)
+        assert "greatest(CAST(mistakes.next_review_at AS DATE)" in sql
+        assert mock_db.execute.await_count == 1
+        calendar = data["calendar"]
+        assert len(calendar) == 7
+        assert [item["id"] for item in calendar[today.strftime("%Y-%m-%d")]] == [str(overdue.id)]
+        assert len(calendar[(today + timedelta(days=3)).strftime("%Y-%m-%d")]) == 1
+
+    @pytest.mark.asyncio
+    async def test_recommended_review_scores_in_sql(self, service, mock_db):
+        """测试推荐复习在 SQL 中排序并截取前N条"""
+        mistake = self._mistake()
+        mock_db.execute = AsyncMock(return_value=_rows_result([(mistake, 42.0, False)]))
+
+        data = await service.get_recommended_review(mistake.student_id, limit=3)
+
+        sql = self._sql(mock_db)
+        assert "ORDER BY" in sql and "LIMIT" in sql
+        assert data["recommendations"][0]["priority_score"] == 42.0
+        assert data["recommendations"][0]["review_type"] == "normal"
@@ -0,0 +1,158 @@
+"""
+推荐结果缓存测试
+"""
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.schemas.recommendation import DailyContentResponse, RecommendationFilter
+from app.services.recommendation_cache_service import RecommendationCacheService
+from app.services.recommendation_service import RecommendationService
+
+
+class FakePipeline:
+    """模拟 Redis pipeline"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def hset(self, key, field, value):
+        self.commands.append(("hset", key, field, value))
+
+    def expire(self, key, ttl):
+        self.commands.append(("expire", key, ttl))
+
+    async def execute(self):
+        for command, key, *args in self.commands:
+            if command == "hset":
+                self.redis.hashes.setdefault(key, {})[args[0]] = args[1]
+            else:
+                self.redis.ttls[key] = args[0]
+
+
+class FakeRedis:
+    """模拟 Redis 客户端（decode_responses=True）"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.strings = {}
+        self.ttls = {}
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def get(self, key):
+        return self.strings.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.strings[key] = value
+        self.ttls[key] = ttl
+
+    async def delete(self, key):
+        self.hashes.pop(key, None)
+        self.strings.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def _response(total: int = 0) -> DailyContentResponse:
+    return DailyContentResponse(
+        date=datetime.now(),
+        student_profile_summary={},
+        daily_goals={},
+        total_recommendations=total,
+    )
+
+
+class TestRecommendationCacheService:
+    """推荐缓存服务测试"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return FakeRedis()
+
+    @pytest.fixture
+    def cache(self, redis_client):
+        return RecommendationCacheService(redis_client=redis_client)
+
+    @pytest.mark.asyncio
+    async def test_daily_roundtrip_per_filter(self, cache):
+        student_id = uuid.uuid4()
+        reading_only = RecommendationFilter(content_types=["reading"])
+
+        await cache.set_daily(student_id, _response(3))
+
+        assert (await cache.get_daily(student_id)).total_recommendations == 3
+        assert await cache.get_daily(student_id, reading_only) is None
+        assert await cache.get_daily(uuid.uuid4()) is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_all_filters(self, cache, redis_client):
+        student_id = uuid.uuid4()
+        reading_only = RecommendationFilter(content_types=["reading"])
+        await cache.set_daily(student_id, _response(1))
+        await cache.set_daily(student_id, _response(2), reading_only)
+
+        await cache.invalidate_daily(student_id)
+
+        assert await cache.get_daily(student_id) is None
+        assert await cache.get_daily(student_id, reading_only) is None
+
+    @pytest.mark.asyncio
+    async def test_daily_key_expires(self, cache, redis_client):
+        student_id = uuid.uuid4()
+        await cache.set_daily(student_id, _response())
+
+        key = cache._get_daily_key(student_id)
+        assert key.endswith(datetime.now().date().isoformat())
+        assert redis_client.ttls[key] == cache._DAILY_TTL
+
+    @pytest.mark.asyncio
+    async def test_rerank_roundtrip(self, cache):
+        await cache.set_rerank("prompt", [2, 1, 3])
+
+        assert await cache.get_rerank("prompt") == [2, 1, 3]
+        assert await cache.get_rerank("other prompt") is None
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_is_a_miss(self):
+        broken = AsyncMock()
+        broken.hget.side_effect = ConnectionError("down")
+        cache = RecommendationCacheService(redis_client=broken)
+
+        assert await cache.get_daily(uuid.uuid4()) is None
+
+
+class TestRecommendDailyCaching:
+    """每日推荐接入缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_cached_response_skips_pipeline(self):
+        cache = RecommendationCacheService(redis_client=FakeRedis())
+        student_id = uuid.uuid4()
+        build = AsyncMock(return_value=(None, []))
+
+        with patch(
+            "app.services.recommendation_service.get_recommendation_cache",
+            AsyncMock(return_value=cache),
+        ), patch.object(RecommendationService, "_recall_and_rank", build), patch.object(
+            RecommendationService, "_build_response", AsyncMock(return_value=_response(5))
+        ):
+            first = await RecommendationService.recommend_daily(db=None, student_id=student_id)
+            second = await RecommendationService.recommend_daily(db=None, student_id=student_id)
+            await RecommendationService.recommend_daily(
+                db=None, student_id=student_id, use_cache=False
+            )
+
+        assert first.total_recommendations == second.total_recommendations == 5
+        assert build.await_count == 2
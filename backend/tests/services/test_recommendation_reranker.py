@@ -0,0 +1,152 @@
+"""
+推荐精排器测试
+"""
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models import Content, ContentType, DifficultyLevel
+from app.schemas.recommendation import StudentProfile
+from app.services.recommendation_reranker import (
+    LinearReranker,
+    Reranker,
+    RerankContext,
+    extract_features,
+    get_reranker,
+    register_reranker,
+)
+from app.services.recommendation_service import RecommendationService
+
+NOW = datetime(2026, 1, 1)
+
+
+def _content(**overrides) -> Content:
+    fields = dict(
+        id=uuid.uuid4(),
+        title="content",
+        content_type=ContentType.READING.value,
+        difficulty_level=DifficultyLevel.INTERMEDIATE.value,
+        topic=None,
+        knowledge_points=[],
+        view_count=0,
+        favorite_count=0,
+        is_featured=False,
+        created_at=NOW,
+        published_at=None,
+    )
+    fields.update(overrides)
+    return Content(**fields)
+
+
+@pytest.fixture
+def context():
+    profile = StudentProfile(
+        student_id=uuid.uuid4(),
+        current_cefr_level="B1",
+        weak_points=["grammar", "listening"],
+        learning_points=["vocabulary"],
+        preferred_topics=["travel"],
+    )
+    return RerankContext(
+        profile=profile,
+        difficulty_range=[DifficultyLevel.INTERMEDIATE.value, DifficultyLevel.UPPER_INTERMEDIATE.value],
+        difficulty_order=RecommendationService.DIFFICULTY_ORDER,
+        now=NOW,
+    )
+
+
+class TestExtractFeatures:
+    """特征提取测试"""
+
+    def test_difficulty_distance(self, context):
+        in_range = extract_features(_content(), context)
+        far = extract_features(_content(difficulty_level=DifficultyLevel.BEGINNER.value), context)
+
+        assert in_range["difficulty_distance"] == 0.0
+        assert far["difficulty_distance"] == pytest.approx(2 / 5)
+
+    def test_weak_point_overlap_includes_topic(self, context):
+        features = extract_features(
+            _content(topic="listening", knowledge_points=["grammar"]), context
+        )
+
+        assert features["weak_point_overlap"] == 1.0
+
+    def test_recency_and_vector_score(self, context):
+        content = _content(created_at=NOW - timedelta(days=180))
+        context.vector_scores = {content.id: 0.8}
+
+        features = extract_features(content, context)
+
+        assert features["recency"] == pytest.approx(0.5)
+        assert features["vector_score"] == 0.8
+
+
+class TestLinearReranker:
+    """线性精排器测试"""
+
+    def test_rank_prefers_relevant_content(self, context):
+        weak = _content(knowledge_points=["grammar", "listening"])
+        too_easy = _content(difficulty_level=DifficultyLevel.BEGINNER.value, is_featured=True)
+        plain = _content()
+
+        ranked = LinearReranker().rank([too_easy, plain, weak], context)
+
+        assert [c for c, _ in ranked] == [weak, plain, too_easy]
+
+    def test_ties_keep_recall_order(self, context):
+        candidates = [_content() for _ in range(4)]
+
+        ranked = LinearReranker().rank(candidates, context)
+
+        assert [c for c, _ in ranked] == candidates
+
+    def test_unknown_weight_rejected(self):
+        with pytest.raises(ValueError):
+            LinearReranker(weights={"unknown": 1.0})
+
+
+class TestRerankerRegistry:
+    """精排器注册测试"""
+
+    def test_register_custom_reranker(self):
+        class ConstantReranker(Reranker):
+            name = "constant"
+
+            def score(self, features):
+                return 0.0
+
+        with patch("app.services.recommendation_reranker.get_settings") as get_settings:
+            get_settings.return_value.RECOMMENDATION_RERANKER = "constant"
+            register_reranker("constant", ConstantReranker)
+            assert isinstance(get_reranker(), ConstantReranker)
+
+            get_settings.return_value.RECOMMENDATION_RERANKER = "linear"
+            register_reranker("linear", LinearReranker)
+            assert isinstance(get_reranker(), LinearReranker)
+
+
+class TestLLMEnhance:
+    """LLM精排增强测试"""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_order_returns_none(self, context):
+        ranked = [_content(), _content()]
+
+        with patch.object(RecommendationService, "_llm_rerank", AsyncMock(return_value=ranked)):
+            assert await RecommendationService._llm_enhance(context.profile, ranked) is None
+
+    @pytest.mark.asyncio
+    async def test_reordered_result_builds_response(self, context):
+        ranked = [_content(), _content()]
+        build = AsyncMock(return_value="response")
+
+        with patch.object(
+            RecommendationService, "_llm_rerank", AsyncMock(return_value=ranked[::-1])
+        ), patch.object(RecommendationService, "_build_response", build):
+            result = await RecommendationService._llm_enhance(context.profile, ranked)
+
+        assert result == "response"
+        assert build.await_args.kwargs["ai_reranked_count"] == 2
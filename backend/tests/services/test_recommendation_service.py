@@ -233,5 +233,60 @@ async def test_recommendation_score_calculation(db: AsyncSession):
     assert score > 20
 
 
+@pytest.mark.asyncio
+async def test_recommend_daily_batch_shares_recall():
+    """批量推荐：相同召回条件的学生共享一次嵌入和检索，候选内容一次查询取回"""
+    from unittest.mock import AsyncMock, MagicMock, patch
+
+    contents = [
+        Content(id=uuid4(), title=f"c{i}", content_type=ContentType.READING.value,
+                difficulty_level=DifficultyLevel.INTERMEDIATE.value, is_published=True)
+        for i in range(3)
+    ]
+    profiles = {
+        sid: StudentProfile(student_id=sid, current_cefr_level="B1", target_exam="cet4",
+                            weak_points=weak)
+        for sid, weak in [(uuid4(), ["grammar"]), (uuid4(), ["grammar"]), (uuid4(), ["listening"])]
+    }
+
+    vector_service = MagicMock()
+    vector_service.embedding_service.batch_generate_embeddings = AsyncMock(
+        side_effect=lambda texts: [[0.1] for _ in texts]
+    )
+    vector_service.batch_search_similar = AsyncMock(return_value=[
+        [{"payload": {"content_id": str(contents[0].id)}}],
+        [{"payload": {"content_id": str(contents[1].id)}},
+         {"payload": {"content_id": str(contents[2].id)}}],
+    ])
+    db = MagicMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = contents
+    db.execute = AsyncMock(return_value=result)
+    cache = MagicMock()
+    cache.set_daily = AsyncMock()
+    rank = AsyncMock(side_effect=lambda profile, vector_candidates, **kwargs: vector_candidates)
+    build = AsyncMock(side_effect=lambda profile, ranked: ranked)
+
+    with patch.object(RecommendationService, "get_student_profiles", AsyncMock(return_value=profiles)), \
+            patch("app.services.vector_service.get_vector_service", return_value=vector_service), \
+            patch("app.services.recommendation_service.get_recommendation_cache",
+                  AsyncMock(return_value=cache)), \
+            patch.object(RecommendationService, "_rank_candidates", rank), \
+            patch.object(RecommendationService, "_build_response", build):
+        responses = await RecommendationService.recommend_daily_batch(db, list(profiles))
+
+    embedded = vector_service.embedding_service.batch_generate_embeddings.await_args.args[0]
+    assert sorted(embedded) == ["cet4 grammar", "cet4 listening"]
+    assert vector_service.batch_search_similar.await_count == 1
+    assert db.execute.await_count == 1
+    assert cache.set_daily.await_count == 3
+
+    grammar_ids = [sid for sid, p in profiles.items() if p.weak_points == ["grammar"]]
+    assert responses[grammar_ids[0]] == responses[grammar_ids[1]]
+    assert len(responses) == 3
+    # 向量相似度随召回结果一起传给精排
+    assert all(call.kwargs["vector_scores"] for call in rank.await_args_list)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
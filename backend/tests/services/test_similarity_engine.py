@@ -0,0 +1,137 @@
+"""
+向量相似度引擎测试 - AI英语教学系统
+"""
+import numpy as np
+import pytest
+
+from app.services.similarity_engine import (
+    MODE_LSH,
+    SimilarityEngine,
+    UnionFind,
+    leader_groups,
+    normalize_vectors,
+)
+
+
+def _brute_force_groups(vectors, threshold):
+    """原逐对比较实现，作为对照"""
+    matrix = normalize_vectors(vectors)
+    sims = matrix @ matrix.T
+    duplicates, processed = [], set()
+    for i in range(len(vectors)):
+        if i in processed:
+            continue
+        group = {i}
+        for j in range(i + 1, len(vectors)):
+            if j not in processed and sims[i, j] >= threshold:
+                group.add(j)
+                processed.add(j)
+        if len(group) > 1:
+            duplicates.append(group)
+        processed.add(i)
+    return duplicates
+
+
+def _clustered_vectors(num_clusters=20, per_cluster=5, dim=64, noise=0.05, seed=0):
+    """生成带噪声的聚类向量"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dim))
+    vectors = []
+    for center in centers:
+        for _ in range(per_cluster):
+            vectors.append((center + noise * rng.standard_normal(dim)).tolist())
+    return vectors
+
+
+class TestNormalizeVectors:
+    """向量归一化测试"""
+
+    def test_rows_are_unit_length(self):
+        matrix = normalize_vectors([[3.0, 4.0], [1.0, 0.0]])
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), [1.0, 1.0], rtol=1e-6)
+
+    def test_zero_and_malformed_vectors_become_zero_rows(self):
+        matrix = normalize_vectors([[0.0, 0.0], [], [1.0, 1.0]])
+        assert matrix.shape == (3, 2)
+        assert not matrix[0].any()
+        assert not matrix[1].any()
+
+
+class TestUnionFind:
+    """并查集测试"""
+
+    def test_groups_are_transitive_and_sorted(self):
+        uf = UnionFind(6)
+        uf.union(4, 5)
+        uf.union(0, 3)
+        uf.union(3, 1)
+
+        assert uf.groups() == [{0, 1, 3}, {4, 5}]
+
+
+class TestLeaderGroups:
+    """首项聚合分组测试"""
+
+    def test_not_transitive(self):
+        """0~1、1~2 但 0≁2 时，2 不会被并入 0 的组"""
+        rows = np.array([1, 0])
+        cols = np.array([2, 1])
+
+        assert leader_groups(3, rows, cols) == [{0, 1}]
+
+
+class TestSimilarityEngine:
+    """相似度引擎测试"""
+
+    @pytest.mark.parametrize("block_size", [1, 7, 1024])
+    def test_exact_mode_matches_brute_force(self, block_size):
+        """分块计算结果与逐对计算一致，与块大小无关"""
+        vectors = _clustered_vectors()
+        threshold = 0.95
+        engine = SimilarityEngine(threshold=threshold, block_size=block_size)
+
+        assert engine.find_groups(vectors) == _brute_force_groups(vectors, threshold)
+
+    def test_transitive_grouping(self):
+        """并查集模式按传递闭包合并"""
+        vectors = [[1.0, 0.0], [0.94, 0.34], [0.77, 0.64]]
+
+        assert SimilarityEngine(threshold=0.9).find_groups(vectors) == [{0, 1}]
+        assert SimilarityEngine(threshold=0.9, transitive=True).find_groups(vectors) == [{0, 1, 2}]
+
+    def test_progress_reported_per_tile(self):
+        """进度按分块上报，而不是按向量对"""
+        vectors = _clustered_vectors(num_clusters=5, per_cluster=4)
+        calls = []
+        engine = SimilarityEngine(threshold=0.9, block_size=8)
+
+        engine.find_groups(vectors, lambda *args: calls.append(args))
+
+        # 20 个向量、块大小 8 -> 3 个块 -> 6 个上三角分块
+        assert len(calls) == 6
+        assert calls[-1][1:3] == (6, 6)
+
+    def test_lsh_mode_recovers_clusters(self):
+        """近似模式能找回明显的重复组"""
+        vectors = _clustered_vectors(noise=0.01)
+        engine = SimilarityEngine(threshold=0.95, mode=MODE_LSH)
+
+        groups = engine.find_groups(vectors)
+
+        assert len(groups) == 20
+        assert all(len(group) == 5 for group in groups)
+
+    def test_max_similarity(self):
+        engine = SimilarityEngine(threshold=0.9, block_size=2)
+        queries = [[1.0, 0.0], [0.0, 1.0], [0.0, 0.0]]
+        references = [[0.9, 0.1], [-1.0, 0.0], [0.5, 0.5]]
+
+        result = engine.max_similarity(queries, references)
+
+        assert result[0] > 0.99
+        assert result[1] == pytest.approx(np.sqrt(0.5), rel=1e-5)
+        assert result[2] == 0.0
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            SimilarityEngine(threshold=0.9, mode="hnsw")
@@ -4,6 +4,7 @@
 测试流式文档生成服务的各项功能，包括流式生成、完整性验证、内存优化和错误处理。
 """
 
+import asyncio
 import uuid
 from io import BytesIO
 from typing import List
@@ -576,6 +577,45 @@ class TestMemoryOptimization:
         assert total_increase < 10 * 1024 * 1024
 
 
+    @pytest.mark.asyncio
+    async def test_writer_waits_for_slow_consumer(self):
+        """测试下游读取慢时生成线程等待（背压）"""
+        service = StreamingDocumentService()
+        written = []
+
+        def produce(write):
+            for i in range(100):
+                write(b"x" * 4096)
+                written.append(i)
+
+        stream = service._stream_from_writer(
+            lambda write: asyncio.to_thread(produce, write), chunk_size=4096
+        )
+        await stream.__anext__()
+        await asyncio.sleep(0.1)
+
+        # 生成线程最多领先缓冲上限个数据块
+        assert len(written) <= service.MAX_BUFFERED_CHUNKS + 2
+
+        await stream.aclose()
+        assert len(written) < 100
+
+    @pytest.mark.asyncio
+    async def test_writer_error_is_propagated(self):
+        """测试生成线程的异常传递给下游"""
+        service = StreamingDocumentService()
+
+        def produce(write):
+            write(b"x" * 5000)
+            raise RuntimeError("render failed")
+
+        with pytest.raises(RuntimeError, match="render failed"):
+            async for _ in service._stream_from_writer(
+                lambda write: asyncio.to_thread(produce, write), chunk_size=4096
+            ):
+                pass
+
+
 # ========== 错误处理测试 ==========
 
 
@@ -2,6 +2,10 @@
 向量服务测试
 测试Qdrant向量数据库集成
 """
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 from qdrant_client.http.exceptions import UnexpectedResponse
 
@@ -59,6 +63,128 @@ class TestVectorService:
         info = await vector_service.get_collection_info("nonexistent_collection")
         assert info["status"] == "not_found"
 
+    @pytest.mark.asyncio
+    async def test_batch_search_similar_chunks_requests(self, vector_service):
+        """批量搜索按 batch_size 分组请求，结果与查询一一对应"""
+        client = MagicMock()
+        client.query_batch_points = AsyncMock(
+            side_effect=lambda collection_name, requests: [
+                SimpleNamespace(points=[SimpleNamespace(id=f"p{i}", score=0.9, payload={})])
+                for i, _ in enumerate(requests)
+            ]
+        )
+        vector_service.client = client
+
+        results = await vector_service.batch_search_similar(
+            [[0.1, 0.2]] * 5, limit=1, score_threshold=0.85, batch_size=2
+        )
+
+        assert client.query_batch_points.await_count == 3
+        assert len(results) == 5
+        assert results[0] == [{"id": "p0", "score": 0.9, "payload": {}}]
+        request = client.query_batch_points.await_args_list[0].kwargs["requests"][0]
+        assert request.score_threshold == 0.85
+
+    @pytest.mark.asyncio
+    async def test_batch_index_contents_pipeline(self, vector_service):
+        """流水线按批读取、批量Upsert，并用一条UPDATE回填每批"""
+        ids = sorted(uuid.uuid4() for _ in range(5))
+        rows = [
+            SimpleNamespace(
+                id=content_id, title=f"t{i}", description=None, content_text="text",
+                embedding_text=None if i % 2 else f"cached {i}", content_type="reading",
+                difficulty_level="A1", exam_type=None, topic=None, tags=[], is_published=True,
+            )
+            for i, content_id in enumerate(ids)
+        ]
+        pages = [rows[0:2], rows[2:4], rows[4:5], []]
+
+        def execute(stmt):
+            result = MagicMock()
+            result.scalar_one.return_value = len(rows)
+            result.all.return_value = pages.pop(0) if str(stmt).startswith("SELECT contents.id") else []
+            return result
+
+        db = MagicMock()
+        db.execute = AsyncMock(side_effect=execute)
+        db.commit = AsyncMock()
+        db.rollback = AsyncMock()
+
+        embedding_service = MagicMock()
+        embedding_service.build_content_text.side_effect = lambda **kw: kw["title"]
+        embedding_service.batch_generate_embeddings = AsyncMock(
+            side_effect=lambda texts, batch_size: [[0.1, 0.2] for _ in texts]
+        )
+        vector_service.embedding_service = embedding_service
+        vector_service.ensure_collection = AsyncMock()
+        client = MagicMock()
+        client.upsert = AsyncMock()
+        vector_service.client = client
+        checkpoints = []
+
+        stats = await vector_service.batch_index_contents(
+            db, batch_size=2, checkpoint_callback=checkpoints.append
+        )
+
+        assert stats == {
+            "total": 5, "indexed": 5, "failed": 0, "skipped": 0, "last_id": str(ids[-1])
+        }
+        assert client.upsert.await_count == 3
+        assert db.commit.await_count == 3
+        assert checkpoints[-1] == str(ids[-1])
+        texts = [c.args[0] for c in embedding_service.batch_generate_embeddings.await_args_list]
+        assert ["cached 0", "t1"] in texts
+
+    @pytest.mark.asyncio
+    async def test_batch_index_checkpoint_stops_at_failed_batch(self, vector_service):
+        """失败批次之后的批次成功也不推进检查点，续传会重新处理失败的内容"""
+        ids = sorted(uuid.uuid4() for _ in range(6))
+        rows = [
+            SimpleNamespace(
+                id=content_id, title=f"t{i}", description=None, content_text="text",
+                embedding_text=None, content_type="reading", difficulty_level="A1",
+                exam_type=None, topic=None, tags=[], is_published=True,
+            )
+            for i, content_id in enumerate(ids)
+        ]
+        pages = [rows[0:2], rows[2:4], rows[4:6], []]
+
+        def execute(stmt):
+            result = MagicMock()
+            result.scalar_one.return_value = len(rows)
+            result.all.return_value = pages.pop(0) if str(stmt).startswith("SELECT contents.id") else []
+            return result
+
+        db = MagicMock()
+        db.execute = AsyncMock(side_effect=execute)
+        db.commit = AsyncMock()
+        db.rollback = AsyncMock()
+
+        embedding_service = MagicMock()
+        embedding_service.build_content_text.side_effect = lambda **kw: kw["title"]
+        embedding_service.batch_generate_embeddings = AsyncMock(
+            side_effect=lambda texts, batch_size: [[0.1, 0.2] for _ in texts]
+        )
+        vector_service.embedding_service = embedding_service
+        vector_service.ensure_collection = AsyncMock()
+
+        async def upsert(collection_name, points):
+            if points[0].id == str(ids[2]):
+                raise ConnectionError("qdrant unavailable")
+
+        client = MagicMock()
+        client.upsert = AsyncMock(side_effect=upsert)
+        vector_service.client = client
+        checkpoints = []
+
+        stats = await vector_service.batch_index_contents(
+            db, batch_size=2, checkpoint_callback=checkpoints.append, embed_concurrency=1
+        )
+
+        assert (stats["indexed"], stats["failed"]) == (4, 2)
+        assert stats["last_id"] == str(ids[1])
+        assert checkpoints == [str(ids[1])]
+
 
 class TestVectorServiceIntegration:
     """
@@ -0,0 +1,118 @@
+"""
+AI 端点配额测试（用户滑动窗口 + 组织令牌桶）
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.core.rate_limiter import AI_ENDPOINT_COSTS, RateLimiter
+
+
+def make_settings(**overrides):
+    values = {
+        "AI_RATE_LIMIT_ENABLED": True,
+        "AI_RATE_LIMIT_USER_BUDGET": 60,
+        "AI_RATE_LIMIT_USER_WINDOW": 60,
+        "AI_RATE_LIMIT_ORG_CAPACITY": 600,
+        "AI_RATE_LIMIT_ORG_REFILL_RATE": 5.0,
+        "AI_RATE_LIMIT_ORG_OVERRIDES": {},
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+@pytest.fixture
+def settings():
+    settings = make_settings()
+    with patch("app.core.rate_limiter.get_settings", return_value=settings):
+        yield settings
+
+
+class TestPrepareAIQuota:
+    """AI 配额检查参数测试"""
+
+    def test_passes_cost_and_keys(self, settings):
+        with patch("app.core.rate_limiter.time.time", return_value=125.0):
+            check = RateLimiter().prepare_ai_quota("lesson_plan_generate", "u1", "org1")
+
+        assert check.keys == (
+            "ratelimit:ai:user:u1:2",
+            "ratelimit:ai:user:u1:1",
+            "ratelimit:ai:org:org1",
+        )
+        assert check.args[:4] == (AI_ENDPOINT_COSTS["lesson_plan_generate"], 60, 60000, 5000)
+
+    def test_without_organization_skips_bucket(self, settings):
+        check = RateLimiter().prepare_ai_quota("conversation_message", "u1")
+
+        assert check.keys[2] == ""
+        assert check.organization_id is None
+
+    def test_org_override_capacity(self, settings):
+        settings.AI_RATE_LIMIT_ORG_OVERRIDES = {"big-org": 5000}
+
+        check = RateLimiter().prepare_ai_quota("conversation_message", "u1", "big-org")
+
+        assert check.capacity == 5000
+        assert check.args[4] == 5000
+
+    def test_disabled_returns_none(self):
+        with patch(
+            "app.core.rate_limiter.get_settings",
+            return_value=make_settings(AI_RATE_LIMIT_ENABLED=False),
+        ):
+            assert RateLimiter().prepare_ai_quota("conversation_message", "u1") is None
+
+    def test_unknown_endpoint_costs_one(self):
+        assert RateLimiter().get_endpoint_cost("unknown") == 1
+
+
+class TestBuildQuotaResult:
+    """配额脚本返回值解析测试"""
+
+    def test_allowed_request(self, settings):
+        limiter = RateLimiter()
+        check = limiter.prepare_ai_quota("lesson_plan_generate", "u1", "org1")
+
+        result = limiter.build_quota_result(check, [1, 0, 50, 30000, 590, 0])
+
+        assert result.allowed
+        assert result.scope is None
+        assert result.remaining == 50
+        assert result.reset_seconds == 30
+        assert result.org_remaining == 590
+
+    def test_user_window_rejection(self, settings):
+        limiter = RateLimiter()
+        check = limiter.prepare_ai_quota("conversation_message", "u1", "org1")
+
+        result = limiter.build_quota_result(check, [0, 1, 0, 12500, 590, 0])
+
+        assert not result.allowed
+        assert result.scope == "user"
+        assert result.retry_after == 13
+
+    def test_org_bucket_rejection_uses_bucket_retry(self, settings):
+        limiter = RateLimiter()
+        check = limiter.prepare_ai_quota("mistake_batch_analyze", "u1", "org1")
+
+        result = limiter.build_quota_result(check, [0, 2, 40, 30000, 3, 1400])
+
+        assert not result.allowed
+        assert result.scope == "org"
+        assert result.retry_after == 2
+
+    def test_records_rejection_metric(self, settings):
+        limiter = RateLimiter()
+        check = limiter.prepare_ai_quota("content_recommend", "u1")
+
+        with patch("app.core.rate_limiter.record_rate_limit_decision") as record:
+            result = limiter.build_quota_result(check, [0, 1, 0, 1000, -1, 0])
+
+        assert result.org_remaining is None
+        kwargs = record.call_args.kwargs
+        assert kwargs["endpoint"] == "content_recommend"
+        assert kwargs["allowed"] is False
+        assert kwargs["scope"] == "user"
+        assert kwargs["org_remaining_ratio"] is None
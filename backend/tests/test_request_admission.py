@@ -0,0 +1,292 @@
+"""
+请求准入检查测试（布隆过滤器 + 单次往返的黑名单/版本检查）
+"""
+import math
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.rate_limiter import AIQuotaCheck, QuotaResult
+from app.core.request_admission import RequestAdmission
+from app.core.token_blacklist import RevokedTokenFilter, TokenBlacklist
+
+
+class FakePipeline:
+    """模拟 Redis pipeline，记录命令"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.redis.commands.append(name)
+            self.queued.append((name, args))
+        return command
+
+    async def execute(self):
+        results = []
+        for name, args in self.queued:
+            if name == "ttl":
+                results.append(self.redis.ttls.get(args[0], -1))
+            elif name == "zadd":
+                self.redis.zadded.update(args[1])
+                results.append(len(args[1]))
+            else:
+                results.append(True)
+        return results
+
+
+class FakeRedis:
+    """模拟 Redis 客户端"""
+
+    def __init__(self, generation=None, members=None, script_result=None,
+                 backfilled="1", ttls=None):
+        self.generation = generation
+        self.members = members or []
+        self.backfilled = backfilled
+        # 回填扫描到的旧 key 及其 TTL
+        self.ttls = ttls or {}
+        self.zadded = {}
+        self.locked = False
+        self.commands = []
+        self.script = AsyncMock(return_value=script_result or [0, 1])
+        self.register_script = MagicMock(return_value=self.script)
+
+    async def mget(self, *keys):
+        self.commands.append("mget")
+        return [self.generation, self.backfilled]
+
+    async def set(self, key, value, nx=False, ex=None):
+        self.commands.append("set")
+        if nx and self.locked:
+            return None
+        self.locked = True
+        return True
+
+    async def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip("*")
+        for key in [*self.ttls, "token:blacklist:index", "token:blacklist:generation"]:
+            if key.startswith(prefix):
+                yield key
+
+    async def zrangebyscore(self, key, min_score, max_score):
+        self.commands.append("zrangebyscore")
+        return self.members
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+QUOTA = AIQuotaCheck(
+    endpoint="conversation_message",
+    cost=1,
+    budget=60,
+    capacity=600,
+    organization_id=None,
+    keys=("ratelimit:ai:user:u1:2", "ratelimit:ai:user:u1:1", ""),
+    args=(1, 60, 60000, 5000, 600, 5.0, 125000),
+)
+
+
+class TestRevokedTokenFilter:
+    """布隆过滤器测试"""
+
+    def test_no_false_negatives(self):
+        bloom = RevokedTokenFilter(capacity=1000)
+        items = [f"jti:{uuid.uuid4()}" for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+
+        assert all(item in bloom for item in items)
+
+    def test_false_positive_rate_is_bounded(self):
+        bloom = RevokedTokenFilter(capacity=1000, error_rate=0.01)
+        for _ in range(1000):
+            bloom.add(f"jti:{uuid.uuid4()}")
+
+        false_positives = sum(f"jti:{uuid.uuid4()}" in bloom for _ in range(10000))
+
+        assert false_positives < 300
+
+
+class TestFilterSync:
+    """过滤器同步测试"""
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_from_index(self):
+        blacklist = TokenBlacklist(redis_client=FakeRedis(generation="3", members=["jti:revoked"]))
+
+        assert await blacklist.might_be_revoked("revoked", "u1")
+        assert not await blacklist.might_be_revoked("fresh", "u1")
+
+    @pytest.mark.asyncio
+    async def test_unchanged_generation_skips_index_read(self):
+        redis_client = FakeRedis(generation="3", members=["jti:revoked"])
+        blacklist = TokenBlacklist(redis_client=redis_client)
+        await blacklist.sync_filter()
+
+        await blacklist.sync_filter(force=True)
+
+        assert redis_client.commands == ["mget", "zrangebyscore", "mget"]
+
+    @pytest.mark.asyncio
+    async def test_sync_is_rate_limited(self):
+        redis_client = FakeRedis(generation="1", members=["jti:other"])
+        blacklist = TokenBlacklist(redis_client=redis_client)
+
+        for _ in range(5):
+            await blacklist.might_be_revoked("fresh", "u1")
+
+        assert redis_client.commands.count("mget") == 1
+
+    @pytest.mark.asyncio
+    async def test_local_revocation_visible_immediately(self):
+        redis_client = FakeRedis(generation="1", members=["jti:other"])
+        blacklist = TokenBlacklist(redis_client=redis_client)
+        await blacklist.sync_filter()
+
+        await blacklist.add_to_blacklist("just-revoked", "u1")
+
+        assert await blacklist.might_be_revoked("just-revoked", "u1")
+        assert {"hset", "expire", "zadd", "incr"} <= set(redis_client.commands)
+
+    @pytest.mark.asyncio
+    async def test_user_revocation_only_matters_for_versioned_tokens(self):
+        blacklist = TokenBlacklist(redis_client=FakeRedis(generation="1", members=["user:u1"]))
+
+        assert not await blacklist.might_be_revoked("fresh", "u1", has_version=False)
+        assert await blacklist.might_be_revoked("fresh", "u1", has_version=True)
+
+    @pytest.mark.asyncio
+    async def test_empty_index_is_not_trusted(self):
+        blacklist = TokenBlacklist(redis_client=FakeRedis(generation="1", members=[]))
+
+        assert await blacklist.might_be_revoked("fresh", "u1")
+
+    @pytest.mark.asyncio
+    async def test_sync_error_marks_filter_unusable(self):
+        redis_client = FakeRedis(generation="1", members=["jti:other"])
+        blacklist = TokenBlacklist(redis_client=redis_client)
+        assert not await blacklist.might_be_revoked("fresh", "u1")
+
+        redis_client.mget = AsyncMock(side_effect=ConnectionError("down"))
+        await blacklist.sync_filter(force=True)
+
+        assert await blacklist.might_be_revoked("fresh", "u1")
+
+
+class TestIndexBackfill:
+    """撤销索引回填测试"""
+
+    @pytest.mark.asyncio
+    async def test_pre_index_keys_are_backfilled_before_filter_is_trusted(self):
+        redis_client = FakeRedis(
+            generation="1",
+            backfilled=None,
+            ttls={"token:blacklist:old-jti": 3600, "token:version:user:u9": -1},
+        )
+        blacklist = TokenBlacklist(redis_client=redis_client)
+
+        assert await blacklist.might_be_revoked("fresh", "u1")
+
+        assert set(redis_client.zadded) == {"jti:old-jti", "user:u9"}
+        assert redis_client.zadded["user:u9"] == math.inf
+        assert {"incr", "delete"} <= set(redis_client.commands)
+
+    @pytest.mark.asyncio
+    async def test_backfill_runs_once_across_processes(self):
+        redis_client = FakeRedis(ttls={"token:blacklist:old-jti": 3600})
+        redis_client.locked = True
+
+        assert await TokenBlacklist(redis_client=redis_client).backfill_index() is None
+        assert redis_client.zadded == {}
+
+
+class TestRequestAdmission:
+    """准入检查测试"""
+
+    @pytest.mark.asyncio
+    async def test_clean_token_skips_redis(self):
+        redis_client = FakeRedis(generation="1", members=["jti:other"])
+        admission = RequestAdmission(TokenBlacklist(redis_client=redis_client))
+
+        result = await admission.admit("fresh", "u1")
+
+        assert result.allowed
+        assert not result.checked_redis
+        redis_client.script.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_rejected_in_one_call(self):
+        redis_client = FakeRedis(generation="1", members=["jti:revoked"], script_result=[1, 1])
+        admission = RequestAdmission(TokenBlacklist(redis_client=redis_client))
+
+        result = await admission.admit("revoked", "u1")
+
+        assert not result.allowed
+        assert result.detail == "Token 已被撤销"
+        redis_client.script.assert_awaited_once()
+        keys = redis_client.script.await_args.kwargs["keys"]
+        assert keys == ["token:blacklist:revoked", "token:version:user:u1", "", "", ""]
+
+    @pytest.mark.asyncio
+    async def test_unsynced_filter_checks_redis(self):
+        redis_client = FakeRedis(generation="1", members=[], script_result=[0, 0])
+        admission = RequestAdmission(TokenBlacklist(redis_client=redis_client))
+
+        result = await admission.admit("fresh", "u1", token_version="v1")
+
+        assert not result.allowed
+        assert result.checked_redis
+        assert redis_client.script.await_args.kwargs["args"][0] == "v1"
+
+    @pytest.mark.asyncio
+    async def test_quota_checked_in_same_call_for_clean_token(self):
+        redis_client = FakeRedis(
+            generation="1", members=["jti:other"], script_result=[0, 1, 0, 1, 0, 12500, -1, 0]
+        )
+        admission = RequestAdmission(TokenBlacklist(redis_client=redis_client))
+
+        with patch("app.core.request_admission.get_rate_limiter") as limiter:
+            limiter.return_value.build_quota_result.side_effect = (
+                lambda check, raw: QuotaResult(allowed=bool(raw[0]), scope="user")
+            )
+            result = await admission.admit("fresh", "u1", "v1", quota=QUOTA)
+
+        redis_client.script.assert_awaited_once()
+        kwargs = redis_client.script.await_args.kwargs
+        # 布隆过滤器判定未撤销：跳过黑名单和版本，只检查配额
+        assert kwargs["keys"] == ["", "token:version:user:u1", *QUOTA.keys]
+        assert kwargs["args"] == ["", *QUOTA.args]
+        assert limiter.return_value.build_quota_result.call_args.args[1] == [0, 1, 0, 12500, -1, 0]
+        assert not result.allowed
+        assert result.quota.scope == "user"
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_does_not_report_quota(self):
+        redis_client = FakeRedis(generation="1", members=["jti:revoked"], script_result=[1, 1])
+        admission = RequestAdmission(TokenBlacklist(redis_client=redis_client))
+
+        result = await admission.admit("revoked", "u1", quota=QUOTA)
+
+        assert not result.allowed
+        assert result.quota is None
+        assert redis_client.script.await_args.kwargs["keys"][0] == "token:blacklist:revoked"
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_allows_request(self):
+        redis_client = FakeRedis(generation="1", members=["jti:revoked"])
+        redis_client.script.side_effect = ConnectionError("down")
+        admission = RequestAdmission(TokenBlacklist(redis_client=redis_client))
+
+        result = await admission.admit("revoked", "u1")
+
+        assert result.allowed